@@ -0,0 +1,30 @@
+"""曲目文件状态
+
+为增量扫描添加文件修改时间和移除标记
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('tracks', sa.Column('file_mtime', sa.Float(), nullable=True))
+    op.add_column(
+        'tracks',
+        sa.Column('missing', sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('tracks', 'missing')
+    op.drop_column('tracks', 'file_mtime')
@@ -0,0 +1,49 @@
+"""曲目路径唯一索引
+
+为批量入库的 ON CONFLICT (path) 写入添加唯一索引，先合并已有的重复路径
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 播放列表中的重复曲目指向保留的最小 ID
+    op.execute(
+        sa.text(
+            """
+            UPDATE playlist_tracks SET track_id = (
+                SELECT MIN(t2.id) FROM tracks t1 JOIN tracks t2 ON t2.path = t1.path
+                WHERE t1.id = playlist_tracks.track_id
+            )
+            WHERE track_id IN (SELECT id FROM tracks WHERE path IS NOT NULL)
+            """
+        )
+    )
+    op.execute(
+        sa.text(
+            """
+            DELETE FROM tracks
+            WHERE path IS NOT NULL
+              AND id NOT IN (SELECT MIN(id) FROM tracks WHERE path IS NOT NULL GROUP BY path)
+            """
+        )
+    )
+
+    op.drop_index(op.f('ix_tracks_path'), table_name='tracks')
+    op.create_index(op.f('ix_tracks_path'), 'tracks', ['path'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_tracks_path'), table_name='tracks')
+    op.create_index(op.f('ix_tracks_path'), 'tracks', ['path'], unique=False)
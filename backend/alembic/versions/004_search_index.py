@@ -0,0 +1,69 @@
+"""搜索索引
+
+补全拼音字段，创建名称搜索索引（SQLite FTS5 / PostgreSQL pg_trgm）
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.pinyin import to_pinyin
+from app.db.models.search import POSTGRESQL_SEARCH_DDL, SEARCH_ENTITIES, SQLITE_SEARCH_DDL
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def _backfill_pinyin(bind) -> None:
+    """为已有记录补全拼音字段"""
+    for _, _, table, name, pinyin in SEARCH_ENTITIES:
+        rows = bind.execute(
+            sa.text(f"SELECT id, {name} FROM {table} WHERE {pinyin} IS NULL")
+        ).all()
+        updates = [
+            {"id": id, "pinyin": value}
+            for id, text in rows
+            if (value := to_pinyin(text)) is not None
+        ]
+        if updates:
+            bind.execute(
+                sa.text(f"UPDATE {table} SET {pinyin} = :pinyin WHERE id = :id"), updates
+            )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    _backfill_pinyin(bind)
+
+    if bind.dialect.name == 'sqlite':
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+        for entity_type, code, table, name, pinyin in SEARCH_ENTITIES:
+            visible = "WHERE missing = 0" if table == "tracks" else ""
+            op.execute(
+                f"INSERT INTO search_index(rowid, entity_type, entity_id, name, pinyin) "
+                f"SELECT id * 4 + {code}, '{entity_type}', id, {name}, {pinyin} "
+                f"FROM {table} {visible}"
+            )
+    elif bind.dialect.name == 'postgresql':
+        for statement in POSTGRESQL_SEARCH_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for _, _, table, _, _ in SEARCH_ENTITIES:
+            for action in ("insert", "update", "delete"):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_search_{action}")
+        op.execute("DROP TABLE IF EXISTS search_index")
+    elif bind.dialect.name == 'postgresql':
+        for _, _, table, name, pinyin in SEARCH_ENTITIES:
+            for column in (name, pinyin):
+                op.execute(f"DROP INDEX IF EXISTS ix_{table}_{column}_trgm")
@@ -0,0 +1,42 @@
+"""播放历史
+
+添加 play_history 表，由播放记录器批量写入
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'play_history',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('event_id', sa.String(length=32), nullable=False),
+        sa.Column('track_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.String(length=100), nullable=True),
+        sa.Column('device_id', sa.String(length=100), nullable=True),
+        sa.Column('played_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['track_id'], ['tracks.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('event_id'),
+    )
+    op.create_index('ix_play_history_track_id', 'play_history', ['track_id'])
+    op.create_index('ix_play_history_played_at', 'play_history', ['played_at'])
+    op.create_index('ix_play_history_user_played_at', 'play_history', ['user_id', 'played_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_play_history_user_played_at', table_name='play_history')
+    op.drop_index('ix_play_history_played_at', table_name='play_history')
+    op.drop_index('ix_play_history_track_id', table_name='play_history')
+    op.drop_table('play_history')
@@ -0,0 +1,43 @@
+"""下载调度任务
+
+添加 download_jobs 表，持久化下载调度器的队列
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'download_jobs',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_retries', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_download_jobs_status_priority', 'download_jobs', ['status', 'priority', 'id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_download_jobs_status_priority', table_name='download_jobs')
+    op.drop_table('download_jobs')
@@ -0,0 +1,29 @@
+"""下载调度任务租约
+
+download_jobs 添加 key、owner 和 lease_expires_at，多个进程通过租约认领任务
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('download_jobs', sa.Column('key', sa.String(length=100), nullable=True))
+    op.add_column('download_jobs', sa.Column('owner', sa.String(length=100), nullable=True))
+    op.add_column('download_jobs', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('download_jobs', 'lease_expires_at')
+    op.drop_column('download_jobs', 'owner')
+    op.drop_column('download_jobs', 'key')
@@ -0,0 +1,33 @@
+"""下载调度任务 ID 不复用
+
+SQLite 的 download_jobs 表使用 AUTOINCREMENT，完成的任务删除后新任务不会复用其 ID
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 其他数据库的自增序列本身不会复用 ID
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table(
+            'download_jobs', recreate='always', table_kwargs={'sqlite_autoincrement': True}
+        ):
+            pass
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table(
+            'download_jobs', recreate='always', table_kwargs={'sqlite_autoincrement': False}
+        ):
+            pass
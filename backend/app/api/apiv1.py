@@ -12,10 +12,13 @@ from app.api.endpoints import (
     metadata,
     player,
     playlist,
+    search,
     site,
     stream,
     subscribe,
     subscribe_release,
+    system,
+    torrents,
     track,
 )
 
@@ -27,6 +30,7 @@ api_router.include_router(album.router, prefix="/albums", tags=["albums"])
 api_router.include_router(track.router, prefix="/tracks", tags=["tracks"])
 api_router.include_router(playlist.router, prefix="/playlists", tags=["playlists"])
 api_router.include_router(library.router, prefix="/libraries", tags=["libraries"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
 api_router.include_router(metadata.router, prefix="/metadata", tags=["metadata"])
 api_router.include_router(covers.router, prefix="/covers", tags=["covers"])
 api_router.include_router(stream.router, tags=["stream"])  # stream 路由带有完整前缀
@@ -34,13 +38,14 @@ api_router.include_router(player.router, prefix="/player", tags=["player"])
 api_router.include_router(site.router, prefix="/sites", tags=["sites"])
 api_router.include_router(subscribe_release.router, tags=["subscribe-releases"])
 api_router.include_router(subscribe.router, prefix="/subscribes", tags=["subscribes"])
+api_router.include_router(torrents.router, prefix="/torrents", tags=["torrents"])
+api_router.include_router(system.router, prefix="/system", tags=["system"])
 
 # TODO: 注册其他路由
-# from app.api.endpoints import download, subscribe, media, system
+# from app.api.endpoints import download, subscribe, media
 # api_router.include_router(download.router, prefix="/download", tags=["download"])
 # api_router.include_router(subscribe.router, prefix="/subscribes", tags=["subscribes"])
 # api_router.include_router(media.router, prefix="/media", tags=["media"])
-# api_router.include_router(system.router, prefix="/system", tags=["system"])
 
 
 # 临时占位路由
@@ -56,7 +61,10 @@ async def api_v1_root():
             "tracks": "/api/v1/tracks",
             "playlists": "/api/v1/playlists",
             "libraries": "/api/v1/libraries",
+            "search": "/api/v1/search",
             "sites": "/api/v1/sites",
+            "torrents": "/api/v1/torrents/search/stream",
+            "system": "/api/v1/system/cache/stats",
             "subscribe-releases": "/api/v1/subscribes/{subscribe_id}/releases",
         },
     }
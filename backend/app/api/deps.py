@@ -0,0 +1,12 @@
+"""
+API 公共依赖
+"""
+
+from fastapi import Request
+
+from app.core.container import Container
+
+
+def get_container(request: Request) -> Container:
+    """获取应用级依赖容器（在应用启动时创建）"""
+    return request.app.state.container
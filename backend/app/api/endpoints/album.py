@@ -8,6 +8,8 @@ from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db
+from app.db.models.album import Album
+from app.db.models.track import Track
 from app.db.operations.album import AlbumOper
 from app.db.operations.track import TrackOper
 from app.schemas.album import (
@@ -22,42 +24,53 @@ from app.schemas.track import TrackListResponse
 router = APIRouter()
 
 
-def get_album_oper(db: AsyncSession = Depends(get_db)) -> AlbumOper:
+def get_album_oper(db: AsyncSession = Depends(get_db, scope="function")) -> AlbumOper:
     """获取 Album 操作实例"""
     from app.db import db_manager
 
-    return AlbumOper(db_manager)
+    return AlbumOper(Album, db_manager)
 
 
-def get_track_oper(db: AsyncSession = Depends(get_db)) -> TrackOper:
+def get_track_oper(db: AsyncSession = Depends(get_db, scope="function")) -> TrackOper:
     """获取 Track 操作实例"""
     from app.db import db_manager
 
-    return TrackOper(db_manager)
+    return TrackOper(Track, db_manager)
 
 
 @router.get("/", response_model=PaginatedResponse[AlbumListResponse])
 async def get_albums(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: str = Query(None),
+    exact_total: bool = Query(False),
     search: str = Query(None),
     album_oper: AlbumOper = Depends(get_album_oper),
 ):
     """
     获取专辑列表
 
-    - **skip**: 跳过的记录数
+    - **skip**: 跳过的记录数（兼容旧客户端，建议使用 cursor）
     - **limit**: 返回的最大记录数（最多 100）
+    - **cursor**: 分页游标，传入上一页返回的 next_cursor
+    - **exact_total**: 是否返回精确总数（默认返回估算值）
     - **search**: 搜索关键词（按标题搜索）
     """
+    next_cursor = None
     if search:
         albums = await album_oper.search_by_title(search, limit=limit)
-    else:
+    elif skip and not cursor:
         albums = await album_oper.get_all(skip=skip, limit=limit)
+    else:
+        try:
+            albums, next_cursor = await album_oper.get_page(cursor, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
 
-    total = await album_oper.count()
+    total = await album_oper.count() if exact_total else await album_oper.estimate_count()
     total_pages = (total + limit - 1) // limit
-    page = skip // limit + 1
+    # 游标分页无法确定页码
+    page = None if cursor else skip // limit + 1
 
     album_list = [
         AlbumListResponse(
@@ -82,6 +95,7 @@ async def get_albums(
         page=page,
         page_size=limit,
         total_pages=total_pages,
+        next_cursor=next_cursor,
     )
 
 
@@ -7,6 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db
+from app.db.models.artist import Artist
 from app.db.operations.artist import ArtistOper
 from app.schemas.artist import (
     ArtistCreate,
@@ -19,35 +20,46 @@ from app.schemas.response import PaginatedResponse, ResponseModel
 router = APIRouter()
 
 
-def get_artist_oper(db: AsyncSession = Depends(get_db)) -> ArtistOper:
+def get_artist_oper(db: AsyncSession = Depends(get_db, scope="function")) -> ArtistOper:
     """获取 Artist 操作实例"""
     from app.db import db_manager
 
-    return ArtistOper(db_manager)
+    return ArtistOper(Artist, db_manager)
 
 
 @router.get("/", response_model=PaginatedResponse[ArtistListResponse])
 async def get_artists(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: str = Query(None),
+    exact_total: bool = Query(False),
     search: str = Query(None),
     artist_oper: ArtistOper = Depends(get_artist_oper),
 ):
     """
     获取艺术家列表
 
-    - **skip**: 跳过的记录数
+    - **skip**: 跳过的记录数（兼容旧客户端，建议使用 cursor）
     - **limit**: 返回的最大记录数（最多 100）
+    - **cursor**: 分页游标，传入上一页返回的 next_cursor
+    - **exact_total**: 是否返回精确总数（默认返回估算值）
     - **search**: 搜索关键词（按名称搜索）
     """
+    next_cursor = None
     if search:
         artists = await artist_oper.search_by_name(search, limit=limit)
-    else:
+    elif skip and not cursor:
         artists = await artist_oper.get_all(skip=skip, limit=limit)
+    else:
+        try:
+            artists, next_cursor = await artist_oper.get_page(cursor, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
 
-    total = await artist_oper.count()
+    total = await artist_oper.count() if exact_total else await artist_oper.estimate_count()
     total_pages = (total + limit - 1) // limit
-    page = skip // limit + 1
+    # 游标分页无法确定页码
+    page = None if cursor else skip // limit + 1
 
     artist_list = [
         ArtistListResponse(
@@ -67,6 +79,7 @@ async def get_artists(
         page=page,
         page_size=limit,
         total_pages=total_pages,
+        next_cursor=next_cursor,
     )
 
 
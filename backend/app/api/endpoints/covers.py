@@ -6,15 +6,26 @@
 import aiofiles
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
 from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core.log import logger
 from app.db import get_db
+from app.db.models.album import Album
 from app.db.operations.album import AlbumOper
+from app.modules.musicbrainz import get_musicbrainz_client
 from app.schemas.response import ResponseModel
 
 router = APIRouter()
 
+
+def get_album_oper(db: AsyncSession = Depends(get_db, scope="function")) -> AlbumOper:
+    """获取 Album 操作实例"""
+    from app.db import db_manager
+
+    return AlbumOper(Album, db_manager)
+
+
 # 封面缓存目录
 COVER_CACHE_DIR = settings.cache_path / "covers"
 COVER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
@@ -68,7 +79,7 @@ async def get_cover(cover_id: str):
 @router.post("/albums/{album_id}/cover", response_model=ResponseModel[dict])
 async def download_album_cover(
     album_id: int,
-    album_oper: AlbumOper = Depends(get_db),
+    album_oper: AlbumOper = Depends(get_album_oper),
 ):
     """
     下载专辑封面
@@ -90,20 +101,13 @@ async def download_album_cover(
             }
         )
 
-    # 否则先查询 MusicBrainz
+    # 否则先查询 MusicBrainz（共享客户端限速，不阻塞事件循环）
     try:
-        import musicbrainzngs
-
-        from app.core.config import settings
-
-        musicbrainzngs.set_useragent(
-            f"{settings.musicbrainz_app_name}/{settings.musicbrainz_app_version}",
-            "https://github.com/hhyo/MusicPilot",
-        )
-
         # 搜索专辑
         if album.title:
-            result = musicbrainzngs.search_release_groups(album.title, limit=5)
+            result = await get_musicbrainz_client().call(
+                "search_release_groups", album.title, limit=5
+            )
             for rg in result.get("release-group-list", []):
                 # 简单匹配标题
                 if rg.get("title") == album.title:
@@ -135,7 +139,7 @@ async def download_album_cover(
 @router.post("/batch", response_model=ResponseModel[dict])
 async def batch_download_covers(
     album_ids: list[int],
-    album_oper: AlbumOper = Depends(get_db),
+    album_oper: AlbumOper = Depends(get_album_oper),
 ):
     """
     批量下载专辑封面
@@ -202,7 +206,7 @@ async def batch_download_covers(
 async def upload_custom_cover(
     album_id: int,
     file: UploadFile = File(...),
-    album_oper: AlbumOper = Depends(get_db),
+    album_oper: AlbumOper = Depends(get_album_oper),
 ):
     """
     上传自定义封面
@@ -245,7 +249,7 @@ async def upload_custom_cover(
 @router.delete("/{album_id}/cover", response_model=ResponseModel[dict])
 async def delete_cover(
     album_id: int,
-    album_oper: AlbumOper = Depends(get_db),
+    album_oper: AlbumOper = Depends(get_album_oper),
 ):
     """
     删除专辑封面
@@ -3,19 +3,21 @@ Library API 端点
 音乐库相关 API
 """
 
+import os
 from pathlib import Path
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.deps import get_container
 from app.chain.metadata import MetadataChain
-from app.core.cache import AsyncFileCache
 from app.core.config import settings
-from app.core.event import EventManager
+from app.core.container import Container
 from app.core.log import logger
-from app.core.module import ModuleManager
-from app.core.plugin import PluginManager
+from app.core.scanner import LibraryScanner
 from app.db import get_db
+from app.db.models.library import Library
+from app.db.models.track import Track
 from app.db.operations.library import LibraryOper
 from app.db.operations.track import TrackOper
 from app.schemas.library import (
@@ -33,126 +35,54 @@ router = APIRouter()
 scan_tasks: dict[str, dict] = {}
 
 
-def get_library_oper(db: AsyncSession = Depends(get_db)) -> LibraryOper:
+def get_library_oper(db: AsyncSession = Depends(get_db, scope="function")) -> LibraryOper:
     """获取 Library 操作实例"""
     from app.db import db_manager
 
-    return LibraryOper(db_manager)
+    return LibraryOper(Library, db_manager)
 
 
-def get_track_oper(db: AsyncSession = Depends(get_db)) -> TrackOper:
+def get_track_oper(db: AsyncSession = Depends(get_db, scope="function")) -> TrackOper:
     """获取 Track 操作实例"""
     from app.db import db_manager
 
-    return TrackOper(db_manager)
+    return TrackOper(Track, db_manager)
 
 
-async def get_metadata_chain():
-    """获取 MetadataChain 实例"""
-    # 创建核心组件
-    event_manager = EventManager()
-    module_manager = ModuleManager()
-    plugin_manager = PluginManager(event_manager)
-    cache = AsyncFileCache(settings.cache_path, settings.cache_ttl)
-
-    # 返回 MetadataChain
-    return MetadataChain(
-        event_manager=event_manager,
-        module_manager=module_manager,
-        plugin_manager=plugin_manager,
-        cache=cache,
-    )
-
-
-async def recursive_scan(directory: Path, recursive: bool = True) -> list[str]:
-    """
-    递归扫描目录，查找音乐文件
-
-    Args:
-        directory: 目录路径
-        recursive: 是否递归扫描
-
-    Returns:
-        音乐文件路径列表
-    """
-    music_extensions = [".mp3", ".flac", ".m4a", ".aac", ".ogg", ".wav", ".wma"]
-    music_files = []
-
-    if not directory.exists():
-        logger.warning(f"目录不存在: {directory}")
-        return music_files
-
-    if recursive:
-        # 递归扫描
-        for file_path in directory.rglob("*"):
-            if file_path.is_file() and file_path.suffix.lower() in music_extensions:
-                music_files.append(str(file_path))
-    else:
-        # 只扫描当前目录
-        for file_path in directory.glob("*"):
-            if file_path.is_file() and file_path.suffix.lower() in music_extensions:
-                music_files.append(str(file_path))
-
-    # 按文件名排序
-    music_files.sort()
-    logger.info(f"扫描完成，找到 {len(music_files)} 个音乐文件")
-
-    return music_files
-
-
-async def process_file_batch(file_paths: list[str], metadata_chain: MetadataChain, task_id: str):
-    """
-    批量处理文件（后台任务）
-
-    Args:
-        file_paths: 文件路径列表
-        metadata_chain: MetadataChain 实例
-        task_id: 任务 ID
-    """
-    total = len(file_paths)
-    success = 0
-    failed = 0
-
-    scan_tasks[task_id]["status"] = "scanning"
-    scan_tasks[task_id]["total"] = total
-    scan_tasks[task_id]["processed"] = 0
-    scan_tasks[task_id]["success"] = 0
-    scan_tasks[task_id]["failed"] = 0
-
-    results = await metadata_chain.batch_recognize(file_paths)
-
-    for result in results:
-        scan_tasks[task_id]["processed"] += 1
-
-        if result.get("success"):
-            success += 1
-            scan_tasks[task_id]["success"] += 1
-        else:
-            failed += 1
-            scan_tasks[task_id]["failed"] += 1
-
-        # 更新进度（每处理 10 个文件）
-        if scan_tasks[task_id]["processed"] % 10 == 0:
-            logger.info(f"扫描进度: {scan_tasks[task_id]['processed']}/{total}")
-
-    scan_tasks[task_id]["status"] = "completed"
-    scan_tasks[task_id]["success_count"] = success
-    scan_tasks[task_id]["failed_count"] = failed
-    logger.info(f"扫描完成: {success} 成功, {failed} 失败")
+def get_metadata_chain(container: Container = Depends(get_container)) -> MetadataChain:
+    """获取 MetadataChain 实例（应用级单例）"""
+    return container.get_chain(MetadataChain)
 
 
 @router.get("/", response_model=PaginatedResponse[LibraryListResponse])
 async def get_libraries(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: str = Query(None),
+    exact_total: bool = Query(False),
     library_oper: LibraryOper = Depends(get_library_oper),
 ):
-    """获取音乐库列表"""
-    libraries = await library_oper.get_all(skip=skip, limit=limit)
+    """
+    获取音乐库列表
 
-    total = await library_oper.count()
+    - **skip**: 跳过的记录数（兼容旧客户端，建议使用 cursor）
+    - **limit**: 返回的最大记录数（最多 100）
+    - **cursor**: 分页游标，传入上一页返回的 next_cursor
+    - **exact_total**: 是否返回精确总数（默认返回估算值）
+    """
+    next_cursor = None
+    if skip and not cursor:
+        libraries = await library_oper.get_all(skip=skip, limit=limit)
+    else:
+        try:
+            libraries, next_cursor = await library_oper.get_page(cursor, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+
+    total = await library_oper.count() if exact_total else await library_oper.estimate_count()
     total_pages = (total + limit - 1) // limit
-    page = skip // limit + 1
+    # 游标分页无法确定页码
+    page = None if cursor else skip // limit + 1
 
     library_list = [
         LibraryListResponse(
@@ -175,6 +105,7 @@ async def get_libraries(
         page=page,
         page_size=limit,
         total_pages=total_pages,
+        next_cursor=next_cursor,
     )
 
 
@@ -246,13 +177,16 @@ async def scan_library(
     library_id: int,
     request: ScanLibraryRequest,
     background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db, scope="function"),
     library_oper: LibraryOper = Depends(get_library_oper),
+    metadata_chain: MetadataChain = Depends(get_metadata_chain),
 ):
     """
     扫描音乐库
 
     - **library_id**: 音乐库 ID
     - **recursive**: 是否递归扫描（默认使用配置值）
+    - **incremental**: 是否增量扫描（默认开启，跳过未变化的文件并标记已删除的文件）
     """
     library = await library_oper.get_by_id(library_id)
     if not library:
@@ -268,6 +202,7 @@ async def scan_library(
 
     # 初始化任务状态
     scan_tasks[task_id] = {
+        "task_id": task_id,
         "library_id": library_id,
         "status": "pending",
         "total": 0,
@@ -276,46 +211,58 @@ async def scan_library(
         "failed": 0,
         "started_at": None,
         "completed_at": None,
+        "error": None,
     }
 
     # 后台任务
     async def run_scan():
-        scan_tasks[task_id]["started_at"] = time.time()
-        scan_tasks[task_id]["status"] = "preparing"
-
-        # 扫描目录
-        music_files = await recursive_scan(Path(library.path), recursive)
-
-        if not music_files:
-            scan_tasks[task_id]["status"] = "completed"
-            scan_tasks[task_id]["completed_at"] = time.time()
-            return
-
-        # 获取 MetadataChain
-        metadata_chain = await get_metadata_chain()
-
-        # 批量处理
-        await process_file_batch(music_files, metadata_chain, task_id)
-
-        scan_tasks[task_id]["completed_at"] = time.time()
-
-        # 更新音乐库统计
-        track_oper = TrackOper()
-        tracks = await track_oper.get_by_library(library.path)
-
-        await library_oper.update_stats(
-            library_id,
-            track_count=len(tracks),
-            album_count=len({t.album_id for t in tracks if t.album_id}),
-            artist_count=len({t.artist_id for t in tracks if t.artist_id}),
-            total_size=sum(t.file_size for t in tracks if t.file_size or 0),
-        )
-
-        # 更新扫描时间
-        await library_oper.update_scan_time(library_id)
-
-        logger.info(f"音乐库扫描完成: {library.name} (ID: {library_id})")
-
+        from app.db import db_manager
+
+        # 后台任务可能在请求的工作单元结束前运行，扫描使用独立会话
+        with db_manager.detach():
+            scan_tasks[task_id]["started_at"] = time.time()
+            try:
+                scan_tasks[task_id]["status"] = "preparing"
+
+                track_oper = TrackOper(Track, db_manager)
+                path_prefix = os.path.join(library.path, "")
+
+                # 增量扫描：一次查询取出已入库文件的大小和修改时间
+                known_files = (
+                    await track_oper.get_file_states(path_prefix) if request.incremental else None
+                )
+
+                # 流式扫描：遍历、解析、入库并行进行，进度实时写入 scan_tasks
+                scanner = LibraryScanner(
+                    parse_workers=settings.scan_workers, batch_size=settings.scan_batch_size
+                )
+                await scanner.scan(
+                    library.path,
+                    metadata_chain.ingest_parsed,
+                    recursive=recursive,
+                    progress=scan_tasks[task_id],
+                    known_files=known_files,
+                    handle_missing=track_oper.mark_missing,
+                )
+
+                # 更新音乐库统计
+                stats = await track_oper.get_library_stats(path_prefix)
+                await library_oper.update_stats(library_id, **stats)
+
+                # 更新扫描时间
+                await library_oper.update_scan_time(library_id)
+
+                scan_tasks[task_id]["completed_at"] = time.time()
+                logger.info(f"音乐库扫描完成: {library.name} (ID: {library_id})")
+            except Exception as e:
+                # 任何阶段失败都要结束任务，否则轮询扫描状态的客户端会一直等待
+                scan_tasks[task_id]["status"] = "failed"
+                scan_tasks[task_id]["error"] = str(e)
+                scan_tasks[task_id]["completed_at"] = time.time()
+                logger.exception(f"音乐库扫描失败: {library.name} (ID: {library_id}): {e}")
+
+    # 先结束请求的事务，避免扫描期间占用连接
+    await db.commit()
     background_tasks.add_task(run_scan)
 
     return ResponseModel(
@@ -366,5 +313,6 @@ async def get_scan_status(library_id: int):
             "failed": latest_task.get("failed", 0),
             "started_at": latest_task.get("started_at"),
             "completed_at": latest_task.get("completed_at"),
+            "error": latest_task.get("error"),
         }
     )
@@ -4,15 +4,16 @@
 """
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.deps import get_container
 from app.chain.metadata import MetadataChain
-from app.core.cache import AsyncFileCache
-from app.core.config import settings
-from app.core.event import EventManager
+from app.core.container import Container
 from app.core.log import logger
-from app.core.module import ModuleManager
-from app.core.plugin import PluginManager
 from app.db import get_db
+from app.db.models.album import Album
+from app.db.models.artist import Artist
+from app.db.models.track import Track
 from app.db.operations.album import AlbumOper
 from app.db.operations.artist import ArtistOper
 from app.db.operations.track import TrackOper
@@ -21,26 +22,37 @@ from app.schemas.response import ResponseModel
 router = APIRouter()
 
 
-async def get_metadata_chain():
-    """获取 MetadataChain 实例"""
-    event_manager = EventManager()
-    module_manager = ModuleManager()
-    plugin_manager = PluginManager(event_manager)
-    cache = AsyncFileCache(settings.cache_path, settings.cache_ttl)
+def get_artist_oper(db: AsyncSession = Depends(get_db, scope="function")) -> ArtistOper:
+    """获取 Artist 操作实例"""
+    from app.db import db_manager
 
-    return MetadataChain(
-        event_manager=event_manager,
-        module_manager=module_manager,
-        plugin_manager=plugin_manager,
-        cache=cache,
-    )
+    return ArtistOper(Artist, db_manager)
+
+
+def get_album_oper(db: AsyncSession = Depends(get_db, scope="function")) -> AlbumOper:
+    """获取 Album 操作实例"""
+    from app.db import db_manager
+
+    return AlbumOper(Album, db_manager)
+
+
+def get_track_oper(db: AsyncSession = Depends(get_db, scope="function")) -> TrackOper:
+    """获取 Track 操作实例"""
+    from app.db import db_manager
+
+    return TrackOper(Track, db_manager)
+
+
+def get_metadata_chain(container: Container = Depends(get_container)) -> MetadataChain:
+    """获取 MetadataChain 实例（应用级单例）"""
+    return container.get_chain(MetadataChain)
 
 
 @router.patch("/artists/batch", response_model=ResponseModel[dict])
 async def batch_update_artists(
     artist_ids: list[int],
     updates: dict,
-    artist_oper: ArtistOper = Depends(get_db),
+    artist_oper: ArtistOper = Depends(get_artist_oper),
 ):
     """
     批量更新艺术家信息
@@ -84,7 +96,7 @@ async def batch_update_artists(
 async def batch_update_albums(
     album_ids: list[int],
     updates: dict,
-    album_oper: AlbumOper = Depends(get_db),
+    album_oper: AlbumOper = Depends(get_album_oper),
 ):
     """
     批量更新专辑信息
@@ -128,7 +140,7 @@ async def batch_update_albums(
 async def batch_update_tracks(
     track_ids: list[int],
     updates: dict,
-    track_oper: TrackOper = Depends(get_db),
+    track_oper: TrackOper = Depends(get_track_oper),
 ):
     """
     批量更新曲目信息
@@ -234,7 +246,7 @@ async def batch_rewrite_tracks(
 @router.get("/validate/{track_id}", response_model=ResponseModel[dict])
 async def validate_track_metadata(
     track_id: int,
-    track_oper: TrackOper = Depends(get_db),
+    track_oper: TrackOper = Depends(get_track_oper),
 ):
     """
     验证曲目元数据完整性
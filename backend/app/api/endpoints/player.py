@@ -1,41 +1,44 @@
 """
 Player API 端点
 播放器状态管理
+
+播放状态按 user_id + device_id 保存，不传时使用匿名用户的默认设备
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 
+from app.api.deps import get_container
 from app.chain.playback import PlaybackChain
-from app.core.config import settings
+from app.core.container import Container
+from app.db.models.track import Track
 from app.schemas.response import ResponseModel
 
 router = APIRouter()
 
 
-async def get_playback_chain() -> PlaybackChain:
-    """获取 PlaybackChain 实例"""
-    # 创建核心组件
-    from app.core.cache import AsyncFileCache
-    from app.core.event import EventManager
-    from app.core.module import ModuleManager
-    from app.core.plugin import PluginManager
-
-    event_manager = EventManager()
-    module_manager = ModuleManager()
-    plugin_manager = PluginManager(event_manager)
-    cache = AsyncFileCache(settings.cache_path, settings.cache_ttl)
-
-    # 创建 PlaybackChain
-    return PlaybackChain(
-        event_manager=event_manager,
-        module_manager=module_manager,
-        plugin_manager=plugin_manager,
-        cache=cache,
-    )
+def get_playback_chain(container: Container = Depends(get_container)) -> PlaybackChain:
+    """获取 PlaybackChain 实例（应用级单例，状态保存在共享的 PlaybackStateStore 中）"""
+    return container.get_chain(PlaybackChain)
+
+
+def _track_summary(track: Track | None) -> dict | None:
+    """曲目摘要"""
+    if not track:
+        return None
+    return {
+        "id": track.id,
+        "title": track.title,
+        "artist_id": track.artist_id,
+        "album_id": track.album_id,
+        "duration": track.duration,
+        "file_format": track.file_format,
+    }
 
 
 @router.get("/current", response_model=ResponseModel[dict])
 async def get_current_state(
+    user_id: str | None = None,
+    device_id: str | None = None,
     playback_chain: PlaybackChain = Depends(get_playback_chain),
 ):
     """
@@ -44,34 +47,30 @@ async def get_current_state(
     返回当前曲目、播放状态、进度、队列信息等
     """
     # 获取队列信息
-    queue_info = playback_chain.get_queue_info()
+    queue_info = await playback_chain.get_queue_info(user_id, device_id)
+    session = await playback_chain.get_current_session(user_id, device_id)
 
     # 获取播放历史
-    history = await playback_chain.get_history(limit=20)
+    history = await playback_chain.get_history(user_id, limit=10, device_id=device_id)
 
     # 组装响应
     return ResponseModel(
         data={
-            "is_playing": False,
-            "track": queue_info.get("current_track"),
-            "next_track": queue_info.get("next_track"),
+            "session_id": session.session_id if session else None,
+            "is_playing": session.is_playing if session else False,
+            "track": _track_summary(queue_info.get("current_track")),
+            "next_track": _track_summary(queue_info.get("next_track")),
             "queue": queue_info.get("queue"),
+            "queue_position": queue_info.get("position"),
             "current_index": queue_info.get("current_index"),
-            "queue_count": len(queue_info.get("queue", [])),
+            "queue_count": queue_info.get("queue_count"),
             "repeat_mode": queue_info.get("repeat_mode"),
             "shuffle": queue_info.get("is_shuffle"),
-            "volume": 1.0,
-            "position": (
-                queue_info.get("current_track", {}).get("position", 0)
-                if queue_info.get("current_track")
-                else 0
-            ),
-            "duration": (
-                queue_info.get("current_track", {}).get("duration", 0)
-                if queue_info.get("current_track")
-                else 0
-            ),
-            "history": history[:10],  # 最近 10 条
+            "volume": session.volume if session else 1.0,
+            "muted": session.muted if session else False,
+            "position": session.position if session else 0,
+            "duration": session.duration if session else 0,
+            "history": history,
         }
     )
 
@@ -80,6 +79,7 @@ async def get_current_state(
 async def get_play_history(
     limit: int = 50,
     user_id: str | None = None,
+    device_id: str | None = None,
     playback_chain: PlaybackChain = Depends(get_playback_chain),
 ):
     """
@@ -87,8 +87,11 @@ async def get_play_history(
 
     - **limit**: 返回数量（最多 100）
     - **user_id**: 用户 ID（可选，筛选特定用户的历史）
+    - **device_id**: 设备 ID（可选）
     """
-    history = await playback_chain.get_history(user_id=user_id, limit=min(limit, 100))
+    history = await playback_chain.get_history(
+        user_id=user_id, limit=min(limit, 100), device_id=device_id
+    )
 
     return ResponseModel(data=history)
 
@@ -97,6 +100,7 @@ async def get_play_history(
 async def play_track(
     track_id: int,
     user_id: str | None = None,
+    device_id: str | None = None,
     playlist_id: int | None = None,
     playback_chain: PlaybackChain = Depends(get_playback_chain),
 ):
@@ -105,10 +109,11 @@ async def play_track(
 
     - **track_id**: 曲目 ID
     - **user_id**: 用户 ID（可选）
+    - **device_id**: 设备 ID（可选）
     - **playlist_id**: 播放列表 ID（可选，从播放列表开始播放）
     """
     try:
-        session = await playback_chain.play(track_id, user_id, playlist_id)
+        session = await playback_chain.play(track_id, user_id, playlist_id, device_id)
 
         return ResponseModel(
             message="开始播放",
@@ -124,23 +129,24 @@ async def play_track(
 
 @router.post("/pause", response_model=ResponseModel[dict])
 async def pause(
-    session_id: str | None = None,
+    user_id: str | None = None,
+    device_id: str | None = None,
     playback_chain: PlaybackChain = Depends(get_playback_chain),
 ):
     """
     暂停播放
 
-    - **session_id**: 会话 ID，None 表示当前会话
+    - **user_id**: 用户 ID（可选）
+    - **device_id**: 设备 ID（可选）
     """
-    await playback_chain.pause(session_id)
+    await playback_chain.pause(user_id, device_id)
 
-    current_session = playback_chain.get_current_session()
-    session_id = current_session.session_id if current_session else None
+    current_session = await playback_chain.get_current_session(user_id, device_id)
 
     return ResponseModel(
         message="已暂停",
         data={
-            "session_id": session_id,
+            "session_id": current_session.session_id if current_session else None,
             "is_playing": False,
         },
     )
@@ -148,66 +154,64 @@ async def pause(
 
 @router.post("/stop", response_model=ResponseModel[dict])
 async def stop(
-    session_id: str | None = None,
+    user_id: str | None = None,
+    device_id: str | None = None,
     playback_chain: PlaybackChain = Depends(get_playback_chain),
 ):
     """
     停止播放
 
-    - **session_id**: 会话 ID，None 表示当前会话
+    - **user_id**: 用户 ID（可选）
+    - **device_id**: 设备 ID（可选）
     """
-    await playback_chain.stop(session_id)
+    await playback_chain.stop(user_id, device_id)
 
     return ResponseModel(message="已停止", data={})
 
 
 @router.post("/next", response_model=ResponseModel[dict])
 async def next_track(
-    session_id: str | None = None,
+    user_id: str | None = None,
+    device_id: str | None = None,
     playback_chain: PlaybackChain = Depends(get_playback_chain),
 ):
     """
     下一首
 
-    - **session_id**: 会话 ID，None 表示当前会话
+    - **user_id**: 用户 ID（可选）
+    - **device_id**: 设备 ID（可选）
     """
-    current_session = playback_chain.get_current_session()
-    session_id = current_session.session_id if current_session else None
-
-    await playback_chain.next(session_id)
+    session = await playback_chain.next(user_id, device_id)
 
     return ResponseModel(
         message="播放下一首",
         data={
-            "session_id": session_id,
-            "track_id": (
-                playback_chain.get_current_session().track_id
-                if playback_chain.get_current_session()
-                else None
-            ),
+            "session_id": session.session_id if session else None,
+            "track_id": session.track_id if session else None,
         },
     )
 
 
 @router.post("/previous", response_model=ResponseModel[dict])
 async def previous_track(
-    session_id: str | None = None,
+    user_id: str | None = None,
+    device_id: str | None = None,
     playback_chain: PlaybackChain = Depends(get_playback_chain),
 ):
     """
     上一首
 
-    - **session_id**: 会话 ID，None 表示当前会话
+    - **user_id**: 用户 ID（可选）
+    - **device_id**: 设备 ID（可选）
     """
-    await playback_chain.previous(session_id)
+    await playback_chain.previous(user_id, device_id)
 
-    current_session = playback_chain.get_current_session()
-    session_id = current_session.session_id if current_session else None
+    current_session = await playback_chain.get_current_session(user_id, device_id)
 
     return ResponseModel(
         message="播放上一首",
         data={
-            "session_id": session_id,
+            "session_id": current_session.session_id if current_session else None,
             "track_id": current_session.track_id if current_session else None,
         },
     )
@@ -216,16 +220,18 @@ async def previous_track(
 @router.post("/seek", response_model=ResponseModel[dict])
 async def seek_to_position(
     position: float,
-    session_id: str | None = None,
+    user_id: str | None = None,
+    device_id: str | None = None,
     playback_chain: PlaybackChain = Depends(get_playback_chain),
 ):
     """
     跳转到指定位置
 
     - **position**: 位置（秒）
-    - **session_id**: session ID, None 表示当前会话
+    - **user_id**: 用户 ID（可选）
+    - **device_id**: 设备 ID（可选）
     """
-    await playback_chain.seek(position, session_id)
+    await playback_chain.seek(position, user_id, device_id)
 
     return ResponseModel(
         message=f"跳转到 {position} 秒",
@@ -238,38 +244,40 @@ async def seek_to_position(
 @router.post("/volume", response_model=ResponseModel[dict])
 async def set_volume(
     volume: float,
-    session_id: str | None = None,
+    user_id: str | None = None,
+    device_id: str | None = None,
     playback_chain: PlaybackChain = Depends(get_playback_chain),
 ):
     """
     设置音量
 
     - **volume**: 音量（0.0-1.0）
-    - **session_id**: 会话 ID，None 表示当前会话
+    - **user_id**: 用户 ID（可选）
+    - **device_id**: 设备 ID（可选）
     """
-    await playback_chain.set_volume(volume, session_id)
+    session = await playback_chain.set_volume(volume, user_id, device_id)
 
     return ResponseModel(
         message=f"音量设置为 {int(volume * 100)}%",
         data={
-            "volume": volume,
+            "volume": session.volume if session else volume,
         },
     )
 
 
 @router.post("/mute", response_model=ResponseModel[dict])
 async def toggle_mute(
-    session_id: str | None = None,
+    user_id: str | None = None,
+    device_id: str | None = None,
     playback_chain: PlaybackChain = Depends(get_playback_chain),
 ):
     """
     切换静音
 
-    - **session_id**: 会话 ID，None 表示当前会话
+    - **user_id**: 用户 ID（可选）
+    - **device_id**: 设备 ID（可选）
     """
-    await playback_chain.toggle_mute(session_id)
-
-    current_session = playback_chain.get_current_session()
+    current_session = await playback_chain.toggle_mute(user_id, device_id)
 
     return ResponseModel(
         message=f"静音: {'开启' if current_session and current_session.muted else '关闭'}",
@@ -282,18 +290,18 @@ async def toggle_mute(
 @router.post("/repeat", response_model=ResponseModel[dict])
 async def set_repeat_mode(
     mode: str,
-    session_id: str | None = None,
+    user_id: str | None = None,
+    device_id: str | None = None,
     playback_chain: PlaybackChain = Depends(get_playback_chain),
 ):
     """
     设置循环模式
 
     - **mode**: 循环模式（off/one/all）
-    - **session_id**: 会话 ID，None 表示当前会话
+    - **user_id**: 用户 ID（可选）
+    - **device_id**: 设备 ID（可选）
     """
-    await playback_chain.set_repeat_mode(mode, session_id)
-
-    current_session = playback_chain.get_current_session()
+    current_session = await playback_chain.set_repeat_mode(mode, user_id, device_id)
 
     return ResponseModel(
         message=f"循环模式: {mode}",
@@ -305,17 +313,17 @@ async def set_repeat_mode(
 
 @router.post("/shuffle", response_model=ResponseModel[dict])
 async def toggle_shuffle(
-    session_id: str | None = None,
+    user_id: str | None = None,
+    device_id: str | None = None,
     playback_chain: PlaybackChain = Depends(get_playback_chain),
 ):
     """
     切换随机播放
 
-    - **session_id**: 会话 ID，None 表示当前会话
+    - **user_id**: 用户 ID（可选）
+    - **device_id**: 设备 ID（可选）
     """
-    await playback_chain.toggle_shuffle(session_id)
-
-    current_session = playback_chain.get_current_session()
+    current_session = await playback_chain.toggle_shuffle(user_id, device_id)
 
     return ResponseModel(
         message=f"随机播放: {'开启' if current_session and current_session.shuffle else '关闭'}",
@@ -327,45 +335,52 @@ async def toggle_shuffle(
 
 @router.get("/queue", response_model=ResponseModel[dict])
 async def get_queue(
+    user_id: str | None = None,
+    device_id: str | None = None,
+    offset: int | None = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=100),
     playback_chain: PlaybackChain = Depends(get_playback_chain),
 ):
     """
     获取播放队列
 
-    返回当前队列和队列信息
-    """
-    queue_info = playback_chain.get_queue_info()
+    按播放顺序（随机播放时为打乱后的顺序）返回一段队列
+
+    - **user_id**: 用户 ID（可选）
+    - **device_id**: 设备 ID（可选）
+    - **offset**: 起始播放位置（可选，默认从当前曲目开始）
+    - **limit**: 返回数量（最多 100）
 
-    # 获取队列中的曲目详情
-    track_ids = queue_info.get("queue", [])
+    queue_count 为队列总长度，window_count 为本次返回的曲目数
+    """
+    state = await playback_chain.get_state(user_id, device_id)
+    session = state.session
+    queue = state.queue
+    if offset is None:
+        offset = max(queue.position, 0)
+
+    # 获取队列中的曲目详情（一次查询）
+    track_ids = queue.window(offset, limit)
     tracks = []
     if track_ids:
-        from app.db.operations.track import TrackOper
-
-        track_oper = TrackOper(playback_chain.db_manager)
-        for track_id in track_ids[:20]:  # 最多显示 20 首
-            track = await track_oper.get_by_id(track_id)
-            if track:
-                tracks.append(
-                    {
-                        "id": track.id,
-                        "title": track.title,
-                        "artist_id": track.artist_id,
-                        "album_id": track.album_id,
-                        "duration": track.duration,
-                        "file_format": track.file_format,
-                    }
-                )
+        track_map = {
+            track.id: track for track in await playback_chain.track_oper.get_by_ids(track_ids)
+        }
+        tracks = [
+            _track_summary(track_map[track_id]) for track_id in track_ids if track_id in track_map
+        ]
 
     return ResponseModel(
         data={
-            "queue": queue_info.get("queue", []),
+            "queue": track_ids,
             "tracks": tracks,
-            "current_index": queue_info.get("current_index"),
-            "is_shuffle": queue_info.get("is_shuffle"),
-            "repeat_mode": queue_info.get("repeat_mode"),
-            "queue_count": len(queue_info.get("queue", [])),
-            "total_count": len(track_ids),
+            "offset": offset,
+            "queue_position": queue.position,
+            "current_index": queue.current_index,
+            "is_shuffle": session.shuffle if session else False,
+            "repeat_mode": session.repeat_mode if session else "off",
+            "queue_count": len(queue),
+            "window_count": len(track_ids),
         }
     )
 
@@ -373,27 +388,34 @@ async def get_queue(
 @router.post("/queue/{track_id}", response_model=ResponseModel[dict])
 async def add_to_queue(
     track_id: int,
+    user_id: str | None = None,
+    device_id: str | None = None,
     playback_chain: PlaybackChain = Depends(get_playback_chain),
 ):
     """
     添加曲目到队列
 
     - **track_id**: 曲目 ID
+    - **user_id**: 用户 ID（可选）
+    - **device_id**: 设备 ID（可选）
     """
-    await playback_chain.enqueue([track_id])
+    queue_count = await playback_chain.enqueue([track_id], user_id, device_id)
 
-    return ResponseModel(
-        message="已添加到队列", data={"queue_count": len(playback_chain.get_queue())}
-    )
+    return ResponseModel(message="已添加到队列", data={"queue_count": queue_count})
 
 
 @router.delete("/queue", response_model=ResponseModel[dict])
 async def clear_queue(
+    user_id: str | None = None,
+    device_id: str | None = None,
     playback_chain: PlaybackChain = Depends(get_playback_chain),
 ):
     """
     清空播放队列
+
+    - **user_id**: 用户 ID（可选）
+    - **device_id**: 设备 ID（可选）
     """
-    await playback_chain.clear_queue()
+    await playback_chain.clear_queue(user_id, device_id)
 
     return ResponseModel(message="队列已清空", data={"queue_count": 0})
@@ -7,6 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db
+from app.db.models.playlist import Playlist
 from app.db.operations.playlist import PlaylistOper
 from app.schemas.playlist import (
     AddTrackRequest,
@@ -23,23 +24,39 @@ from app.schemas.response import PaginatedResponse, ResponseModel
 router = APIRouter()
 
 
-def get_playlist_oper(db: AsyncSession = Depends(get_db)) -> PlaylistOper:
+def get_playlist_oper(db: AsyncSession = Depends(get_db, scope="function")) -> PlaylistOper:
     """获取 Playlist 操作实例"""
     from app.db import db_manager
 
-    return PlaylistOper(db_manager)
+    return PlaylistOper(Playlist, db_manager)
 
 
 @router.get("/", response_model=PaginatedResponse[PlaylistListResponse])
 async def get_playlists(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: str = Query(None),
+    exact_total: bool = Query(False),
     playlist_oper: PlaylistOper = Depends(get_playlist_oper),
 ):
-    """获取播放列表"""
-    playlists = await playlist_oper.get_all(skip=skip, limit=limit)
-
-    total = await playlist_oper.count()
+    """
+    获取播放列表
+
+    - **skip**: 跳过的记录数（兼容旧客户端，建议使用 cursor）
+    - **limit**: 返回的最大记录数（最多 100）
+    - **cursor**: 分页游标，传入上一页返回的 next_cursor
+    - **exact_total**: 是否返回精确总数（默认返回估算值）
+    """
+    next_cursor = None
+    if skip and not cursor:
+        playlists = await playlist_oper.get_all(skip=skip, limit=limit)
+    else:
+        try:
+            playlists, next_cursor = await playlist_oper.get_page(cursor, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+
+    total = await playlist_oper.count() if exact_total else await playlist_oper.estimate_count()
     total_pages = (total + limit - 1) // limit
     page = skip // limit + 1
 
@@ -61,6 +78,7 @@ async def get_playlists(
         page=page,
         page_size=limit,
         total_pages=total_pages,
+        next_cursor=next_cursor,
     )
 
 
@@ -0,0 +1,39 @@
+"""
+Search API 端点
+跨曲目、专辑、艺术家的统一搜索
+"""
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_db
+from app.db.operations.search import SearchOper
+from app.schemas.response import ResponseModel
+from app.schemas.search import SearchResult
+
+router = APIRouter()
+
+
+def get_search_oper(db: AsyncSession = Depends(get_db, scope="function")) -> SearchOper:
+    """获取 Search 操作实例"""
+    from app.db import db_manager
+
+    return SearchOper(db_manager)
+
+
+@router.get("/", response_model=ResponseModel[list[SearchResult]])
+async def search(
+    q: str = Query(..., min_length=1, max_length=100),
+    types: list[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    search_oper: SearchOper = Depends(get_search_oper),
+):
+    """
+    统一搜索
+
+    - **q**: 搜索关键词，支持名称和拼音（全拼或首字母）
+    - **types**: 实体类型，可多选：track, album, artist（默认全部）
+    - **limit**: 返回的最大记录数（最多 100）
+    """
+    results = await search_oper.search(q, types=types, limit=limit)
+    return ResponseModel(data=[SearchResult(**result) for result in results])
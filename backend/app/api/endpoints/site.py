@@ -6,7 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.log import logger
-from app.db import db_manager
+from app.db import db_manager, get_db
 from app.db.models.site import Site
 from app.db.operations.site import SiteOper
 from app.schemas.response import ResponseModel
@@ -22,19 +22,13 @@ from app.schemas.site import (
 router = APIRouter(prefix="/sites", tags=["站点管理"])
 
 
-async def get_db():
-    """获取数据库会话"""
-    async with db_manager.get_session() as session:
-        yield session
-
-
 @router.get("", response_model=SiteListResponse, summary="获取站点列表")
 async def get_sites(
     skip: int = 0,
     limit: int = 100,
     enabled: bool = None,
     downloader: str = None,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
 ):
     """
     获取站点列表
@@ -60,7 +54,7 @@ async def get_sites(
 
 
 @router.get("/enabled", response_model=list[SiteResponse], summary="获取启用的站点")
-async def get_enabled_sites(db: AsyncSession = Depends(get_db)):
+async def get_enabled_sites(db: AsyncSession = Depends(get_db, scope="function")):
     """
     获取所有启用的站点，按优先级排序
     """
@@ -70,7 +64,7 @@ async def get_enabled_sites(db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/{site_id}", response_model=SiteResponse, summary="获取站点详情")
-async def get_site(site_id: int, db: AsyncSession = Depends(get_db)):
+async def get_site(site_id: int, db: AsyncSession = Depends(get_db, scope="function")):
     """
     根据ID获取站点详情
     """
@@ -84,7 +78,7 @@ async def get_site(site_id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.post("", response_model=SiteResponse, summary="创建站点")
-async def create_site(site: SiteCreate, db: AsyncSession = Depends(get_db)):
+async def create_site(site: SiteCreate, db: AsyncSession = Depends(get_db, scope="function")):
     """
     创建新站点
     """
@@ -95,7 +89,9 @@ async def create_site(site: SiteCreate, db: AsyncSession = Depends(get_db)):
 
 
 @router.put("/{site_id}", response_model=SiteResponse, summary="更新站点")
-async def update_site(site_id: int, site: SiteUpdate, db: AsyncSession = Depends(get_db)):
+async def update_site(
+    site_id: int, site: SiteUpdate, db: AsyncSession = Depends(get_db, scope="function")
+):
     """
     更新站点信息
     """
@@ -110,7 +106,7 @@ async def update_site(site_id: int, site: SiteUpdate, db: AsyncSession = Depends
 
 
 @router.delete("/{site_id}", response_model=ResponseModel, summary="删除站点")
-async def delete_site(site_id: int, db: AsyncSession = Depends(get_db)):
+async def delete_site(site_id: int, db: AsyncSession = Depends(get_db, scope="function")):
     """
     删除站点
     """
@@ -125,7 +121,7 @@ async def delete_site(site_id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.post("/{site_id}/toggle", response_model=SiteResponse, summary="切换站点启用状态")
-async def toggle_site(site_id: int, db: AsyncSession = Depends(get_db)):
+async def toggle_site(site_id: int, db: AsyncSession = Depends(get_db, scope="function")):
     """
     切换站点的启用状态
     """
@@ -140,7 +136,7 @@ async def toggle_site(site_id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.post("/test", response_model=TestSiteResponse, summary="测试站点连接")
-async def test_site(request: TestSiteRequest, db: AsyncSession = Depends(get_db)):
+async def test_site(request: TestSiteRequest, db: AsyncSession = Depends(get_db, scope="function")):
     """
     测试站点连接
     """
@@ -6,70 +6,29 @@
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.log import logger
+from app.core.streaming import content_disposition, file_response
+from app.core.transcoder import (
+    TRANSCODE_FORMATS,
+    TranscodeError,
+    TranscodeResponse,
+    get_transcoder,
+)
 from app.db import get_db
+from app.db.models.track import Track
 from app.db.operations.track import TrackOper
 from app.schemas.response import ResponseModel
 
 router = APIRouter()
 
 
-def get_track_oper(db: AsyncSession = Depends(get_db)) -> TrackOper:
+def get_track_oper(db: AsyncSession = Depends(get_db, scope="function")) -> TrackOper:
     """获取 Track 操作实例"""
     from app.db import db_manager
 
-    return TrackOper(db_manager)
-
-
-def parse_range_header(range_header: str, file_size: int) -> tuple[int, int]:
-    """
-    解析 Range 请求头
-
-    Args:
-        range_header: Range 请求头（如 "bytes=0-1023"）
-        file_size: 文件总大小
-
-    Returns:
-        (start, end) 字节范围
-    """
-    if not range_header:
-        return 0, file_size - 1
-
-    if range_header.startswith("bytes="):
-        range_header = range_header[6:]
-
-    # 支持 "bytes=start-end" 格式
-    if "-" in range_header:
-        parts = range_header.split("-")
-        if len(parts) == 2:
-            start = int(parts[0]) if parts[0] else 0
-            end = int(parts[1]) if parts[1] else file_size - 1
-            # 修正范围
-            start = max(0, min(start, file_size - 1))
-            end = max(start, min(end, file_size - 1))
-            return start, end
-
-    return 0, file_size - 1
-
-
-async def get_audio_file_bytes(file_path: Path, start: int, end: int) -> bytes:
-    """
-    获取音频文件的指定字节范围
-
-    Args:
-        file_path: 文件路径
-        start: 起始字节
-        end: 结束字节
-
-    Returns:
-        文件字节数据
-    """
-    with open(file_path, "rb") as f:
-        f.seek(start)
-        return f.read(end - start + 1)
+    return TrackOper(Track, db_manager)
 
 
 def get_mime_type(file_format: str) -> str:
@@ -98,14 +57,18 @@ async def stream_track(
     track_id: int,
     request: Request,
     format: str | None = Query(None, description="目标格式（如需要转换）"),
+    bitrate: int | None = Query(None, ge=32, le=320, description="转码码率（kbps）"),
+    start: float = Query(0, ge=0, description="转码起始时间（秒）"),
     track_oper: TrackOper = Depends(get_track_oper),
 ):
     """
     流式传输曲目
 
     - **track_id**: 曲目 ID
-    - **format**: 目标格式（可选，如需要转换，支持 mp3/flac/m4a）
-    - **Range**: 支持 Range 请求头进行断点续传
+    - **format**: 目标格式（可选，与原格式不同时实时转码，支持 mp3/opus/aac）
+    - **bitrate**: 转码码率（可选，指定时即使格式相同也会转码，默认 192kbps）
+    - **start**: 转码起始时间（秒），转码流按时间拖动进度
+    - **Range**: 原文件和已缓存的转码结果支持 Range 请求头进行断点续传
 
     支持的音频格式：mp3, flac, m4a, ogg, wav
     """
@@ -114,6 +77,9 @@ async def stream_track(
     if not track:
         raise HTTPException(status_code=404, detail="曲目不存在")
 
+    if track.missing:
+        raise HTTPException(status_code=410, detail="曲目文件已从音乐库中移除")
+
     if not track.path:
         raise HTTPException(status_code=404, detail="曲目文件路径不存在")
 
@@ -121,62 +87,88 @@ async def stream_track(
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="曲目文件不存在")
 
-    file_size = file_path.stat().st_size
     file_format = track.file_format or "mp3"
 
-    # 检查是否需要格式转换（暂时不支持转换，直接返回原格式）
-    # TODO: 使用 ffmpeg 实现音频格式转换
-    if format and format.lower() != file_format.lower():
-        raise HTTPException(status_code=400, detail=f"格式转换暂未实现，当前格式: {file_format}")
+    # 格式不同或指定了码率时转码
+    if (format and format.lower() != file_format.lower()) or bitrate:
+        return await transcode_track(
+            request, track, file_path, (format or file_format).lower(), bitrate or 192, start
+        )
 
-    # 解析 Range 请求头
-    range_header = request.headers.get("Range")
-    start, end = parse_range_header(range_header, file_size)
+    # 分块/零拷贝发送，支持多区间 Range、If-Range 和 ETag/Last-Modified 协商缓存
+    response = file_response(
+        request,
+        file_path,
+        get_mime_type(file_format),
+        headers={
+            "content-disposition": content_disposition("inline", f"{track.title}.{file_format}")
+        },
+    )
 
-    # 设置响应头
-    headers = {
-        "Accept-Ranges": "bytes",
-        "Content-Type": get_mime_type(file_format),
-        "Content-Disposition": f'inline; filename="{track.title}.{file_format}"',
-    }
+    logger.info(
+        f"流式传输: {track.title} ({track_id}), 状态: {response.status_code}, "
+        f"范围: {request.headers.get('range') or '完整文件'}"
+    )
+    return response
+
+
+async def transcode_track(
+    request: Request,
+    track: Track,
+    file_path: Path,
+    target_format: str,
+    bitrate: int,
+    start: float,
+):
+    """
+    返回转码后的音频流
+
+    已缓存的完整转码结果直接从磁盘返回（支持 Range），否则边转码边输出
+
+    Args:
+        request: 请求对象
+        track: 曲目
+        file_path: 源文件路径
+        target_format: 目标格式
+        bitrate: 目标码率（kbps）
+        start: 起始时间（秒）
 
-    # 如果是 Range 请求，返回部分内容
-    if range_header:
-        content_length = end - start + 1
-        headers.update(
-            {
-                "Content-Range": f"bytes {start}-{end}/{file_size}",
-                "Content-Length": str(content_length),
-            }
+    Returns:
+        响应对象
+    """
+    if target_format not in TRANSCODE_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的转码格式: {target_format}，支持: {', '.join(TRANSCODE_FORMATS)}",
+        )
+    media_type = TRANSCODE_FORMATS[target_format][2]
+    disposition = content_disposition("inline", f"{track.title}.{target_format}")
+
+    transcoder = get_transcoder()
+    if start <= 0:
+        cached = transcoder.get_cached(track.id, file_path, target_format, bitrate)
+        if cached:
+            logger.info(f"命中转码缓存: {track.title} ({track.id}) {target_format} {bitrate}k")
+            return file_response(
+                request, cached, media_type, headers={"content-disposition": disposition}
+            )
+
+    try:
+        stream = await transcoder.transcode(
+            track.id, file_path, target_format, bitrate, start_time=start
         )
-        status_code = 206  # Partial Content
-    else:
-        content_length = file_size
-        headers["Content-Length"] = str(content_length)
-        status_code = 200
-
-    # 流式传输文件内容
-    async def file_iterator():
-        """文件迭代器"""
-        with open(file_path, "rb") as f:
-            f.seek(start)
-            remaining = end - start + 1
-            chunk_size = 64 * 1024  # 64KB chunks
-            while remaining > 0:
-                chunk = f.read(min(chunk_size, remaining))
-                if not chunk:
-                    break
-                remaining -= len(chunk)
-                yield chunk
-
-    # 记录流式传输日志
-    logger.info(f"流式传输: {track.title} ({track_id}), 范围: {start}-{end}/{file_size}")
-
-    return StreamingResponse(
-        file_iterator(),
-        status_code=status_code,
-        headers=headers,
-        media_type=get_mime_type(file_format),
+    except TranscodeError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+
+    # 转码输出长度未知，不支持字节 Range，拖动进度使用 start 参数
+    return TranscodeResponse(
+        stream,
+        media_type=media_type,
+        headers={
+            "accept-ranges": "none",
+            "cache-control": "no-store",
+            "content-disposition": disposition,
+        },
     )
 
 
@@ -194,6 +186,9 @@ async def get_stream_info(
     if not track:
         raise HTTPException(status_code=404, detail="曲目不存在")
 
+    if track.missing:
+        raise HTTPException(status_code=410, detail="曲目文件已从音乐库中移除")
+
     if not track.path:
         raise HTTPException(status_code=404, detail="曲目文件路径不存在")
 
@@ -216,9 +211,10 @@ async def get_stream_info(
     )
 
 
-@router.get("/tracks/{track_id}/download", response_class=StreamingResponse)
+@router.get("/tracks/{track_id}/download")
 async def download_track(
     track_id: int,
+    request: Request,
     track_oper: TrackOper = Depends(get_track_oper),
 ):
     """
@@ -230,6 +226,9 @@ async def download_track(
     if not track:
         raise HTTPException(status_code=404, detail="曲目不存在")
 
+    if track.missing:
+        raise HTTPException(status_code=410, detail="曲目文件已从音乐库中移除")
+
     if not track.path:
         raise HTTPException(status_code=404, detail="曲目文件路径不存在")
 
@@ -237,29 +236,16 @@ async def download_track(
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="曲目文件不存在")
 
-    file_size = file_path.stat().st_size
     file_format = track.file_format or "mp3"
 
-    headers = {
-        "Content-Type": get_mime_type(file_format),
-        "Content-Disposition": f'attachment; filename="{track.title}.{file_format}"',
-        "Content-Length": str(file_size),
-    }
-
-    async def file_iterator():
-        """文件迭代器"""
-        with open(file_path, "rb") as f:
-            chunk_size = 64 * 1024  # 64KB chunks
-            while True:
-                chunk = f.read(chunk_size)
-                if not chunk:
-                    break
-                yield chunk
-
     logger.info(f"下载曲目: {track.title} ({track_id})")
 
-    return StreamingResponse(
-        file_iterator(),
-        headers=headers,
-        media_type=get_mime_type(file_format),
+    # 下载同样支持 Range，便于断点续传
+    return file_response(
+        request,
+        file_path,
+        get_mime_type(file_format),
+        headers={
+            "content-disposition": content_disposition("attachment", f"{track.title}.{file_format}")
+        },
     )
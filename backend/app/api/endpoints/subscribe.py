@@ -2,9 +2,11 @@
 订阅 API 端点
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 
+from app.api.deps import get_container
 from app.chain.subscribe import SubscribeChain
+from app.core.container import Container
 from app.db import db_manager
 from app.db.models.subscribe import Subscribe
 from app.db.operations.subscribe import SubscribeOper
@@ -18,7 +20,11 @@ from app.schemas.subscribe import (
 router = APIRouter()
 
 subscribe_oper = SubscribeOper(Subscribe, db_manager)
-subscribe_chain = SubscribeChain()
+
+
+def get_subscribe_chain(container: Container = Depends(get_container)) -> SubscribeChain:
+    """获取 SubscribeChain 实例（应用级单例，使用容器的模块管理器）"""
+    return container.get_chain(SubscribeChain)
 
 
 @router.get("", response_model=SubscribeListResponse)
@@ -113,7 +119,9 @@ async def delete_subscribe(subscribe_id: int):
 
 
 @router.post("/{subscribe_id}/check")
-async def check_subscribe(subscribe_id: int):
+async def check_subscribe(
+    subscribe_id: int, subscribe_chain: SubscribeChain = Depends(get_subscribe_chain)
+):
     """
     检查订阅（手动触发）
     """
@@ -152,7 +160,7 @@ async def check_subscribe(subscribe_id: int):
 
 
 @router.post("/check-all")
-async def check_all_subscribes():
+async def check_all_subscribes(subscribe_chain: SubscribeChain = Depends(get_subscribe_chain)):
     """
     检查所有订阅
     """
@@ -172,6 +180,7 @@ async def get_subscribe_releases(
     download_status: str | None = Query(None, description="下载状态"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    subscribe_chain: SubscribeChain = Depends(get_subscribe_chain),
 ):
     """
     获取订阅的发布记录
@@ -6,7 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.log import logger
-from app.db import db_manager
+from app.db import db_manager, get_db
 from app.db.models.subscribe_release import SubscribeRelease
 from app.db.operations.subscribe_release import SubscribeReleaseOper
 from app.schemas.response import ResponseModel
@@ -20,12 +20,6 @@ from app.schemas.subscribe_release import (
 router = APIRouter(tags=["订阅发布记录"])
 
 
-async def get_db():
-    """获取数据库会话"""
-    async with db_manager.get_session() as session:
-        yield session
-
-
 @router.get(
     "/{subscribe_id}/releases",
     response_model=SubscribeReleaseListResponse,
@@ -36,7 +30,7 @@ async def get_subscribe_releases(
     skip: int = 0,
     limit: int = 100,
     status: str | None = None,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
 ):
     """
     获取订阅的发布记录
@@ -64,7 +58,9 @@ async def get_subscribe_releases(
     response_model=SubscribeReleaseResponse,
     summary="获取发布记录详情",
 )
-async def get_release(subscribe_id: int, release_id: int, db: AsyncSession = Depends(get_db)):
+async def get_release(
+    subscribe_id: int, release_id: int, db: AsyncSession = Depends(get_db, scope="function")
+):
     """
     根据ID获取发布记录详情
     """
@@ -82,7 +78,9 @@ async def get_release(subscribe_id: int, release_id: int, db: AsyncSession = Dep
     response_model=SubscribeReleaseStatistics,
     summary="获取订阅发布统计",
 )
-async def get_release_statistics(subscribe_id: int, db: AsyncSession = Depends(get_db)):
+async def get_release_statistics(
+    subscribe_id: int, db: AsyncSession = Depends(get_db, scope="function")
+):
     """
     获取订阅的发布统计信息
     """
@@ -100,7 +98,7 @@ async def update_release(
     subscribe_id: int,
     release_id: int,
     release: SubscribeReleaseUpdate,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
 ):
     """
     更新发布记录（主要用于更新下载状态）
@@ -121,7 +119,9 @@ async def update_release(
 @router.delete(
     "/{subscribe_id}/releases/{release_id}", response_model=ResponseModel, summary="删除发布记录"
 )
-async def delete_release(subscribe_id: int, release_id: int, db: AsyncSession = Depends(get_db)):
+async def delete_release(
+    subscribe_id: int, release_id: int, db: AsyncSession = Depends(get_db, scope="function")
+):
     """
     删除发布记录
     """
@@ -146,7 +146,9 @@ async def delete_release(subscribe_id: int, release_id: int, db: AsyncSession =
     response_model=list[SubscribeReleaseResponse],
     summary="获取正在下载的发布记录",
 )
-async def get_downloading_releases(limit: int = 100, db: AsyncSession = Depends(get_db)):
+async def get_downloading_releases(
+    limit: int = 100, db: AsyncSession = Depends(get_db, scope="function")
+):
     """
     获取所有正在下载的发布记录
     """
@@ -160,7 +162,9 @@ async def get_downloading_releases(limit: int = 100, db: AsyncSession = Depends(
     response_model=list[SubscribeReleaseResponse],
     summary="获取下载失败的发布记录",
 )
-async def get_failed_releases(limit: int = 100, db: AsyncSession = Depends(get_db)):
+async def get_failed_releases(
+    limit: int = 100, db: AsyncSession = Depends(get_db, scope="function")
+):
     """
     获取所有下载失败的发布记录
     """
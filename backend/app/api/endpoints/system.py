@@ -0,0 +1,28 @@
+"""
+系统 API 端点
+运行状态和缓存统计
+"""
+
+from fastapi import APIRouter
+
+from app.core.cache import get_chain_cache
+from app.modules.musicbrainz import get_musicbrainz_cache
+from app.schemas.response import ResponseModel
+
+router = APIRouter()
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    获取缓存统计
+
+    - **chain**: 业务链进程内缓存，按链分别统计命中、未命中、淘汰、过期次数和条目数
+    - **musicbrainz**: MusicBrainz 持久化缓存统计
+    """
+    return ResponseModel(
+        data={
+            "chain": get_chain_cache().get_stats(),
+            "musicbrainz": get_musicbrainz_cache().get_stats(),
+        }
+    )
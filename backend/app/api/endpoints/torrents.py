@@ -0,0 +1,92 @@
+"""
+资源搜索 API 端点
+多站点种子搜索，通过 SSE 流式返回结果
+"""
+
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import get_container
+from app.chain.torrents import TorrentsChain
+from app.core.container import Container
+from app.core.context import MusicInfo
+
+router = APIRouter()
+
+
+def format_sse(event: dict[str, Any]) -> str:
+    """
+    把搜索事件编码为 SSE 消息
+
+    Args:
+        event: 搜索事件（results 为 TorrentInfo 列表）
+
+    Returns:
+        SSE 消息文本
+    """
+    data = {**event, "results": [torrent.to_dict() for torrent in event["results"]]}
+    return f"event: {event['type']}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def get_torrents_chain(container: Container = Depends(get_container)) -> TorrentsChain:
+    """获取 TorrentsChain 实例（应用级单例，搜索缓存在请求之间共享）"""
+    return container.get_chain(TorrentsChain)
+
+
+@router.get("/search/stream")
+async def search_stream(
+    artist: str | None = Query(None),
+    album: str | None = Query(None),
+    title: str | None = Query(None),
+    sites: list[str] = Query(None),
+    format: str = Query("FLAC"),
+    min_size: int | None = Query(None, ge=0),
+    max_size: int | None = Query(None, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    site_timeout: float | None = Query(None, gt=0, le=120),
+    deadline: float | None = Query(None, gt=0, le=300),
+    torrents_chain: TorrentsChain = Depends(get_torrents_chain),
+):
+    """
+    流式搜索资源（Server-Sent Events）
+
+    每个站点返回后推送一次当前排序靠前的结果，最后推送 done 事件：
+
+    - **cached**: 缓存中的部分结果，之后只重新搜索上次未成功的站点
+    - **site**: 一个站点返回，status 为 ok / error / timeout
+    - **done**: 搜索结束，complete 表示所有站点是否都成功返回
+
+    参数：
+    - **limit**: 保留的结果数量
+    - **site_timeout**: 单个站点超时（秒）
+    - **deadline**: 整体截止时间（秒），到期后返回已有结果
+    """
+    if not (artist or album or title):
+        raise HTTPException(status_code=400, detail="至少需要艺术家、专辑或标题之一")
+
+    music_info = MusicInfo(artist=artist, album=album, title=title)
+    events = torrents_chain.search_stream(
+        music_info,
+        sites=sites,
+        format=format,
+        min_size=min_size,
+        max_size=max_size,
+        limit=limit,
+        site_timeout=site_timeout,
+        deadline=deadline,
+    )
+
+    async def stream() -> AsyncIterator[str]:
+        # 客户端断开时生成器被关闭，未返回的站点搜索随之取消
+        async for event in events:
+            yield format_sse(event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -7,7 +7,9 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.play_history import get_play_history_recorder
 from app.db import get_db
+from app.db.models.track import Track
 from app.db.operations.track import TrackOper
 from app.schemas.response import PaginatedResponse, ResponseModel
 from app.schemas.track import (
@@ -19,35 +21,49 @@ from app.schemas.track import (
 router = APIRouter()
 
 
-def get_track_oper(db: AsyncSession = Depends(get_db)) -> TrackOper:
+def get_track_oper(db: AsyncSession = Depends(get_db, scope="function")) -> TrackOper:
     """获取 Track 操作实例"""
     from app.db import db_manager
 
-    return TrackOper(db_manager)
+    return TrackOper(Track, db_manager)
 
 
 @router.get("/", response_model=PaginatedResponse[TrackListResponse])
 async def get_tracks(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: str = Query(None),
+    exact_total: bool = Query(False),
     search: str = Query(None),
     track_oper: TrackOper = Depends(get_track_oper),
 ):
     """
     获取曲目列表
 
-    - **skip**: 跳过的记录数
+    - **skip**: 跳过的记录数（兼容旧客户端，建议使用 cursor）
     - **limit**: 返回的最大记录数（最多 100）
+    - **cursor**: 分页游标，传入上一页返回的 next_cursor
+    - **exact_total**: 是否返回精确总数（默认返回估算值）
     - **search**: 搜索关键词（按标题搜索）
     """
+    next_cursor = None
     if search:
         tracks = await track_oper.search_by_title(search, limit=limit)
+    elif skip and not cursor:
+        tracks = await track_oper.get_all(skip=skip, limit=limit, missing=False)
     else:
-        tracks = await track_oper.get_all(skip=skip, limit=limit)
-
-    total = await track_oper.count()
+        try:
+            tracks, next_cursor = await track_oper.get_page(cursor, limit=limit, missing=False)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+
+    # 已从磁盘移除的曲目不出现在列表中（估算总数可能包含这部分）
+    total = (
+        await track_oper.count(missing=False) if exact_total else await track_oper.estimate_count()
+    )
     total_pages = (total + limit - 1) // limit
-    page = skip // limit + 1
+    # 游标分页无法确定页码
+    page = None if cursor else skip // limit + 1
 
     track_list = [
         TrackListResponse(
@@ -72,6 +88,7 @@ async def get_tracks(
         page=page,
         page_size=limit,
         total_pages=total_pages,
+        next_cursor=next_cursor,
     )
 
 
@@ -183,11 +200,14 @@ async def play_track(
     track_oper: TrackOper = Depends(get_track_oper),
 ):
     """记录曲目播放（增加播放次数）"""
-    track = await track_oper.update_play_count(track_id)
+    track = await track_oper.get_by_id(track_id)
     if not track:
         raise HTTPException(status_code=404, detail="曲目不存在")
 
+    # 播放记录批量写入，播放次数稍后生效，这里返回预期值
+    get_play_history_recorder().record(track_id)
+
     return ResponseModel(
         message="播放记录成功",
-        data={"id": track_id, "play_count": track.play_count},
+        data={"id": track_id, "play_count": (track.play_count or 0) + 1},
     )
@@ -3,12 +3,19 @@
 处理音乐下载和整理
 """
 
+import asyncio
+import uuid
 from collections.abc import Callable
+from datetime import datetime
 from pathlib import Path
 
 from app.chain import ChainBase
+from app.core.container import get_app_container
+from app.core.download_scheduler import JobCancelledError, ScheduledJob, get_download_scheduler
 from app.core.event import EventType
 from app.core.log import logger
+from app.core.progress import get_progress_reporter
+from app.db.models.download import DownloadHistory
 from app.db.operations.download import DownloadHistoryOper
 from app.modules.downloader import (
     DownloadQuality,
@@ -20,18 +27,23 @@ from app.modules.downloader import (
 )
 
 
+class DownloadFailedError(Exception):
+    """下载失败"""
+
+
 class DownloadChain(ChainBase):
     """
     下载链
     负责音乐下载、文件整理、元数据补全
     """
 
+    # 执行中的任务，所有实例共享（排队中的任务由下载调度器按任务 ID 登记）
+    _active_tasks: dict[str, DownloadTask] = {}
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.logger = logger
-        self.download_oper = DownloadHistoryOper(self.db_manager)
-        self._active_tasks: dict[str, DownloadTask] = {}
-        self._max_retries = 3  # 最大重试次数
+        self.download_oper = DownloadHistoryOper(DownloadHistory, self.db_manager)
 
     async def search(
         self,
@@ -71,112 +83,152 @@ class DownloadChain(ChainBase):
         task: DownloadTask,
         source: DownloadSource = DownloadSource.NETEASE,
         progress_callback: Callable | None = None,
-        retry_count: int = 0,
+        priority: int = 0,
     ) -> DownloadTask:
         """
         下载音乐
 
+        任务提交到下载调度器，在全局和来源并发限制内执行，失败后按退避时间自动重试；
+        下载 URL 在任务即将执行时由调度器批量预取
+
         Args:
             task: 下载任务
             source: 下载来源
             progress_callback: 进度回调函数
-            retry_count: 当前重试次数
+            priority: 优先级，数值越小越先执行
+
+        Returns:
+            完成的下载任务（最终失败时状态为 FAILED，取消时为 CANCELLED）
+        """
+        downloader = self._get_downloader(source)
+        if not downloader:
+            raise ValueError(f"不支持的下载来源: {source}")
+
+        # 保存到数据库，重试和重启恢复后沿用同一条历史记录
+        history = await self._save_to_history(task, source)
+        task.metadata["history_id"] = history.id
+
+        scheduler = get_download_scheduler()
+        job_id = await scheduler.submit(
+            source.value,
+            {"task": task.to_dict()},
+            priority=priority,
+            context={"progress_callback": progress_callback},
+            key=task.task_id,
+        )
+        self.logger.info(f"下载任务已排队: {task.title or task.task_id} (任务 {job_id})")
+
+        try:
+            return await scheduler.wait(job_id)
+        except DownloadFailedError as e:
+            task.status = DownloaderTaskStatus.FAILED
+            task.error_message = str(e)
+            return task
+        except JobCancelledError:
+            task.status = DownloaderTaskStatus.CANCELLED
+            # 更新数据库
+            await self._update_history(task, status="cancelled")
+            return task
+
+    async def run_job(self, job: ScheduledJob) -> DownloadTask:
+        """
+        执行一次下载（由下载调度器调用）
+
+        Args:
+            job: 调度任务，payload 中保存下载任务
 
         Returns:
             完成的下载任务
+
+        Raises:
+            DownloadFailedError: 下载失败，调度器会按退避时间重试
         """
+        task = DownloadTask.from_dict(job.payload["task"])
+        source = DownloadSource(job.source)
         self.logger.info(
-            f"开始下载: {task.title or task.task_id} (重试 {retry_count}/{self._max_retries})"
+            f"开始下载: {task.title or task.task_id} (第 {job.attempts}/{job.max_retries + 1} 次)"
         )
 
-        # 获取下载器
         downloader = self._get_downloader(source)
         if not downloader:
             raise ValueError(f"不支持的下载来源: {source}")
 
-        # 保存到数据库
-        await self._save_to_history(task, source)
-
         # 添加到活跃任务
         self._active_tasks[task.task_id] = task
 
         # 更新数据库状态为下载中
-        await self.download_oper.update(
-            task.task_id,
-            status="downloading",
-        )
+        await self._update_history(task, status="downloading")
 
         # 发送下载开始事件
-        await self.put_message(
-            EventType.DOWNLOAD_STARTED,
-            {
-                "task_id": task.task_id,
-                "title": task.title,
-                "artist": task.artist,
-                "album": task.album,
-                "quality": task.quality.value,
-            },
+        if job.attempts == 1:
+            await self.put_message(
+                EventType.DownloadStarted,
+                {
+                    "task_id": task.task_id,
+                    "title": task.title,
+                    "artist": task.artist,
+                    "album": task.album,
+                    "quality": task.quality.value,
+                },
+            )
+
+        # 下载器每个数据块都会回调，节流后再通知调用方并发送进度事件
+        reporter = get_progress_reporter()
+        throttled_callback = reporter.throttle(
+            job.context.get("progress_callback"),
+            task.task_id,
+            self._progress_event,
+            lambda t: t.status != DownloaderTaskStatus.DOWNLOADING,
         )
 
         try:
             # 执行下载
-            downloaded_task = await downloader.download(task, progress_callback)
-
-            # 检查是否需要重试
-            if (
-                downloaded_task.status == DownloaderTaskStatus.FAILED
-                and retry_count < self._max_retries
-            ):
-                self.logger.warning(
-                    f"下载失败，准备重试 ({retry_count + 1}/{self._max_retries}): "
-                    f"{downloaded_task.title} - {downloaded_task.error_message}"
-                )
-
-                # 延迟后重试
-                import asyncio
-
-                await asyncio.sleep(2**retry_count)  # 指数退避
-
-                # 重试
-                return await self.download(
-                    task,
-                    source,
-                    progress_callback,
-                    retry_count + 1,
-                )
+            downloaded_task = await downloader.download(task, throttled_callback)
+            if downloaded_task.status == DownloaderTaskStatus.FAILED:
+                raise DownloadFailedError(downloaded_task.error_message or "下载失败")
 
             # 下载完成处理
-            await self.complete(downloaded_task)
-
-            return downloaded_task
+            return await self.complete(downloaded_task)
 
         except Exception as e:
             self.logger.error(f"下载异常: {task.title or task.task_id} - {e}")
             task.status = DownloaderTaskStatus.FAILED
             task.error_message = str(e)
 
-            # 更新数据库
-            await self.download_oper.update(
-                task.task_id,
-                status="failed",
-                error_message=task.error_message,
-            )
-
-            # 发送下载失败事件
-            await self.put_message(
-                EventType.DOWNLOAD_FAILED,
-                {
-                    "task_id": task.task_id,
-                    "error": task.error_message,
-                },
-            )
-
-            return task
+            # 最后一次尝试失败时记录失败，否则交给调度器重试
+            if job.is_last_attempt:
+                await self.complete(task)
+            if isinstance(e, DownloadFailedError):
+                raise
+            raise DownloadFailedError(str(e)) from e
 
         finally:
             # 从活跃任务中移除
-            if task.task_id in self._active_tasks:
-                del self._active_tasks[task.task_id]
+            self._active_tasks.pop(task.task_id, None)
+            reporter.discard(task.task_id)
+
+    @staticmethod
+    def _progress_event(task: DownloadTask) -> dict:
+        """
+        构建下载进度事件数据
+
+        Args:
+            task: 下载任务
+
+        Returns:
+            事件数据
+        """
+        return {
+            "task_id": task.task_id,
+            "downloader": task.source.value,
+            "progress": {
+                "task_id": task.task_id,
+                "progress": task.progress * 100,
+                "downloaded": task.downloaded_bytes,
+                "total": task.total_bytes,
+                "status": task.status.value,
+            },
+        }
 
     async def complete(self, task: DownloadTask) -> DownloadTask:
         """
@@ -192,9 +244,10 @@ class DownloadChain(ChainBase):
             self.logger.info(f"下载完成: {task.title}")
 
             # 更新数据库
-            await self.download_oper.update(
-                task.task_id,
+            await self._update_history(
+                task,
                 status="completed",
+                completed_at=datetime.utcnow().isoformat(),
                 file_path=task.file_path,
                 file_size=task.total_bytes,
                 file_format=Path(task.file_path).suffix[1:] if task.file_path else None,
@@ -202,7 +255,7 @@ class DownloadChain(ChainBase):
 
             # 发送下载完成事件
             await self.put_message(
-                EventType.DOWNLOAD_COMPLETED,
+                EventType.DownloadCompleted,
                 {
                     "task_id": task.task_id,
                     "title": task.title,
@@ -221,15 +274,15 @@ class DownloadChain(ChainBase):
             self.logger.error(f"下载失败: {task.title} - {task.error_message}")
 
             # 更新数据库
-            await self.download_oper.update(
-                task.task_id,
+            await self._update_history(
+                task,
                 status="failed",
                 error_message=task.error_message,
             )
 
             # 发送下载失败事件
             await self.put_message(
-                EventType.DOWNLOAD_FAILED,
+                EventType.DownloadFailed,
                 {
                     "task_id": task.task_id,
                     "error": task.error_message,
@@ -264,13 +317,8 @@ class DownloadChain(ChainBase):
             self.logger.warning(f"未找到结果: {keyword}")
             return []
 
-        # 下载
-        download_tasks = []
-        for task in tasks:
-            downloaded_task = await self.download(task, source)
-            download_tasks.append(downloaded_task)
-
-        return download_tasks
+        # 并发下载（由调度器限制并发）
+        return list(await asyncio.gather(*(self.download(task, source) for task in tasks)))
 
     async def download_by_url(
         self,
@@ -291,11 +339,9 @@ class DownloadChain(ChainBase):
         Returns:
             下载任务
         """
-        # 创建任务
-        import time
-
+        # 创建任务（批量下载时同一秒内会创建多个任务，使用随机 ID）
         task = DownloadTask(
-            task_id=f"{source.value}_{int(time.time())}",
+            task_id=f"{source.value}_{uuid.uuid4().hex[:12]}",
             url=url,
             source=source,
             quality=quality,
@@ -317,20 +363,17 @@ class DownloadChain(ChainBase):
         """
         self.logger.info(f"批量下载: {len(tasks)} 个任务")
 
-        results = []
-
-        for task_data in tasks:
+        async def run(task_data: dict) -> list[DownloadTask]:
             try:
                 keyword = task_data.get("keyword")
                 url = task_data.get("url")
 
                 if keyword:
-                    tasks = await self.search_and_download(
+                    return await self.search_and_download(
                         keyword=keyword,
                         source=DownloadSource(task_data.get("source", "netease")),
                         quality=DownloadQuality(task_data.get("quality", "standard")),
                     )
-                    results.extend(tasks)
                 elif url:
                     task = await self.download_by_url(
                         url=url,
@@ -339,10 +382,16 @@ class DownloadChain(ChainBase):
                         metadata=task_data.get("metadata"),
                     )
                     if task:
-                        results.append(task)
+                        return [task]
 
             except Exception as e:
                 self.logger.error(f"下载任务失败: {task_data}, 错误: {e}")
+            return []
+
+        # 所有任务一起提交给调度器，由调度器控制并发
+        results = [
+            task for batch in await asyncio.gather(*(run(t) for t in tasks)) for task in batch
+        ]
 
         self.logger.info(f"批量下载完成: 成功 {len(results)} 个")
 
@@ -363,6 +412,10 @@ class DownloadChain(ChainBase):
         if task:
             return task.to_dict()
 
+        # 排队中的任务（包括重启后恢复的任务）
+        if get_download_scheduler().get_job_id(task_id) is not None:
+            return {"task_id": task_id, "status": "pending"}
+
         # 从数据库查询
         history = await self.download_oper.get_by_source_id(task_id)
         if history:
@@ -402,19 +455,19 @@ class DownloadChain(ChainBase):
         Returns:
             是否成功
         """
-        task = self._active_tasks.get(task_id)
-        if task:
-            task.status = DownloaderTaskStatus.CANCELLED
-            self.logger.info(f"取消下载: {task.task_id}")
+        scheduler = get_download_scheduler()
+        job_id = scheduler.get_job_id(task_id)
+        job = scheduler.get_job(job_id) if job_id is not None else None
+        if job is None or not await scheduler.cancel(job.id):
+            return False
 
-            # 更新数据库
-            await self.download_oper.update(
-                task_id,
-                status="cancelled",
-            )
+        # 恢复的任务没有等待者，按任务中保存的历史记录 ID 更新
+        history_id = job.payload.get("task", {}).get("metadata", {}).get("history_id")
+        if history_id:
+            await self.download_oper.update(history_id, status="cancelled")
 
-            return True
-        return False
+        self.logger.info(f"取消下载: {task_id}")
+        return True
 
     def _get_downloader(self, source: DownloadSource):
         """
@@ -439,15 +492,18 @@ class DownloadChain(ChainBase):
 
         return downloader_class()
 
-    async def _save_to_history(self, task: DownloadTask, source: DownloadSource):
+    async def _save_to_history(self, task: DownloadTask, source: DownloadSource) -> DownloadHistory:
         """
         保存到下载历史
 
         Args:
             task: 下载任务
             source: 下载来源
+
+        Returns:
+            下载历史对象
         """
-        await self.download_oper.create(
+        return await self.download_oper.create(
             source=source.value,
             source_id=task.url,
             artist=task.artist,
@@ -457,3 +513,43 @@ class DownloadChain(ChainBase):
             quality=task.quality.value,
             status="pending",
         )
+
+    async def _update_history(self, task: DownloadTask, **kwargs):
+        """
+        更新任务对应的下载历史
+
+        Args:
+            task: 下载任务
+            **kwargs: 更新的字段值
+        """
+        history_id = task.metadata.get("history_id")
+        if history_id:
+            await self.download_oper.update(history_id, **kwargs)
+
+
+async def run_download_job(job: ScheduledJob) -> DownloadTask:
+    """
+    下载调度器的任务执行函数
+
+    Args:
+        job: 调度任务
+
+    Returns:
+        完成的下载任务
+    """
+    return await get_app_container().get_chain(DownloadChain).run_job(job)
+
+
+def prefetch_download_jobs(source: str, jobs: list[ScheduledJob]):
+    """
+    下载调度器的预取函数：为即将执行的任务批量预取下载 URL
+
+    Args:
+        source: 下载来源
+        jobs: 调度任务列表
+    """
+    downloader = (
+        get_app_container().get_chain(DownloadChain)._get_downloader(DownloadSource(source))
+    )
+    if downloader:
+        downloader.prefetch([DownloadTask.from_dict(job.payload["task"]) for job in jobs])
@@ -6,7 +6,9 @@
 from app.core.event import EventType, event_bus
 from app.core.log import logger
 from app.core.module import ModuleManager
-from app.db import db_manager
+from app.core.progress import get_progress_reporter
+from app.db import DatabaseManager
+from app.db import db_manager as global_db_manager
 from app.db.models.site import Site
 from app.db.operations.site import SiteOper
 from app.modules.downloader_module import DownloadProgress, DownloadTaskInfo
@@ -18,10 +20,22 @@ class DownloaderChain:
     负责推送种子到下载器、监控下载进度、控制任务
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        db_manager: DatabaseManager | None = None,
+        module_manager: ModuleManager | None = None,
+    ):
+        """
+        初始化下载器对接链
+
+        Args:
+            db_manager: 数据库管理器，默认使用全局实例
+            module_manager: 模块管理器，默认创建新实例
+        """
         self.logger = logger
-        self.site_oper = SiteOper(Site, db_manager)
-        self.module_manager = ModuleManager()
+        self.db_manager = db_manager or global_db_manager
+        self.site_oper = SiteOper(Site, self.db_manager)
+        self.module_manager = module_manager or ModuleManager()
 
     async def push_torrent(
         self,
@@ -57,7 +71,7 @@ class DownloaderChain:
                     task_id = await module.add_torrent(torrent_url, download_dir, paused)
 
                     # 发送下载开始事件
-                    await event_bus.emit(
+                    await event_bus.publish(
                         EventType.DownloadStarted,
                         {
                             "task_id": task_id,
@@ -97,25 +111,31 @@ class DownloaderChain:
 
         for module in downloader_modules:
             if hasattr(module, "downloader_type") and module.downloader_type == downloader:
+                reporter = get_progress_reporter()
                 try:
                     progress = await module.get_task_progress(task_id)
-
-                    # 发送下载进度事件
-                    if progress:
-                        await event_bus.emit(
-                            EventType.DownloadProgress,
-                            {
-                                "task_id": task_id,
-                                "downloader": downloader,
-                                "progress": progress.__dict__,
-                            },
-                        )
-
-                    return progress
                 except Exception as e:
                     self.logger.error(f"获取下载进度失败: {e}")
+                    reporter.discard(task_id)
                     raise
 
+                # 发送下载进度事件（按任务节流，下载完成时只发送一次）
+                if progress:
+                    reporter.update(
+                        task_id,
+                        {
+                            "task_id": task_id,
+                            "downloader": downloader,
+                            "progress": progress.__dict__,
+                        },
+                        final=progress.progress >= 100,
+                    )
+                else:
+                    # 任务已不存在（被删除或出错移除）
+                    reporter.discard(task_id)
+
+                return progress
+
         # 如果没有找到对应的下载器模块，抛出异常
         raise ValueError(f"未找到下载器 {downloader} 的模块")
 
@@ -200,11 +220,13 @@ class DownloaderChain:
             if hasattr(module, "downloader_type") and module.downloader_type == downloader:
                 try:
                     success = await module.remove_torrent(task_id, delete_files)
+                    if success:
+                        get_progress_reporter().discard(task_id)
                     self.logger.info(f"删除任务{'成功' if success else '失败'}: {task_id}")
 
                     # 发送下载完成事件
                     if delete_files:
-                        await event_bus.emit(
+                        await event_bus.publish(
                             EventType.DownloadCompleted,
                             {
                                 "task_id": task_id,
@@ -52,7 +52,7 @@ class MediaChain(ChainBase):
             return {"success": False, "error": f"不支持的类型: {server.type}"}
 
         # 发送扫描完成事件
-        self.send_event(
+        await self.send_event(
             "media.sync_completed",
             {
                 "server_id": server_id,
@@ -3,6 +3,8 @@
 处理音乐元数据的识别、补全
 """
 
+import asyncio
+from dataclasses import asdict
 from pathlib import Path
 from typing import Any
 
@@ -10,6 +12,7 @@ from app.chain import ChainBase
 from app.core.context import MusicInfo
 from app.core.meta import FilenameParser, MetadataParser
 from app.db import db_manager
+from app.db.models.track import Track
 from app.db.operations.album import AlbumOper
 from app.db.operations.artist import ArtistOper
 from app.db.operations.track import TrackOper
@@ -147,6 +150,7 @@ class MetadataChain(ChainBase):
         merged.path = local.path
         merged.file_format = local.file_format
         merged.file_size = local.file_size
+        merged.file_mtime = local.file_mtime
         merged.bitrate = local.bitrate
         merged.sample_rate = local.sample_rate
         merged.channels = local.channels
@@ -166,98 +170,100 @@ class MetadataChain(ChainBase):
 
         return merged
 
-    async def complete(self, metadata: MusicInfo, fetch_cover: bool = True) -> MusicInfo:
-        """补全元数据"""
-        cache_key = f"metadata:{metadata.musicbrainz_track_id or metadata.path}"
-        cached = self.get_cache(cache_key)
-        if cached:
-            self.logger.debug(f"使用缓存的元数据: {metadata.title}")
-            return cached
+    @staticmethod
+    def _metadata_cache_key(metadata: MusicInfo) -> str:
+        """
+        元数据缓存键
 
-        # 查询 MusicBrainz
+        有文件路径时按路径和修改时间缓存：缓存结果包含文件信息，不能在不同文件之间共用，
+        文件重新打标签（修改时间变化）后也不能命中旧结果
+        """
+        if not metadata.path:
+            return f"metadata:{metadata.musicbrainz_track_id}"
+        if metadata.file_mtime is None:
+            return f"metadata:{metadata.path}"
+        return f"metadata:{metadata.path}:{metadata.file_mtime}"
+
+    async def _complete_online(self, metadata: MusicInfo) -> MusicInfo:
+        """查询 MusicBrainz 并合并结果，缺少艺术家或标题时原样返回"""
         if metadata.artist and metadata.title:
             online = await self.query_musicbrainz(metadata.artist, metadata.title, metadata.album)
             if online:
                 metadata = self.merge_metadata(metadata, metadata, online)
+        return metadata
 
-        self.set_cache(cache_key, metadata, ttl=86400)
+    async def complete(self, metadata: MusicInfo, fetch_cover: bool = True) -> MusicInfo:
+        """补全元数据"""
+        cache_key = self._metadata_cache_key(metadata)
+        cached = await self.async_get_cache(cache_key)
+        if cached:
+            self.logger.debug(f"使用缓存的元数据: {metadata.title}")
+            return MusicInfo(**cached)
+
+        metadata = await self._complete_online(metadata)
+
+        # 共享缓存后端只保存 JSON，缓存字段字典
+        await self.async_set_cache(cache_key, asdict(metadata), ttl=86400)
         self.logger.info(f"补全元数据: {metadata.title}")
         return metadata
 
-    async def save_to_database(self, metadata: MusicInfo) -> dict[str, Any]:
-        """保存到数据库"""
-        artist_oper = ArtistOper(db_manager)
-        album_oper = AlbumOper(db_manager)
-        track_oper = TrackOper(db_manager)
+    async def complete_batch(self, metadata_list: list[MusicInfo]) -> list[MusicInfo | Exception]:
+        """
+        批量补全元数据
 
-        result = {}
+        缓存一次批量读取，未命中的文件并发查询（由 MusicBrainz 客户端统一限速），结果一次批量写回
 
-        # 保存艺术家
-        artist = None
-        if metadata.musicbrainz_artist_id:
-            artist = await artist_oper.get_by_musicbrainz_id(metadata.musicbrainz_artist_id)
+        Args:
+            metadata_list: 元数据列表
 
-        if not artist and metadata.artist:
-            artist = await artist_oper.create(
-                name=metadata.artist,
-                musicbrainz_id=metadata.musicbrainz_artist_id,
-                image_url=metadata.cover_url,
-            )
-            self.logger.info(f"创建艺术家: {artist.name} (ID: {artist.id})")
-
-        if artist:
-            result["artist_id"] = artist.id
-
-        # 保存专辑
-        album = None
-        if metadata.album and artist:
-            albums = await album_oper.get_by_artist_id(artist.id)
-            album = next((a for a in albums if a.title == metadata.album), None)
-
-        if not album and metadata.album and artist:
-            album = await album_oper.create(
-                artist_id=artist.id,
-                title=metadata.album,
-                cover_url=metadata.cover_url,
-                genres=metadata.genres,
-                track_number=metadata.track_number,
-                total_duration=metadata.duration,
-            )
-            self.logger.info(f"创建专辑: {album.title} (ID: {album.id})")
+        Returns:
+            与输入一一对应的补全结果，查询失败的位置为异常对象
+        """
+        keys = [self._metadata_cache_key(metadata) for metadata in metadata_list]
+        cached = await self.async_get_cache_many(list(dict.fromkeys(keys)))
+
+        results: list[MusicInfo | Exception | None] = [
+            MusicInfo(**cached[key]) if cached.get(key) else None for key in keys
+        ]
+        pending = [index for index, result in enumerate(results) if result is None]
+        online = await asyncio.gather(
+            *(self._complete_online(metadata_list[index]) for index in pending),
+            return_exceptions=True,
+        )
 
-        if album:
-            result["album_id"] = album.id
-
-        # 保存曲目
-        track = None
-        if metadata.path:
-            track = await track_oper.get_by_path(metadata.path)
-
-        if not track:
-            track = await track_oper.create(
-                title=metadata.title or "Unknown",
-                artist_id=artist.id if artist else None,
-                album_id=album.id if album else None,
-                path=metadata.path,
-                file_format=metadata.file_format,
-                file_size=metadata.file_size,
-                bitrate=metadata.bitrate,
-                sample_rate=metadata.sample_rate,
-                channels=metadata.channels,
-                duration=metadata.duration,
-                track_number=metadata.track_number,
-                disc_number=metadata.disc_number,
-                musicbrainz_track_id=metadata.musicbrainz_track_id,
-                genres=metadata.genres,
-                tags=metadata.tags,
-                lyrics=metadata.lyrics,
-            )
-            self.logger.info(f"创建曲目: {track.title} (ID: {track.id})")
+        completed = {}
+        for index, result in zip(pending, online, strict=True):
+            if isinstance(result, BaseException) and not isinstance(result, Exception):
+                raise result
+            results[index] = result
+            if not isinstance(result, Exception):
+                completed[keys[index]] = asdict(result)
+
+        await self.async_set_cache_many(completed, ttl=86400)
+        self.logger.info(
+            f"补全元数据: {len(metadata_list)} 个文件, 缓存命中 {len(metadata_list) - len(pending)} 个"
+        )
+        return results
 
-        if track:
-            result["track_id"] = track.id
+    async def save_to_database(self, metadata: MusicInfo) -> dict[str, Any]:
+        """保存到数据库"""
+        results = await self.save_batch_to_database([metadata])
+        return results[0]
+
+    async def save_batch_to_database(self, metadata_list: list[MusicInfo]) -> list[dict[str, Any]]:
+        """
+        批量保存到数据库（单个事务）
 
-        return result
+        Args:
+            metadata_list: 音乐信息列表
+
+        Returns:
+            每条记录的 artist_id/album_id/track_id
+        """
+        track_oper = TrackOper(Track, db_manager)
+        results = await track_oper.bulk_ingest(metadata_list)
+        self.logger.info(f"批量保存 {len(metadata_list)} 条元数据")
+        return results
 
     async def batch_recognize(self, file_paths: list[str]) -> list[dict[str, Any]]:
         """批量识别元数据"""
@@ -294,6 +300,65 @@ class MetadataChain(ChainBase):
         self.logger.info(f"批量识别完成，成功 {len([r for r in results if r['success']])} 个")
         return results
 
+    async def ingest_parsed(
+        self, parsed_files: list[tuple[str, MusicInfo | None, MusicInfo]]
+    ) -> list[dict[str, Any]]:
+        """
+        入库一批已解析的文件（供扫描流水线调用）
+
+        Args:
+            parsed_files: (文件路径, 本地元数据, 文件名元数据) 列表
+
+        Returns:
+            每个文件的处理结果
+        """
+        results: list[dict[str, Any] | None] = [None] * len(parsed_files)
+        merged: list[tuple[int, MusicInfo]] = []
+        pending: list[tuple[int, MusicInfo]] = []
+
+        for index, (file_path, local_metadata, filename_metadata) in enumerate(parsed_files):
+            if local_metadata is None:
+                self.logger.error(f"入库文件失败: {file_path}, 错误: 无法读取音频元数据")
+                results[index] = {
+                    "path": file_path,
+                    "success": False,
+                    "error": "无法读取音频元数据",
+                }
+                continue
+            merged.append((index, self.merge_metadata(local_metadata, filename_metadata, None)))
+
+        # 整批补全：缓存批量读写，在线查询并发执行
+        completed = await self.complete_batch([metadata for _, metadata in merged])
+        for (index, _), metadata in zip(merged, completed, strict=True):
+            if isinstance(metadata, Exception):
+                file_path = parsed_files[index][0]
+                self.logger.error(f"入库文件失败: {file_path}, 错误: {metadata}")
+                results[index] = {"path": file_path, "success": False, "error": str(metadata)}
+            else:
+                pending.append((index, metadata))
+
+        if pending:
+            try:
+                save_results = await self.save_batch_to_database(
+                    [metadata for _, metadata in pending]
+                )
+                for (index, _), save_result in zip(pending, save_results, strict=True):
+                    results[index] = {
+                        "path": parsed_files[index][0],
+                        "success": True,
+                        "save_result": save_result,
+                    }
+            except Exception as e:
+                self.logger.error(f"批量入库失败: {e}")
+                for index, _ in pending:
+                    results[index] = {
+                        "path": parsed_files[index][0],
+                        "success": False,
+                        "error": str(e),
+                    }
+
+        return results
+
     async def rewrite_metadata(self, track_id: int) -> bool:
         """将识别结果写入音频文件"""
         self.logger.info(f"回写元数据到文件: {track_id}")
@@ -5,7 +5,7 @@ MusicBrainz 专用链
 
 from typing import Any
 
-from app.chain import ChainBase
+from app.chain import ChainBase, cached
 
 
 class MusicBrainzChain(ChainBase):
@@ -14,6 +14,7 @@ class MusicBrainzChain(ChainBase):
     专门处理 MusicBrainz 相关操作
     """
 
+    @cached("mb_artist_search:{query}:{limit}", ttl=86400)
     async def search_artist(self, query: str, limit: int = 50) -> list[dict[str, Any]]:
         """
         搜索艺术家
@@ -27,20 +28,9 @@ class MusicBrainzChain(ChainBase):
         """
         self.logger.info(f"搜索艺术家: {query}")
 
-        # 检查缓存
-        cache_key = f"mb_artist_search:{query}:{limit}"
-        cached = self.get_cache(cache_key)
-        if cached:
-            return cached
-
-        # 调用 MusicBrainz 模块
-        results = await self.run_module("musicbrainz", "search_artist", query, limit)
-
-        # 缓存结果
-        self.set_cache(cache_key, results, ttl=86400)  # 24小时
-
-        return results
+        return await self.run_module("musicbrainz", "search_artist", query, limit)
 
+    @cached("mb_artist_discog:{musicbrainz_id}", ttl=86400)
     async def get_artist_discography(self, musicbrainz_id: str) -> dict[str, Any]:
         """
         获取艺术家作品集
@@ -53,20 +43,9 @@ class MusicBrainzChain(ChainBase):
         """
         self.logger.info(f"获取艺术家作品集: {musicbrainz_id}")
 
-        # 检查缓存
-        cache_key = f"mb_artist_discog:{musicbrainz_id}"
-        cached = self.get_cache(cache_key)
-        if cached:
-            return cached
-
-        # 调用 MusicBrainz 模块
-        result = await self.run_module("musicbrainz", "get_artist_info", musicbrainz_id)
-
-        # 缓存结果
-        self.set_cache(cache_key, result, ttl=86400)
-
-        return result
+        return await self.run_module("musicbrainz", "get_artist_info", musicbrainz_id)
 
+    @cached("mb_album_search:{query}:{limit}", ttl=86400)
     async def search_album(self, query: str, limit: int = 50) -> list[dict[str, Any]]:
         """
         搜索专辑
@@ -80,20 +59,9 @@ class MusicBrainzChain(ChainBase):
         """
         self.logger.info(f"搜索专辑: {query}")
 
-        # 检查缓存
-        cache_key = f"mb_album_search:{query}:{limit}"
-        cached = self.get_cache(cache_key)
-        if cached:
-            return cached
-
-        # 调用 MusicBrainz 模块
-        results = await self.run_module("musicbrainz", "search_album", query, limit)
-
-        # 缓存结果
-        self.set_cache(cache_key, results, ttl=86400)
-
-        return results
+        return await self.run_module("musicbrainz", "search_album", query, limit)
 
+    @cached("mb_album_info:{musicbrainz_id}", ttl=86400)
     async def get_album_info(self, musicbrainz_id: str) -> dict[str, Any] | None:
         """
         获取专辑详情
@@ -106,20 +74,9 @@ class MusicBrainzChain(ChainBase):
         """
         self.logger.info(f"获取专辑详情: {musicbrainz_id}")
 
-        # 检查缓存
-        cache_key = f"mb_album_info:{musicbrainz_id}"
-        cached = self.get_cache(cache_key)
-        if cached:
-            return cached
-
-        # 调用 MusicBrainz 模块
-        result = await self.run_module("musicbrainz", "get_album_info", musicbrainz_id)
-
-        # 缓存结果
-        self.set_cache(cache_key, result, ttl=86400)
-
-        return result
+        return await self.run_module("musicbrainz", "get_album_info", musicbrainz_id)
 
+    @cached("mb_track_search:{query}:{limit}", ttl=3600)
     async def search_track(self, query: str, limit: int = 50) -> list[dict[str, Any]]:
         """
         搜索曲目
@@ -133,20 +90,9 @@ class MusicBrainzChain(ChainBase):
         """
         self.logger.info(f"搜索曲目: {query}")
 
-        # 检查缓存
-        cache_key = f"mb_track_search:{query}:{limit}"
-        cached = self.get_cache(cache_key)
-        if cached:
-            return cached
-
-        # 调用 MusicBrainz 模块
-        results = await self.run_module("musicbrainz", "search_track", query, limit)
-
-        # 缓存结果
-        self.set_cache(cache_key, results, ttl=3600)  # 1小时
-
-        return results
+        return await self.run_module("musicbrainz", "search_track", query, limit)
 
+    @cached("mb_track_info:{musicbrainz_id}", ttl=86400)
     async def get_track_info(self, musicbrainz_id: str) -> dict[str, Any] | None:
         """
         获取曲目详情
@@ -159,19 +105,7 @@ class MusicBrainzChain(ChainBase):
         """
         self.logger.info(f"获取曲目详情: {musicbrainz_id}")
 
-        # 检查缓存
-        cache_key = f"mb_track_info:{musicbrainz_id}"
-        cached = self.get_cache(cache_key)
-        if cached:
-            return cached
-
-        # 调用 MusicBrainz 模块
-        result = await self.run_module("musicbrainz", "get_track_info", musicbrainz_id)
-
-        # 缓存结果
-        self.set_cache(cache_key, result, ttl=86400)
-
-        return result
+        return await self.run_module("musicbrainz", "get_track_info", musicbrainz_id)
 
     async def download_cover(self, musicbrainz_id: str, cover_type: str = "front") -> str | None:
         """
@@ -186,7 +120,4 @@ class MusicBrainzChain(ChainBase):
         """
         self.logger.info(f"下载封面: {musicbrainz_id}")
 
-        # 调用 MusicBrainz 模块
-        result = await self.run_module("musicbrainz", "download_cover", musicbrainz_id, cover_type)
-
-        return result
+        return await self.run_module("musicbrainz", "download_cover", musicbrainz_id, cover_type)
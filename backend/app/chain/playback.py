@@ -3,13 +3,21 @@
 处理播放控制、状态同步
 """
 
-import contextlib
+import time
 from datetime import datetime
 from typing import Any
 
+from sqlalchemy import select
+
 from app.chain import ChainBase
 from app.core.context import PlaybackSession
 from app.core.log import logger
+from app.core.play_history import PlayHistoryRecorder, get_play_history_recorder
+from app.core.playback_state import PlaybackState, PlaybackStateStore, get_playback_state_store
+from app.db.models.play_history import PlayHistory
+from app.db.models.playlist import Playlist, PlaylistTrack
+from app.db.models.track import Track
+from app.db.operations.play_history import PlayHistoryOper
 from app.db.operations.playlist import PlaylistOper
 from app.db.operations.track import TrackOper
 
@@ -18,22 +26,64 @@ class PlaybackChain(ChainBase):
     """
     播放控制链
     负责播放控制、状态同步、历史记录、队列管理
+
+    播放状态按用户/设备保存在 PlaybackStateStore 中，Chain 本身不持有状态，
+    每个请求创建新实例也不会丢失会话和队列
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self,
+        *args,
+        state_store: PlaybackStateStore | None = None,
+        history_recorder: PlayHistoryRecorder | None = None,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
-        self._sessions: dict[str, PlaybackSession] = {}
-        self._play_queue: list[int] = []  # 播放队列（曲目 ID 列表）
-        self._history: list[dict[str, Any]] = []  # 播放历史
-        self._current_index = -1  # 当前播放队列索引
         self.logger = logger
-        self.track_oper = TrackOper(self.db_manager)
-        self.playlist_oper = PlaylistOper(self.db_manager)
+        self.state_store = state_store or get_playback_state_store()
+        self.history_recorder = history_recorder or get_play_history_recorder()
+        self.track_oper = TrackOper(Track, self.db_manager)
+        self.history_oper = PlayHistoryOper(PlayHistory, self.db_manager)
+        self.playlist_oper = PlaylistOper(Playlist, self.db_manager)
 
     # ========== 会话管理 ==========
 
+    async def get_state(
+        self, user_id: str | None = None, device_id: str | None = None
+    ) -> PlaybackState:
+        """
+        获取播放状态
+
+        Args:
+            user_id: 用户 ID
+            device_id: 设备 ID
+
+        Returns:
+            播放状态
+        """
+        return await self.state_store.get(user_id, device_id)
+
+    async def get_current_session(
+        self, user_id: str | None = None, device_id: str | None = None
+    ) -> PlaybackSession | None:
+        """
+        获取当前播放会话
+
+        Args:
+            user_id: 用户 ID
+            device_id: 设备 ID
+
+        Returns:
+            播放会话对象
+        """
+        return (await self.get_state(user_id, device_id)).session
+
     async def create_session(
-        self, track_id: int, user_id: str | None = None, playlist_id: int | None = None
+        self,
+        track_id: int,
+        user_id: str | None = None,
+        playlist_id: int | None = None,
+        device_id: str | None = None,
     ) -> PlaybackSession:
         """
         创建播放会话
@@ -42,12 +92,14 @@ class PlaybackChain(ChainBase):
             track_id: 曲目 ID
             user_id: 用户 ID
             playlist_id: 播放列表 ID
+            device_id: 设备 ID
 
         Returns:
             播放会话对象
         """
         self.logger.info(
-            f"创建播放会话: track_id={track_id}, user_id={user_id}, playlist_id={playlist_id}"
+            f"创建播放会话: track_id={track_id}, user_id={user_id}, "
+            f"device_id={device_id}, playlist_id={playlist_id}"
         )
 
         # 查询曲目信息
@@ -55,48 +107,52 @@ class PlaybackChain(ChainBase):
         if not track:
             raise ValueError(f"曲目不存在: {track_id}")
 
-        # 如果在播放中，先停止当前曲目
-        if self._sessions:
-            current_session = list(self._sessions.values())[0]
-            await self.stop(current_session.session_id)
-
-        # 添加到播放历史
-        await self.add_to_history(track_id, user_id)
-
-        # 如果有播放列表，设置队列
-        if playlist_id:
-            await self.set_playlist(playlist_id)
-
-        # 创建播放会话
-        import time
-
-        session_id = f"{user_id or 'anonymous'}:{track_id}:{time.time()}"
-
-        session = PlaybackSession(
-            session_id=session_id,
-            track_id=track_id,
-            user_id=user_id,
-            position=0.0,
-            duration=track.duration / 1000 if track.duration else None,
-            volume=1.0,
-            muted=False,
-            repeat_mode="off",
-            shuffle=False,
-            started_at=datetime.utcnow().isoformat(),
-        )
+        # 如果有播放列表，先在锁外查出队列
+        queue = await self._get_playlist_track_ids(playlist_id) if playlist_id else None
+
+        async with self.state_store.edit(user_id, device_id) as state:
+            previous = state.session
+
+            if queue is not None:
+                state.queue.replace(queue)
+            # 由 next/previous 切换时队列已指向该曲目，无需查找
+            if state.queue.current != track_id:
+                index = state.queue.index_of(track_id)
+                if index >= 0:
+                    state.queue.jump(index)
+
+            session = PlaybackSession(
+                session_id=f"{user_id or 'anonymous'}:{track_id}:{time.time()}",
+                track_id=track_id,
+                user_id=user_id,
+                device_id=device_id,
+                title=track.title,
+                position=0.0,
+                duration=track.duration / 1000 if track.duration else None,
+                # 沿用上一个会话的播放设置
+                volume=previous.volume if previous else 1.0,
+                muted=previous.muted if previous else False,
+                repeat_mode=previous.repeat_mode if previous else "off",
+                shuffle=previous.shuffle if previous else False,
+                started_at=datetime.utcnow().isoformat(),
+            )
+            state.session = session
 
-        self._sessions = {session_id: session}
+        # 如果在播放中，同步停止上一个会话
+        if previous:
+            await self.sync_stop_to_media_server(previous)
 
-        # 更新播放次数
-        await self.track_oper.update_play_count(track_id)
+        # 记录播放历史（批量写入数据库并累加播放次数）
+        self.history_recorder.record(track_id, user_id, device_id)
 
         # 发送播放开始事件
-        self.send_event(
+        await self.send_event(
             "playback.started",
             {
-                "session_id": session_id,
+                "session_id": session.session_id,
                 "track_id": track_id,
                 "user_id": user_id,
+                "device_id": device_id,
                 "playlist_id": playlist_id,
             },
         )
@@ -106,77 +162,64 @@ class PlaybackChain(ChainBase):
 
         return session
 
-    def get_session(self, session_id: str) -> PlaybackSession | None:
+    async def _get_playlist_track_ids(self, playlist_id: int) -> list[int]:
         """
-        获取播放会话
+        获取播放列表的曲目 ID
 
         Args:
-            session_id: 会话 ID
+            playlist_id: 播放列表 ID
 
         Returns:
-            播放会话对象
-        """
-        return self._sessions.get(session_id)
-
-    def get_current_session(self) -> PlaybackSession | None:
-        """获取当前播放会话"""
-        if self._sessions:
-            return list(self._sessions.values())[0]
-        return None
-
-    async def destroy_session(self, session_id: str):
+            按位置排序的曲目 ID 列表
         """
-        销毁播放会话
-
-        Args:
-            session_id: 会话 ID
-        """
-        if session_id in self._sessions:
-            session = self._sessions[session_id]
-
-            # 同步停止状态到媒体服务器
-            await self.sync_stop_to_media_server(session)
-
-            # 移除会话
-            del self._sessions[session_id]
-
-            self.logger.info(f"播放会话已销毁: {session_id}")
-
-    async def destroy_current_session(self):
-        """销毁当前播放会话"""
-        session = self.get_current_session()
-        if session:
-            await self.destroy_session(session.session_id)
+        async with self.db_manager.get_session() as db:
+            result = await db.execute(
+                select(PlaylistTrack.track_id)
+                .where(PlaylistTrack.playlist_id == playlist_id)
+                .order_by(PlaylistTrack.position)
+            )
+            return list(result.scalars().all())
 
     # ========== 播放控制 ==========
 
-    async def play(self, track_id: int, user_id: str | None = None):
+    async def play(
+        self,
+        track_id: int,
+        user_id: str | None = None,
+        playlist_id: int | None = None,
+        device_id: str | None = None,
+    ) -> PlaybackSession:
         """
         播放曲目
 
         Args:
             track_id: 曲目 ID
             user_id: 用户 ID
+            playlist_id: 播放列表 ID
+            device_id: 设备 ID
+
+        Returns:
+            播放会话对象
         """
         self.logger.info(f"播放曲目: {track_id}")
-        await self.create_session(track_id, user_id)
+        return await self.create_session(track_id, user_id, playlist_id, device_id)
 
-    async def pause(self, session_id: str | None = None):
+    async def pause(self, user_id: str | None = None, device_id: str | None = None):
         """
         暂停播放
 
         Args:
-            session_id: 会话 ID，None 表示当前会话
+            user_id: 用户 ID
+            device_id: 设备 ID
         """
-        session = self._sessions.get(session_id) if session_id else self.get_current_session()
-
-        if not session:
-            return
-
-        session.is_playing = False
+        async with self.state_store.edit(user_id, device_id) as state:
+            session = state.session
+            if not session:
+                return
+            session.is_playing = False
 
         # 发送播放暂停事件
-        self.send_event(
+        await self.send_event(
             "playback.paused",
             {
                 "session_id": session.session_id,
@@ -187,23 +230,26 @@ class PlaybackChain(ChainBase):
         # 同步暂停状态到媒体服务器
         await self.sync_stop_to_media_server(session)
 
-    async def stop(self, session_id: str | None = None):
+    async def stop(self, user_id: str | None = None, device_id: str | None = None):
         """
         停止播放
 
         Args:
-            session_id: 会话 ID，None 表示当前会话
+            user_id: 用户 ID
+            device_id: 设备 ID
         """
-        session = self._sessions.get(session_id) if session_id else self.get_current_session()
+        async with self.state_store.edit(user_id, device_id) as state:
+            session = state.session
+            if not session:
+                return
+            state.session = None
 
-        if not session:
-            return
-
-        # 移除会话
-        await self.destroy_session(session.session_id)
+        # 同步停止状态到媒体服务器
+        await self.sync_stop_to_media_server(session)
+        self.logger.info(f"播放会话已结束: {session.session_id}")
 
         # 发送播放停止事件
-        self.send_event(
+        await self.send_event(
             "playback.stopped",
             {
                 "session_id": session.session_id,
@@ -211,71 +257,80 @@ class PlaybackChain(ChainBase):
             },
         )
 
-    async def next(self, session_id: str | None = None):
+    async def next(
+        self, user_id: str | None = None, device_id: str | None = None, auto: bool = False
+    ) -> PlaybackSession | None:
         """
         下一首
 
         Args:
-            session_id: 会话 ID，None 表示当前会话
-        """
-        session = self._sessions.get(session_id) if session_id else self.get_current_session()
+            user_id: 用户 ID
+            device_id: 设备 ID
+            auto: 是否为当前曲目播放结束后的自动切换（单曲循环时重复当前曲目）
 
-        if not session:
-            self.logger.warning("没有正在播放的曲目")
-            return
+        Returns:
+            新的播放会话，没有下一首时返回 None
+        """
+        async with self.state_store.edit(user_id, device_id) as state:
+            if not state.session:
+                self.logger.warning("没有正在播放的曲目")
+                return None
+            self.logger.info(f"播放下一首: {state.session.title}")
+            next_track_id = state.queue.next(state.session.repeat_mode, manual=not auto)
 
-        self.logger.info(f"播放下一首: {session.title}")
+        if next_track_id is not None:
+            return await self.play(next_track_id, user_id, device_id=device_id)
 
-        # 获取下一首曲目
-        next_track_id = self._get_next_track()
-        if next_track_id:
-            await self.play(next_track_id, session.user_id)
-        else:
-            self.logger.info("没有更多曲目，停止播放")
-            await self.stop()
+        self.logger.info("没有更多曲目，停止播放")
+        await self.stop(user_id, device_id)
+        return None
 
-    async def previous(self, session_id: str | None = None):
+    async def previous(
+        self, user_id: str | None = None, device_id: str | None = None
+    ) -> PlaybackSession | None:
         """
         上一首
 
         Args:
-            session_id: 会话 ID，None 表示当前会话
-        """
-        session = self._sessions.get(session_id) if session_id else self.get_current_session()
+            user_id: 用户 ID
+            device_id: 设备 ID
 
-        if not session:
-            self.logger.warning("没有正在播放的曲目")
-            return
+        Returns:
+            新的播放会话，没有上一首时返回 None
+        """
+        async with self.state_store.edit(user_id, device_id) as state:
+            if not state.session:
+                self.logger.warning("没有正在播放的曲目")
+                return None
+            self.logger.info(f"播放上一首: {state.session.title}")
+            prev_track_id = state.queue.previous(state.session.repeat_mode)
 
-        self.logger.info(f"播放上一首: {session.title}")
+        if prev_track_id is not None:
+            return await self.play(prev_track_id, user_id, device_id=device_id)
 
-        # 获取上一首曲目
-        prev_track_id = self._get_previous_track()
-        if prev_track_id:
-            await self.play(prev_track_id, session.user_id)
-        else:
-            self.logger.info("没有上一首曲目")
+        self.logger.info("没有上一首曲目")
+        return None
 
-    async def seek(self, position: float, session_id: str | None = None):
+    async def seek(self, position: float, user_id: str | None = None, device_id: str | None = None):
         """
         跳转到指定位置
 
         Args:
             position: 位置（秒）
-            session_id: 会话 ID，None 表示当前会话
+            user_id: 用户 ID
+            device_id: 设备 ID
         """
-        session = self._sessions.get(session_id) if session_id else self.get_current_session()
-
-        if not session:
-            return
-
-        session.position = position
+        async with self.state_store.edit(user_id, device_id) as state:
+            session = state.session
+            if not session:
+                return
+            session.position = position
 
         # 同步进度到媒体服务器
         await self.sync_playback_to_media_server(session)
 
         # 发送进度更新事件
-        self.send_event(
+        await self.send_event(
             "playback.seek",
             {
                 "session_id": session.session_id,
@@ -288,32 +343,37 @@ class PlaybackChain(ChainBase):
     # ========== 进度控制 ==========
 
     async def update_progress(
-        self, session_id: str, position: float, duration: float | None = None
+        self,
+        position: float,
+        duration: float | None = None,
+        user_id: str | None = None,
+        device_id: str | None = None,
     ):
         """
         更新播放进度
 
         Args:
-            session_id: 会话 ID
             position: 当前位置（秒）
             duration: 总时长（秒）
+            user_id: 用户 ID
+            device_id: 设备 ID
         """
-        session = self._sessions.get(session_id)
-        if not session:
-            return
-
-        session.position = position
-        if duration:
-            session.duration = duration
+        async with self.state_store.edit(user_id, device_id) as state:
+            session = state.session
+            if not session:
+                return
+            session.position = position
+            if duration:
+                session.duration = duration
 
         # 同步进度到媒体服务器
         await self.sync_playback_to_media_server(session)
 
         # 发送进度事件
-        self.send_event(
+        await self.send_event(
             "playback.progress",
             {
-                "session_id": session_id,
+                "session_id": session.session_id,
                 "position": position,
                 "duration": session.duration,
             },
@@ -321,123 +381,86 @@ class PlaybackChain(ChainBase):
 
     # ========== 播放队列管理 ==========
 
-    async def set_playlist(self, playlist_id: int):
+    async def set_playlist(
+        self, playlist_id: int, user_id: str | None = None, device_id: str | None = None
+    ):
         """
         设置播放列表
 
         Args:
             playlist_id: 播放列表 ID
+            user_id: 用户 ID
+            device_id: 设备 ID
         """
         self.logger.info(f"设置播放列表: {playlist_id}")
 
         # 获取播放列表的曲目
-        from app.db.models.playlist import PlaylistTrack
+        tracks = await self._get_playlist_track_ids(playlist_id)
+        async with self.state_store.edit(user_id, device_id) as state:
+            state.queue.replace(tracks, position=0 if tracks else -1)
 
-        async with self.db_manager.get_session() as db:
-            from sqlalchemy import select
+        self.logger.info(f"播放队列更新: {len(tracks)} 首曲目")
 
-            result = await db.execute(
-                select(PlaylistTrack.track_id)
-                .where(PlaylistTrack.playlist_id == playlist_id)
-                .order_by(PlaylistTrack.position)
-            )
-            tracks = result.scalars().all()
-            self._play_queue = list(tracks)
-            self._current_index = 0 if tracks else -1
-
-        self.logger.info(f"播放队列更新: {len(self._play_queue)} 首曲目")
-
-    async def enqueue(self, track_ids: list[int]):
+    async def enqueue(
+        self, track_ids: list[int], user_id: str | None = None, device_id: str | None = None
+    ) -> int:
         """
         将曲目加入队列
 
         Args:
             track_ids: 曲目 ID 列表
+            user_id: 用户 ID
+            device_id: 设备 ID
+
+        Returns:
+            队列长度
         """
-        self._play_queue.extend(track_ids)
+        async with self.state_store.edit(user_id, device_id) as state:
+            state.queue.extend(track_ids)
+            queue_count = len(state.queue)
         self.logger.info(f"加入队列: {len(track_ids)} 首曲目")
+        return queue_count
 
-    async def clear_queue(self):
-        """清空播放队列"""
-        self._play_queue = []
-        self._current_index = -1
-        self.logger.info("播放队列已清空")
-
-    async def get_queue(self) -> list[int]:
-        """获取当前播放队列"""
-        return self._play_queue.copy()
-
-    def _get_next_track(self) -> int | None:
-        """获取下一首曲目"""
-        if not self._play_queue:
-            return None
-
-        # 随机播放
-        if self._current_index >= len(self._play_queue) - 1:
-            self._current_index = 0
-
-        # 如果是 shuffle 模式，随机选择
-        current_session = self.get_current_session()
-        if current_session and current_session.shuffle:
-            import random
-
-            index = random.randint(0, len(self._play_queue) - 1)
-            return self._play_queue[index]
-        else:
-            self._current_index = (self._current_index + 1) % len(self._play_queue)
-            return self._play_queue[self._current_index]
-
-    def _get_previous_track(self) -> int | None:
-        """获取上一首曲目"""
-        if not self._play_queue:
-            return None
-
-        if self._current_index <= 0:
-            self._current_index = len(self._play_queue) - 1
-
-        current_session = self.get_current_session()
-        if current_session and current_session.shuffle:
-            import random
-
-            index = random.randint(0, len(self._play_queue) - 1)
-            return self._play_queue[index]
-        else:
-            self._current_index = (self._current_index - 1) % len(self._play_queue)
-            return self._play_queue[self._current_index]
-
-    # ========== 播放历史 ==========
-
-    async def add_to_history(self, track_id: int, user_id: str | None = None):
+    async def clear_queue(self, user_id: str | None = None, device_id: str | None = None):
         """
-        添加到播放历史
+        清空播放队列
 
         Args:
-            track_id: 曲目 ID
             user_id: 用户 ID
+            device_id: 设备 ID
         """
-        track = await self.track_oper.get_by_id(track_id)
-        if not track:
-            return
-
-        history_item = {
-            "track_id": track_id,
-            "title": track.title,
-            "artist_id": track.artist_id,
-            "album_id": track.album_id,
-            "user_id": user_id,
-            "played_at": datetime.utcnow().isoformat(),
-        }
+        async with self.state_store.edit(user_id, device_id) as state:
+            state.queue.clear()
+        self.logger.info("播放队列已清空")
+
+    async def get_queue(
+        self,
+        user_id: str | None = None,
+        device_id: str | None = None,
+        offset: int | None = None,
+        limit: int = 20,
+    ) -> list[int]:
+        """
+        按播放顺序获取一段播放队列
 
-        self._history.append(history_item)
+        Args:
+            user_id: 用户 ID
+            device_id: 设备 ID
+            offset: 起始播放位置，默认从当前曲目开始
+            limit: 返回数量
 
-        # 只保留最近 1000 条历史
-        if len(self._history) > 1000:
-            self._history = self._history[-1000:]
+        Returns:
+            曲目 ID 列表
+        """
+        queue = (await self.get_state(user_id, device_id)).queue
+        if offset is None:
+            offset = max(queue.position, 0)
+        return queue.window(offset, limit)
 
-        self.logger.debug(f"添加到历史: {track.title}")
+    # ========== 播放历史 ==========
 
     async def get_history(
-        self, user_id: str | None = None, limit: int = 50
+        self, user_id: str | None = None, limit: int = 50, device_id: str | None = None
     ) -> list[dict[str, Any]]:
         """
         获取播放历史
@@ -445,98 +468,155 @@ class PlaybackChain(ChainBase):
         Args:
             user_id: 用户 ID
             limit: 返回数量
+            device_id: 设备 ID
 
         Returns:
-            历史记录列表
+            历史记录列表（按播放时间倒序）
         """
-        history = self._history.copy()
+        history = await self.history_oper.get_recent(user_id, limit=limit, device_id=device_id)
 
-        if user_id:
-            history = [h for h in history if h.get("user_id") == user_id]
+        # 合并尚未写入的缓冲记录，刚播放的曲目立即可见（不为读取触发写入）
+        buffered = self.history_recorder.get_buffered(user_id, device_id)[:limit]
+        if not buffered:
+            return history
 
-        # 返回最近的记录
-        return history[-limit:] if history else []
+        tracks = {
+            track.id: track
+            for track in await self.track_oper.get_by_ids(
+                list({event["track_id"] for event in buffered})
+            )
+        }
+        # 正在写入的记录可能已提交，按 event_id 去重
+        written = {item["event_id"] for item in history}
+        pending = [
+            {
+                "event_id": event["event_id"],
+                "track_id": event["track_id"],
+                "title": tracks[event["track_id"]].title,
+                "artist_id": tracks[event["track_id"]].artist_id,
+                "album_id": tracks[event["track_id"]].album_id,
+                "user_id": event["user_id"],
+                "device_id": event["device_id"],
+                "played_at": event["played_at"],
+            }
+            for event in buffered
+            if event["track_id"] in tracks and event["event_id"] not in written
+        ]
+        merged = sorted(
+            pending + history,
+            key=lambda item: datetime.fromisoformat(item["played_at"]),
+            reverse=True,
+        )
+        return merged[:limit]
 
-    async def clear_history(self):
-        """清空播放历史"""
-        self._history = []
-        self.logger.info("播放历史已清空")
+    async def clear_history(self, user_id: str | None = None, device_id: str | None = None):
+        """
+        清空播放历史
+
+        Args:
+            user_id: 用户 ID
+            device_id: 设备 ID
+        """
+        await self.history_recorder.flush()
+        count = await self.history_oper.delete_by_user(user_id, device_id)
+        self.logger.info(f"播放历史已清空: {count} 条")
 
     # ========== 播放模式 ==========
 
-    async def set_repeat_mode(self, repeat_mode: str, session_id: str | None = None):
+    async def set_repeat_mode(
+        self, repeat_mode: str, user_id: str | None = None, device_id: str | None = None
+    ) -> PlaybackSession | None:
         """
         设置播放模式
 
         Args:
             repeat_mode: 播放模式（off/one/all）
-            session_id: 会话 ID
-        """
-        session = self._sessions.get(session_id) if session_id else self.get_current_session()
-
-        if not session:
-            return
+            user_id: 用户 ID
+            device_id: 设备 ID
 
-        session.repeat_mode = repeat_mode
+        Returns:
+            当前播放会话
+        """
+        async with self.state_store.edit(user_id, device_id) as state:
+            session = state.session
+            if not session:
+                return None
+            session.repeat_mode = repeat_mode
 
         self.logger.info(f"设置播放模式: {repeat_mode}")
 
         # 发送模式变更事件
-        self.send_event(
+        await self.send_event(
             "playback.repeat_mode_changed",
             {
                 "session_id": session.session_id,
                 "repeat_mode": repeat_mode,
             },
         )
+        return session
 
-    async def toggle_shuffle(self, session_id: str | None = None):
+    async def toggle_shuffle(
+        self, user_id: str | None = None, device_id: str | None = None
+    ) -> PlaybackSession | None:
         """
         切换随机播放
 
         Args:
-            session_id: 会话 ID
-        """
-        session = self._sessions.get(session_id) if session_id else self.get_current_session()
-
-        if not session:
-            return
+            user_id: 用户 ID
+            device_id: 设备 ID
 
-        session.shuffle = not session.shuffle
+        Returns:
+            当前播放会话
+        """
+        async with self.state_store.edit(user_id, device_id) as state:
+            session = state.session
+            if not session:
+                return None
+            session.shuffle = not session.shuffle
+            if session.shuffle:
+                state.queue.shuffle()
+            else:
+                state.queue.unshuffle()
 
         self.logger.info(f"随机播放: {session.shuffle}")
 
         # 发送模式变更事件
-        self.send_event(
+        await self.send_event(
             "playback.shuffle_toggled",
             {
                 "session_id": session.session_id,
                 "shuffle": session.shuffle,
             },
         )
+        return session
 
     # ========== 音量控制 ==========
 
-    async def set_volume(self, volume: float, session_id: str | None = None):
+    async def set_volume(
+        self, volume: float, user_id: str | None = None, device_id: str | None = None
+    ) -> PlaybackSession | None:
         """
         设置音量
 
         Args:
             volume: 音量（0.0-1.0）
-            session_id: 会话 ID
-        """
-        session = self._sessions.get(session_id) if session_id else self.get_current_session()
-
-        if not session:
-            return
+            user_id: 用户 ID
+            device_id: 设备 ID
 
-        session.volume = max(0.0, min(1.0, volume))
+        Returns:
+            当前播放会话
+        """
+        async with self.state_store.edit(user_id, device_id) as state:
+            session = state.session
+            if not session:
+                return None
+            session.volume = max(0.0, min(1.0, volume))
 
         # 同步音量到媒体服务器
         await self.sync_playback_to_media_server(session)
 
         # 发送音量变更事件
-        self.send_event(
+        await self.send_event(
             "playback.volume_changed",
             {
                 "session_id": session.session_id,
@@ -545,31 +625,38 @@ class PlaybackChain(ChainBase):
         )
 
         self.logger.info(f"设置音量: {session.volume}")
+        return session
 
-    async def toggle_mute(self, session_id: str | None = None):
+    async def toggle_mute(
+        self, user_id: str | None = None, device_id: str | None = None
+    ) -> PlaybackSession | None:
         """
         切换静音
 
         Args:
-            session_id: 会话 ID
-        """
-        session = self._sessions.get(session_id) if session_id else self.get_current_session()
-
-        if not session:
-            return
+            user_id: 用户 ID
+            device_id: 设备 ID
 
-        session.muted = not session.muted
+        Returns:
+            当前播放会话
+        """
+        async with self.state_store.edit(user_id, device_id) as state:
+            session = state.session
+            if not session:
+                return None
+            session.muted = not session.muted
 
         self.logger.info(f"静音: {session.muted}")
 
         # 发送静音状态事件
-        self.send_event(
+        await self.send_event(
             "playback.mute_toggled",
             {
                 "session_id": session.session_id,
                 "muted": session.muted,
             },
         )
+        return session
 
     # ========== 媒体服务器同步 ==========
 
@@ -581,9 +668,10 @@ class PlaybackChain(ChainBase):
             session: 播放会话对象
         """
         # 获取启用的媒体服务器
+        from app.db.models.media import MediaServer
         from app.db.operations.media import MediaServerOper
 
-        media_oper = MediaServerOper(self.db_manager)
+        media_oper = MediaServerOper(MediaServer, self.db_manager)
         servers = await media_oper.get_enabled()
 
         # 同步到所有启用的服务器
@@ -601,9 +689,10 @@ class PlaybackChain(ChainBase):
             session: 播放会话对象
         """
         # 获取启用的媒体服务器
+        from app.db.models.media import MediaServer
         from app.db.operations.media import MediaServerOper
 
-        media_oper = MediaServerOper(self.db_manager)
+        media_oper = MediaServerOper(MediaServer, self.db_manager)
         servers = await media_oper.get_enabled()
 
         # 同步到所有启用的服务器
@@ -615,40 +704,42 @@ class PlaybackChain(ChainBase):
 
     # ========== 状态获取 ==========
 
-    def get_all_sessions(self) -> list[PlaybackSession]:
-        """获取所有播放会话"""
-        return list(self._sessions.values())
-
-    def get_queue_info(self) -> dict[str, Any]:
+    async def get_queue_info(
+        self, user_id: str | None = None, device_id: str | None = None, window: int = 20
+    ) -> dict[str, Any]:
         """
         获取队列信息
 
+        Args:
+            user_id: 用户 ID
+            device_id: 设备 ID
+            window: 返回从当前曲目开始的队列曲目数
+
         Returns:
             队列信息字典
         """
-        current_session = self.get_current_session()
-        current_track_id = current_session.track_id if current_session else None
+        state = await self.get_state(user_id, device_id)
+        session = state.session
 
         # 获取当前曲目信息
         current_track = None
-        if current_track_id:
-            import asyncio
-
-            with contextlib.suppress(BaseException):
-                current_track = asyncio.run(self.track_oper.get_by_id(current_track_id))
+        if session:
+            current_track = await self.track_oper.get_by_id(session.track_id)
 
-        # 获取下一首曲目信息
-        next_track_id = self._get_next_track()
+        # 获取下一首曲目信息（不移动队列位置）
         next_track = None
-        if next_track_id:
-            with contextlib.suppress(BaseException):
-                next_track = asyncio.run(self.track_oper.get_by_id(next_track_id))
+        repeat_mode = session.repeat_mode if session else "off"
+        next_position = state.queue.peek(1, repeat_mode, manual=False)
+        if next_position is not None:
+            next_track = await self.track_oper.get_by_id(state.queue.track_at(next_position))
 
         return {
-            "queue": self._play_queue,
-            "current_index": self._current_index,
-            "is_shuffle": current_session.shuffle if current_session else False,
-            "repeat_mode": current_session.repeat_mode if current_session else "off",
+            "queue": state.queue.window(max(state.queue.position, 0), window),
+            "queue_count": len(state.queue),
+            "position": state.queue.position,
+            "current_index": state.queue.current_index,
+            "is_shuffle": session.shuffle if session else False,
+            "repeat_mode": repeat_mode,
             "current_track": current_track,
             "next_track": next_track,
         }
@@ -10,7 +10,9 @@ from app.chain.torrents import TorrentsChain
 from app.core.context import MusicInfo
 from app.core.event import EventType, event_bus
 from app.core.log import logger
-from app.db import db_manager
+from app.core.module import ModuleManager
+from app.db import DatabaseManager
+from app.db import db_manager as global_db_manager
 from app.db.models.subscribe import Subscribe
 from app.db.models.subscribe_release import SubscribeRelease
 from app.db.operations.subscribe import SubscribeOper
@@ -25,12 +27,29 @@ class SubscribeChain:
     支持艺术家、专辑、歌单、榜单四种订阅类型
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        db_manager: DatabaseManager | None = None,
+        module_manager: ModuleManager | None = None,
+    ):
+        """
+        初始化订阅链
+
+        Args:
+            db_manager: 数据库管理器，默认使用全局实例
+            module_manager: 模块管理器，默认创建新实例（资源搜索链和下载器对接链共用）
+        """
         self.logger = logger
-        self.subscribe_oper = SubscribeOper(Subscribe, db_manager)
-        self.subscribe_release_oper = SubscribeReleaseOper(SubscribeRelease, db_manager)
-        self.torrents_chain = TorrentsChain()
-        self.downloader_chain = DownloaderChain()
+        self.db_manager = db_manager or global_db_manager
+        self.module_manager = module_manager or ModuleManager()
+        self.subscribe_oper = SubscribeOper(Subscribe, self.db_manager)
+        self.subscribe_release_oper = SubscribeReleaseOper(SubscribeRelease, self.db_manager)
+        self.torrents_chain = TorrentsChain(
+            db_manager=self.db_manager, module_manager=self.module_manager
+        )
+        self.downloader_chain = DownloaderChain(
+            db_manager=self.db_manager, module_manager=self.module_manager
+        )
         self.netease_downloader = NeteaseDownloader()
 
     async def check_artist(self, subscribe_id: int, musicbrainz_id: str) -> list[dict[str, Any]]:
@@ -338,7 +357,7 @@ class SubscribeChain:
                 stats["errors"] += 1
 
         # 发送订阅检查事件
-        await event_bus.emit(
+        await event_bus.publish(
             EventType.SUBSCRIBE_CHECK,
             {
                 "stats": stats,
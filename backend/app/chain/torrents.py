@@ -5,15 +5,20 @@
 
 import asyncio
 import hashlib
+import heapq
+import itertools
+from collections.abc import AsyncIterator, Callable
 from datetime import datetime
 from typing import Any
 
 from app.core.cache import AsyncFileCache
+from app.core.config import settings
 from app.core.context import MusicInfo
 from app.core.event import EventType, event_bus
 from app.core.log import logger
 from app.core.module import ModuleManager
-from app.db import db_manager
+from app.db import DatabaseManager
+from app.db import db_manager as global_db_manager
 from app.db.models.site import Site
 from app.db.operations.site import SiteOper
 
@@ -63,6 +68,79 @@ class TorrentInfo:
             "bitrate": self.bitrate,
         }
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "TorrentInfo":
+        """从字典创建（用于读取缓存）"""
+        return cls(
+            torrent_id=data["torrent_id"],
+            site_name=data["site_name"],
+            title=data["title"],
+            size=data["size"],
+            download_url=data["download_url"],
+            upload_time=(
+                datetime.fromisoformat(data["upload_time"]) if data.get("upload_time") else None
+            ),
+            seeders=data.get("seeders", 0),
+            leechers=data.get("leechers", 0),
+            is_free=data.get("is_free", False),
+            format=data.get("format", "FLAC"),
+            bitrate=data.get("bitrate", ""),
+        )
+
+
+class TopKResults:
+    """
+    保留排序最靠前的 K 个结果
+
+    小顶堆，堆顶是当前保留结果中最差的一个；每个站点返回后增量合并，
+    不需要等所有站点返回后再整体排序。同分时先加入的结果排在前面
+    """
+
+    def __init__(self, limit: int | None, key: Callable[[TorrentInfo], tuple]):
+        """
+        初始化
+
+        Args:
+            limit: 保留数量，None 表示不限制
+            key: 排序键，越大越靠前
+        """
+        self.limit = limit
+        self.key = key
+        self._heap: list[tuple[tuple, int, TorrentInfo]] = []
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def add(self, torrent: TorrentInfo) -> bool:
+        """
+        加入一个结果
+
+        Args:
+            torrent: 种子信息
+
+        Returns:
+            是否进入前 K 个
+        """
+        entry = (self.key(torrent), -next(self._seq), torrent)
+        if self.limit is None or len(self._heap) < self.limit:
+            heapq.heappush(self._heap, entry)
+            return True
+        if self.limit > 0 and entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def results(self) -> list[TorrentInfo]:
+        """按排序规则返回当前保留的结果"""
+        return [torrent for *_, torrent in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+
+# 站点搜索状态
+SITE_OK = "ok"
+SITE_ERROR = "error"
+SITE_TIMEOUT = "timeout"
+
 
 class TorrentsChain:
     """
@@ -70,17 +148,29 @@ class TorrentsChain:
     负责搜索资源、排序结果、过滤结果
     """
 
-    def __init__(self, cache_dir: str = "/tmp/torrent_cache", cache_ttl: int = 1800):
+    # 部分站点未返回时，缓存的部分结果只保留较短时间
+    PARTIAL_CACHE_TTL = 300
+
+    def __init__(
+        self,
+        cache_dir: str = "/tmp/torrent_cache",
+        cache_ttl: int = 1800,
+        db_manager: DatabaseManager | None = None,
+        module_manager: ModuleManager | None = None,
+    ):
         """
         初始化资源搜索链
 
         Args:
             cache_dir: 缓存目录
             cache_ttl: 缓存过期时间（秒），默认 30 分钟
+            db_manager: 数据库管理器，默认使用全局实例
+            module_manager: 模块管理器，默认创建新实例
         """
         self.logger = logger
-        self.site_oper = SiteOper(Site, db_manager)
-        self.module_manager = ModuleManager()
+        self.db_manager = db_manager or global_db_manager
+        self.site_oper = SiteOper(Site, self.db_manager)
+        self.module_manager = module_manager or ModuleManager()
         self.cache = AsyncFileCache(cache_dir, cache_ttl)
 
     def _generate_cache_key(
@@ -88,6 +178,9 @@ class TorrentsChain:
         music_info: MusicInfo,
         format: str,
         sites: list[str] | None = None,
+        min_size: int | None = None,
+        max_size: int | None = None,
+        limit: int | None = None,
     ) -> str:
         """
         生成缓存键
@@ -96,17 +189,23 @@ class TorrentsChain:
             music_info: 音乐信息
             format: 音质格式
             sites: 站点列表
+            min_size: 最小文件大小
+            max_size: 最大文件大小
+            limit: 结果数量上限
 
         Returns:
             缓存键
         """
-        # 将所有参数组合成字符串
+        # 将所有参数组合成字符串（缓存的是过滤和截断后的结果）
         cache_data = {
             "artist": music_info.artist or "",
             "album": music_info.album or "",
             "title": music_info.title or "",
             "format": format,
             "sites": sorted(sites) if sites else [],
+            "min_size": min_size,
+            "max_size": max_size,
+            "limit": limit,
         }
 
         # 生成哈希键
@@ -123,7 +222,7 @@ class TorrentsChain:
         use_cache: bool = True,
     ) -> list[TorrentInfo]:
         """
-        搜索资源
+        搜索资源（等待所有站点返回或超时）
 
         Args:
             music_info: 音乐信息
@@ -136,84 +235,178 @@ class TorrentsChain:
         Returns:
             种子信息列表
         """
+        results: list[TorrentInfo] = []
+        async for event in self.search_stream(
+            music_info, sites, format, min_size, max_size, limit=None, use_cache=use_cache
+        ):
+            if event["type"] == "done":
+                results = event["results"]
+        return results
+
+    async def search_stream(
+        self,
+        music_info: MusicInfo,
+        sites: list[str] | None = None,
+        format: str = "FLAC",
+        min_size: int | None = None,
+        max_size: int | None = None,
+        limit: int | None = 50,
+        site_timeout: float | None = None,
+        deadline: float | None = None,
+        use_cache: bool = True,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        流式搜索资源：每个站点返回后立即合并到前 K 个结果中并产出
+
+        产出的事件：
+        - cached: 缓存中的部分结果（之后只重新搜索上次未成功的站点）
+        - site: 一个站点返回（status 为 ok/error/timeout），附带当前前 K 个结果
+        - done: 搜索结束，complete 表示所有站点是否都成功返回
+
+        Args:
+            music_info: 音乐信息
+            sites: 站点列表（None 表示搜索所有启用的站点）
+            format: 音质格式（FLAC, MP3, 等）
+            min_size: 最小文件大小（字节）
+            max_size: 最大文件大小（字节）
+            limit: 保留的结果数量，None 表示不限制
+            site_timeout: 单个站点超时（秒），默认使用配置
+            deadline: 整体截止时间（秒），到期后未返回的站点记为超时，默认使用配置
+            use_cache: 是否使用缓存
+
+        Yields:
+            搜索事件
+        """
         self.logger.info(f"开始搜索资源: {music_info.artist} - {music_info.album}")
+        site_timeout = site_timeout or settings.torrent_site_timeout
+        deadline = deadline or settings.torrent_search_deadline
 
-        # 1. 检查缓存
-        cache_key = self._generate_cache_key(music_info, format, sites)
-        if use_cache:
-            cached_results = await self.cache.async_get(cache_key)
-            if cached_results:
-                self.logger.info(f"从缓存获取结果: {len(cached_results)} 个")
-                # 缓存中的结果是 TorrentInfo.to_dict() 的结果，需要转换回来
-                return [
-                    TorrentInfo(
-                        torrent_id=r["torrent_id"],
-                        site_name=r["site_name"],
-                        title=r["title"],
-                        size=r["size"],
-                        download_url=r["download_url"],
-                        upload_time=(
-                            datetime.fromisoformat(r["upload_time"])
-                            if r.get("upload_time")
-                            else None
-                        ),
-                        seeders=r.get("seeders", 0),
-                        leechers=r.get("leechers", 0),
-                        is_free=r.get("is_free", False),
-                        format=r.get("format", "FLAC"),
-                        bitrate=r.get("bitrate", ""),
-                    )
-                    for r in cached_results
-                ]
+        top = TopKResults(limit, self._sort_key)
+        statuses: dict[str, str] = {}
 
-        # 2. 获取启用的站点
+        # 1. 检查缓存
+        cache_key = self._generate_cache_key(music_info, format, sites, min_size, max_size, limit)
+        cached = await self.cache.async_get(cache_key) if use_cache else None
+        if cached:
+            # 旧版本缓存的是完整结果列表
+            if isinstance(cached, list):
+                cached = {"complete": True, "sites": {}, "results": cached}
+            for item in cached["results"]:
+                top.add(TorrentInfo.from_dict(item))
+            if cached["complete"]:
+                self.logger.info(f"从缓存获取结果: {len(top)} 个")
+                yield {
+                    "type": "done",
+                    "complete": True,
+                    "sites": cached["sites"],
+                    "results": top.results(),
+                }
+                return
+
+            statuses = {name: st for name, st in cached["sites"].items() if st == SITE_OK}
+            self.logger.info(f"从缓存获取部分结果: {len(top)} 个，重新搜索未完成的站点")
+            yield {"type": "cached", "sites": dict(statuses), "results": top.results()}
+
+        # 2. 获取启用的站点（跳过缓存中已成功返回的站点）
         enabled_sites = await self.site_oper.get_enabled()
         if sites:
             enabled_sites = [s for s in enabled_sites if s.name in sites]
+        enabled_sites = [s for s in enabled_sites if s.name not in statuses]
 
-        if not enabled_sites:
+        if not enabled_sites and not statuses:
             self.logger.warning("没有启用的站点")
-            return []
-
-        # 3. 并发搜索所有站点
-        tasks = [self._search_site(site, music_info, format) for site in enabled_sites]
 
-        # 使用 asyncio.gather 并发执行搜索
-        site_results_list = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # 处理结果
-        results = []
-        for site, site_results in zip(enabled_sites, site_results_list, strict=False):
-            if isinstance(site_results, Exception):
-                self.logger.error(f"站点 {site.name} 搜索失败: {site_results}")
-            else:
-                results.extend(site_results)
-                self.logger.info(f"站点 {site.name} 找到 {len(site_results)} 个结果")
-
-        # 4. 排序结果
-        sorted_results = self._sort_results(results)
-
-        # 5. 过滤结果
-        filtered_results = self._filter_results(sorted_results, format, min_size, max_size)
-
-        self.logger.info(f"搜索完成，找到 {len(filtered_results)} 个结果")
+        # 3. 并发搜索，按返回顺序合并
+        loop = asyncio.get_running_loop()
+        end_time = loop.time() + deadline
+        tasks = {
+            asyncio.create_task(
+                asyncio.wait_for(self._search_site(site, music_info, format), site_timeout)
+            ): site.name
+            for site in enabled_sites
+        }
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(end_time - loop.time(), 0),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    break
+
+                for task in done:
+                    name = tasks[task]
+                    count = 0
+                    try:
+                        site_results = task.result()
+                    except TimeoutError:
+                        status = SITE_TIMEOUT
+                        self.logger.warning(f"站点 {name} 搜索超时")
+                    except Exception as e:
+                        status = SITE_ERROR
+                        self.logger.error(f"站点 {name} 搜索失败: {e}")
+                    else:
+                        status = SITE_OK
+                        count = len(site_results)
+                        for torrent in self._filter_results(
+                            site_results, format, min_size, max_size
+                        ):
+                            top.add(torrent)
+                        self.logger.info(f"站点 {name} 找到 {count} 个结果")
+
+                    statuses[name] = status
+                    yield {
+                        "type": "site",
+                        "site": name,
+                        "status": status,
+                        "count": count,
+                        "results": top.results(),
+                    }
+
+            # 截止时间到达时仍未返回的站点
+            for task in pending:
+                statuses[tasks[task]] = SITE_TIMEOUT
+                self.logger.warning(f"站点 {tasks[task]} 在截止时间前未返回")
+        finally:
+            # 截止时间到达或调用方提前结束时取消未完成的搜索
+            for task in pending:
+                task.cancel()
+
+        results = top.results()
+        complete = all(status == SITE_OK for status in statuses.values())
+        self.logger.info(
+            f"搜索完成，找到 {len(results)} 个结果{'' if complete else '（部分站点未返回）'}"
+        )
 
-        # 6. 缓存结果（转换为字典格式）
-        if use_cache and filtered_results:
+        # 4. 缓存结果，记录是否完整
+        if use_cache and results:
             await self.cache.async_set(
-                cache_key, [r.to_dict() for r in filtered_results], ttl=self.cache.default_ttl
+                cache_key,
+                {
+                    "complete": complete,
+                    "sites": statuses,
+                    "results": [r.to_dict() for r in results],
+                },
+                ttl=(
+                    self.cache.default_ttl
+                    if complete
+                    else min(self.cache.default_ttl, self.PARTIAL_CACHE_TTL)
+                ),
             )
 
-        # 7. 发送搜索事件
-        await event_bus.emit(
-            EventType.TORRENT_SEARCH,
+        # 5. 发送搜索事件
+        await event_bus.publish(
+            EventType.TorrentSearch,
             {
                 "music_info": music_info.__dict__,
-                "result_count": len(filtered_results),
+                "result_count": len(results),
+                "complete": complete,
             },
         )
 
-        return filtered_results
+        yield {"type": "done", "complete": complete, "sites": statuses, "results": results}
 
     async def _search_site(
         self, site: Site, music_info: MusicInfo, format: str
@@ -228,6 +421,9 @@ class TorrentsChain:
 
         Returns:
             种子信息列表
+
+        Raises:
+            Exception: 站点搜索失败
         """
         # 获取站点的站点模块
         site_modules = self.module_manager.get_running_modules_by_type("site")
@@ -235,45 +431,39 @@ class TorrentsChain:
         for module in site_modules:
             # 找到对应的站点模块（通过站点名称匹配）
             if hasattr(module, "site_info") and module.site_info.name == site.name:
-                try:
-                    # 根据音乐信息搜索
-                    if music_info.artist and music_info.album:
-                        # 搜索专辑
-                        results = await module.search_album(
-                            music_info.artist, music_info.album, format
-                        )
-                    elif music_info.artist:
-                        # 搜索艺术家
-                        results = await module.search_artist(music_info.artist, format)
-                    elif music_info.title:
-                        # 搜索标题
-                        results = await module.search_title(music_info.title, format)
-                    else:
-                        # 使用完整关键词搜索
-                        keyword = music_info.to_dict()
-                        keyword_str = " ".join(str(v) for v in keyword.values() if v)
-                        results = await module.search_torrent(keyword_str, format)
-
-                    # 将 TorrentResult 转换为 TorrentInfo
-                    return [
-                        TorrentInfo(
-                            torrent_id=result.torrent_id,
-                            site_name=module.site_info.name,
-                            title=result.title,
-                            size=result.size,
-                            download_url=result.download_url,
-                            upload_time=result.upload_time,
-                            seeders=result.seeders,
-                            leechers=result.leechers,
-                            is_free=result.is_free,
-                            format=result.format,
-                            bitrate=result.bitrate,
-                        )
-                        for result in results
-                    ]
-                except Exception as e:
-                    self.logger.error(f"站点 {site.name} 搜索失败: {e}")
-                    return []
+                # 根据音乐信息搜索
+                if music_info.artist and music_info.album:
+                    # 搜索专辑
+                    results = await module.search_album(music_info.artist, music_info.album, format)
+                elif music_info.artist:
+                    # 搜索艺术家
+                    results = await module.search_artist(music_info.artist, format)
+                elif music_info.title:
+                    # 搜索标题
+                    results = await module.search_title(music_info.title, format)
+                else:
+                    # 使用完整关键词搜索
+                    keyword = music_info.to_dict()
+                    keyword_str = " ".join(str(v) for v in keyword.values() if v)
+                    results = await module.search_torrent(keyword_str, format)
+
+                # 将 TorrentResult 转换为 TorrentInfo
+                return [
+                    TorrentInfo(
+                        torrent_id=result.torrent_id,
+                        site_name=module.site_info.name,
+                        title=result.title,
+                        size=result.size,
+                        download_url=result.download_url,
+                        upload_time=result.upload_time,
+                        seeders=result.seeders,
+                        leechers=result.leechers,
+                        is_free=result.is_free,
+                        format=result.format,
+                        bitrate=result.bitrate,
+                    )
+                    for result in results
+                ]
 
         # 如果没有找到对应的站点模块，返回空列表
         self.logger.warning(f"未找到站点 {site.name} 的模块")
@@ -295,22 +485,31 @@ class TorrentsChain:
         Returns:
             排序后的种子信息列表
         """
+        return sorted(results, key=self._sort_key, reverse=True)
+
+    @staticmethod
+    def _sort_key(torrent: TorrentInfo) -> tuple:
+        """
+        排序键（越大越靠前），规则见 _sort_results
 
-        def sort_key(torrent: TorrentInfo) -> tuple:
-            # 免费种子优先级最高
-            free_priority = 1 if torrent.is_free else 0
-            # 种子活跃度
-            activity = torrent.seeders - torrent.leechers
-            # 上传时间（越新越好，使用时间戳的负数）
-            upload_time = -torrent.upload_time.timestamp() if torrent.upload_time else 0
-            # 文件大小（适中优先，使用绝对偏差的负数）
-            # 假设理想大小为 500MB (500 * 1024 * 1024)
-            ideal_size = 500 * 1024 * 1024
-            size_deviation = -abs(torrent.size - ideal_size)
-
-            return (free_priority, activity, upload_time, size_deviation)
-
-        return sorted(results, key=sort_key, reverse=True)
+        Args:
+            torrent: 种子信息
+
+        Returns:
+            排序键
+        """
+        # 免费种子优先级最高
+        free_priority = 1 if torrent.is_free else 0
+        # 种子活跃度
+        activity = torrent.seeders - torrent.leechers
+        # 上传时间（越新越好，使用时间戳的负数）
+        upload_time = -torrent.upload_time.timestamp() if torrent.upload_time else 0
+        # 文件大小（适中优先，使用绝对偏差的负数）
+        # 假设理想大小为 500MB (500 * 1024 * 1024)
+        ideal_size = 500 * 1024 * 1024
+        size_deviation = -abs(torrent.size - ideal_size)
+
+        return (free_priority, activity, upload_time, size_deviation)
 
     def _filter_results(
         self,
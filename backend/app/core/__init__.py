@@ -2,7 +2,7 @@
 核心模块
 """
 
-from app.core.cache import AsyncFileCache, FileCache
+from app.core.cache import AsyncFileCache, CacheBackend, FileCache, RedisCacheBackend
 from app.core.config import settings
 from app.core.context import (
     Context,
@@ -36,6 +36,8 @@ __all__ = [
     "PluginBase",
     "FileCache",
     "AsyncFileCache",
+    "CacheBackend",
+    "RedisCacheBackend",
     "Context",
     "MusicInfo",
     "DownloadSource",
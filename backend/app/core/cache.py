@@ -1,36 +1,191 @@
 """
 文件缓存模块
 提供文件和内存缓存功能
+
+缓存分为两级：
+- 内存层：进程内 LRU，按字节预算淘汰
+- 磁盘层：每个键一个 pickle 文件，过期时间和大小记录在 SQLite 索引中
+
+异步接口通过 CacheBackend 读写，可切换为 Redis 后端在多个 worker 间共享
+（Redis 中的值使用 JSON 序列化，不反序列化任意对象）
 """
 
+import asyncio
+import fcntl
 import hashlib
+import json
+import os
 import pickle
-from datetime import datetime, timedelta
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any
 
+import redis.asyncio as aioredis
+from redis.exceptions import WatchError
+
+from app.core.config import settings
 from app.core.log import logger
 
 
+class MemoryCache:
+    """
+    内存 LRU 缓存
+    按序列化后的字节数计算预算，超出预算时淘汰最久未使用的条目
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        初始化内存缓存
+
+        Args:
+            max_bytes: 字节预算，0 表示禁用内存层
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        # key -> (序列化数据, 过期时间戳)
+        self._data: OrderedDict[str, tuple[bytes, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        """
+        获取缓存数据，命中时移动到队尾
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            序列化数据，不存在或已过期则返回 None
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            payload, expires_at = entry
+            if expires_at is not None and time.time() > expires_at:
+                self._remove(key)
+                return None
+
+            self._data.move_to_end(key)
+            return payload
+
+    def set(self, key: str, payload: bytes, expires_at: float | None):
+        """
+        设置缓存数据
+
+        Args:
+            key: 缓存键
+            payload: 序列化数据
+            expires_at: 过期时间戳，None 表示永不过期
+        """
+        size = len(payload)
+        with self._lock:
+            self._remove(key)
+
+            # 单个条目超过预算时不进入内存层
+            if size > self.max_bytes:
+                return
+
+            self._data[key] = (payload, expires_at)
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                old_key, _ = next(iter(self._data.items()))
+                self._remove(old_key)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        """
+        删除缓存数据
+
+        Args:
+            key: 缓存键
+        """
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        """清空内存缓存"""
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _remove(self, key: str):
+        """移除条目（调用方需持有锁）"""
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= len(entry[0])
+
+
 class FileCache:
     """
     文件缓存类
-    支持文件系统缓存和 TTL 过期时间
+    支持内存 + 文件系统两级缓存和 TTL 过期时间
     """
 
-    def __init__(self, cache_dir: str | Path, default_ttl: int = 3600):
+    INDEX_FILE = "index.db"
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        default_ttl: int = 3600,
+        memory_max_bytes: int | None = None,
+    ):
         """
         初始化文件缓存
 
         Args:
             cache_dir: 缓存目录
             default_ttl: 默认过期时间（秒）
+            memory_max_bytes: 内存层字节预算，None 表示使用配置值
         """
         self.cache_dir = Path(cache_dir)
         self.default_ttl = default_ttl
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.logger = logger
 
+        if memory_max_bytes is None:
+            memory_max_bytes = settings.cache_memory_max_bytes
+        self.memory = MemoryCache(memory_max_bytes)
+
+        # 统计计数
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        # 磁盘层索引
+        self._index_lock = threading.Lock()
+        self._index = sqlite3.connect(
+            str(self.cache_dir / self.INDEX_FILE), check_same_thread=False, isolation_level=None
+        )
+        self._index.execute("PRAGMA journal_mode=WAL")
+        self._index.execute("PRAGMA synchronous=NORMAL")
+        self._index.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key_hash TEXT PRIMARY KEY, expires_at REAL, size INTEGER NOT NULL)"
+        )
+
+    def _get_key_hash(self, key: str) -> str:
+        """
+        获取缓存键哈希
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            MD5 哈希
+        """
+        # 使用 MD5 哈希作为文件名，避免特殊字符问题
+        return hashlib.md5(key.encode()).hexdigest()
+
     def _get_cache_path(self, key: str) -> Path:
         """
         获取缓存文件路径
@@ -41,9 +196,34 @@ class FileCache:
         Returns:
             缓存文件路径
         """
-        # 使用 MD5 哈希作为文件名，避免特殊字符问题
-        key_hash = hashlib.md5(key.encode()).hexdigest()
-        return self.cache_dir / f"{key_hash}.cache"
+        return self.cache_dir / f"{self._get_key_hash(key)}.cache"
+
+    def _get_expires_at(self, ttl: int | None) -> float | None:
+        """
+        计算过期时间戳
+
+        Args:
+            ttl: 过期时间（秒），None 表示使用默认值，0 表示永不过期
+
+        Returns:
+            过期时间戳
+        """
+        if ttl is None:
+            ttl = self.default_ttl
+        return time.time() + ttl if ttl > 0 else None
+
+    def _index_lookup(self, key_hash: str) -> tuple[float | None] | None:
+        """查询磁盘索引，返回 (expires_at,) 或 None"""
+        with self._index_lock:
+            return self._index.execute(
+                "SELECT expires_at FROM entries WHERE key_hash = ?", (key_hash,)
+            ).fetchone()
+
+    def _index_remove(self, key_hash: str):
+        """删除磁盘条目和索引"""
+        with self._index_lock:
+            self._index.execute("DELETE FROM entries WHERE key_hash = ?", (key_hash,))
+        (self.cache_dir / f"{key_hash}.cache").unlink(missing_ok=True)
 
     def get(self, key: str) -> Any | None:
         """
@@ -55,29 +235,41 @@ class FileCache:
         Returns:
             缓存值，如果不存在或已过期则返回 None
         """
-        cache_file = self._get_cache_path(key)
-
-        if not cache_file.exists():
-            return None
+        # 1. 内存层
+        payload = self.memory.get(key)
+        if payload is not None:
+            self.memory_hits += 1
+            return pickle.loads(payload)
 
+        # 2. 磁盘层（先查索引，避免无谓的文件读取）
+        key_hash = self._get_key_hash(key)
         try:
-            with open(cache_file, "rb") as f:
-                cache_data = pickle.load(f)
+            row = self._index_lookup(key_hash)
+            if row is None:
+                self.misses += 1
+                return None
 
-            # 检查是否过期
-            expires_at = cache_data.get("expires_at")
-            if expires_at and datetime.now() > expires_at:
+            expires_at = row[0]
+            if expires_at is not None and time.time() > expires_at:
                 self.logger.debug(f"缓存已过期: {key}")
-                cache_file.unlink(missing_ok=True)
+                self._index_remove(key_hash)
+                self.misses += 1
                 return None
 
-            return cache_data.get("value")
+            payload = (self.cache_dir / f"{key_hash}.cache").read_bytes()
+            value = pickle.loads(payload)
 
         except Exception as e:
             self.logger.error(f"读取缓存失败: {key}, 错误: {e}")
-            cache_file.unlink(missing_ok=True)
+            self._index_remove(key_hash)
+            self.misses += 1
             return None
 
+        # 回填内存层
+        self.memory.set(key, payload, expires_at)
+        self.disk_hits += 1
+        return value
+
     def set(self, key: str, value: Any, ttl: int | None = None):
         """
         设置缓存
@@ -87,26 +279,25 @@ class FileCache:
             value: 缓存值
             ttl: 过期时间（秒），None 表示使用默认值
         """
-        cache_file = self._get_cache_path(key)
+        key_hash = self._get_key_hash(key)
+        cache_file = self.cache_dir / f"{key_hash}.cache"
 
         try:
-            expires_at = None
-            if ttl is not None:
-                if ttl > 0:
-                    expires_at = datetime.now() + timedelta(seconds=ttl)
-            else:
-                if self.default_ttl > 0:
-                    expires_at = datetime.now() + timedelta(seconds=self.default_ttl)
+            expires_at = self._get_expires_at(ttl)
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
 
-            cache_data = {
-                "value": value,
-                "expires_at": expires_at,
-                "created_at": datetime.now(),
-            }
+            # 先写临时文件再原子替换，避免读到半写的文件
+            tmp_file = cache_file.with_suffix(f".tmp{threading.get_ident()}")
+            tmp_file.write_bytes(payload)
+            os.replace(tmp_file, cache_file)
 
-            with open(cache_file, "wb") as f:
-                pickle.dump(cache_data, f)
+            with self._index_lock:
+                self._index.execute(
+                    "INSERT OR REPLACE INTO entries (key_hash, expires_at, size) VALUES (?, ?, ?)",
+                    (key_hash, expires_at, len(payload)),
+                )
 
+            self.memory.set(key, payload, expires_at)
             self.logger.debug(f"设置缓存: {key}, TTL: {ttl or self.default_ttl}s")
 
         except Exception as e:
@@ -119,14 +310,12 @@ class FileCache:
         Args:
             key: 缓存键
         """
-        cache_file = self._get_cache_path(key)
-
-        if cache_file.exists():
-            try:
-                cache_file.unlink()
-                self.logger.debug(f"删除缓存: {key}")
-            except Exception as e:
-                self.logger.error(f"删除缓存失败: {key}, 错误: {e}")
+        self.memory.delete(key)
+        try:
+            self._index_remove(self._get_key_hash(key))
+            self.logger.debug(f"删除缓存: {key}")
+        except Exception as e:
+            self.logger.error(f"删除缓存失败: {key}, 错误: {e}")
 
     def exists(self, key: str) -> bool:
         """
@@ -138,11 +327,23 @@ class FileCache:
         Returns:
             是否存在
         """
-        return self.get(key) is not None
+        if self.memory.get(key) is not None:
+            return True
+
+        try:
+            row = self._index_lookup(self._get_key_hash(key))
+        except Exception as e:
+            self.logger.error(f"查询缓存索引失败: {key}, 错误: {e}")
+            return False
+
+        return row is not None and (row[0] is None or time.time() <= row[0])
 
     def clear(self):
         """清空所有缓存"""
+        self.memory.clear()
         try:
+            with self._index_lock:
+                self._index.execute("DELETE FROM entries")
             for cache_file in self.cache_dir.glob("*.cache"):
                 cache_file.unlink(missing_ok=True)
             self.logger.info("清空所有缓存")
@@ -151,14 +352,15 @@ class FileCache:
 
     def get_size(self) -> int:
         """
-        获取缓存目录大小（字节）
+        获取磁盘缓存大小（字节）
 
         Returns:
-            缓存目录大小
+            磁盘缓存大小
         """
         try:
-            total_size = sum(f.stat().st_size for f in self.cache_dir.glob("*.cache"))
-            return total_size
+            with self._index_lock:
+                row = self._index.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+            return row[0]
         except Exception as e:
             self.logger.error(f"获取缓存大小失败: {e}")
             return 0
@@ -166,36 +368,407 @@ class FileCache:
     def cleanup_expired(self):
         """清理所有过期的缓存"""
         try:
-            now = datetime.now()
-            cleaned = 0
+            now = time.time()
+            with self._index_lock:
+                expired = [
+                    row[0]
+                    for row in self._index.execute(
+                        "SELECT key_hash FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?",
+                        (now,),
+                    )
+                ]
+                self._index.execute(
+                    "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?", (now,)
+                )
 
-            for cache_file in self.cache_dir.glob("*.cache"):
-                try:
-                    with open(cache_file, "rb") as f:
-                        cache_data = pickle.load(f)
+            for key_hash in expired:
+                (self.cache_dir / f"{key_hash}.cache").unlink(missing_ok=True)
+
+            self.logger.info(f"清理过期缓存完成，清理了 {len(expired)} 个文件")
+
+        except Exception as e:
+            self.logger.error(f"清理过期缓存失败: {e}")
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            命中、未命中、淘汰次数及内存层占用
+        """
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.memory.evictions,
+            "memory_items": len(self.memory),
+            "memory_bytes": self.memory.current_bytes,
+            "memory_max_bytes": self.memory.max_bytes,
+        }
+
+    def close(self):
+        """关闭磁盘索引"""
+        with self._index_lock:
+            self._index.close()
+
+
+class CacheBackend(ABC):
+    """
+    异步缓存后端接口
+    AsyncFileCache 和 ChainBase 通过该接口读写缓存
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Any | None:
+        """获取缓存，不存在或已过期则返回 None"""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: int | None = None):
+        """设置缓存，ttl 为 None 时使用后端默认值，0 表示永不过期"""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """删除缓存"""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """检查缓存是否存在且未过期"""
+
+    @abstractmethod
+    async def clear(self):
+        """清空所有缓存"""
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """
+        批量获取缓存
+
+        Args:
+            keys: 缓存键列表
+
+        Returns:
+            命中的键值字典（未命中的键不包含在内）
+        """
+        result = {}
+        for key in keys:
+            value = await self.get(key)
+            if value is not None:
+                result[key] = value
+        return result
+
+    async def set_many(self, items: dict[str, Any], ttl: int | None = None):
+        """
+        批量设置缓存
+
+        Args:
+            items: 键值字典
+            ttl: 过期时间（秒）
+        """
+        for key, value in items.items():
+            await self.set(key, value, ttl)
+
+    async def set_if_version(
+        self, key: str, version: int, items: dict[str, Any], ttl: int | None = None
+    ) -> bool:
+        """
+        按版本号比较并写入
+
+        key 当前值（包含 version 字段的字典，不存在时版本为 0）的版本等于 version 时写入 items，
+        否则不写入。默认实现先读后写，只在单个进程内有效，共享后端需要覆盖为原子操作
+
+        Args:
+            key: 带版本号的缓存键
+            version: 期望的当前版本号
+            items: 要写入的键值字典（通常包含 key 本身）
+            ttl: 过期时间（秒）
+
+        Returns:
+            是否写入
+        """
+        current = await self.get(key)
+        if (current or {}).get("version", 0) != version:
+            return False
+        await self.set_many(items, ttl)
+        return True
+
+    async def cleanup_expired(self):
+        """清理过期缓存（由后端自行过期时无需实现）"""
+        return None
+
+    async def close(self):
+        """关闭后端连接"""
+        return None
+
+
+class FileCacheBackend(CacheBackend):
+    """
+    文件缓存后端
+    内存层命中时直接返回，其余操作在线程池中执行
+    """
+
+    # 版本号比较写入使用的文件锁，同机多个进程之间互斥
+    LOCK_FILE = "cas.lock"
+
+    def __init__(self, cache: FileCache):
+        """
+        初始化文件缓存后端
+
+        Args:
+            cache: 文件缓存实例
+        """
+        self.cache = cache
+
+    async def _run(self, func, *args):
+        """在线程池中执行同步操作"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def get(self, key: str) -> Any | None:
+        # 内存层命中时直接返回，不进入线程池
+        payload = self.cache.memory.get(key)
+        if payload is not None:
+            self.cache.memory_hits += 1
+            return pickle.loads(payload)
+
+        return await self._run(self.cache.get, key)
+
+    async def set(self, key: str, value: Any, ttl: int | None = None):
+        await self._run(self.cache.set, key, value, ttl)
+
+    async def delete(self, key: str):
+        await self._run(self.cache.delete, key)
+
+    async def exists(self, key: str) -> bool:
+        return await self._run(self.cache.exists, key)
+
+    async def clear(self):
+        await self._run(self.cache.clear)
+
+    async def cleanup_expired(self):
+        await self._run(self.cache.cleanup_expired)
+
+    async def set_if_version(
+        self, key: str, version: int, items: dict[str, Any], ttl: int | None = None
+    ) -> bool:
+        return await self._run(self._set_if_version, key, version, items, ttl)
+
+    def _set_if_version(
+        self, key: str, version: int, items: dict[str, Any], ttl: int | None
+    ) -> bool:
+        with open(self.cache.cache_dir / self.LOCK_FILE, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # 其他进程的写入不会更新本进程的内存层，比较前从磁盘读取
+            self.cache.memory.delete(key)
+            current = self.cache.get(key)
+            if (current or {}).get("version", 0) != version:
+                return False
+            for item_key, value in items.items():
+                self.cache.set(item_key, value, ttl)
+        return True
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis 缓存后端
+    多个 worker 共享同一份缓存，过期由 Redis 服务端处理
+
+    值以 JSON 保存：Redis 可能被其他服务共用，从中读取的数据不应能构造任意对象，
+    因此只能缓存 JSON 可序列化的值（dict / list / str / 数字等），其他值写入失败并记录日志
+    """
+
+    def __init__(
+        self,
+        client: aioredis.Redis | None = None,
+        default_ttl: int = 3600,
+        prefix: str = "musicpilot:cache:",
+    ):
+        """
+        初始化 Redis 缓存后端
 
-                    expires_at = cache_data.get("expires_at")
-                    if expires_at and now > expires_at:
-                        cache_file.unlink(missing_ok=True)
-                        cleaned += 1
+        Args:
+            client: Redis 客户端，默认按配置创建
+            default_ttl: 默认过期时间（秒）
+            prefix: 键前缀
+        """
+        self.client = client or aioredis.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=settings.redis_db,
+            password=settings.redis_password or None,
+        )
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+        self.logger = logger
 
-                except Exception:
-                    cache_file.unlink(missing_ok=True)
-                    cleaned += 1
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
 
-            self.logger.info(f"清理过期缓存完成，清理了 {cleaned} 个文件")
+    def _ttl(self, ttl: int | None) -> int | None:
+        """转换为 Redis EX 参数，None 表示不过期"""
+        if ttl is None:
+            ttl = self.default_ttl
+        return ttl if ttl > 0 else None
 
+    @staticmethod
+    def _dumps(value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def _loads(self, key: str, payload: bytes | None) -> Any | None:
+        if payload is None:
+            return None
+        try:
+            return json.loads(payload)
         except Exception as e:
-            self.logger.error(f"清理过期缓存失败: {e}")
+            self.logger.error(f"读取缓存失败: {key}, 错误: {e}")
+            return None
+
+    async def get(self, key: str) -> Any | None:
+        try:
+            payload = await self.client.get(self._key(key))
+        except Exception as e:
+            self.logger.error(f"读取缓存失败: {key}, 错误: {e}")
+            return None
+        return self._loads(key, payload)
+
+    async def set(self, key: str, value: Any, ttl: int | None = None):
+        try:
+            await self.client.set(self._key(key), self._dumps(value), ex=self._ttl(ttl))
+            self.logger.debug(f"设置缓存: {key}, TTL: {ttl or self.default_ttl}s")
+        except Exception as e:
+            self.logger.error(f"设置缓存失败: {key}, 错误: {e}")
+
+    async def delete(self, key: str):
+        try:
+            await self.client.delete(self._key(key))
+        except Exception as e:
+            self.logger.error(f"删除缓存失败: {key}, 错误: {e}")
+
+    async def exists(self, key: str) -> bool:
+        try:
+            return bool(await self.client.exists(self._key(key)))
+        except Exception as e:
+            self.logger.error(f"查询缓存失败: {key}, 错误: {e}")
+            return False
+
+    async def clear(self):
+        try:
+            batch = []
+            async for redis_key in self.client.scan_iter(match=f"{self.prefix}*", count=500):
+                batch.append(redis_key)
+                if len(batch) >= 500:
+                    await self.client.delete(*batch)
+                    batch = []
+            if batch:
+                await self.client.delete(*batch)
+            self.logger.info("清空所有缓存")
+        except Exception as e:
+            self.logger.error(f"清空缓存失败: {e}")
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        if not keys:
+            return {}
+        try:
+            payloads = await self.client.mget([self._key(key) for key in keys])
+        except Exception as e:
+            self.logger.error(f"批量读取缓存失败: {e}")
+            return {}
+
+        result = {}
+        for key, payload in zip(keys, payloads, strict=True):
+            value = self._loads(key, payload)
+            if value is not None:
+                result[key] = value
+        return result
+
+    async def set_many(self, items: dict[str, Any], ttl: int | None = None):
+        if not items:
+            return
+        try:
+            ex = self._ttl(ttl)
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.set(self._key(key), self._dumps(value), ex=ex)
+                await pipe.execute()
+        except Exception as e:
+            self.logger.error(f"批量设置缓存失败: {e}")
+
+    async def set_if_version(
+        self, key: str, version: int, items: dict[str, Any], ttl: int | None = None
+    ) -> bool:
+        # WATCH 版本键，事务提交前被其他客户端修改时 EXEC 失败；连接错误直接抛出，由调用方重试
+        ex = self._ttl(ttl)
+        async with self.client.pipeline(transaction=True) as pipe:
+            await pipe.watch(self._key(key))
+            current = self._loads(key, await pipe.get(self._key(key)))
+            if (current or {}).get("version", 0) != version:
+                return False
+            pipe.multi()
+            for item_key, value in items.items():
+                pipe.set(self._key(item_key), self._dumps(value), ex=ex)
+            try:
+                await pipe.execute()
+            except WatchError:
+                return False
+        return True
+
+    async def close(self):
+        await self.client.aclose()
+
+
+_default_backend: CacheBackend | None = None
+
+
+def get_default_cache_backend() -> CacheBackend | None:
+    """
+    获取配置指定的共享缓存后端
+
+    Returns:
+        cache_backend 为 redis 时返回共享的 RedisCacheBackend，否则返回 None（使用文件缓存）
+    """
+    global _default_backend
+
+    if settings.cache_backend != "redis":
+        return None
+
+    if _default_backend is None:
+        _default_backend = RedisCacheBackend(default_ttl=settings.cache_ttl)
+    return _default_backend
+
+
+async def close_default_cache_backend():
+    """关闭共享缓存后端"""
+    global _default_backend
+
+    if _default_backend is not None:
+        await _default_backend.close()
+        _default_backend = None
 
 
 class AsyncFileCache(FileCache):
     """
     异步文件缓存类
-    支持异步操作
+    支持异步操作，异步接口通过 CacheBackend 读写
+
+    同步接口（get / set 等，继承自 FileCache）始终只读写本进程的本地文件缓存；
+    配置了 Redis 后端时两者是不同的存储，同一个键应始终使用异步接口访问
     """
 
-    import asyncio
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        default_ttl: int = 3600,
+        memory_max_bytes: int | None = None,
+        backend: CacheBackend | None = None,
+    ):
+        """
+        初始化异步文件缓存
+
+        Args:
+            cache_dir: 缓存目录
+            default_ttl: 默认过期时间（秒）
+            memory_max_bytes: 内存层字节预算，None 表示使用配置值
+            backend: 缓存后端，None 时使用配置的共享后端，未配置则使用本地文件缓存
+        """
+        super().__init__(cache_dir, default_ttl, memory_max_bytes)
+        self.backend = backend or get_default_cache_backend() or FileCacheBackend(self)
 
     async def async_get(self, key: str) -> Any | None:
         """
@@ -207,8 +780,19 @@ class AsyncFileCache(FileCache):
         Returns:
             缓存值
         """
-        # 在线程池中执行同步操作
-        return await self.asyncio.get_event_loop().run_in_executor(None, self.get, key)
+        return await self.backend.get(key)
+
+    async def async_get_many(self, keys: list[str]) -> dict[str, Any]:
+        """
+        异步批量获取缓存
+
+        Args:
+            keys: 缓存键列表
+
+        Returns:
+            命中的键值字典
+        """
+        return await self.backend.get_many(keys)
 
     async def async_set(self, key: str, value: Any, ttl: int | None = None):
         """
@@ -219,7 +803,17 @@ class AsyncFileCache(FileCache):
             value: 缓存值
             ttl: 过期时间（秒）
         """
-        await self.asyncio.get_event_loop().run_in_executor(None, self.set, key, value, ttl)
+        await self.backend.set(key, value, ttl)
+
+    async def async_set_many(self, items: dict[str, Any], ttl: int | None = None):
+        """
+        异步批量设置缓存
+
+        Args:
+            items: 键值字典
+            ttl: 过期时间（秒）
+        """
+        await self.backend.set_many(items, ttl)
 
     async def async_delete(self, key: str):
         """
@@ -228,12 +822,218 @@ class AsyncFileCache(FileCache):
         Args:
             key: 缓存键
         """
-        await self.asyncio.get_event_loop().run_in_executor(None, self.delete, key)
+        await self.backend.delete(key)
+
+    async def async_exists(self, key: str) -> bool:
+        """
+        异步检查缓存是否存在
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            是否存在
+        """
+        return await self.backend.exists(key)
 
     async def async_clear(self):
         """异步清空所有缓存"""
-        await self.asyncio.get_event_loop().run_in_executor(None, self.clear)
+        await self.backend.clear()
 
     async def async_cleanup_expired(self):
         """异步清理所有过期的缓存"""
-        await self.asyncio.get_event_loop().run_in_executor(None, self.cleanup_expired)
+        await self.backend.cleanup_expired()
+
+
+class _LRUShard:
+    """ChainCache 的一个分片：带 TTL 的 LRU 和统计计数"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        # key -> (值, 过期时间)
+        self.data: OrderedDict[str, tuple[Any, float | None]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+
+class ChainCache:
+    """
+    业务链共享的进程内缓存
+    按命名空间（通常是链的类名）分配条目预算，超出预算时淘汰最久未使用的条目；
+    命名空间内按键哈希分片，每个分片一把锁，减少并发访问时的锁竞争
+    """
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        shards: int | None = None,
+        namespace_limits: dict[str, int] | None = None,
+        clock=time.monotonic,
+    ):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 每个命名空间的默认最大条目数，None 表示使用配置值
+            shards: 每个命名空间的分片数，None 表示使用配置值
+            namespace_limits: 按命名空间覆盖最大条目数，None 表示使用配置值
+            clock: 时钟函数（测试用）
+        """
+        self.max_entries = max_entries or settings.chain_cache_max_entries
+        self.shards = shards or settings.chain_cache_shards
+        self.namespace_limits = (
+            namespace_limits
+            if namespace_limits is not None
+            else settings.chain_cache_namespace_limits
+        )
+        self.clock = clock
+        self.logger = logger
+        self._namespaces: dict[str, list[_LRUShard]] = {}
+        self._lock = threading.Lock()
+
+    def _get_shards(self, namespace: str) -> list[_LRUShard]:
+        """获取命名空间的分片，首次使用时按预算创建"""
+        shards = self._namespaces.get(namespace)
+        if shards is None:
+            with self._lock:
+                shards = self._namespaces.get(namespace)
+                if shards is None:
+                    limit = self.namespace_limits.get(namespace, self.max_entries)
+                    count = max(1, min(self.shards, limit))
+                    # 预算平均分给各分片（向上取整）
+                    per_shard = -(-limit // count)
+                    shards = [_LRUShard(per_shard) for _ in range(count)]
+                    self._namespaces[namespace] = shards
+        return shards
+
+    def _shard(self, namespace: str, key: str) -> _LRUShard:
+        shards = self._get_shards(namespace)
+        return shards[hash(key) % len(shards)]
+
+    def get(self, namespace: str, key: str) -> Any | None:
+        """
+        获取缓存，命中时移动到队尾
+
+        Args:
+            namespace: 命名空间
+            key: 缓存键
+
+        Returns:
+            缓存值，不存在或已过期则返回 None
+        """
+        shard = self._shard(namespace, key)
+        with shard.lock:
+            entry = shard.data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or self.clock() < expires_at:
+                    shard.data.move_to_end(key)
+                    shard.hits += 1
+                    return value
+                del shard.data[key]
+                shard.expirations += 1
+            shard.misses += 1
+            return None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: int | None = None):
+        """
+        设置缓存
+
+        Args:
+            namespace: 命名空间
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒），None 或 0 表示永不过期
+        """
+        expires_at = self.clock() + ttl if ttl else None
+        shard = self._shard(namespace, key)
+        with shard.lock:
+            shard.data[key] = (value, expires_at)
+            shard.data.move_to_end(key)
+            while len(shard.data) > shard.max_entries:
+                shard.data.popitem(last=False)
+                shard.evictions += 1
+
+    def delete(self, namespace: str, key: str):
+        """
+        删除缓存
+
+        Args:
+            namespace: 命名空间
+            key: 缓存键
+        """
+        shard = self._shard(namespace, key)
+        with shard.lock:
+            shard.data.pop(key, None)
+
+    def clear(self, namespace: str | None = None):
+        """
+        清空缓存
+
+        Args:
+            namespace: 只清空指定命名空间，None 表示全部（同时重置统计）
+        """
+        with self._lock:
+            if namespace is None:
+                self._namespaces.clear()
+            else:
+                self._namespaces.pop(namespace, None)
+
+    def cleanup_expired(self) -> int:
+        """
+        清理所有过期条目（由定时任务调用）
+
+        Returns:
+            清理的条目数
+        """
+        now = self.clock()
+        removed = 0
+        for shards in list(self._namespaces.values()):
+            for shard in shards:
+                with shard.lock:
+                    expired = [
+                        key
+                        for key, (_, expires_at) in shard.data.items()
+                        if expires_at is not None and expires_at <= now
+                    ]
+                    for key in expired:
+                        del shard.data[key]
+                    shard.expirations += len(expired)
+                    removed += len(expired)
+
+        if removed:
+            self.logger.debug(f"清理过期链缓存: {removed} 个")
+        return removed
+
+    def get_stats(self) -> dict[str, dict[str, int]]:
+        """
+        获取各命名空间的统计信息
+
+        Returns:
+            命名空间 -> 命中、未命中、淘汰、过期次数和条目数
+        """
+        stats = {}
+        for namespace, shards in list(self._namespaces.items()):
+            stats[namespace] = {
+                "hits": sum(shard.hits for shard in shards),
+                "misses": sum(shard.misses for shard in shards),
+                "evictions": sum(shard.evictions for shard in shards),
+                "expirations": sum(shard.expirations for shard in shards),
+                "items": sum(len(shard.data) for shard in shards),
+                "max_items": sum(shard.max_entries for shard in shards),
+            }
+        return stats
+
+
+_chain_cache: ChainCache | None = None
+
+
+def get_chain_cache() -> ChainCache:
+    """获取业务链共享的进程内缓存"""
+    global _chain_cache
+    if _chain_cache is None:
+        _chain_cache = ChainCache()
+    return _chain_cache
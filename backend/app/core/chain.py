@@ -3,9 +3,12 @@ Chain 基类
 提供链式业务逻辑处理的基础功能
 """
 
-import time
+import functools
+import inspect
+from collections.abc import Awaitable, Callable
 from typing import Any
 
+from app.core.cache import CacheBackend, ChainCache, get_chain_cache, get_default_cache_backend
 from app.core.event import EventType, event_bus
 from app.core.log import logger
 from app.core.module import ModuleManager
@@ -23,14 +26,19 @@ class ChainBase:
     - 插件管理（PluginManager）访问
     - 事件总线（EventBus）访问
     - 数据库会话管理
-    - 缓存支持
+    - 缓存支持（进程内共享 LRU，每个链一个命名空间）
     """
 
+    # 共享后端命中后写入进程内缓存的过期时间（秒），其他进程的更新最多延迟这么久可见
+    CACHE_PROMOTE_TTL = 60
+
     def __init__(
         self,
         db_manager: DatabaseManager | None = None,
         module_manager: ModuleManager | None = None,
         plugin_manager: PluginManager | None = None,
+        cache_backend: CacheBackend | None = None,
+        chain_cache: ChainCache | None = None,
     ):
         """
         初始化 Chain 基类
@@ -39,12 +47,17 @@ class ChainBase:
             db_manager: 数据库管理器，默认使用全局实例
             module_manager: 模块管理器，默认创建新实例
             plugin_manager: 插件管理器，默认创建新实例
+            cache_backend: 共享缓存后端，默认使用配置的后端（未配置则仅使用进程内缓存）
+            chain_cache: 进程内缓存，默认使用全局共享实例
         """
         self.logger = logger
         self.db_manager = db_manager or global_db_manager
         self.module_manager = module_manager or ModuleManager()
         self.plugin_manager = plugin_manager or PluginManager()
-        self._cache: dict[str, tuple[Any, float | None]] = {}
+        self.cache_backend = cache_backend or get_default_cache_backend()
+        # 同一类的链实例共用一个命名空间，缓存不随实例销毁
+        self.chain_cache = chain_cache or get_chain_cache()
+        self.cache_namespace = type(self).__name__
 
     async def run_module(self, module_name: str, method: str, *args, **kwargs) -> Any:
         """
@@ -130,12 +143,7 @@ class ChainBase:
         Returns:
             缓存值，不存在或过期则返回 None
         """
-        if key in self._cache:
-            value, expires_at = self._cache[key]
-            if expires_at is None or time.time() < expires_at:
-                return value
-            del self._cache[key]
-        return None
+        return self.chain_cache.get(self.cache_namespace, key)
 
     def set_cache(self, key: str, value: Any, ttl: int | None = None) -> None:
         """
@@ -146,5 +154,117 @@ class ChainBase:
             value: 缓存值
             ttl: 过期时间（秒），None 表示永不过期
         """
-        expires_at = time.time() + ttl if ttl else None
-        self._cache[key] = (value, expires_at)
+        self.chain_cache.set(self.cache_namespace, key, value, ttl)
+
+    async def async_get_cache(self, key: str) -> Any | None:
+        """
+        异步获取缓存，进程内未命中时查询共享缓存后端
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存值，不存在或过期则返回 None
+        """
+        value = self.get_cache(key)
+        if value is None and self.cache_backend:
+            value = await self.cache_backend.get(self._backend_key(key))
+            if value is not None:
+                self.set_cache(key, value, self.CACHE_PROMOTE_TTL)
+        return value
+
+    async def async_set_cache(self, key: str, value: Any, ttl: int | None = None) -> None:
+        """
+        异步设置缓存，同时写入共享缓存后端
+
+        Args:
+            key: 缓存键
+            value: 缓存值（写入共享后端时需可 JSON 序列化）
+            ttl: 过期时间（秒），None 表示进程内永不过期、共享后端使用默认过期时间
+        """
+        self.set_cache(key, value, ttl)
+        if self.cache_backend:
+            await self.cache_backend.set(self._backend_key(key), value, ttl)
+
+    async def async_get_cache_many(self, keys: list[str]) -> dict[str, Any]:
+        """
+        异步批量获取缓存，进程内未命中的键一次性查询共享缓存后端
+
+        Args:
+            keys: 缓存键列表
+
+        Returns:
+            命中的键值字典（未命中的键不包含在内）
+        """
+        result, misses = {}, []
+        for key in keys:
+            value = self.get_cache(key)
+            if value is None:
+                misses.append(key)
+            else:
+                result[key] = value
+        if misses and self.cache_backend:
+            found = await self.cache_backend.get_many([self._backend_key(key) for key in misses])
+            for key in misses:
+                value = found.get(self._backend_key(key))
+                if value is not None:
+                    self.set_cache(key, value, self.CACHE_PROMOTE_TTL)
+                    result[key] = value
+        return result
+
+    async def async_set_cache_many(self, items: dict[str, Any], ttl: int | None = None) -> None:
+        """
+        异步批量设置缓存，同时批量写入共享缓存后端
+
+        Args:
+            items: 键值字典
+            ttl: 过期时间（秒），含义同 async_set_cache
+        """
+        for key, value in items.items():
+            self.set_cache(key, value, ttl)
+        if items and self.cache_backend:
+            await self.cache_backend.set_many(
+                {self._backend_key(key): value for key, value in items.items()}, ttl
+            )
+
+    def _backend_key(self, key: str) -> str:
+        """共享后端的缓存键，加上命名空间前缀，避免不同链使用相同的键时互相覆盖"""
+        return f"{self.cache_namespace}:{key}"
+
+
+def cached(key: str, ttl: int | None = None):
+    """
+    缓存链方法的返回值
+
+    缓存键是格式字符串，按方法参数名填充，如 ``"mb_artist_search:{query}:{limit}"``。
+    先查进程内缓存再查共享缓存后端，返回 None 时不缓存
+
+    Args:
+        key: 缓存键模板
+        ttl: 过期时间（秒），None 表示永不过期
+
+    Returns:
+        装饰器
+    """
+
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(self: ChainBase, *args, **kwargs) -> Any:
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            cache_key = key.format(**bound.arguments)
+
+            value = await self.async_get_cache(cache_key)
+            if value is not None:
+                return value
+
+            value = await func(self, *args, **kwargs)
+            if value is not None:
+                await self.async_set_cache(cache_key, value, ttl)
+            return value
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,124 @@
+"""
+应用级依赖容器
+在应用启动时创建一次，持有共享的事件总线、模块管理器、插件管理器和业务链实例，
+API 端点通过依赖注入获取，避免每个请求重复创建组件
+"""
+
+import inspect
+from typing import Any, TypeVar
+
+from app.core.chain import ChainBase
+from app.core.event import EventManager, event_bus
+from app.core.log import logger
+from app.core.module import ModuleManager
+from app.core.plugin import PluginManager
+from app.db import DatabaseManager
+from app.db import db_manager as global_db_manager
+
+T = TypeVar("T")
+
+
+class Container:
+    """
+    依赖容器
+
+    业务链按类型懒加载，每种链只创建一个实例，所有请求共用
+    （链本身不保存请求状态，缓存和连接池也因此在请求之间共享）
+    """
+
+    def __init__(
+        self,
+        event_manager: EventManager | None = None,
+        module_manager: ModuleManager | None = None,
+        plugin_manager: PluginManager | None = None,
+        db_manager: DatabaseManager | None = None,
+    ):
+        """
+        初始化容器
+
+        Args:
+            event_manager: 事件管理器，默认使用全局事件总线
+            module_manager: 模块管理器，默认创建新实例
+            plugin_manager: 插件管理器，默认创建新实例（使用同一事件管理器）
+            db_manager: 数据库管理器，默认使用全局实例
+        """
+        self.event_manager = event_manager or event_bus
+        self.module_manager = module_manager or ModuleManager()
+        self.plugin_manager = plugin_manager or PluginManager(self.event_manager)
+        self.db_manager = db_manager or global_db_manager
+        self.logger = logger
+        self._chains: dict[type, Any] = {}
+
+    def register_builtin_modules(self):
+        """注册内置模块（无需配置即可使用的模块）"""
+        from app.modules.musicbrainz import MusicBrainzModule
+
+        if self.module_manager.get_module("musicbrainz") is None:
+            module = MusicBrainzModule()
+            module.init_module()
+            self.module_manager.register_module("musicbrainz", module)
+
+    def get_chain(self, chain_class: type[T]) -> T:
+        """
+        获取业务链实例，首次获取时创建
+
+        继承 ChainBase 的链注入数据库、模块和插件管理器；其他链按构造函数的同名参数
+        注入容器持有的组件（db_manager、module_manager、plugin_manager、event_manager）
+
+        Args:
+            chain_class: 业务链类
+
+        Returns:
+            业务链实例
+        """
+        chain = self._chains.get(chain_class)
+        if chain is None:
+            if issubclass(chain_class, ChainBase):
+                chain = chain_class(
+                    db_manager=self.db_manager,
+                    module_manager=self.module_manager,
+                    plugin_manager=self.plugin_manager,
+                )
+            else:
+                components = {
+                    "db_manager": self.db_manager,
+                    "module_manager": self.module_manager,
+                    "plugin_manager": self.plugin_manager,
+                    "event_manager": self.event_manager,
+                }
+                params = inspect.signature(chain_class).parameters
+                chain = chain_class(
+                    **{name: value for name, value in components.items() if name in params}
+                )
+            self._chains[chain_class] = chain
+            self.logger.debug(f"创建业务链: {chain_class.__name__}")
+        return chain
+
+    def close(self):
+        """停止所有模块并释放业务链实例"""
+        self.module_manager.stop_all()
+        self._chains.clear()
+
+
+_container: Container | None = None
+
+
+def get_app_container() -> Container:
+    """
+    获取应用级依赖容器
+
+    应用启动时创建，API 端点之外的调用方（下载调度、定时任务）通过它使用同一组业务链
+    """
+    global _container
+    if _container is None:
+        _container = Container()
+    return _container
+
+
+def close_app_container():
+    """停止所有模块并释放应用级依赖容器"""
+    global _container
+
+    if _container is not None:
+        _container.close()
+        _container = None
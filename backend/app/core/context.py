@@ -96,6 +96,7 @@ class MusicInfo:
     path: str | None = None
     file_format: str | None = None
     file_size: int | None = None
+    file_mtime: float | None = None
     bitrate: int | None = None
     sample_rate: int | None = None
     channels: int | None = None
@@ -127,6 +128,7 @@ class MusicInfo:
             "path": self.path,
             "file_format": self.file_format,
             "file_size": self.file_size,
+            "file_mtime": self.file_mtime,
             "bitrate": self.bitrate,
             "sample_rate": self.sample_rate,
             "channels": self.channels,
@@ -215,7 +217,7 @@ class PlaybackSession:
     session_id: str
 
     # 曲目 ID
-    track_id: str
+    track_id: int
 
     # 用户 ID
     user_id: str | None = None
@@ -241,6 +243,33 @@ class PlaybackSession:
     # 开始时间
     started_at: str | None = None
 
+    # 曲目标题
+    title: str | None = None
+
+    # 是否正在播放
+    is_playing: bool = True
+
+    # 设备 ID
+    device_id: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """转换为字典"""
+        return {
+            "session_id": self.session_id,
+            "track_id": self.track_id,
+            "user_id": self.user_id,
+            "position": self.position,
+            "duration": self.duration,
+            "volume": self.volume,
+            "muted": self.muted,
+            "repeat_mode": self.repeat_mode,
+            "shuffle": self.shuffle,
+            "started_at": self.started_at,
+            "title": self.title,
+            "is_playing": self.is_playing,
+            "device_id": self.device_id,
+        }
+
 
 @dataclass
 class SmartQuery:
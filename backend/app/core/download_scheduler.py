@@ -0,0 +1,689 @@
+"""
+下载调度模块
+按优先级调度下载任务，限制全局和每个来源的并发数，失败任务按退避时间重新排队
+"""
+
+import asyncio
+import contextlib
+import heapq
+import os
+import random
+import socket
+import uuid
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any
+
+from app.core.config import settings
+from app.core.log import logger
+from app.db import DatabaseManager
+from app.db import db_manager as global_db_manager
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+
+class JobCancelledError(Exception):
+    """任务被取消或调度器已停止"""
+
+
+@dataclass
+class ScheduledJob:
+    """调度中的下载任务"""
+
+    id: int
+    source: str
+    priority: int
+    payload: dict[str, Any]
+    attempts: int = 0
+    max_retries: int = 3
+    key: str | None = None
+
+    # 不持久化的运行时参数（如进度回调），重启后恢复的任务没有
+    context: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def is_last_attempt(self) -> bool:
+        """当前执行是否为最后一次尝试"""
+        return self.attempts > self.max_retries
+
+
+JobRunner = Callable[[ScheduledJob], Awaitable[Any]]
+JobPrefetcher = Callable[[str, list[ScheduledJob]], Any]
+
+
+class DownloadScheduler:
+    """
+    下载调度器
+
+    - 每个来源一个优先级堆，数值越小越先执行；同优先级按提交顺序
+    - 同时执行的任务数不超过 max_concurrency，每个来源不超过 source_limits 中的限制
+    - runner 抛出异常视为失败，按带抖动的指数退避重新排队，等待期间不占用并发
+    - 任务持久化到 download_jobs 表，重启后 start() 恢复未完成的任务
+    - 启动任务时通过 prefetch 为同一来源即将执行的任务预取下载信息（如下载 URL），
+      剩余的预取任务不足一半时再预取下一批，预取结果不会在任务排队期间过期
+    - 多个进程共用一张表：每个任务由持有租约的调度器执行，调度器定期续租；
+      进程退出后其任务的租约过期，由其他进程（或重启后的进程）认领
+    """
+
+    def __init__(
+        self,
+        runner: JobRunner,
+        db_manager: DatabaseManager | None = None,
+        max_concurrency: int | None = None,
+        source_limits: dict[str, int] | None = None,
+        max_retries: int | None = None,
+        backoff: float | None = None,
+        backoff_max: float | None = None,
+        lease: float | None = None,
+        prefetch: JobPrefetcher | None = None,
+        prefetch_ahead: int | None = None,
+    ):
+        """
+        初始化下载调度器
+
+        Args:
+            runner: 执行单个任务的协程函数
+            db_manager: 数据库管理器，默认使用全局实例
+            max_concurrency: 全局最大并发数，默认使用配置
+            source_limits: 每个来源的最大并发数，默认使用配置
+            max_retries: 默认最大重试次数，默认使用配置
+            backoff: 首次重试的退避时间（秒），默认使用配置
+            backoff_max: 最长退避时间（秒），默认使用配置
+            lease: 任务租约时长（秒），默认使用配置
+            prefetch: 为即将执行的任务预取下载信息的函数，参数为来源和任务列表
+            prefetch_ahead: 每个来源预取的任务数，默认使用配置
+        """
+        self.runner = runner
+        self.db_manager = db_manager or global_db_manager
+        self.max_concurrency = max_concurrency or settings.download_max_concurrency
+        self.source_limits = (
+            source_limits if source_limits is not None else settings.download_source_concurrency
+        )
+        self.max_retries = max_retries if max_retries is not None else settings.download_max_retries
+        self.backoff = backoff if backoff is not None else settings.download_retry_backoff
+        self.backoff_max = (
+            backoff_max if backoff_max is not None else settings.download_retry_backoff_max
+        )
+        self.lease = lease or settings.download_job_lease
+        self.prefetch = prefetch
+        self.prefetch_ahead = (
+            prefetch_ahead if prefetch_ahead is not None else settings.download_prefetch_ahead
+        )
+        # 调度器标识，同一主机上的多个进程和同一进程重启前后都不相同
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.logger = logger
+
+        self._jobs: dict[int, ScheduledJob] = {}
+        # 调用方任务标识 -> 任务 ID
+        self._keys: dict[str, int] = {}
+        # 租约被其他进程接管的执行中任务，中断时不修改记录
+        self._lost: set[int] = set()
+        # 已预取但尚未启动的任务
+        self._prefetched: set[int] = set()
+        # 来源 -> (优先级, 任务 ID) 堆
+        self._ready: dict[str, list[tuple[int, int]]] = {}
+        # (可执行时间, 任务 ID) 堆，时间为事件循环时钟
+        self._delayed: list[tuple[float, int]] = []
+        self._running: dict[int, asyncio.Task] = {}
+        self._running_by_source: Counter[str] = Counter()
+        self._waiters: dict[int, asyncio.Future] = {}
+        self._wakeup = asyncio.Event()
+        self._dispatcher: asyncio.Task | None = None
+        self._lease_task: asyncio.Task | None = None
+        self._recovered = False
+
+    def _oper(self):
+        """获取任务持久化操作对象"""
+        from app.db.models.download_job import DownloadJob
+        from app.db.operations.download_job import DownloadJobOper
+
+        return DownloadJobOper(DownloadJob, self.db_manager)
+
+    # ========== 提交 ==========
+
+    async def submit(
+        self,
+        source: str,
+        payload: dict[str, Any],
+        priority: int = 0,
+        max_retries: int | None = None,
+        context: dict[str, Any] | None = None,
+        key: str | None = None,
+    ) -> int:
+        """
+        提交下载任务
+
+        Args:
+            source: 下载来源
+            payload: 任务参数（必须可 JSON 序列化）
+            priority: 优先级，数值越小越先执行
+            max_retries: 最大重试次数，默认使用调度器配置
+            context: 不持久化的运行时参数
+            key: 调用方任务标识，用于 get_job_id() 查询（重启恢复后仍可用）
+
+        Returns:
+            任务 ID，结果保留到 wait() 取走
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        with self.db_manager.detach():
+            row = await self._oper().create(
+                source=source,
+                priority=priority,
+                payload=payload,
+                status=JOB_QUEUED,
+                attempts=0,
+                max_retries=max_retries,
+                key=key,
+                owner=self.owner,
+                lease_expires_at=datetime.utcnow() + timedelta(seconds=self.lease),
+            )
+
+        job = ScheduledJob(
+            row.id,
+            source,
+            priority,
+            payload,
+            max_retries=max_retries,
+            key=key,
+            context=context or {},
+        )
+        self._add(job)
+        waiter = asyncio.get_running_loop().create_future()
+        # 只提交不等待的任务失败时不输出 "exception was never retrieved"
+        waiter.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._waiters[job.id] = waiter
+        heapq.heappush(self._ready.setdefault(source, []), (priority, job.id))
+        self._ensure_dispatcher()
+        self.logger.debug(f"提交下载任务: {job.id} ({source}, 优先级 {priority})")
+        return job.id
+
+    async def wait(self, job_id: int) -> Any:
+        """
+        等待任务完成并取走结果
+
+        调用方被取消时不会取消任务本身
+
+        Args:
+            job_id: 任务 ID
+
+        Returns:
+            runner 的返回值
+
+        Raises:
+            KeyError: 任务不存在或结果已被取走
+            JobCancelledError: 任务被取消
+            Exception: 任务最终失败时 runner 抛出的异常
+        """
+        waiter = self._waiters[job_id]
+        try:
+            return await asyncio.shield(waiter)
+        finally:
+            if waiter.done():
+                self._waiters.pop(job_id, None)
+
+    async def run(
+        self,
+        source: str,
+        payload: dict[str, Any],
+        priority: int = 0,
+        max_retries: int | None = None,
+        context: dict[str, Any] | None = None,
+    ) -> Any:
+        """
+        提交任务并等待结果
+
+        Args:
+            source: 下载来源
+            payload: 任务参数
+            priority: 优先级，数值越小越先执行
+            max_retries: 最大重试次数
+            context: 不持久化的运行时参数
+
+        Returns:
+            runner 的返回值
+        """
+        job_id = await self.submit(source, payload, priority, max_retries, context)
+        return await self.wait(job_id)
+
+    def get_job_id(self, key: str) -> int | None:
+        """
+        按调用方任务标识查找本调度器持有的未完成任务
+
+        Args:
+            key: 调用方任务标识
+
+        Returns:
+            任务 ID，不存在时返回 None
+        """
+        return self._keys.get(key)
+
+    def get_job(self, job_id: int) -> ScheduledJob | None:
+        """
+        获取本调度器持有的未完成任务
+
+        Args:
+            job_id: 任务 ID
+
+        Returns:
+            任务，不存在时返回 None
+        """
+        return self._jobs.get(job_id)
+
+    async def cancel(self, job_id: int) -> bool:
+        """
+        取消任务（排队中的直接移除，执行中的取消执行）
+
+        Args:
+            job_id: 任务 ID
+
+        Returns:
+            是否取消成功
+        """
+        if job_id not in self._jobs:
+            return False
+
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+            return True
+
+        # 排队中的任务：堆中的条目在出队时跳过
+        self._forget(job_id)
+        self._delayed = [item for item in self._delayed if item[1] != job_id]
+        heapq.heapify(self._delayed)
+        await self._finish(job_id, JOB_CANCELLED)
+        return True
+
+    # ========== 调度 ==========
+
+    async def start(self):
+        """认领未完成且无人持有的任务（包括上次运行留下的任务）并启动调度"""
+        if not self._recovered:
+            self._recovered = True
+            rows = await self._claim()
+            if rows:
+                self.logger.info(f"恢复下载任务: {len(rows)} 个")
+
+        self._ensure_dispatcher()
+
+    async def _claim(self) -> list:
+        """
+        认领无人持有的任务并加入队列
+
+        Returns:
+            新加入队列的任务记录
+        """
+        now = datetime.utcnow()
+        with self.db_manager.detach():
+            rows = await self._oper().claim(self.owner, now + timedelta(seconds=self.lease), now)
+
+        loop = asyncio.get_running_loop()
+        rows = [row for row in rows if row.id not in self._jobs and row.id not in self._running]
+        for row in rows:
+            job = ScheduledJob(
+                row.id,
+                row.source,
+                row.priority,
+                row.payload,
+                attempts=row.attempts,
+                max_retries=row.max_retries,
+                key=row.key,
+            )
+            self._add(job)
+            if row.next_attempt_at and row.next_attempt_at > now:
+                delay = (row.next_attempt_at - now).total_seconds()
+                heapq.heappush(self._delayed, (loop.time() + delay, job.id))
+            else:
+                heapq.heappush(self._ready.setdefault(job.source, []), (job.priority, job.id))
+        return rows
+
+    async def _lease_loop(self):
+        """租约循环：续租持有的任务，放弃已被其他进程接管的任务，认领租约过期的任务"""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                # 续租期间新提交的任务不在快照中，不会被误判为已丢失
+                known = set(self._jobs)
+                with self.db_manager.detach():
+                    held = await self._oper().renew(
+                        self.owner, datetime.utcnow() + timedelta(seconds=self.lease)
+                    )
+                for job_id in known - held:
+                    self._drop(job_id)
+
+                if self._recovered and await self._claim():
+                    self.logger.info("接管其他进程的下载任务")
+                    self._wakeup.set()
+            except Exception as e:
+                self.logger.error(f"下载任务续租失败: {e}")
+
+    def _drop(self, job_id: int):
+        """
+        放弃租约已被其他进程接管的任务（不修改记录）
+
+        Args:
+            job_id: 任务 ID
+        """
+        if job_id not in self._jobs:
+            return
+        self.logger.warning(f"下载任务已由其他进程接管: {job_id}")
+
+        task = self._running.get(job_id)
+        if task is not None:
+            self._lost.add(job_id)
+            task.cancel()
+            return
+
+        self._forget(job_id)
+        self._delayed = [item for item in self._delayed if item[1] != job_id]
+        heapq.heapify(self._delayed)
+        self._notify(job_id, JOB_CANCELLED)
+
+    def _ensure_dispatcher(self):
+        """确保调度循环在运行"""
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        if self._lease_task is None or self._lease_task.done():
+            self._lease_task = asyncio.create_task(self._lease_loop())
+        self._wakeup.set()
+
+    async def _dispatch_loop(self):
+        """调度循环：把到期的重试移回就绪队列，在并发限制内启动任务"""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+
+            now = loop.time()
+            while self._delayed and self._delayed[0][0] <= now:
+                _, job_id = heapq.heappop(self._delayed)
+                job = self._jobs.get(job_id)
+                if job is not None:
+                    heapq.heappush(self._ready.setdefault(job.source, []), (job.priority, job.id))
+
+            while len(self._running) < self.max_concurrency:
+                job = self._pick()
+                if job is None:
+                    break
+                self._launch(job)
+
+            timeout = self._delayed[0][0] - loop.time() if self._delayed else None
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+
+    def _pick(self) -> ScheduledJob | None:
+        """
+        选出下一个可执行的任务：在未达到来源并发限制的来源中取优先级最高的
+
+        Returns:
+            任务，没有可执行任务时返回 None
+        """
+        best: tuple[int, int] | None = None
+        best_source = None
+        for source, heap in self._ready.items():
+            # 跳过已取消的任务
+            while heap and heap[0][1] not in self._jobs:
+                heapq.heappop(heap)
+            if not heap:
+                continue
+            limit = self.source_limits.get(source, self.max_concurrency)
+            if self._running_by_source[source] >= limit:
+                continue
+            if best is None or heap[0] < best:
+                best, best_source = heap[0], source
+
+        if best is None:
+            return None
+        heapq.heappop(self._ready[best_source])
+        return self._jobs[best[1]]
+
+    def _launch(self, job: ScheduledJob):
+        """启动任务"""
+        job.attempts += 1
+        self._running_by_source[job.source] += 1
+        self._prefetch_next(job)
+        self._prefetched.discard(job.id)
+        self._running[job.id] = asyncio.create_task(self._execute(job))
+
+    def _prefetch_next(self, job: ScheduledJob):
+        """
+        为启动的任务和同一来源中即将执行的任务预取下载信息
+
+        启动的任务未预取，或已预取的任务不足 prefetch_ahead 的一半时，
+        把接下来未预取的任务作为一批预取
+
+        Args:
+            job: 正在启动的任务
+        """
+        if self.prefetch is None or self.prefetch_ahead <= 0:
+            return
+
+        heap = self._ready.get(job.source, [])
+        upcoming = [job] + [
+            self._jobs[job_id]
+            for _, job_id in heapq.nsmallest(self.prefetch_ahead - 1, heap)
+            if job_id in self._jobs
+        ]
+        pending = [item for item in upcoming if item.id not in self._prefetched]
+        if not pending:
+            return
+        if job.id in self._prefetched and len(upcoming) - len(pending) > self.prefetch_ahead // 2:
+            return
+
+        self._prefetched.update(item.id for item in pending)
+        try:
+            self.prefetch(job.source, pending)
+        except Exception as e:
+            self.logger.warning(f"预取下载信息失败 ({job.source}, {len(pending)} 个): {e}")
+
+    async def _execute(self, job: ScheduledJob):
+        """
+        执行任务并处理结果：成功则删除记录，失败则重新排队或标记失败
+
+        Args:
+            job: 任务
+        """
+        try:
+            with self.db_manager.detach():
+                await self._oper().update(job.id, status=JOB_RUNNING, attempts=job.attempts)
+                result = await self.runner(job)
+        except asyncio.CancelledError:
+            if self._dispatcher is None:
+                # 调度器停止：保留记录，下次启动时恢复
+                raise
+            self._forget(job.id)
+            if job.id in self._lost:
+                # 租约已被其他进程接管，由接管的进程继续执行
+                self._lost.discard(job.id)
+                self._notify(job.id, JOB_CANCELLED)
+            else:
+                await self._finish(job.id, JOB_CANCELLED)
+        except Exception as e:
+            if job.is_last_attempt:
+                self.logger.error(f"下载任务失败: {job.id}, 已尝试 {job.attempts} 次, 错误: {e}")
+                self._forget(job.id)
+                await self._finish(job.id, JOB_FAILED, error=e)
+            else:
+                await self._retry_later(job, e)
+        else:
+            self._forget(job.id)
+            await self._finish(job.id, result=result)
+        finally:
+            self._running.pop(job.id, None)
+            self._running_by_source[job.source] -= 1
+            self._wakeup.set()
+
+    async def _retry_later(self, job: ScheduledJob, error: Exception):
+        """
+        按带抖动的指数退避重新排队
+
+        Args:
+            job: 任务
+            error: 本次失败的异常
+        """
+        # 重试时预取的信息可能已失效（下载器在失败时删除失效的缓存），重新排队后再次预取
+        self._prefetched.discard(job.id)
+        delay = min(self.backoff_max, self.backoff * 2 ** (job.attempts - 1))
+        # 抖动避免大量任务同时重试
+        delay = random.uniform(delay / 2, delay)
+        self.logger.warning(
+            f"下载任务失败，{delay:.1f} 秒后重试 ({job.attempts}/{job.max_retries + 1}): "
+            f"{job.id}, 错误: {error}"
+        )
+
+        with self.db_manager.detach():
+            await self._oper().update(
+                job.id,
+                status=JOB_QUEUED,
+                next_attempt_at=datetime.utcnow() + timedelta(seconds=delay),
+                error_message=str(error),
+            )
+        heapq.heappush(self._delayed, (asyncio.get_running_loop().time() + delay, job.id))
+
+    async def _finish(
+        self,
+        job_id: int,
+        status: str | None = None,
+        result: Any = None,
+        error: Exception | None = None,
+    ):
+        """
+        结束任务：更新记录并通知等待者
+
+        Args:
+            job_id: 任务 ID
+            status: 最终状态，None 表示成功（删除记录）
+            result: 成功时的结果
+            error: 失败时的异常
+        """
+        try:
+            with self.db_manager.detach():
+                if status is None:
+                    await self._oper().delete(job_id)
+                else:
+                    await self._oper().update(
+                        job_id, status=status, error_message=str(error) if error else None
+                    )
+        except Exception as e:
+            self.logger.error(f"更新下载任务记录失败: {job_id}, 错误: {e}")
+
+        self._notify(job_id, status, result, error)
+
+    def _notify(
+        self,
+        job_id: int,
+        status: str | None = None,
+        result: Any = None,
+        error: Exception | None = None,
+    ):
+        """
+        通知等待者任务结果
+
+        Args:
+            job_id: 任务 ID
+            status: 最终状态，None 表示成功
+            result: 成功时的结果
+            error: 失败时的异常
+        """
+        waiter = self._waiters.get(job_id)
+        if waiter is None or waiter.done():
+            return
+        if status == JOB_CANCELLED:
+            waiter.set_exception(JobCancelledError(f"任务已取消: {job_id}"))
+        elif error is not None:
+            waiter.set_exception(error)
+        else:
+            waiter.set_result(result)
+
+    def _add(self, job: ScheduledJob):
+        """登记任务"""
+        self._jobs[job.id] = job
+        if job.key:
+            self._keys[job.key] = job.id
+
+    def _forget(self, job_id: int):
+        """移除任务登记"""
+        job = self._jobs.pop(job_id, None)
+        self._prefetched.discard(job_id)
+        if job is not None and job.key and self._keys.get(job.key) == job_id:
+            del self._keys[job.key]
+
+    # ========== 生命周期 ==========
+
+    async def stop(self):
+        """
+        停止调度：中断执行中的任务，未完成的任务保留在数据库中并释放租约，
+        其他进程或下次启动时立即认领
+        """
+        dispatcher, self._dispatcher = self._dispatcher, None
+        lease_task, self._lease_task = self._lease_task, None
+        for background in (dispatcher, lease_task):
+            if background is not None:
+                background.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await background
+
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for job_id, waiter in self._waiters.items():
+            if not waiter.done():
+                waiter.set_exception(JobCancelledError(f"调度器已停止: {job_id}"))
+        self._waiters.clear()
+        self._jobs.clear()
+        self._keys.clear()
+        self._lost.clear()
+        self._prefetched.clear()
+        self._ready.clear()
+        self._delayed.clear()
+        self._recovered = False
+
+        try:
+            with self.db_manager.detach():
+                await self._oper().release(self.owner)
+        except Exception as e:
+            self.logger.error(f"释放下载任务租约失败: {e}")
+
+    def metrics(self) -> dict[str, Any]:
+        """
+        获取调度指标
+
+        Returns:
+            排队、等待重试和执行中的任务数
+        """
+        delayed = {job_id for _, job_id in self._delayed}
+        return {
+            "queued": len(self._jobs) - len(self._running) - len(delayed),
+            "delayed": len(delayed),
+            "running": len(self._running),
+            "running_by_source": {k: v for k, v in self._running_by_source.items() if v},
+        }
+
+
+_scheduler: DownloadScheduler | None = None
+
+
+def get_download_scheduler() -> DownloadScheduler:
+    """获取全局下载调度器（执行逻辑由 DownloadChain 提供）"""
+    global _scheduler
+    if _scheduler is None:
+        from app.chain.download import prefetch_download_jobs, run_download_job
+
+        _scheduler = DownloadScheduler(run_download_job, prefetch=prefetch_download_jobs)
+    return _scheduler
+
+
+async def close_download_scheduler():
+    """停止全局下载调度器"""
+    global _scheduler
+
+    if _scheduler is not None:
+        await _scheduler.stop()
+        _scheduler = None
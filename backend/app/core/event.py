@@ -1,14 +1,21 @@
 """
 事件管理器
 实现事件的发送、注册、处理，支持消息通知
+
+事件按类型进入各自的有界队列，由固定数量的 worker 取出并调用处理器；
+高频事件可以配置为合并或丢弃，避免积压
 """
 
 import asyncio
-from collections import defaultdict
-from collections.abc import Callable
+import inspect
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, field
 from enum import StrEnum
 from typing import Any
 
+from app.core.config import settings
 from app.core.log import logger
 
 
@@ -64,15 +71,131 @@ class EventType(StrEnum):
     MessageChannelSlack = "slack"
 
 
+class OverflowPolicy(StrEnum):
+    """队列满时的处理策略"""
+
+    # publish 等待队列有空位；publish_nowait 丢弃新事件
+    BLOCK = "block"
+    # 丢弃最早的未处理事件
+    DROP_OLDEST = "drop_oldest"
+    # 丢弃新事件
+    DROP_NEWEST = "drop_newest"
+    # 相同 coalesce_key 的未处理事件合并为最新的一条（队列未满时也合并）
+    COALESCE = "coalesce"
+
+
+@dataclass
+class EventPolicy:
+    """事件类型的排队策略"""
+
+    overflow: OverflowPolicy = OverflowPolicy.BLOCK
+
+    # 队列容量，None 表示使用事件总线的默认容量
+    maxsize: int | None = None
+
+    # 合并依据的事件数据字段，None 表示同类型事件全部合并为一条
+    coalesce_key: str | None = None
+
+
+# 默认策略：进度类事件只需要最新状态
+DEFAULT_POLICIES: dict[str, EventPolicy] = {
+    EventType.DownloadProgress: EventPolicy(OverflowPolicy.COALESCE, coalesce_key="task_id"),
+    "playback.progress": EventPolicy(OverflowPolicy.COALESCE, coalesce_key="session_id"),
+}
+
+
+@dataclass
+class EventStats:
+    """单个事件类型的统计"""
+
+    published: int = 0
+    handled: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    failed: int = 0
+    handler_time: float = 0.0
+    max_handler_time: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """转换为字典"""
+        return {
+            "published": self.published,
+            "handled": self.handled,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "avg_handler_ms": (
+                round(self.handler_time / self.handled * 1000, 3) if self.handled else 0.0
+            ),
+            "max_handler_ms": round(self.max_handler_time * 1000, 3),
+        }
+
+
+@dataclass
+class _EventQueue:
+    """单个事件类型的待处理队列"""
+
+    policy: EventPolicy
+    maxsize: int
+    # 元素为 [合并键, 事件数据]，合并时原地替换数据，保持排队位置
+    items: deque[list] = field(default_factory=deque)
+    pending: dict[Hashable, list] = field(default_factory=dict)
+    # 等待空位的 publish
+    putters: deque[asyncio.Future] = field(default_factory=deque)
+    stats: EventStats = field(default_factory=EventStats)
+
+    def full(self) -> bool:
+        return len(self.items) >= self.maxsize
+
+    def coalesce_key(self, data: dict[str, Any] | None) -> Hashable:
+        key = self.policy.coalesce_key
+        if key is None:
+            return None
+        return data.get(key) if isinstance(data, dict) else None
+
+    def pop(self) -> list:
+        item = self.items.popleft()
+        if self.pending.get(item[0]) is item:
+            del self.pending[item[0]]
+        # 唤醒一个等待空位的 publish
+        while self.putters:
+            putter = self.putters.popleft()
+            if not putter.done():
+                putter.set_result(None)
+                break
+        return item
+
+
 class EventManager:
     """
     事件管理器
     管理事件的发送和订阅
+
+    - publish/publish_nowait 把事件放入该类型的有界队列，由 worker 池并发处理，
+      异步处理器会被 await，不再创建无人跟踪的任务
+    - 队列满时按 EventPolicy 等待、丢弃或合并
+    - metrics() 返回各类型的队列深度、吞吐和处理耗时
     """
 
-    def __init__(self):
+    def __init__(self, workers: int | None = None, queue_size: int | None = None):
+        """
+        初始化事件管理器
+
+        Args:
+            workers: 处理事件的 worker 数，默认使用配置
+            queue_size: 每个事件类型的默认队列容量，默认使用配置
+        """
         self._handlers: dict[str, list[Callable]] = defaultdict(list)
         self.logger = logger
+        self.workers = workers or settings.event_workers
+        self.queue_size = queue_size or settings.event_queue_size
+
+        self._policies: dict[str, EventPolicy] = dict(DEFAULT_POLICIES)
+        self._queues: dict[str, _EventQueue] = {}
+        # 每个排队事件对应一张票据，worker 按票据取事件
+        self._tickets: asyncio.Queue[str] | None = None
+        self._worker_tasks: list[asyncio.Task] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
 
     def register(self, event_type: str, handler: Callable):
         """
@@ -100,25 +223,119 @@ class EventManager:
             except ValueError:
                 pass
 
+    def set_policy(self, event_type: str, policy: EventPolicy):
+        """
+        设置事件类型的排队策略
+
+        Args:
+            event_type: 事件类型
+            policy: 排队策略
+        """
+        self._policies[event_type] = policy
+        queue = self._queues.get(event_type)
+        if queue is not None:
+            queue.policy = policy
+            queue.maxsize = policy.maxsize or self.queue_size
+
+    def _get_queue(self, event_type: str) -> _EventQueue:
+        """获取（必要时创建）事件类型的队列"""
+        queue = self._queues.get(event_type)
+        if queue is None:
+            policy = self._policies.get(event_type, EventPolicy())
+            queue = _EventQueue(policy, policy.maxsize or self.queue_size)
+            self._queues[event_type] = queue
+        return queue
+
+    # ========== 发布 ==========
+
+    async def publish(self, event_type: str, data: dict[str, Any] | None = None) -> bool:
+        """
+        发布事件，BLOCK 策略下队列满时等待空位
+
+        Args:
+            event_type: 事件类型
+            data: 事件数据
+
+        Returns:
+            是否进入队列（被丢弃时返回 False）
+        """
+        if not self._handlers.get(event_type):
+            return True
+
+        self._ensure_started()
+        queue = self._get_queue(event_type)
+        while queue.policy.overflow == OverflowPolicy.BLOCK and queue.full():
+            putter = asyncio.get_running_loop().create_future()
+            queue.putters.append(putter)
+            try:
+                await putter
+            except asyncio.CancelledError:
+                putter.cancel()
+                raise
+        return self.publish_nowait(event_type, data)
+
+    def publish_nowait(self, event_type: str, data: dict[str, Any] | None = None) -> bool:
+        """
+        发布事件，不等待
+
+        Args:
+            event_type: 事件类型
+            data: 事件数据
+
+        Returns:
+            是否进入队列（被丢弃时返回 False，被合并时返回 True）
+        """
+        if not self._handlers.get(event_type):
+            return True
+
+        queue = self._get_queue(event_type)
+        queue.stats.published += 1
+        policy = queue.policy.overflow
+
+        key = queue.coalesce_key(data)
+        if policy == OverflowPolicy.COALESCE and key in queue.pending:
+            queue.pending[key][1] = data
+            queue.stats.coalesced += 1
+            return True
+
+        item = [key, data]
+        if queue.full():
+            if policy != OverflowPolicy.DROP_OLDEST:
+                queue.stats.dropped += 1
+                self.logger.debug(f"事件队列已满，丢弃事件: {event_type}")
+                return False
+            # 替换最早的事件，票据数不变
+            queue.pop()
+            queue.stats.dropped += 1
+            queue.items.append(item)
+        else:
+            queue.items.append(item)
+            self._ensure_started()
+            if self._tickets is not None:
+                self._tickets.put_nowait(event_type)
+
+        if policy == OverflowPolicy.COALESCE:
+            queue.pending[key] = item
+        return True
+
     def send_event(self, event_type: str, data: dict[str, Any] | None = None):
         """
         发送事件
 
+        在事件循环中等同于 publish_nowait；没有运行中的事件循环时（同步代码）直接调用处理器
+
         Args:
             event_type: 事件类型
             data: 事件数据
         """
         self.logger.debug(f"发送事件: {event_type}, 数据: {data}")
 
-        if event_type in self._handlers:
-            for handler in self._handlers[event_type]:
-                try:
-                    result = handler(data)
-                    # 支持异步处理器
-                    if hasattr(result, "__await__"):
-                        asyncio.create_task(result)
-                except Exception as e:
-                    self.logger.error(f"事件处理器执行失败: {event_type}, 错误: {e}")
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._dispatch_sync(event_type, data)
+            return
+        self.publish_nowait(event_type, data)
 
     def emit(self, event_type: str, data: dict[str, Any] | None = None):
         """
@@ -130,6 +347,131 @@ class EventManager:
         """
         self.send_event(event_type, data)
 
+    # ========== 处理 ==========
+
+    def _ensure_started(self):
+        """在当前事件循环中启动 worker（事件循环变化时重新启动）"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._loop is loop and self._worker_tasks:
+            return
+
+        self._loop = loop
+        self._tickets = asyncio.Queue()
+        for event_type, queue in self._queues.items():
+            queue.putters.clear()
+            for _ in queue.items:
+                self._tickets.put_nowait(event_type)
+        self._worker_tasks = [
+            loop.create_task(self._worker(), name=f"event-worker-{i}") for i in range(self.workers)
+        ]
+        self.logger.debug(f"事件总线启动: {self.workers} 个 worker")
+
+    async def _worker(self):
+        """worker：按票据取出事件并调用处理器"""
+        tickets = self._tickets
+        while True:
+            event_type = await tickets.get()
+            try:
+                queue = self._queues.get(event_type)
+                if queue and queue.items:
+                    _, data = queue.pop()
+                    await self._dispatch(event_type, data, queue.stats)
+            finally:
+                tickets.task_done()
+
+    async def _dispatch(self, event_type: str, data: dict[str, Any] | None, stats: EventStats):
+        """
+        调用事件类型的所有处理器
+
+        Args:
+            event_type: 事件类型
+            data: 事件数据
+            stats: 统计对象
+        """
+        for handler in list(self._handlers.get(event_type, [])):
+            start = time.perf_counter()
+            try:
+                result = handler(data)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                stats.failed += 1
+                self.logger.error(f"事件处理器执行失败: {event_type}, 错误: {e}")
+            finally:
+                elapsed = time.perf_counter() - start
+                stats.handler_time += elapsed
+                stats.max_handler_time = max(stats.max_handler_time, elapsed)
+        stats.handled += 1
+
+    def _dispatch_sync(self, event_type: str, data: dict[str, Any] | None):
+        """
+        在同步代码中直接调用处理器（异步处理器无法执行，只记录警告）
+
+        Args:
+            event_type: 事件类型
+            data: 事件数据
+        """
+        for handler in list(self._handlers.get(event_type, [])):
+            try:
+                result = handler(data)
+                if inspect.iscoroutine(result):
+                    result.close()
+                    self.logger.warning(f"没有运行中的事件循环，跳过异步处理器: {event_type}")
+            except Exception as e:
+                self.logger.error(f"事件处理器执行失败: {event_type}, 错误: {e}")
+
+    async def join(self):
+        """等待所有已排队的事件处理完成"""
+        if self._tickets is not None and self._loop is asyncio.get_running_loop():
+            await self._tickets.join()
+
+    async def stop(self, timeout: float = 5.0):
+        """
+        停止事件总线：等待已排队事件处理完成（最多 timeout 秒）后停止 worker
+
+        Args:
+            timeout: 最长等待时间（秒）
+        """
+        if not self._worker_tasks:
+            return
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except TimeoutError:
+            self.logger.warning(f"事件总线停止超时，丢弃未处理事件: {self.pending_count}")
+
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._tickets = None
+        self._loop = None
+
+    # ========== 指标 ==========
+
+    @property
+    def pending_count(self) -> int:
+        """所有类型未处理的事件数"""
+        return sum(len(queue.items) for queue in self._queues.values())
+
+    def metrics(self) -> dict[str, Any]:
+        """
+        获取事件总线指标
+
+        Returns:
+            worker 数、总队列深度，以及每个事件类型的队列深度、发布/处理/丢弃/合并/失败次数和处理耗时
+        """
+        return {
+            "workers": len(self._worker_tasks),
+            "pending": self.pending_count,
+            "events": {
+                event_type: {"depth": len(queue.items), **queue.stats.to_dict()}
+                for event_type, queue in self._queues.items()
+            },
+        }
+
     def put_message(self, channel: str, title: str, content: str, **kwargs):
         """
         发送消息通知
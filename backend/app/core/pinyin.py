@@ -0,0 +1,31 @@
+"""
+拼音模块
+为中文名称生成拼音检索字段
+"""
+
+import re
+
+from pypinyin import Style, lazy_pinyin
+
+_CJK_PATTERN = re.compile(r"[㐀-鿿]")
+
+
+def to_pinyin(text: str | None) -> str | None:
+    """
+    生成拼音检索字段
+
+    格式为 "全拼 首字母"，如 "周杰伦" -> "zhoujielun zjl"，
+    非中文部分原样保留（小写、去空格）
+
+    Args:
+        text: 原始名称
+
+    Returns:
+        拼音字段，不含中文时返回 None
+    """
+    if not text or not _CJK_PATTERN.search(text):
+        return None
+
+    full = "".join(lazy_pinyin(text)).replace(" ", "").lower()
+    initials = "".join(lazy_pinyin(text, style=Style.FIRST_LETTER)).replace(" ", "").lower()
+    return full if full == initials else f"{full} {initials}"
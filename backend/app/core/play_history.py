@@ -0,0 +1,315 @@
+"""
+播放记录模块
+播放事件先写入本地日志和内存缓冲，定期批量写入数据库（write-behind）
+"""
+
+import asyncio
+import contextlib
+import fcntl
+import itertools
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from app.core.log import logger
+from app.db import DatabaseManager
+from app.db import db_manager as global_db_manager
+
+
+class PlayHistoryRecorder:
+    """
+    播放记录器
+
+    - record() 只追加一行日志并写入内存缓冲，不访问数据库
+    - 每 flush_interval 秒或缓冲达到 batch_size 时，一次事务批量写入 play_history 并累加播放次数
+    - 写入前轮转日志段，写入成功后删除；进程崩溃后由 recover() 重放残留的日志段，
+      event_id 去重保证不会重复计数
+    - 每个进程使用自己的日志（journal.<pid>.log）并持有文件锁，多个 worker 共用日志目录时
+      互不干扰；recover() 只接管锁已释放（进程已退出）的日志和日志段
+    """
+
+    JOURNAL_GLOB = "journal.*.log"
+    SEGMENT_GLOB = "journal.*.seg"
+
+    def __init__(
+        self,
+        journal_dir: str | Path,
+        db_manager: DatabaseManager | None = None,
+        flush_interval: float = 5.0,
+        batch_size: int = 500,
+    ):
+        """
+        初始化播放记录器
+
+        Args:
+            journal_dir: 日志目录
+            db_manager: 数据库管理器，默认使用全局实例
+            flush_interval: 批量写入间隔（秒）
+            batch_size: 缓冲达到该数量时立即写入
+        """
+        self.journal_dir = Path(journal_dir)
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self.db_manager = db_manager or global_db_manager
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.logger = logger
+        self.pid = os.getpid()
+        self.journal_path = self.journal_dir / f"journal.{self.pid}.log"
+
+        self._segment_seq = itertools.count()
+        self._buffer: list[dict[str, Any]] = []
+        # 已从缓冲取出但尚未写入成功的事件，及其对应的日志段
+        self._pending: list[dict[str, Any]] = []
+        self._segments: list[Path] = []
+        self._journal = self._open_journal()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def record(
+        self,
+        track_id: int,
+        user_id: str | None = None,
+        device_id: str | None = None,
+        played_at: datetime | None = None,
+    ) -> dict[str, Any]:
+        """
+        记录一次播放
+
+        Args:
+            track_id: 曲目 ID
+            user_id: 用户 ID
+            device_id: 设备 ID
+            played_at: 播放时间，默认当前时间
+
+        Returns:
+            播放事件
+        """
+        event = {
+            "event_id": uuid.uuid4().hex,
+            "track_id": track_id,
+            "user_id": user_id,
+            "device_id": device_id,
+            "played_at": (played_at or datetime.utcnow()).isoformat(),
+        }
+        # 先写日志再进入缓冲，进程崩溃时可以从日志恢复
+        self._journal.write(json.dumps(event).encode("utf-8") + b"\n")
+        self._journal.flush()
+        self._buffer.append(event)
+
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        self._ensure_task()
+        return event
+
+    @property
+    def buffered_count(self) -> int:
+        """尚未写入数据库的事件数"""
+        return len(self._buffer) + len(self._pending)
+
+    def get_buffered(
+        self, user_id: str | None = None, device_id: str | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        获取尚未写入数据库的播放事件
+
+        Args:
+            user_id: 用户 ID，None 表示匿名用户
+            device_id: 设备 ID，None 表示所有设备
+
+        Returns:
+            播放事件列表（按播放时间倒序）
+        """
+        events = [
+            event
+            for event in self._pending + self._buffer
+            if event["user_id"] == user_id
+            and (device_id is None or event["device_id"] == device_id)
+        ]
+        return sorted(
+            events, key=lambda event: datetime.fromisoformat(event["played_at"]), reverse=True
+        )
+
+    def _ensure_task(self):
+        """确保定时写入任务在运行"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        """定时写入循环"""
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    def _open_journal(self) -> BinaryIO:
+        """打开本进程的日志（追加模式，跨多次 flush 保持打开），持有文件锁表示进程仍在运行"""
+        journal = open(self.journal_path, "ab")  # noqa: SIM115
+        try:
+            fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.logger.warning(f"播放记录日志已被同一进程的其他实例打开: {self.journal_path}")
+        return journal
+
+    def _segment_path(self) -> Path:
+        """生成本进程的新日志段路径"""
+        return (
+            self.journal_dir / f"journal.{self.pid}.{time.time_ns()}-{next(self._segment_seq)}.seg"
+        )
+
+    def _rotate(self) -> Path:
+        """轮转日志：当前日志成为待写入的日志段"""
+        # 先改名再关闭，关闭前一直持有锁，其他进程不会把它当作残留日志接管
+        segment = self._segment_path()
+        self.journal_path.rename(segment)
+        self._journal.close()
+        self._journal = self._open_journal()
+        return segment
+
+    def _claim_orphans(self) -> list[Path]:
+        """
+        接管已退出进程残留的日志和日志段
+
+        日志的文件锁能获取到说明所属进程已退出；仍在运行的进程的日志段由其自己写入，跳过
+
+        Returns:
+            接管后的日志段路径（已改名为本进程的日志段）
+        """
+        claimed = []
+        live = set()
+        for journal in self.journal_dir.glob(self.JOURNAL_GLOB):
+            owner = journal.name.split(".")[1]
+            if journal == self.journal_path:
+                continue
+            try:
+                with open(journal, "rb") as f:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    if os.fstat(f.fileno()).st_size:
+                        segment = self._segment_path()
+                        journal.rename(segment)
+                        claimed.append(segment)
+                    else:
+                        journal.unlink()
+            except BlockingIOError:
+                live.add(owner)
+            except FileNotFoundError:
+                # 已被其他进程接管
+                continue
+
+        for segment in self.journal_dir.glob(self.SEGMENT_GLOB):
+            owner = segment.name.split(".")[1]
+            if owner == str(self.pid) or owner in live:
+                continue
+            target = self._segment_path()
+            with contextlib.suppress(FileNotFoundError):
+                segment.rename(target)
+                claimed.append(target)
+        return claimed
+
+    async def flush(self) -> int:
+        """
+        将缓冲的事件批量写入数据库
+
+        Returns:
+            实际写入的记录数
+        """
+        async with self._flush_lock:
+            if self._buffer:
+                # 缓冲和日志同步轮转（中间没有 await），两者始终对应
+                self._segments.append(self._rotate())
+                self._pending.extend(self._buffer)
+                self._buffer = []
+
+            if not self._pending:
+                return 0
+
+            from app.db.models.play_history import PlayHistory
+            from app.db.operations.play_history import PlayHistoryOper
+
+            try:
+                # 定时任务可能由请求创建，脱离请求的工作单元使用独立事务
+                with self.db_manager.detach():
+                    written = await PlayHistoryOper(PlayHistory, self.db_manager).record_batch(
+                        self._pending
+                    )
+            except Exception as e:
+                self.logger.error(f"写入播放记录失败，稍后重试: {len(self._pending)} 条, 错误: {e}")
+                return 0
+
+            for segment in self._segments:
+                segment.unlink(missing_ok=True)
+            self.logger.debug(f"写入播放记录: {written}/{len(self._pending)} 条")
+            self._segments = []
+            self._pending = []
+            return written
+
+    async def recover(self) -> int:
+        """
+        重放上次运行残留的日志
+
+        Returns:
+            实际写入的记录数
+        """
+        async with self._flush_lock:
+            if self._buffer or self.journal_path.stat().st_size:
+                self._segments.append(self._rotate())
+                self._buffer = []
+
+            claimed = self._claim_orphans()
+            if claimed:
+                self.logger.info(f"接管已退出进程的播放记录日志: {len(claimed)} 个")
+            # 本进程的日志段，包括同 pid 的上一次运行残留的日志段
+            segments = sorted(self.journal_dir.glob(f"journal.{self.pid}.*.seg"))
+            events = []
+            for segment in segments:
+                for line in segment.read_bytes().splitlines():
+                    # 崩溃时最后一行可能不完整
+                    with contextlib.suppress(ValueError):
+                        events.append(json.loads(line))
+            self._segments = segments
+            self._pending = events
+
+        if events:
+            self.logger.info(f"重放播放记录日志: {len(events)} 条")
+        return await self.flush()
+
+    async def close(self):
+        """停止定时写入，写入剩余事件并关闭日志"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        self._task = None
+        await self.flush()
+        self._journal.close()
+
+
+_recorder: PlayHistoryRecorder | None = None
+
+
+def get_play_history_recorder() -> PlayHistoryRecorder:
+    """获取全局播放记录器"""
+    global _recorder
+    if _recorder is None:
+        from app.core.config import settings
+
+        _recorder = PlayHistoryRecorder(
+            settings.cache_path / "play_history",
+            flush_interval=settings.play_history_flush_interval,
+            batch_size=settings.play_history_batch_size,
+        )
+    return _recorder
+
+
+async def close_play_history_recorder():
+    """关闭全局播放记录器"""
+    global _recorder
+
+    if _recorder is not None:
+        await _recorder.close()
+        _recorder = None
@@ -0,0 +1,332 @@
+"""
+播放队列模块
+紧凑存储曲目 ID，随机播放使用带种子的 Fisher–Yates 排列
+"""
+
+import random
+from array import array
+from collections.abc import Iterable
+from typing import Any
+
+# 曲目 ID 和排列使用 64 位整数数组，每个元素 8 字节
+TYPECODE = "q"
+
+REPEAT_OFF = "off"
+REPEAT_ONE = "one"
+REPEAT_ALL = "all"
+
+
+class PlayQueue:
+    """
+    播放队列
+
+    - tracks 按加入顺序保存曲目 ID（队列索引）
+    - 随机播放时 order 保存播放顺序到队列索引的排列，由种子确定，关闭随机播放后回到原顺序
+    - position 是当前在播放顺序中的位置，next/previous/jump 都是 O(1)
+    """
+
+    def __init__(
+        self,
+        track_ids: Iterable[int] = (),
+        position: int = -1,
+        seed: int | None = None,
+        order: Iterable[int] | None = None,
+    ):
+        """
+        初始化播放队列
+
+        Args:
+            track_ids: 曲目 ID 列表
+            position: 当前播放位置，-1 表示未开始
+            seed: 随机播放种子，None 表示顺序播放
+            order: 随机播放排列，不传时由种子生成
+        """
+        self.tracks = array(TYPECODE, track_ids)
+        self.position = position if -1 <= position < len(self.tracks) else -1
+        self.seed = seed
+        self._order: array | None = None
+        # 队列索引到播放位置的反向映射，jump 时按需生成
+        self._slots: array | None = None
+        # 曲目或排列每次修改递增（不含播放位置），用于判断是否需要重新保存队列内容
+        self.revision = 0
+
+        if seed is not None:
+            if order is not None:
+                self._order = array(TYPECODE, order)
+            else:
+                self._order = self._permutation(len(self.tracks), seed)
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PlayQueue):
+            return NotImplemented
+        return (
+            self.tracks == other.tracks
+            and self.position == other.position
+            and self.seed == other.seed
+            and self._order == other._order
+        )
+
+    def __repr__(self):
+        return f"<PlayQueue(size={len(self.tracks)}, position={self.position}, shuffled={self.shuffled})>"
+
+    @property
+    def shuffled(self) -> bool:
+        """是否随机播放"""
+        return self._order is not None
+
+    @property
+    def current_index(self) -> int:
+        """当前曲目的队列索引，未开始时为 -1"""
+        if self.position < 0:
+            return -1
+        return self._index_at(self.position)
+
+    @property
+    def current(self) -> int | None:
+        """当前曲目 ID"""
+        if self.position < 0:
+            return None
+        return self.tracks[self._index_at(self.position)]
+
+    def _index_at(self, position: int) -> int:
+        """播放位置对应的队列索引"""
+        return self._order[position] if self._order is not None else position
+
+    @staticmethod
+    def _permutation(size: int, seed: int, start: int = 0) -> array:
+        """
+        生成 [start, start + size) 的随机排列（Fisher–Yates）
+
+        Args:
+            size: 排列长度
+            seed: 随机种子，相同种子生成相同排列
+            start: 起始索引
+
+        Returns:
+            排列数组
+        """
+        order = array(TYPECODE, range(start, start + size))
+        rng = random.Random(seed)
+        for i in range(size - 1, 0, -1):
+            j = rng.randrange(i + 1)
+            order[i], order[j] = order[j], order[i]
+        return order
+
+    # ========== 导航 ==========
+
+    def peek(self, step: int = 1, repeat_mode: str = REPEAT_OFF, manual: bool = True) -> int | None:
+        """
+        计算相邻曲目的播放位置（不移动）
+
+        Args:
+            step: 1 表示下一首，-1 表示上一首
+            repeat_mode: 播放模式（off/one/all）
+            manual: 是否由用户切歌；单曲循环只在自动播放下一首时重复当前曲目
+
+        Returns:
+            播放位置，没有相邻曲目时返回 None
+        """
+        size = len(self.tracks)
+        if size == 0:
+            return None
+        if self.position < 0:
+            return 0 if step > 0 else None
+        if repeat_mode == REPEAT_ONE and not manual:
+            return self.position
+
+        position = self.position + step
+        if 0 <= position < size:
+            return position
+        # 单曲循环下手动切歌按列表循环处理
+        if repeat_mode in (REPEAT_ALL, REPEAT_ONE):
+            return position % size
+        return None
+
+    def track_at(self, position: int) -> int:
+        """
+        获取播放位置上的曲目 ID
+
+        Args:
+            position: 播放位置
+
+        Returns:
+            曲目 ID
+        """
+        return self.tracks[self._index_at(position)]
+
+    def next(self, repeat_mode: str = REPEAT_OFF, manual: bool = True) -> int | None:
+        """
+        移动到下一首
+
+        Args:
+            repeat_mode: 播放模式（off/one/all）
+            manual: 是否由用户切歌
+
+        Returns:
+            曲目 ID，没有下一首时返回 None（位置不变）
+        """
+        return self._move(self.peek(1, repeat_mode, manual))
+
+    def previous(self, repeat_mode: str = REPEAT_OFF) -> int | None:
+        """
+        移动到上一首（随机播放时回到上一首实际播放的曲目）
+
+        Args:
+            repeat_mode: 播放模式（off/one/all）
+
+        Returns:
+            曲目 ID，没有上一首时返回 None（位置不变）
+        """
+        return self._move(self.peek(-1, repeat_mode))
+
+    def _move(self, position: int | None) -> int | None:
+        """移动到指定播放位置"""
+        if position is None:
+            return None
+        self.position = position
+        return self.track_at(position)
+
+    def jump(self, index: int) -> int:
+        """
+        跳转到队列索引对应的曲目
+
+        Args:
+            index: 队列索引（加入顺序）
+
+        Returns:
+            曲目 ID
+
+        Raises:
+            IndexError: 索引越界
+        """
+        if not 0 <= index < len(self.tracks):
+            raise IndexError(f"队列索引越界: {index}")
+        if self._order is None:
+            self.position = index
+        else:
+            if self._slots is None:
+                self._slots = array(TYPECODE, bytes(len(self._order) * self._order.itemsize))
+                for position, track_index in enumerate(self._order):
+                    self._slots[track_index] = position
+            self.position = self._slots[index]
+        return self.tracks[index]
+
+    def index_of(self, track_id: int) -> int:
+        """
+        查找曲目第一次出现的队列索引
+
+        Args:
+            track_id: 曲目 ID
+
+        Returns:
+            队列索引，不存在时返回 -1
+        """
+        try:
+            return self.tracks.index(track_id)
+        except ValueError:
+            return -1
+
+    def window(self, start: int = 0, limit: int = 20) -> list[int]:
+        """
+        按播放顺序获取一段曲目 ID
+
+        Args:
+            start: 起始播放位置
+            limit: 返回数量
+
+        Returns:
+            曲目 ID 列表
+        """
+        start = max(start, 0)
+        end = min(start + max(limit, 0), len(self.tracks))
+        if self._order is None:
+            return self.tracks[start:end].tolist()
+        return [self.tracks[i] for i in self._order[start:end]]
+
+    # ========== 修改 ==========
+
+    def replace(self, track_ids: Iterable[int], position: int = -1):
+        """
+        替换队列内容，保持随机播放开关
+
+        Args:
+            track_ids: 曲目 ID 列表
+            position: 当前播放位置
+        """
+        shuffled = self.shuffled
+        self.tracks = array(TYPECODE, track_ids)
+        self.position = position if -1 <= position < len(self.tracks) else -1
+        self._order = None
+        self._slots = None
+        self.revision += 1
+        if shuffled:
+            self.shuffle()
+
+    def extend(self, track_ids: Iterable[int]):
+        """
+        追加曲目；随机播放时新曲目打乱后排在已有排列之后
+
+        Args:
+            track_ids: 曲目 ID 列表
+        """
+        start = len(self.tracks)
+        self.tracks.extend(track_ids)
+        self.revision += 1
+        if self._order is not None:
+            self._order.extend(
+                self._permutation(len(self.tracks) - start, self.seed + start, start)
+            )
+            self._slots = None
+
+    def clear(self):
+        """清空队列，保持随机播放开关"""
+        self.replace(())
+
+    def shuffle(self, seed: int | None = None):
+        """
+        开启随机播放；当前曲目排在排列第一位，其余曲目随机
+
+        Args:
+            seed: 随机种子，默认随机生成
+        """
+        current = self.current_index
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self._order = self._permutation(len(self.tracks), self.seed)
+        self._slots = None
+        self.revision += 1
+        if current >= 0:
+            slot = self._order.index(current)
+            self._order[0], self._order[slot] = self._order[slot], self._order[0]
+            self.position = 0
+
+    def unshuffle(self):
+        """关闭随机播放，回到当前曲目在原顺序中的位置"""
+        self.position = self.current_index
+        self.seed = None
+        self._order = None
+        self._slots = None
+        self.revision += 1
+
+    # ========== 序列化 ==========
+
+    def to_dict(self) -> dict[str, Any]:
+        """转换为字典"""
+        return {
+            "tracks": self.tracks.tolist(),
+            "position": self.position,
+            "seed": self.seed,
+            "order": self._order.tolist() if self._order is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "PlayQueue":
+        """从字典创建"""
+        return cls(
+            data.get("tracks", []),
+            position=data.get("position", -1),
+            seed=data.get("seed"),
+            order=data.get("order"),
+        )
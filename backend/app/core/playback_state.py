@@ -0,0 +1,480 @@
+"""
+播放状态存储模块
+按用户/设备保存播放会话和队列，内存热副本 + 批量写回共享存储
+"""
+
+import asyncio
+import contextlib
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.core.cache import CacheBackend
+from app.core.context import PlaybackSession
+from app.core.log import logger
+from app.core.play_queue import PlayQueue
+
+
+@dataclass
+class PlaybackState:
+    """
+    播放状态数据类
+    一个用户的一个设备对应一份状态
+    """
+
+    # 用户 ID
+    user_id: str | None = None
+
+    # 设备 ID
+    device_id: str | None = None
+
+    # 当前播放会话
+    session: PlaybackSession | None = None
+
+    # 播放队列
+    queue: PlayQueue = field(default_factory=PlayQueue)
+
+    # 版本号，每次写回共享存储递增
+    version: int = 0
+
+    # 队列内容的版本号（队列内容最后一次写回时的状态版本）
+    queue_version: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        """转换为字典"""
+        return {
+            "user_id": self.user_id,
+            "device_id": self.device_id,
+            "session": self.session.to_dict() if self.session else None,
+            "queue": self.queue.to_dict(),
+            "version": self.version,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "PlaybackState":
+        """从字典创建"""
+        session = data.get("session")
+        queue = data.get("queue") or {}
+        if isinstance(queue, list):
+            # 兼容旧格式：曲目 ID 列表 + current_index
+            queue = {"tracks": queue, "position": data.get("current_index", -1)}
+        return cls(
+            user_id=data.get("user_id"),
+            device_id=data.get("device_id"),
+            session=PlaybackSession(**session) if session else None,
+            queue=PlayQueue.from_dict(queue),
+            version=data.get("version", 0),
+        )
+
+    def to_header(self) -> dict[str, Any]:
+        """
+        转换为状态头
+
+        状态头只包含会话、播放位置和版本号，队列内容单独保存，
+        进度更新等频繁修改不需要重新序列化整个队列
+        """
+        return {
+            "user_id": self.user_id,
+            "device_id": self.device_id,
+            "session": self.session.to_dict() if self.session else None,
+            "position": self.queue.position,
+            "version": self.version,
+            "queue_version": self.queue_version,
+        }
+
+    @classmethod
+    def from_header(cls, header: dict[str, Any], queue: PlayQueue) -> "PlaybackState":
+        """从状态头和队列创建"""
+        session = header.get("session")
+        position = header.get("position", -1)
+        queue.position = position if -1 <= position < len(queue) else -1
+        return cls(
+            user_id=header.get("user_id"),
+            device_id=header.get("device_id"),
+            session=PlaybackSession(**session) if session else None,
+            queue=queue,
+            version=header.get("version", 0),
+            queue_version=header.get("queue_version", 0),
+        )
+
+
+class PlaybackStateStore:
+    """
+    播放状态存储
+
+    - 读取命中内存热副本时为 O(1) 字典查找，热副本超过 refresh_interval 后从共享存储刷新，
+      其他 worker 的修改在一个刷新周期内可见
+    - 同一用户/设备的修改通过 asyncio.Lock 串行化，只有实际发生修改时才标记为脏
+    - flush_interval 内的多次修改合并为一次写回；写回按版本号比较（CAS），
+      其他 worker 先写入时重新读取共享存储，再把本地修改过的字段应用上去
+    - 队列内容和状态头分开保存，只修改会话或播放位置时不重写队列
+    - 超过 idle_timeout 未访问的热副本和锁会被淘汰
+    """
+
+    KEY_PREFIX = "playback_state:"
+    QUEUE_PREFIX = "playback_queue:"
+
+    # 写回冲突时的最大重试次数，超过后留到下一次写回
+    MAX_WRITE_ATTEMPTS = 5
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        flush_interval: float = 0.5,
+        refresh_interval: float = 1.0,
+        ttl: int = 30 * 86400,
+        idle_timeout: float = 600,
+    ):
+        """
+        初始化播放状态存储
+
+        Args:
+            backend: 共享存储后端（Redis 或文件缓存）
+            flush_interval: 批量写回间隔（秒）
+            refresh_interval: 热副本刷新间隔（秒）
+            ttl: 状态在共享存储中的保留时间（秒）
+            idle_timeout: 热副本闲置淘汰时间（秒）
+        """
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.refresh_interval = refresh_interval
+        self.ttl = ttl
+        self.idle_timeout = idle_timeout
+        self.logger = logger
+        self._states: dict[str, PlaybackState] = {}
+        # 热副本最后一次与共享存储同步时的状态头和队列修订号，写回冲突时据此找出本地修改
+        self._synced: dict[str, tuple[dict[str, Any], int]] = {}
+        self._loaded_at: dict[str, float] = {}
+        self._accessed_at: dict[str, float] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._dirty: set[str] = set()
+        self._flush_task: asyncio.Task | None = None
+        self._evicted_at = time.monotonic()
+
+    @staticmethod
+    def make_key(user_id: str | None = None, device_id: str | None = None) -> str:
+        """
+        生成状态键
+
+        Args:
+            user_id: 用户 ID
+            device_id: 设备 ID
+
+        Returns:
+            状态键
+        """
+        return f"{user_id or 'anonymous'}:{device_id or 'default'}"
+
+    async def get(self, user_id: str | None = None, device_id: str | None = None) -> PlaybackState:
+        """
+        获取播放状态（只读，修改请使用 edit）
+
+        Args:
+            user_id: 用户 ID
+            device_id: 设备 ID
+
+        Returns:
+            播放状态
+        """
+        key = self.make_key(user_id, device_id)
+        lock = self._locks.get(key)
+        if lock is not None and lock.locked() and key in self._states:
+            # 正在修改或写回时不替换热副本，避免修改落在被替换的旧对象上
+            self._accessed_at[key] = time.monotonic()
+            return self._states[key]
+        return await self._load(key, user_id, device_id)
+
+    @contextlib.asynccontextmanager
+    async def edit(
+        self, user_id: str | None = None, device_id: str | None = None
+    ) -> AsyncIterator[PlaybackState]:
+        """
+        修改播放状态
+
+        持有该用户/设备的锁，退出时如有修改则标记为脏并安排批量写回
+
+        Args:
+            user_id: 用户 ID
+            device_id: 设备 ID
+
+        Yields:
+            播放状态
+        """
+        key = self.make_key(user_id, device_id)
+        async with self._lock(key):
+            state = await self._load(key, user_id, device_id)
+            header, revision = state.to_header(), state.queue.revision
+            try:
+                yield state
+            finally:
+                # 块内异常时热副本可能已部分修改，同样按是否修改决定写回，保持与共享存储一致
+                if state.queue.revision != revision or state.to_header() != header:
+                    self._dirty.add(key)
+                    self._schedule_flush()
+
+    def _lock(self, key: str) -> asyncio.Lock:
+        """获取用户/设备的锁"""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    async def _load(self, key: str, user_id: str | None, device_id: str | None) -> PlaybackState:
+        """加载状态，优先使用未过期或未写回的热副本"""
+        now = time.monotonic()
+        self._accessed_at[key] = now
+        self._evict_idle(now)
+
+        state = self._states.get(key)
+        if state is not None and (
+            key in self._dirty or now - self._loaded_at[key] < self.refresh_interval
+        ):
+            return state
+
+        stored = await self._fetch(key, user_id, device_id, state)
+        # 读取失败等情况下共享存储可能比热副本旧，不回退版本
+        if state is None or stored.version >= state.version:
+            self._set_synced(key, stored)
+            state = stored
+        self._loaded_at[key] = time.monotonic()
+        return state
+
+    async def _read(self, keys: list[str]) -> dict[str, Any]:
+        """读取共享存储，失败时按不存在处理"""
+        try:
+            return await self.backend.get_many(keys)
+        except Exception as e:
+            self.logger.error(f"读取播放状态失败: {keys[0]}, 错误: {e}")
+            return {}
+
+    async def _fetch(
+        self,
+        key: str,
+        user_id: str | None,
+        device_id: str | None,
+        current: PlaybackState | None = None,
+    ) -> PlaybackState:
+        """
+        从共享存储读取状态
+
+        Args:
+            key: 状态键
+            user_id: 用户 ID
+            device_id: 设备 ID
+            current: 与共享存储同步过的热副本，队列版本未变时沿用其队列，不重复读取队列内容
+
+        Returns:
+            播放状态
+        """
+        header_key, queue_key = self.KEY_PREFIX + key, self.QUEUE_PREFIX + key
+        header = (await self._read([header_key])).get(header_key)
+        if header is None:
+            return PlaybackState(user_id=user_id, device_id=device_id)
+
+        queue_version = header.get("queue_version", 0)
+        if current is not None and current.queue_version == queue_version:
+            queue = current.queue
+        elif queue_version == 0:
+            queue = PlayQueue()
+        else:
+            # 状态头和队列可能分两次读到不同版本（其他 worker 正在写入），不一致时重新读取
+            for _ in range(self.MAX_WRITE_ATTEMPTS):
+                data = await self._read([header_key, queue_key])
+                header = data.get(header_key) or header
+                queue_data = data.get(queue_key) or {}
+                if queue_data.get("version") == header.get("queue_version", 0):
+                    break
+            else:
+                self.logger.warning(f"播放队列与状态版本不一致: {key}")
+            queue = PlayQueue.from_dict(queue_data)
+        return PlaybackState.from_header(header, queue)
+
+    def _set_synced(self, key: str, state: PlaybackState):
+        """记录与共享存储一致的热副本"""
+        self._states[key] = state
+        self._synced[key] = (state.to_header(), state.queue.revision)
+
+    def _evict_idle(self, now: float):
+        """淘汰闲置的热副本和锁（未写回或正在使用的保留）"""
+        if now - self._evicted_at < self.idle_timeout:
+            return
+        self._evicted_at = now
+
+        for key, accessed_at in list(self._accessed_at.items()):
+            lock = self._locks.get(key)
+            if (
+                now - accessed_at < self.idle_timeout
+                or key in self._dirty
+                or (lock is not None and lock.locked())
+            ):
+                continue
+            for mapping in (self._states, self._synced, self._loaded_at, self._locks):
+                mapping.pop(key, None)
+            del self._accessed_at[key]
+
+    def _schedule_flush(self):
+        """安排一次延迟写回"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        """每个写回间隔写回一次，直到没有脏状态"""
+        while self._dirty:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """将所有脏状态写回共享存储（不同用户/设备并发写回）"""
+        if not self._dirty:
+            return
+
+        keys, self._dirty = self._dirty, set()
+        results = await asyncio.gather(*(self._flush_key(key) for key in keys))
+        self.logger.debug(f"写回播放状态: {sum(results)} 条")
+
+    async def _flush_key(self, key: str) -> bool:
+        """写回单个状态，失败时保留为脏状态"""
+        async with self._lock(key):
+            try:
+                if await self._write(key):
+                    return True
+            except asyncio.CancelledError:
+                self._dirty.add(key)
+                raise
+            except Exception as e:
+                self.logger.error(f"写回播放状态失败: {key}, 错误: {e}")
+            self._dirty.add(key)
+            return False
+
+    async def _write(self, key: str) -> bool:
+        """
+        按版本号比较写回状态
+
+        共享存储的版本与热副本的版本不同时说明其他 worker 已写入，
+        重新读取后把本地修改过的字段应用到最新状态上再写回
+
+        Args:
+            key: 状态键
+
+        Returns:
+            是否写回成功
+        """
+        state = self._states[key]
+        synced_header, synced_revision = self._synced[key]
+        header_key, queue_key = self.KEY_PREFIX + key, self.QUEUE_PREFIX + key
+
+        for _ in range(self.MAX_WRITE_ATTEMPTS):
+            queue_changed = state.queue.revision != synced_revision
+            header = state.to_header()
+            if not queue_changed and header == synced_header:
+                return True
+
+            version = state.version + 1
+            header["version"] = version
+            items = {}
+            if queue_changed:
+                # 队列先于状态头写入，其他 worker 不会读到指向不存在队列的状态头
+                header["queue_version"] = version
+                items[queue_key] = {**state.queue.to_dict(), "version": version}
+            items[header_key] = header
+
+            if await self.backend.set_if_version(header_key, state.version, items, ttl=self.ttl):
+                state.version = version
+                if queue_changed:
+                    state.queue_version = version
+                self._set_synced(key, state)
+                self._loaded_at[key] = time.monotonic()
+                return True
+
+            self.logger.debug(f"播放状态写回冲突，合并后重试: {key}")
+            latest = await self._fetch(key, state.user_id, state.device_id)
+            latest_header, latest_revision = latest.to_header(), latest.queue.revision
+            self._merge(latest, state, synced_header, queue_changed)
+            # 合并后以最新状态为同步基准，本地修改过的队列仍需写回
+            synced_header = latest_header
+            synced_revision = -1 if queue_changed else latest_revision
+            state = latest
+
+        self.logger.warning(f"播放状态写回冲突次数过多，稍后重试: {key}")
+        return False
+
+    @staticmethod
+    def _merge(
+        latest: PlaybackState,
+        local: PlaybackState,
+        base: dict[str, Any],
+        queue_changed: bool,
+    ):
+        """
+        将本地相对上次同步的修改应用到最新状态（同一字段以本地为准）
+
+        Args:
+            latest: 共享存储中的最新状态
+            local: 本地修改后的状态
+            base: 本地上次同步时的状态头
+            queue_changed: 本地是否修改了队列内容
+        """
+        if queue_changed:
+            latest.queue = local.queue
+        elif local.queue.position != base["position"] and local.queue.position < len(latest.queue):
+            latest.queue.position = local.queue.position
+
+        session = local.session.to_dict() if local.session else None
+        base_session = base["session"]
+        if session == base_session:
+            return
+        if (
+            session is None
+            or base_session is None
+            or latest.session is None
+            or latest.session.session_id != local.session.session_id
+        ):
+            latest.session = local.session
+            return
+        for name, value in session.items():
+            if value != base_session.get(name):
+                setattr(latest.session, name, value)
+
+    async def close(self):
+        """停止定时写回并写回剩余状态"""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flush_task
+        self._flush_task = None
+        await self.flush()
+
+
+_store: PlaybackStateStore | None = None
+
+
+def get_playback_state_store() -> PlaybackStateStore:
+    """
+    获取全局播放状态存储
+
+    配置了 Redis 时多个 worker 共享状态，否则写入本地文件缓存（关闭内存层，同机 worker 共享）
+    """
+    global _store
+    if _store is None:
+        from app.core.cache import FileCache, FileCacheBackend, get_default_cache_backend
+        from app.core.config import settings
+
+        backend = get_default_cache_backend() or FileCacheBackend(
+            FileCache(settings.cache_path / "playback", memory_max_bytes=0)
+        )
+        _store = PlaybackStateStore(
+            backend,
+            flush_interval=settings.playback_state_flush_interval,
+            refresh_interval=settings.playback_state_refresh_interval,
+        )
+    return _store
+
+
+async def close_playback_state_store():
+    """关闭全局播放状态存储"""
+    global _store
+
+    if _store is not None:
+        await _store.close()
+        _store = None
@@ -0,0 +1,158 @@
+"""
+进度上报模块
+位于下载器和事件总线之间，按任务节流进度更新
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from app.core.config import settings
+from app.core.event import EventManager, EventType, event_bus
+from app.core.log import logger
+
+
+class ProgressReporter:
+    """
+    进度上报器
+
+    - 每个任务的进度更新最多每秒 rate 次，其余更新直接丢弃，只需一次时钟读取
+    - 事件数据可以传入函数，只有真正上报时才构建
+    - 最终更新（完成/失败）不受节流限制，并清理该任务的节流状态；
+      通过 update 上报的最终更新每个任务只上报一次，轮询已完成的任务不会重复发送
+    """
+
+    # 记录已上报最终更新的任务数上限，超出时遗忘最早完成的任务
+    MAX_FINISHED = 10000
+
+    def __init__(
+        self,
+        rate: float | None = None,
+        bus: EventManager | None = None,
+        event_type: str = EventType.DownloadProgress,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初始化进度上报器
+
+        Args:
+            rate: 每个任务每秒最多上报次数，默认使用配置
+            bus: 事件总线，默认使用全局实例
+            event_type: 上报的事件类型
+            clock: 时钟函数（测试用）
+        """
+        self.interval = 1 / (rate or settings.progress_report_rate)
+        self.bus = bus or event_bus
+        self.event_type = event_type
+        self.clock = clock
+        self.logger = logger
+        # 任务 ID -> 下次允许上报的时间
+        self._next_report: dict[str, float] = {}
+        # 已上报最终更新的任务 ID
+        self._finished: OrderedDict[str, None] = OrderedDict()
+
+    def update(
+        self,
+        task_id: str,
+        data: dict[str, Any] | Callable[[], dict[str, Any]],
+        final: bool = False,
+    ) -> bool:
+        """
+        上报进度
+
+        Args:
+            task_id: 任务 ID
+            data: 事件数据，或构建事件数据的函数
+            final: 是否为最终更新（不受节流限制，任务再次有非最终更新之前只上报一次）
+
+        Returns:
+            是否上报
+        """
+        if final:
+            if task_id in self._finished:
+                return False
+            self._finished[task_id] = None
+            if len(self._finished) > self.MAX_FINISHED:
+                self._finished.popitem(last=False)
+        else:
+            self._finished.pop(task_id, None)
+
+        if not self._due(task_id, final):
+            return False
+        self.bus.publish_nowait(self.event_type, data() if callable(data) else data)
+        return True
+
+    def _due(self, task_id: str, final: bool) -> bool:
+        """
+        判断是否应该上报，并记录下次允许上报的时间
+
+        Args:
+            task_id: 任务 ID
+            final: 是否为最终更新
+
+        Returns:
+            是否应该上报
+        """
+        if final:
+            self._next_report.pop(task_id, None)
+            return True
+
+        now = self.clock()
+        if now < self._next_report.get(task_id, 0.0):
+            return False
+        self._next_report[task_id] = now + self.interval
+        return True
+
+    def throttle(
+        self,
+        callback: Callable[[Any], Any] | None,
+        task_id: str,
+        data: Callable[[Any], dict[str, Any]],
+        is_final: Callable[[Any], bool],
+    ) -> Callable[[Any], None]:
+        """
+        包装下载器的进度回调：节流后调用原回调并发送进度事件
+
+        Args:
+            callback: 原进度回调，可以为 None
+            task_id: 任务 ID
+            data: 根据回调参数构建事件数据
+            is_final: 根据回调参数判断是否为最终更新
+
+        Returns:
+            节流后的回调
+        """
+
+        def report(value: Any):
+            if not self._due(task_id, is_final(value)):
+                return
+            self.bus.publish_nowait(self.event_type, data(value))
+            if callback:
+                try:
+                    callback(value)
+                except Exception as e:
+                    self.logger.error(f"进度回调执行失败: {task_id}, 错误: {e}")
+
+        return report
+
+    def discard(self, task_id: str):
+        """
+        清理任务的节流状态（任务被取消、出错、删除或不再上报时调用）
+
+        Args:
+            task_id: 任务 ID
+        """
+        self._next_report.pop(task_id, None)
+        self._finished.pop(task_id, None)
+
+
+_reporter: ProgressReporter | None = None
+
+
+def get_progress_reporter() -> ProgressReporter:
+    """获取全局下载进度上报器"""
+    global _reporter
+    if _reporter is None:
+        _reporter = ProgressReporter()
+    return _reporter
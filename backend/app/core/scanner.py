@@ -0,0 +1,395 @@
+"""
+音乐库扫描模块
+提供流式的目录遍历、并行元数据解析和批量入库流水线
+"""
+
+import asyncio
+import multiprocessing
+import os
+from collections.abc import Awaitable, Callable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+from app.core.context import MusicInfo
+from app.core.log import logger
+from app.core.meta import MetadataParser, filename_parser, metadata_parser
+
+# 扫描结果：(文件路径, 本地元数据, 文件名元数据)
+ParsedFile = tuple[str, MusicInfo | None, MusicInfo]
+
+# 批量处理回调：接收一批解析结果，返回每个文件的处理结果（含 success 字段）
+BatchHandler = Callable[[list[ParsedFile]], Awaitable[list[dict[str, Any]]]]
+
+# 已入库文件状态：路径 -> (文件大小, 修改时间)
+KnownFiles = dict[str, tuple[int | None, float | None]]
+
+MUSIC_EXTENSIONS = frozenset(MetadataParser.SUPPORTED_FORMATS)
+
+
+def iter_music_entries(
+    directory: str | Path, recursive: bool = True, failed: list[str] | None = None
+) -> Iterator[os.DirEntry]:
+    """
+    遍历目录，逐个产出音乐文件的目录项
+
+    使用 os.scandir，目录项类型来自 readdir，不需要对每个文件单独 stat
+
+    Args:
+        directory: 目录路径
+        recursive: 是否递归扫描
+        failed: 传入时收集读取失败的目录和目录项路径（其下的文件未被遍历到）
+
+    Yields:
+        音乐文件目录项
+    """
+    stack = [str(directory)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                stack.append(entry.path)
+                        elif entry.is_file() and (
+                            os.path.splitext(entry.name)[1].lower() in MUSIC_EXTENSIONS
+                        ):
+                            yield entry
+                    except OSError as e:
+                        logger.warning(f"读取目录项失败: {entry.path}, 错误: {e}")
+                        if failed is not None:
+                            failed.append(entry.path)
+        except OSError as e:
+            logger.warning(f"读取目录失败: {current}, 错误: {e}")
+            if failed is not None:
+                failed.append(current)
+
+
+def iter_music_files(directory: str | Path, recursive: bool = True) -> Iterator[str]:
+    """
+    遍历目录，逐个产出音乐文件路径
+
+    Args:
+        directory: 目录路径
+        recursive: 是否递归扫描
+
+    Yields:
+        音乐文件路径
+    """
+    for entry in iter_music_entries(directory, recursive):
+        yield entry.path
+
+
+def is_file_changed(known: tuple[int | None, float | None] | None, size: int, mtime: float) -> bool:
+    """
+    根据文件大小和修改时间判断文件是否变化
+
+    Args:
+        known: 数据库中记录的 (文件大小, 修改时间)，None 表示新文件
+        size: 当前文件大小
+        mtime: 当前修改时间戳
+
+    Returns:
+        是否需要重新解析
+    """
+    if known is None:
+        return True
+    known_size, known_mtime = known
+    if known_size != size or known_mtime is None:
+        return True
+    # 数据库浮点精度不同，允许 1ms 误差
+    return abs(known_mtime - mtime) > 0.001
+
+
+def is_covered(path: str, directory: str, recursive: bool, failed: list[str] | None = None) -> bool:
+    """
+    判断文件是否在一次遍历的覆盖范围内（未遍历到即可认为已删除）
+
+    Args:
+        path: 文件路径
+        directory: 遍历的根目录
+        recursive: 是否递归遍历
+        failed: 读取失败的目录和目录项路径
+
+    Returns:
+        非递归时只覆盖根目录下的文件，读取失败的目录下的文件不在覆盖范围内
+    """
+    parent = os.path.dirname(path)
+    if not recursive and os.path.normpath(parent) != os.path.normpath(directory):
+        return False
+    return not any(
+        path == prefix or path.startswith(os.path.join(prefix, "")) for prefix in failed or ()
+    )
+
+
+def parse_files(file_paths: list[str]) -> list[ParsedFile]:
+    """
+    解析一组音乐文件（在子进程中执行）
+
+    Args:
+        file_paths: 文件路径列表
+
+    Returns:
+        解析结果列表
+    """
+    results = []
+    for file_path in file_paths:
+        path = Path(file_path)
+        local_metadata = metadata_parser.parse_file(path)
+        if local_metadata:
+            local_metadata.file_mtime = path.stat().st_mtime
+        results.append((file_path, local_metadata, filename_parser.parse(path)))
+    return results
+
+
+# 全局解析进程池
+_parse_executor: ProcessPoolExecutor | None = None
+
+
+def get_parse_executor() -> ProcessPoolExecutor:
+    """
+    获取全局解析进程池，所有扫描共用，应用关闭时释放
+
+    子进程通过 forkserver（不支持时为 spawn）启动，不从运行中的服务进程 fork，
+    不会继承事件循环、数据库连接和其他线程持有的锁
+    """
+    global _parse_executor
+    if _parse_executor is None:
+        start_method = (
+            "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        )
+        _parse_executor = ProcessPoolExecutor(
+            max(1, settings.scan_workers), mp_context=multiprocessing.get_context(start_method)
+        )
+    return _parse_executor
+
+
+def close_parse_executor():
+    """关闭全局解析进程池"""
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=False, cancel_futures=True)
+        _parse_executor = None
+
+
+class LibraryScanner:
+    """
+    音乐库扫描流水线
+
+    遍历 -> 解析 -> 入库 三个阶段通过有界队列连接：
+    - 遍历在线程池中进行，按块产出路径
+    - 解析在进程池中并行执行 MetadataParser.parse_file
+    - 入库按批调用处理回调
+    下游处理不过来时，有界队列会让上游阶段等待
+
+    传入已入库文件状态时为增量扫描：大小和修改时间都未变的文件在遍历阶段直接跳过，
+    遍历结束后未出现的文件交给 handle_missing 处理（只处理本次遍历覆盖的文件：
+    非递归扫描时不处理子目录中的文件，读取失败的目录下的文件也不处理）
+    """
+
+    def __init__(
+        self,
+        parse_workers: int = 4,
+        batch_size: int = 200,
+        chunk_size: int = 64,
+        queue_size: int = 16,
+        executor: Executor | None = None,
+    ):
+        """
+        初始化扫描流水线
+
+        Args:
+            parse_workers: 解析进程数
+            batch_size: 每批入库的文件数
+            chunk_size: 每次提交给解析进程的文件数
+            queue_size: 阶段之间队列的最大块数
+            executor: 解析用执行器，默认使用全局解析进程池
+        """
+        self.parse_workers = max(1, parse_workers)
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+        self.executor = executor
+        self.logger = logger
+
+    async def scan(
+        self,
+        directory: str | Path,
+        handle_batch: BatchHandler,
+        recursive: bool = True,
+        progress: dict[str, Any] | None = None,
+        known_files: KnownFiles | None = None,
+        handle_missing: Callable[[list[str]], Awaitable[Any]] | None = None,
+    ) -> dict[str, Any]:
+        """
+        扫描目录并分批处理
+
+        Args:
+            directory: 目录路径
+            handle_batch: 批量处理回调
+            recursive: 是否递归扫描
+            progress: 进度字典，扫描过程中实时更新 total/processed/success/failed
+            known_files: 已入库文件状态，传入时只处理新增或变化的文件
+            handle_missing: 增量扫描时处理已不存在文件的回调
+
+        Returns:
+            进度字典
+        """
+        progress = progress if progress is not None else {}
+        progress.update(
+            {
+                "status": "scanning",
+                "total": 0,
+                "processed": 0,
+                "success": 0,
+                "failed": 0,
+                "skipped": 0,
+                "missing": 0,
+            }
+        )
+
+        if not Path(directory).exists():
+            self.logger.warning(f"目录不存在: {directory}")
+            progress["status"] = "completed"
+            return progress
+
+        failed: list[str] = []
+        path_queue: asyncio.Queue[list[str] | None] = asyncio.Queue(self.queue_size)
+        parsed_queue: asyncio.Queue[list[ParsedFile] | None] = asyncio.Queue(self.queue_size)
+
+        executor = self.executor or get_parse_executor()
+        async with asyncio.TaskGroup() as group:
+            walker = group.create_task(
+                self._walk(directory, recursive, path_queue, progress, known_files, failed)
+            )
+            parsers = [
+                group.create_task(self._parse(executor, path_queue, parsed_queue))
+                for _ in range(self.parse_workers)
+            ]
+            group.create_task(self._write(parsed_queue, handle_batch, progress))
+
+            await asyncio.gather(*parsers)
+            await parsed_queue.put(None)
+
+        # 增量扫描：数据库中有记录但本次未遍历到的文件
+        if known_files is not None:
+            seen = walker.result()
+            missing = [
+                path
+                for path in known_files
+                if path not in seen and is_covered(path, str(directory), recursive, failed)
+            ]
+            progress["missing"] = len(missing)
+            if missing and handle_missing:
+                await handle_missing(missing)
+
+        progress["status"] = "completed"
+        self.logger.info(
+            f"扫描完成: {directory}, 共 {progress['total']} 个文件, "
+            f"{progress['success']} 成功, {progress['failed']} 失败"
+        )
+        return progress
+
+    async def _walk(
+        self,
+        directory: str | Path,
+        recursive: bool,
+        path_queue: asyncio.Queue,
+        progress: dict[str, Any],
+        known_files: KnownFiles | None = None,
+        failed: list[str] | None = None,
+    ) -> set[str]:
+        """遍历阶段：在线程池中按块读取路径，返回遍历到的所有路径"""
+        loop = asyncio.get_running_loop()
+        entries = iter_music_entries(directory, recursive, failed)
+        seen: set[str] = set()
+
+        def next_chunk() -> tuple[list[str], int, bool]:
+            """读取下一块需要解析的路径，返回 (路径列表, 跳过数量, 是否遍历完毕)"""
+            chunk, skipped = [], 0
+            # 跳过的文件也计入读取量，保证进度能定期更新
+            while len(chunk) + skipped // 16 < self.chunk_size:
+                batch = list(islice(entries, self.chunk_size))
+                if not batch:
+                    return chunk, skipped, True
+                for entry in batch:
+                    seen.add(entry.path)
+                    if known_files is not None:
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        if not is_file_changed(
+                            known_files.get(entry.path), stat.st_size, stat.st_mtime
+                        ):
+                            skipped += 1
+                            continue
+                    chunk.append(entry.path)
+            return chunk, skipped, False
+
+        done = False
+        while not done:
+            chunk, skipped, done = await loop.run_in_executor(None, next_chunk)
+            progress["skipped"] += skipped
+            if chunk:
+                progress["total"] += len(chunk)
+                await path_queue.put(chunk)
+
+        for _ in range(self.parse_workers):
+            await path_queue.put(None)
+
+        return seen
+
+    async def _parse(
+        self, executor: Executor, path_queue: asyncio.Queue, parsed_queue: asyncio.Queue
+    ):
+        """解析阶段：把路径块提交给执行器"""
+        loop = asyncio.get_running_loop()
+        while (chunk := await path_queue.get()) is not None:
+            try:
+                parsed = await loop.run_in_executor(executor, parse_files, chunk)
+            except BrokenProcessPool as e:
+                # 子进程异常退出后进程池不可再用，丢弃全局进程池，下次扫描重新创建
+                self.logger.error(f"解析进程池已失效: {e}")
+                if executor is _parse_executor:
+                    close_parse_executor()
+                parsed = [(path, None, filename_parser.parse(Path(path))) for path in chunk]
+            except Exception as e:
+                self.logger.error(f"解析文件失败: {e}")
+                parsed = [(path, None, filename_parser.parse(Path(path))) for path in chunk]
+            await parsed_queue.put(parsed)
+
+    async def _write(
+        self, parsed_queue: asyncio.Queue, handle_batch: BatchHandler, progress: dict[str, Any]
+    ):
+        """入库阶段：攒够一批后调用处理回调"""
+        batch: list[ParsedFile] = []
+        while (parsed := await parsed_queue.get()) is not None:
+            batch.extend(parsed)
+            if len(batch) >= self.batch_size:
+                await self._flush(batch, handle_batch, progress)
+                batch = []
+
+        if batch:
+            await self._flush(batch, handle_batch, progress)
+
+    async def _flush(
+        self, batch: list[ParsedFile], handle_batch: BatchHandler, progress: dict[str, Any]
+    ):
+        """处理一批文件并更新进度"""
+        try:
+            results = await handle_batch(batch)
+            success = sum(1 for result in results if result.get("success"))
+        except Exception as e:
+            self.logger.error(f"批量入库失败: {e}")
+            success = 0
+
+        progress["processed"] += len(batch)
+        progress["success"] += success
+        progress["failed"] += len(batch) - success
+        self.logger.info(f"扫描进度: {progress['processed']}/{progress['total']}")
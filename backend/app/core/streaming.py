@@ -0,0 +1,352 @@
+"""
+文件流式传输模块
+提供 Range / 条件请求处理和内存占用有界的文件响应
+"""
+
+import asyncio
+import os
+import secrets
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import quote
+
+import aiofiles
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# 单个请求最多返回的区间数，超出时忽略 Range 返回完整文件
+MAX_RANGES = 16
+
+
+class RangeNotSatisfiableError(Exception):
+    """请求的区间都不在文件范围内"""
+
+
+def parse_range_header(range_header: str | None, file_size: int) -> list[tuple[int, int]] | None:
+    """
+    解析 Range 请求头
+
+    支持 "bytes=0-1023"、"bytes=1024-"、"bytes=-500" 以及逗号分隔的多个区间，
+    重叠或相邻的区间会被合并
+
+    Args:
+        range_header: Range 请求头
+        file_size: 文件总大小
+
+    Returns:
+        (start, end) 闭区间列表；请求头缺失、格式无效或区间过多时返回 None（返回完整文件）
+
+    Raises:
+        RangeNotSatisfiableError: 区间都不在文件范围内
+    """
+    if not range_header:
+        return None
+
+    unit, _, specs = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs:
+        return None
+
+    ranges = []
+    for spec in specs.split(","):
+        first, sep, last = spec.strip().partition("-")
+        if not sep:
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else max(start, file_size - 1)
+                if end < start:
+                    return None
+            else:
+                # 后缀区间：最后 N 个字节
+                suffix = int(last)
+                if suffix == 0:
+                    continue
+                start, end = max(0, file_size - suffix), file_size - 1
+        except ValueError:
+            return None
+        if start < 0 or start >= file_size:
+            continue
+        ranges.append((start, min(end, file_size - 1)))
+
+    if not ranges:
+        raise RangeNotSatisfiableError()
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+
+    return merged if len(merged) <= MAX_RANGES else None
+
+
+def content_disposition(disposition: str, filename: str) -> str:
+    """
+    生成 Content-Disposition 响应头
+
+    响应头只能是 latin-1，中文文件名通过 RFC 5987 的 filename* 传递
+
+    Args:
+        disposition: inline 或 attachment
+        filename: 文件名
+
+    Returns:
+        响应头的值
+    """
+    ascii_name = filename.encode("ascii", "replace").decode("ascii").replace('"', "'")
+    return f"{disposition}; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def make_etag(stat_result: os.stat_result) -> str:
+    """根据修改时间和大小生成强 ETag"""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def _parse_http_date(value: str) -> int | None:
+    """解析 HTTP 日期为时间戳（秒）"""
+    try:
+        return int(parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def is_not_modified(request_headers, etag: str, mtime: float) -> bool:
+    """
+    判断条件请求是否可以返回 304
+
+    Args:
+        request_headers: 请求头
+        etag: 当前 ETag
+        mtime: 文件修改时间
+
+    Returns:
+        是否未修改
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match 使用弱比较，存在时忽略 If-Modified-Since
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        since = _parse_http_date(if_modified_since)
+        return since is not None and int(mtime) <= since
+    return False
+
+
+def if_range_matches(if_range: str | None, etag: str, mtime: float) -> bool:
+    """
+    判断 If-Range 是否仍然有效（无效时忽略 Range 返回完整文件）
+
+    Args:
+        if_range: If-Range 请求头
+        etag: 当前 ETag
+        mtime: 文件修改时间
+
+    Returns:
+        是否可以按 Range 返回部分内容
+    """
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith(('"', "W/")):
+        # If-Range 要求强比较，弱 ETag 永远不匹配
+        return if_range == etag
+    return _parse_http_date(if_range) == int(mtime)
+
+
+class FileRangeResponse(Response):
+    """
+    文件区间响应
+
+    按固定大小的块读取文件并发送，每个连接只占用一个块的内存：
+    - 服务器支持 http.response.zerocopysend 扩展时，单区间使用 sendfile 零拷贝发送
+    - 服务器支持 http.response.pathsend 扩展时，完整文件交给服务器发送
+    - 多区间返回 multipart/byteranges
+    客户端断开后立即停止读取
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        path: str | Path,
+        stat_result: os.stat_result,
+        media_type: str,
+        ranges: list[tuple[int, int]] | None = None,
+        headers: dict[str, str] | None = None,
+    ):
+        """
+        初始化文件区间响应
+
+        Args:
+            path: 文件路径
+            stat_result: 文件状态
+            media_type: MIME 类型
+            ranges: 要返回的区间，None 表示完整文件
+            headers: 额外的响应头
+        """
+        self.path = path
+        self.file_size = stat_result.st_size
+        self.ranges = ranges
+        self.media_type = media_type
+        self.background = None
+        self.status_code = 206 if ranges else 200
+        self.boundary = secrets.token_hex(12) if ranges and len(ranges) > 1 else None
+
+        response_headers = {
+            "accept-ranges": "bytes",
+            "etag": make_etag(stat_result),
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+            **(headers or {}),
+        }
+        if self.boundary:
+            self._parts = [
+                (
+                    (
+                        f"--{self.boundary}\r\nContent-Type: {media_type}\r\n"
+                        f"Content-Range: bytes {start}-{end}/{self.file_size}\r\n\r\n"
+                    ).encode("latin-1"),
+                    start,
+                    end,
+                )
+                for start, end in ranges
+            ]
+            self._closing = f"--{self.boundary}--\r\n".encode("latin-1")
+            content_length = sum(
+                len(header) + end - start + 1 + 2 for header, start, end in self._parts
+            ) + len(self._closing)
+            response_headers["content-type"] = f"multipart/byteranges; boundary={self.boundary}"
+        elif ranges:
+            start, end = ranges[0]
+            content_length = end - start + 1
+            response_headers["content-range"] = f"bytes {start}-{end}/{self.file_size}"
+            response_headers["content-type"] = media_type
+        else:
+            content_length = self.file_size
+            response_headers["content-type"] = media_type
+        response_headers["content-length"] = str(content_length)
+
+        self.init_headers(response_headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if not self.ranges and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+
+        body = asyncio.create_task(self._send_body(send, extensions))
+        disconnect = asyncio.create_task(self._wait_disconnect(receive))
+        done, pending = await asyncio.wait({body, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if body in done:
+            body.result()
+
+    async def _wait_disconnect(self, receive: Receive) -> None:
+        """等待客户端断开"""
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def _send_body(self, send: Send, extensions: dict) -> None:
+        """发送响应体"""
+        if self.boundary:
+            async with aiofiles.open(self.path, "rb") as f:
+                for header, start, end in self._parts:
+                    await send({"type": "http.response.body", "body": header, "more_body": True})
+                    await self._send_range(f, send, start, end)
+                    await send({"type": "http.response.body", "body": b"\r\n", "more_body": True})
+            await send({"type": "http.response.body", "body": self._closing})
+            return
+
+        start, end = self.ranges[0] if self.ranges else (0, self.file_size - 1)
+        if "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as f:
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": f.fileno(),
+                        "offset": start,
+                        "count": end - start + 1,
+                    }
+                )
+            return
+
+        async with aiofiles.open(self.path, "rb") as f:
+            await self._send_range(f, send, start, end)
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _send_range(self, f, send: Send, start: int, end: int) -> None:
+        """分块发送文件的 [start, end] 区间"""
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await f.read(min(self.chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+
+def file_response(
+    request: Request,
+    path: str | Path,
+    media_type: str,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """
+    根据请求头构造文件响应
+
+    处理 If-None-Match / If-Modified-Since（304）、If-Range 和 Range（206/416）
+
+    Args:
+        request: 请求对象
+        path: 文件路径
+        media_type: MIME 类型
+        headers: 额外的响应头
+
+    Returns:
+        响应对象
+
+    Raises:
+        FileNotFoundError: 文件不存在
+    """
+    stat_result = os.stat(path)
+    etag = make_etag(stat_result)
+    validators = {
+        "etag": etag,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+    }
+
+    if is_not_modified(request.headers, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=validators)
+
+    ranges = None
+    if if_range_matches(request.headers.get("if-range"), etag, stat_result.st_mtime):
+        try:
+            ranges = parse_range_header(request.headers.get("range"), stat_result.st_size)
+        except RangeNotSatisfiableError:
+            return Response(
+                status_code=416,
+                headers={"content-range": f"bytes */{stat_result.st_size}", **validators},
+            )
+
+    return FileRangeResponse(path, stat_result, media_type, ranges=ranges, headers=headers)
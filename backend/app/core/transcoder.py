@@ -0,0 +1,280 @@
+"""
+音频转码模块
+基于 ffmpeg 的边转码边输出，完整转码结果写入 LRU 磁盘缓存
+"""
+
+import asyncio
+import contextlib
+import os
+import tempfile
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.core.log import logger
+
+# 目标格式 -> (ffmpeg 编码器, 容器格式, MIME 类型)，容器都可以流式输出
+TRANSCODE_FORMATS: dict[str, tuple[str, str, str]] = {
+    "mp3": ("libmp3lame", "mp3", "audio/mpeg"),
+    "opus": ("libopus", "ogg", "audio/ogg"),
+    "aac": ("aac", "adts", "audio/aac"),
+}
+
+
+class TranscodeError(Exception):
+    """转码失败"""
+
+
+class TranscodeStream:
+    """
+    一次转码的输出流
+
+    占用转码池的一个名额直到流结束或关闭；
+    从头转码且完整读完时，结果写入缓存
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        transcoder: "Transcoder",
+        process: asyncio.subprocess.Process,
+        cache_path: Path | None,
+    ):
+        self._transcoder = transcoder
+        self._process = process
+        self._cache_path = cache_path
+        self._part_file = None
+        self._part_path: Path | None = None
+        self._closed = False
+
+        if cache_path:
+            fd, part = tempfile.mkstemp(dir=cache_path.parent, suffix=".part")
+            self._part_file = os.fdopen(fd, "wb")
+            self._part_path = Path(part)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            while chunk := await self._process.stdout.read(self.chunk_size):
+                if self._part_file:
+                    # 磁盘写入放到线程中，避免阻塞事件循环
+                    await asyncio.to_thread(self._part_file.write, chunk)
+                yield chunk
+            if await self._process.wait() != 0:
+                logger.warning(f"转码进程异常退出: {self._process.returncode}")
+            elif self._part_file:
+                # 正常结束时不会被取消，写入缓存和淘汰放到线程中执行
+                await asyncio.to_thread(self._save)
+        finally:
+            # 客户端断开时这里处于取消状态，清理过程不能再 await
+            self._finish()
+
+    async def aclose(self) -> None:
+        """关闭流（客户端断开时终止转码）"""
+        self._finish()
+
+    def _finish(self) -> None:
+        """结束转码，未写入缓存的临时文件直接删除"""
+        if self._closed:
+            return
+        self._closed = True
+
+        if self._process.returncode is None:
+            with contextlib.suppress(ProcessLookupError):
+                self._process.kill()
+
+        if self._part_file:
+            self._part_file.close()
+            self._part_path.unlink(missing_ok=True)
+
+        self._transcoder.release()
+
+    def _save(self) -> None:
+        """将完整的转码结果写入缓存"""
+        part_file, self._part_file = self._part_file, None
+        part_file.close()
+        os.replace(self._part_path, self._cache_path)
+        self._transcoder.evict()
+
+
+class TranscodeResponse(StreamingResponse):
+    """
+    转码流响应
+
+    无论响应是否开始发送（客户端可能在响应头发出前断开，此时既不会迭代响应体，
+    也不会执行后台任务），结束时都会关闭转码流，释放转码名额并终止 ffmpeg
+    """
+
+    def __init__(self, stream: TranscodeStream, **kwargs):
+        super().__init__(stream, **kwargs)
+        self.stream = stream
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.stream.aclose()
+
+
+class Transcoder:
+    """
+    ffmpeg 转码器
+
+    - 并发转码数受 workers 限制，超出时排队等待，避免 CPU 超额占用
+    - 缓存以 (曲目, 格式, 码率) 为键，文件名包含源文件修改时间，源文件变化后自动失效
+    - 缓存总大小超过 max_cache_size 时按最近使用时间淘汰
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        max_cache_size: int,
+        workers: int = 2,
+        ffmpeg_path: str = "ffmpeg",
+    ):
+        """
+        初始化转码器
+
+        Args:
+            cache_dir: 转码缓存目录
+            max_cache_size: 缓存最大字节数
+            workers: 最大并发转码数
+            ffmpeg_path: ffmpeg 可执行文件路径
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_cache_size = max_cache_size
+        self.ffmpeg_path = ffmpeg_path
+        self.logger = logger
+        self._semaphore = asyncio.Semaphore(workers)
+
+    def cache_path(self, track_id: int, source: str | Path, fmt: str, bitrate: int) -> Path:
+        """
+        获取转码结果的缓存路径
+
+        Args:
+            track_id: 曲目 ID
+            source: 源文件路径
+            fmt: 目标格式
+            bitrate: 目标码率（kbps）
+
+        Returns:
+            缓存文件路径
+        """
+        version = os.stat(source).st_mtime_ns
+        return self.cache_dir / f"{track_id}_{version:x}_{bitrate}k.{fmt}"
+
+    def get_cached(self, track_id: int, source: str | Path, fmt: str, bitrate: int) -> Path | None:
+        """
+        获取已缓存的转码结果
+
+        Args:
+            track_id: 曲目 ID
+            source: 源文件路径
+            fmt: 目标格式
+            bitrate: 目标码率（kbps）
+
+        Returns:
+            缓存文件路径，未缓存时返回 None
+        """
+        path = self.cache_path(track_id, source, fmt, bitrate)
+        try:
+            # 更新修改时间作为最近使用时间
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    async def transcode(
+        self,
+        track_id: int,
+        source: str | Path,
+        fmt: str,
+        bitrate: int,
+        start_time: float = 0,
+    ) -> TranscodeStream:
+        """
+        启动转码
+
+        Args:
+            track_id: 曲目 ID
+            source: 源文件路径
+            fmt: 目标格式
+            bitrate: 目标码率（kbps）
+            start_time: 起始时间（秒），用于拖动进度
+
+        Returns:
+            转码输出流
+
+        Raises:
+            TranscodeError: 格式不支持或无法启动 ffmpeg
+        """
+        if fmt not in TRANSCODE_FORMATS:
+            raise TranscodeError(f"不支持的转码格式: {fmt}")
+        codec, container, _ = TRANSCODE_FORMATS[fmt]
+
+        args = ["-hide_banner", "-loglevel", "error", "-nostdin"]
+        if start_time > 0:
+            args += ["-ss", f"{start_time:.3f}"]
+        args += ["-i", str(source), "-map", "0:a:0", "-vn", "-c:a", codec, "-b:a", f"{bitrate}k"]
+        args += ["-f", container, "pipe:1"]
+
+        await self._semaphore.acquire()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.ffmpeg_path,
+                *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+        except OSError as e:
+            self._semaphore.release()
+            raise TranscodeError(f"无法启动 ffmpeg: {e}") from e
+
+        # 只有从头开始的转码才是完整结果，可以写入缓存
+        cache_path = self.cache_path(track_id, source, fmt, bitrate) if start_time <= 0 else None
+        self.logger.info(f"开始转码: {source} -> {fmt} {bitrate}k, 起始: {start_time}s")
+        return TranscodeStream(self, process, cache_path)
+
+    def release(self) -> None:
+        """释放一个转码名额"""
+        self._semaphore.release()
+
+    def evict(self) -> None:
+        """按最近使用时间淘汰缓存，直到总大小不超过上限"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.endswith(".part"):
+                stat_result = entry.stat()
+                entries.append((stat_result.st_mtime, stat_result.st_size, entry.path))
+                total += stat_result.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_cache_size:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+            self.logger.debug(f"淘汰转码缓存: {path}")
+
+
+_transcoder: Transcoder | None = None
+
+
+def get_transcoder() -> Transcoder:
+    """获取全局转码器"""
+    global _transcoder
+    if _transcoder is None:
+        from app.core.config import settings
+
+        _transcoder = Transcoder(
+            settings.cache_path / "transcode",
+            settings.transcode_cache_max_bytes,
+            workers=settings.transcode_workers,
+            ffmpeg_path=settings.ffmpeg_path,
+        )
+    return _transcoder
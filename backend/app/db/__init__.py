@@ -3,18 +3,24 @@
 提供数据库连接、会话管理和通用操作
 """
 
+import base64
+import json
+import time
 from collections.abc import AsyncGenerator
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Any, Generic, TypeVar
+from typing import Any, ClassVar, Generic, TypeVar
 
-from sqlalchemy import delete, func, select, update
+from sqlalchemy import delete, func, select, text, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from sqlalchemy.types import DateTime
 
 from app.core.config import settings
 from app.core.log import logger
+from app.core.pinyin import to_pinyin
 
 
 # Base 类用于所有数据库模型
@@ -33,6 +39,10 @@ class TimestampMixin:
     )
 
 
+# 当前工作单元绑定的会话
+_current_session: ContextVar[AsyncSession | None] = ContextVar("current_session", default=None)
+
+
 class DatabaseManager:
     """
     数据库管理器
@@ -91,9 +101,17 @@ class DatabaseManager:
         """
         获取数据库会话
 
+        处于工作单元中时直接复用其会话，由工作单元负责提交；
+        否则创建独立会话，退出时提交
+
         Yields:
             数据库会话
         """
+        session = _current_session.get()
+        if session is not None:
+            yield session
+            return
+
         if not self._async_session_maker:
             raise RuntimeError("数据库未初始化，请先调用 init_db()")
 
@@ -108,6 +126,52 @@ class DatabaseManager:
             finally:
                 await session.close()
 
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncGenerator[AsyncSession, None]:
+        """
+        开启工作单元
+
+        范围内所有 get_session() 共用同一个会话和连接，正常退出时只提交一次，
+        出现异常时整体回滚。嵌套调用时复用外层工作单元
+
+        Yields:
+            数据库会话
+        """
+        session = _current_session.get()
+        if session is not None:
+            yield session
+            return
+
+        if not self._async_session_maker:
+            raise RuntimeError("数据库未初始化，请先调用 init_db()")
+
+        async with self._async_session_maker() as session:
+            token = _current_session.set(session)
+            try:
+                yield session
+                if session.in_transaction():
+                    await session.commit()
+            except Exception as e:
+                await session.rollback()
+                self.logger.error(f"数据库操作失败: {e}")
+                raise
+            finally:
+                _current_session.reset(token)
+
+    @contextmanager
+    def detach(self):
+        """
+        脱离当前工作单元
+
+        用于在请求内启动的后台任务：范围内的 get_session() 重新创建独立会话，
+        不占用请求的连接和事务
+        """
+        token = _current_session.set(None)
+        try:
+            yield
+        finally:
+            _current_session.reset(token)
+
     async def close(self):
         """关闭数据库连接"""
         if self._engine:
@@ -122,9 +186,67 @@ class DatabaseManager:
         return self._engine
 
 
+def insert_on_conflict(dialect_name: str, model: type[Base]):
+    """
+    创建支持 ON CONFLICT 子句的 INSERT 语句
+
+    Args:
+        dialect_name: 数据库方言名称（postgresql / sqlite）
+        model: 数据库模型类
+
+    Returns:
+        对应方言的 INSERT 语句
+    """
+    if dialect_name == "postgresql":
+        return postgresql.insert(model)
+    if dialect_name == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"不支持 ON CONFLICT 的数据库: {dialect_name}")
+
+
 # 泛型类型变量
 ModelType = TypeVar("ModelType", bound=Base)
 
+# 精确总数缓存：(数据库 URL, 表名) -> (总数, 过期时间)
+_count_cache: dict[tuple[str, str], tuple[int, float]] = {}
+
+
+def encode_cursor(values: list[Any]) -> str:
+    """
+    编码分页游标
+
+    Args:
+        values: 最后一条记录的排序键值
+
+    Returns:
+        不透明的游标字符串
+    """
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    """
+    解码分页游标
+
+    Args:
+        cursor: 游标字符串
+
+    Returns:
+        排序键值
+
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError(f"无效的分页游标: {cursor}")
+    return values
+
 
 class OperBase(Generic[ModelType]):
     """
@@ -132,6 +254,9 @@ class OperBase(Generic[ModelType]):
     提供通用的 CRUD 操作
     """
 
+    # 写入时自动生成拼音的字段：原字段 -> 拼音字段
+    pinyin_fields: ClassVar[dict[str, str]] = {}
+
     def __init__(self, model: type[ModelType], db_manager: DatabaseManager):
         """
         初始化操作基类
@@ -158,6 +283,22 @@ class OperBase(Generic[ModelType]):
             result = await session.execute(select(self.model).where(self.model.id == id))
             return result.scalar_one_or_none()
 
+    async def get_by_ids(self, ids: list[int]) -> list[ModelType]:
+        """
+        根据 ID 列表批量获取记录（不保证顺序）
+
+        Args:
+            ids: 记录 ID 列表
+
+        Returns:
+            记录列表
+        """
+        if not ids:
+            return []
+        async with self.db_manager.get_session() as session:
+            result = await session.execute(select(self.model).where(self.model.id.in_(ids)))
+            return list(result.scalars().all())
+
     async def get_all(self, skip: int = 0, limit: int = 100, **filters) -> list[ModelType]:
         """
         获取所有记录
@@ -171,12 +312,7 @@ class OperBase(Generic[ModelType]):
             记录列表
         """
         async with self.db_manager.get_session() as session:
-            query = select(self.model)
-
-            # 应用过滤条件
-            for key, value in filters.items():
-                if hasattr(self.model, key):
-                    query = query.where(getattr(self.model, key) == value)
+            query = self._apply_filters(select(self.model), filters)
 
             # 应用分页
             query = query.offset(skip).limit(limit)
@@ -184,6 +320,57 @@ class OperBase(Generic[ModelType]):
             result = await session.execute(query)
             return result.scalars().all()
 
+    async def get_page(
+        self,
+        cursor: str | None = None,
+        limit: int = 100,
+        order_by: str = "id",
+        descending: bool = False,
+        **filters,
+    ) -> tuple[list[ModelType], str | None]:
+        """
+        游标分页获取记录
+
+        按 (order_by, id) 排序，从游标位置继续向后读取，不使用 OFFSET，
+        翻到多深的位置都只需走一次索引
+
+        Args:
+            cursor: 上一页返回的游标，None 表示第一页
+            limit: 每页数量
+            order_by: 排序字段，应为非空且有索引的列
+            descending: 是否倒序
+            **filters: 过滤条件
+
+        Returns:
+            (记录列表, 下一页游标)，没有下一页时游标为 None
+
+        Raises:
+            ValueError: 游标无效
+        """
+        column = getattr(self.model, order_by)
+        key = tuple_(column, self.model.id)
+
+        query = self._apply_filters(select(self.model), filters)
+        if cursor:
+            last = tuple_(*decode_cursor(cursor))
+            query = query.where(key < last if descending else key > last)
+        if descending:
+            query = query.order_by(column.desc(), self.model.id.desc())
+        else:
+            query = query.order_by(column.asc(), self.model.id.asc())
+
+        async with self.db_manager.get_session() as session:
+            # 多取一条判断是否还有下一页
+            result = await session.execute(query.limit(limit + 1))
+            items = list(result.scalars().all())
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            last_item = items[-1]
+            next_cursor = encode_cursor([getattr(last_item, order_by), last_item.id])
+        return items, next_cursor
+
     async def create(self, **kwargs) -> ModelType:
         """
         创建新记录
@@ -194,10 +381,11 @@ class OperBase(Generic[ModelType]):
         Returns:
             创建的记录对象
         """
+        kwargs = self._fill_pinyin(kwargs)
         async with self.db_manager.get_session() as session:
             obj = self.model(**kwargs)
             session.add(obj)
-            await session.commit()
+            await session.flush()
             await session.refresh(obj)
             self.logger.debug(f"创建记录: {self.model.__name__} ID={obj.id}")
             return obj
@@ -213,16 +401,21 @@ class OperBase(Generic[ModelType]):
         Returns:
             更新后的记录对象
         """
+        kwargs = self._fill_pinyin(kwargs)
         async with self.db_manager.get_session() as session:
             result = await session.execute(
                 update(self.model).where(self.model.id == id).values(**kwargs)
             )
-            await session.commit()
-
             if result.rowcount == 0:
                 return None
 
-            obj = await self.get_by_id(id)
+            # 同一会话内重新读取，覆盖身份映射中的旧值
+            result = await session.execute(
+                select(self.model)
+                .where(self.model.id == id)
+                .execution_options(populate_existing=True)
+            )
+            obj = result.scalar_one_or_none()
             self.logger.debug(f"更新记录: {self.model.__name__} ID={id}")
             return obj
 
@@ -238,7 +431,6 @@ class OperBase(Generic[ModelType]):
         """
         async with self.db_manager.get_session() as session:
             result = await session.execute(delete(self.model).where(self.model.id == id))
-            await session.commit()
             success = result.rowcount > 0
             if success:
                 self.logger.debug(f"删除记录: {self.model.__name__} ID={id}")
@@ -255,16 +447,54 @@ class OperBase(Generic[ModelType]):
             记录数量
         """
         async with self.db_manager.get_session() as session:
-            query = select(func.count(self.model.id))
-
-            # 应用过滤条件
-            for key, value in filters.items():
-                if hasattr(self.model, key):
-                    query = query.where(getattr(self.model, key) == value)
-
+            query = self._apply_filters(select(func.count(self.model.id)), filters)
             result = await session.execute(query)
             return result.scalar() or 0
 
+    async def estimate_count(self) -> int:
+        """
+        估算记录总数（用于列表页的页数显示）
+
+        PostgreSQL 读取 pg_class.reltuples 统计值；其他数据库或表尚未统计时
+        使用精确总数，并按 database_count_cache_ttl 缓存
+
+        Returns:
+            估算的记录数量
+        """
+        table = self.model.__tablename__
+        async with self.db_manager.get_session() as session:
+            if session.bind.dialect.name == "postgresql":
+                result = await session.execute(
+                    text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+                    {"table": table},
+                )
+                estimate = result.scalar()
+                if estimate is not None and estimate >= 0:
+                    return estimate
+
+        cache_key = (self.db_manager.database_url, table)
+        cached = _count_cache.get(cache_key)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        total = await self.count()
+        _count_cache[cache_key] = (total, time.monotonic() + settings.database_count_cache_ttl)
+        return total
+
+    def _fill_pinyin(self, values: dict[str, Any]) -> dict[str, Any]:
+        """为写入的名称字段补充拼音（已显式传入拼音时不覆盖）"""
+        for source, target in self.pinyin_fields.items():
+            if source in values and target not in values:
+                values = {**values, target: to_pinyin(values[source])}
+        return values
+
+    def _apply_filters(self, query, filters: dict[str, Any]):
+        """应用等值过滤条件，忽略模型中不存在的字段"""
+        for key, value in filters.items():
+            if hasattr(self.model, key):
+                query = query.where(getattr(self.model, key) == value)
+        return query
+
     async def exists(self, id: int) -> bool:
         """
         检查记录是否存在
@@ -292,12 +522,28 @@ class OperBase(Generic[ModelType]):
             创建的记录对象列表
         """
         async with self.db_manager.get_session() as session:
-            objects = [self.model(**item) for item in items]
+            objects = [self.model(**self._fill_pinyin(item)) for item in items]
             session.add_all(objects)
-            await session.commit()
+            await session.flush()
             self.logger.debug(f"批量创建记录: {self.model.__name__} 数量={len(objects)}")
             return objects
 
 
 # 全局数据库管理器实例
 db_manager = DatabaseManager()
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI 依赖：为当前请求开启工作单元
+
+    请求内的所有 Oper 调用共用一个连接，端点函数返回后提交一次。
+    声明时需使用 Depends(get_db, scope="function")：默认作用域下 yield 之后的代码
+    在响应发送之后才执行，提交失败无法反映到响应中，客户端的下一个请求也可能读不到刚写入的数据；
+    function 作用域下先提交再发送响应，提交失败返回 500
+
+    Yields:
+        数据库会话
+    """
+    async with db_manager.unit_of_work() as session:
+        yield session
@@ -5,9 +5,12 @@
 from app.db.models.album import Album
 from app.db.models.artist import Artist
 from app.db.models.download import DownloadHistory
+from app.db.models.download_job import DownloadJob
 from app.db.models.library import Library
 from app.db.models.media import MediaServer
+from app.db.models.play_history import PlayHistory
 from app.db.models.playlist import Playlist, PlaylistTrack
+from app.db.models.search import SEARCH_ENTITIES
 from app.db.models.site import Site
 from app.db.models.subscribe import Subscribe
 from app.db.models.subscribe_release import SubscribeRelease
@@ -20,11 +23,14 @@ __all__ = [
     "Track",
     "Playlist",
     "PlaylistTrack",
+    "PlayHistory",
     "Library",
     "DownloadHistory",
+    "DownloadJob",
     "Subscribe",
     "Site",
     "SubscribeRelease",
     "MediaServer",
     "SystemConfig",
+    "SEARCH_ENTITIES",
 ]
@@ -0,0 +1,54 @@
+"""
+DownloadJob 下载调度任务数据库模型
+"""
+
+from datetime import datetime
+
+from sqlalchemy import JSON, DateTime, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base, TimestampMixin
+
+
+class DownloadJob(Base, TimestampMixin):
+    """下载调度任务模型（DownloadScheduler 的持久化队列）"""
+
+    __tablename__ = "download_jobs"
+    __table_args__ = (
+        Index("ix_download_jobs_status_priority", "status", "priority", "id"),
+        # 完成的任务会删除，SQLite 默认会复用最大的 ID，任务 ID 需要在调度器中保持唯一
+        {"sqlite_autoincrement": True},
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+
+    # 下载来源，用于按来源限制并发
+    source: Mapped[str] = mapped_column(String(20), nullable=False)
+
+    # 优先级，数值越小越先执行
+    priority: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # 任务参数（可序列化的下载任务）
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+
+    # 状态：queued / running / completed / failed / cancelled
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="queued")
+
+    # 已执行次数和最大重试次数
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_retries: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
+
+    # 重试等待到的时间（UTC），None 表示立即可执行
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    error_message: Mapped[str] = mapped_column(Text, nullable=True)
+
+    # 调用方的任务标识（如下载任务 ID），用于查询状态和取消
+    key: Mapped[str] = mapped_column(String(100), nullable=True)
+
+    # 持有任务的调度器和租约到期时间（UTC），租约过期后其他进程才能接管
+    owner: Mapped[str] = mapped_column(String(100), nullable=True)
+    lease_expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<DownloadJob(id={self.id}, source='{self.source}', status='{self.status}')>"
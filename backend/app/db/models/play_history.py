@@ -0,0 +1,32 @@
+"""
+PlayHistory 播放历史数据库模型
+"""
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+
+class PlayHistory(Base):
+    """播放历史模型（只追加，由 PlayHistoryRecorder 批量写入）"""
+
+    __tablename__ = "play_history"
+    __table_args__ = (Index("ix_play_history_user_played_at", "user_id", "played_at"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+
+    # 事件 ID，日志重放时用于去重
+    event_id: Mapped[str] = mapped_column(String(32), nullable=False, unique=True)
+
+    track_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("tracks.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    user_id: Mapped[str] = mapped_column(String(100), nullable=True)
+    device_id: Mapped[str] = mapped_column(String(100), nullable=True)
+    played_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<PlayHistory(id={self.id}, track_id={self.track_id}, user_id={self.user_id})>"
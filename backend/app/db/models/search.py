@@ -0,0 +1,74 @@
+"""
+搜索索引
+曲目、专辑、艺术家名称的全文检索索引（随建表一起创建）
+
+- SQLite：FTS5 trigram 虚拟表 search_index，由触发器与业务表保持同步，
+  rowid = 实体 ID * 4 + 类型编号，便于触发器按主键删除
+- PostgreSQL：pg_trgm GIN 索引，加速名称和拼音字段的 ILIKE 与相似度排序
+"""
+
+from sqlalchemy import DDL, event
+
+from app.db import Base
+
+# 实体类型：(类型名, 类型编号, 表名, 名称列, 拼音列)
+SEARCH_ENTITIES = (
+    ("track", 1, "tracks", "title", "title_pinyin"),
+    ("album", 2, "albums", "title", "title_pinyin"),
+    ("artist", 3, "artists", "name", "name_pinyin"),
+)
+
+
+def _sqlite_statements() -> list[str]:
+    """SQLite FTS5 索引和同步触发器"""
+    statements = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "entity_type UNINDEXED, entity_id UNINDEXED, name, pinyin, tokenize='trigram')"
+    ]
+    for entity_type, code, table, name, pinyin in SEARCH_ENTITIES:
+        # 已从磁盘移除的曲目不进入索引
+        visible = "new.missing = 0" if table == "tracks" else "1"
+        insert = (
+            f"INSERT INTO search_index(rowid, entity_type, entity_id, name, pinyin) "
+            f"SELECT new.id * 4 + {code}, '{entity_type}', new.id, new.{name}, new.{pinyin} "
+            f"WHERE {visible};"
+        )
+        delete = f"DELETE FROM search_index WHERE rowid = old.id * 4 + {code};"
+        watched = f"{name}, {pinyin}, missing" if table == "tracks" else f"{name}, {pinyin}"
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} "
+            f"BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF {watched} "
+            f"ON {table} BEGIN {delete} {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} "
+            f"BEGIN {delete} END",
+        ]
+    return statements
+
+
+def _postgresql_statements() -> list[str]:
+    """PostgreSQL trigram 索引"""
+    statements = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"]
+    for _, _, table, name, pinyin in SEARCH_ENTITIES:
+        for column in (name, pinyin):
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm "
+                f"ON {table} USING gin ({column} gin_trgm_ops)"
+            )
+    return statements
+
+
+SQLITE_SEARCH_DDL = _sqlite_statements()
+POSTGRESQL_SEARCH_DDL = _postgresql_statements()
+
+for _statement in SQLITE_SEARCH_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+for _statement in POSTGRESQL_SEARCH_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+
+# 删除业务表前先删除 FTS 表（触发器随业务表一起删除）
+event.listen(
+    Base.metadata,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS search_index").execute_if(dialect="sqlite"),
+)
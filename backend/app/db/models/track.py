@@ -2,7 +2,7 @@
 Track 数据库模型
 """
 
-from sqlalchemy import JSON, BigInteger, ForeignKey, Integer, String, Text
+from sqlalchemy import JSON, BigInteger, Boolean, Float, ForeignKey, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db import Base, TimestampMixin
@@ -38,13 +38,17 @@ class Track(Base, TimestampMixin):
     position: Mapped[int] = mapped_column(Integer, nullable=True)  # 专辑中的位置
 
     # 文件信息
-    path: Mapped[str] = mapped_column(String(1000), nullable=True, index=True)
+    path: Mapped[str] = mapped_column(String(1000), nullable=True, index=True, unique=True)
     file_format: Mapped[str] = mapped_column(String(10), nullable=True)  # mp3, flac, etc.
     file_hash: Mapped[str] = mapped_column(String(32), nullable=True, index=True)  # MD5 哈希
     bitrate: Mapped[int] = mapped_column(Integer, nullable=True)  # kbps
     sample_rate: Mapped[int] = mapped_column(Integer, nullable=True)  # Hz
     channels: Mapped[int] = mapped_column(Integer, nullable=True)  # 1=mono, 2=stereo
     file_size: Mapped[int] = mapped_column(BigInteger, nullable=True)  # 字节
+    file_mtime: Mapped[float] = mapped_column(Float, nullable=True)  # 文件修改时间戳
+    missing: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False
+    )  # 文件已从磁盘移除
 
     # 歌词
     lyrics: Mapped[str] = mapped_column(Text, nullable=True)
@@ -5,8 +5,10 @@
 from app.db.operations.album import AlbumOper
 from app.db.operations.artist import ArtistOper
 from app.db.operations.download import DownloadHistoryOper
+from app.db.operations.download_job import DownloadJobOper
 from app.db.operations.library import LibraryOper
 from app.db.operations.media import MediaServerOper
+from app.db.operations.play_history import PlayHistoryOper
 from app.db.operations.playlist import PlaylistOper
 from app.db.operations.site import SiteOper
 from app.db.operations.subscribe import SubscribeOper
@@ -19,8 +21,10 @@ __all__ = [
     "AlbumOper",
     "TrackOper",
     "PlaylistOper",
+    "PlayHistoryOper",
     "LibraryOper",
     "DownloadHistoryOper",
+    "DownloadJobOper",
     "SubscribeOper",
     "SiteOper",
     "SubscribeReleaseOper",
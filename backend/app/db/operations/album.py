@@ -2,15 +2,18 @@
 Album 操作类
 """
 
-from sqlalchemy import or_, select
+from sqlalchemy import select
 
 from app.db import OperBase
 from app.db.models.album import Album
+from app.db.operations.search import SearchOper
 
 
 class AlbumOper(OperBase[Album]):
     """Album 操作类"""
 
+    pinyin_fields = {"title": "title_pinyin"}
+
     async def get_by_musicbrainz_id(self, musicbrainz_id: str) -> Album | None:
         """
         根据 MusicBrainz ID 获取专辑
@@ -50,6 +53,8 @@ class AlbumOper(OperBase[Album]):
         """
         搜索专辑（按标题）
 
+        通过搜索索引匹配名称和拼音，按相关度排序
+
         Args:
             keyword: 搜索关键词
             limit: 返回数量
@@ -57,19 +62,14 @@ class AlbumOper(OperBase[Album]):
         Returns:
             专辑列表
         """
+        ids = await SearchOper(self.db_manager).search_ids(keyword, "album", limit)
+        if not ids:
+            return []
+
         async with self.db_manager.get_session() as session:
-            query = (
-                select(Album)
-                .where(
-                    or_(
-                        Album.title.ilike(f"%{keyword}%"),
-                        Album.title_pinyin.ilike(f"%{keyword}%"),
-                    )
-                )
-                .limit(limit)
-            )
-            result = await session.execute(query)
-            return result.scalars().all()
+            result = await session.execute(select(Album).where(Album.id.in_(ids)))
+            rows = {row.id: row for row in result.scalars()}
+        return [rows[id] for id in ids if id in rows]
 
     async def get_by_genre(self, genre: str, limit: int = 50) -> list[Album]:
         """
@@ -2,15 +2,18 @@
 Artist 操作类
 """
 
-from sqlalchemy import or_, select
+from sqlalchemy import select
 
 from app.db import OperBase
 from app.db.models.artist import Artist
+from app.db.operations.search import SearchOper
 
 
 class ArtistOper(OperBase[Artist]):
     """Artist 操作类"""
 
+    pinyin_fields = {"name": "name_pinyin"}
+
     async def get_by_musicbrainz_id(self, musicbrainz_id: str) -> Artist | None:
         """
         根据 MusicBrainz ID 获取艺术家
@@ -31,6 +34,8 @@ class ArtistOper(OperBase[Artist]):
         """
         搜索艺术家（按名称）
 
+        通过搜索索引匹配名称和拼音，按相关度排序
+
         Args:
             keyword: 搜索关键词
             limit: 返回数量
@@ -38,19 +43,14 @@ class ArtistOper(OperBase[Artist]):
         Returns:
             艺术家列表
         """
+        ids = await SearchOper(self.db_manager).search_ids(keyword, "artist", limit)
+        if not ids:
+            return []
+
         async with self.db_manager.get_session() as session:
-            query = (
-                select(Artist)
-                .where(
-                    or_(
-                        Artist.name.ilike(f"%{keyword}%"),
-                        Artist.name_pinyin.ilike(f"%{keyword}%"),
-                    )
-                )
-                .limit(limit)
-            )
-            result = await session.execute(query)
-            return result.scalars().all()
+            result = await session.execute(select(Artist).where(Artist.id.in_(ids)))
+            rows = {row.id: row for row in result.scalars()}
+        return [rows[id] for id in ids if id in rows]
 
     async def get_top_rated(self, limit: int = 50) -> list[Artist]:
         """
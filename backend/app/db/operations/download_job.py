@@ -0,0 +1,104 @@
+"""
+DownloadJob 操作类
+"""
+
+from datetime import datetime
+
+from sqlalchemy import or_, select, update
+
+from app.db import OperBase
+from app.db.models.download_job import DownloadJob
+
+# 未完成的任务状态
+UNFINISHED = ("queued", "running")
+
+
+class DownloadJobOper(OperBase[DownloadJob]):
+    """DownloadJob 操作类"""
+
+    async def get_unfinished(self) -> list[DownloadJob]:
+        """
+        获取未完成的任务（排队中和执行中）
+
+        Returns:
+            任务列表（按优先级和创建顺序排序）
+        """
+        async with self.db_manager.get_session() as session:
+            result = await session.execute(
+                select(DownloadJob)
+                .where(DownloadJob.status.in_(UNFINISHED))
+                .order_by(DownloadJob.priority, DownloadJob.id)
+            )
+            return list(result.scalars().all())
+
+    async def claim(self, owner: str, lease_until: datetime, now: datetime) -> list[DownloadJob]:
+        """
+        认领无人持有（没有持有者或租约已过期）的未完成任务
+
+        租约条件写在 UPDATE 的 WHERE 中，多个进程同时认领时每个任务只会被一个进程认领
+
+        Args:
+            owner: 调度器标识
+            lease_until: 租约到期时间
+            now: 当前时间
+
+        Returns:
+            该调度器持有的全部未完成任务（按优先级和创建顺序排序）
+        """
+        async with self.db_manager.get_session() as session:
+            await session.execute(
+                update(DownloadJob)
+                .where(
+                    DownloadJob.status.in_(UNFINISHED),
+                    or_(
+                        DownloadJob.owner.is_(None),
+                        DownloadJob.lease_expires_at.is_(None),
+                        DownloadJob.lease_expires_at < now,
+                    ),
+                )
+                .values(owner=owner, lease_expires_at=lease_until)
+            )
+            result = await session.execute(
+                select(DownloadJob)
+                .where(DownloadJob.owner == owner, DownloadJob.status.in_(UNFINISHED))
+                .order_by(DownloadJob.priority, DownloadJob.id)
+            )
+            return list(result.scalars().all())
+
+    async def renew(self, owner: str, lease_until: datetime) -> set[int]:
+        """
+        续租调度器持有的未完成任务
+
+        Args:
+            owner: 调度器标识
+            lease_until: 新的租约到期时间
+
+        Returns:
+            仍由该调度器持有的任务 ID
+        """
+        async with self.db_manager.get_session() as session:
+            result = await session.execute(
+                update(DownloadJob)
+                .where(DownloadJob.owner == owner, DownloadJob.status.in_(UNFINISHED))
+                .values(lease_expires_at=lease_until)
+                .returning(DownloadJob.id)
+            )
+            return set(result.scalars().all())
+
+    async def release(self, owner: str) -> int:
+        """
+        释放调度器持有的未完成任务，其他进程或下次启动时可以立即认领
+
+        Args:
+            owner: 调度器标识
+
+        Returns:
+            释放的任务数
+        """
+        async with self.db_manager.get_session() as session:
+            result = await session.execute(
+                update(DownloadJob)
+                .where(DownloadJob.owner == owner, DownloadJob.status.in_(UNFINISHED))
+                .values(owner=None, lease_expires_at=None)
+            )
+            return result.rowcount
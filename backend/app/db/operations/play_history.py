@@ -0,0 +1,166 @@
+"""
+PlayHistory 操作类
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import ColumnElement, bindparam, delete, func, select
+
+from app.db import OperBase, insert_on_conflict
+from app.db.models.play_history import PlayHistory
+from app.db.models.track import Track
+
+
+class PlayHistoryOper(OperBase[PlayHistory]):
+    """PlayHistory 操作类"""
+
+    async def record_batch(self, events: list[dict[str, Any]]) -> int:
+        """
+        批量写入播放记录并累加曲目播放次数
+
+        一条多行 INSERT 写入历史（event_id 冲突的重复事件跳过），
+        一条批量 UPDATE 按曲目累加 play_count 并更新 last_played
+
+        Args:
+            events: 播放事件列表，包含 event_id、track_id、user_id、device_id、played_at
+
+        Returns:
+            实际写入的记录数
+        """
+        if not events:
+            return 0
+
+        async with self.db_manager.get_session() as session:
+            # 跳过已删除的曲目，避免外键错误导致整批失败
+            track_ids = {event["track_id"] for event in events}
+            result = await session.execute(select(Track.id).where(Track.id.in_(track_ids)))
+            existing = set(result.scalars().all())
+
+            rows = [
+                {
+                    "event_id": event["event_id"],
+                    "track_id": event["track_id"],
+                    "user_id": event.get("user_id"),
+                    "device_id": event.get("device_id"),
+                    "played_at": datetime.fromisoformat(event["played_at"]),
+                }
+                for event in events
+                if event["track_id"] in existing
+            ]
+            if not rows:
+                return 0
+
+            stmt = (
+                insert_on_conflict(session.bind.dialect.name, PlayHistory)
+                .on_conflict_do_nothing(index_elements=[PlayHistory.event_id])
+                .returning(PlayHistory.track_id, PlayHistory.played_at)
+            )
+            inserted = (await session.execute(stmt, rows)).all()
+            if not inserted:
+                return 0
+
+            # 只累加真正写入的记录，日志重放不会重复计数
+            counts = Counter(track_id for track_id, _ in inserted)
+            last_played: dict[int, datetime] = {}
+            for track_id, played_at in inserted:
+                if track_id not in last_played or played_at > last_played[track_id]:
+                    last_played[track_id] = played_at
+
+            tracks = Track.__table__
+            await session.execute(
+                tracks.update()
+                .where(tracks.c.id == bindparam("b_id"))
+                .values(
+                    play_count=func.coalesce(tracks.c.play_count, 0) + bindparam("b_count"),
+                    last_played=bindparam("b_last_played"),
+                ),
+                [
+                    {
+                        "b_id": track_id,
+                        "b_count": count,
+                        "b_last_played": last_played[track_id].isoformat(),
+                    }
+                    for track_id, count in counts.items()
+                ],
+            )
+            await session.flush()
+            return len(inserted)
+
+    async def get_recent(
+        self,
+        user_id: str | None = None,
+        limit: int = 50,
+        device_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        获取最近播放记录
+
+        Args:
+            user_id: 用户 ID，None 表示匿名用户
+            limit: 返回数量
+            device_id: 设备 ID，None 表示所有设备
+
+        Returns:
+            播放记录列表（按播放时间倒序）
+        """
+        async with self.db_manager.get_session() as session:
+            query = select(
+                PlayHistory.event_id,
+                PlayHistory.track_id,
+                PlayHistory.user_id,
+                PlayHistory.device_id,
+                PlayHistory.played_at,
+                Track.title,
+                Track.artist_id,
+                Track.album_id,
+            ).join(Track, Track.id == PlayHistory.track_id)
+            query = (
+                query.where(*self._user_filter(user_id, device_id))
+                .order_by(PlayHistory.played_at.desc(), PlayHistory.id.desc())
+                .limit(limit)
+            )
+
+            result = await session.execute(query)
+            return [
+                {
+                    "event_id": row.event_id,
+                    "track_id": row.track_id,
+                    "title": row.title,
+                    "artist_id": row.artist_id,
+                    "album_id": row.album_id,
+                    "user_id": row.user_id,
+                    "device_id": row.device_id,
+                    "played_at": row.played_at.isoformat(),
+                }
+                for row in result
+            ]
+
+    async def delete_by_user(self, user_id: str | None = None, device_id: str | None = None) -> int:
+        """
+        删除用户的播放记录
+
+        Args:
+            user_id: 用户 ID，None 表示匿名用户
+            device_id: 设备 ID，None 表示所有设备
+
+        Returns:
+            删除的记录数
+        """
+        async with self.db_manager.get_session() as session:
+            result = await session.execute(
+                delete(PlayHistory).where(*self._user_filter(user_id, device_id))
+            )
+            await session.flush()
+            return result.rowcount
+
+    @staticmethod
+    def _user_filter(user_id: str | None, device_id: str | None) -> list[ColumnElement[bool]]:
+        """构建用户/设备过滤条件"""
+        conditions = [
+            PlayHistory.user_id == user_id if user_id is not None else PlayHistory.user_id.is_(None)
+        ]
+        if device_id is not None:
+            conditions.append(PlayHistory.device_id == device_id)
+        return conditions
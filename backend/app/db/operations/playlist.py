@@ -88,7 +88,7 @@ class PlaylistOper(OperBase[Playlist]):
                 playlist_id=playlist_id, track_id=track_id, position=position
             )
             session.add(playlist_track)
-            await session.commit()
+            await session.flush()
             await session.refresh(playlist_track)
             return playlist_track
 
@@ -111,7 +111,7 @@ class PlaylistOper(OperBase[Playlist]):
                     )
                 )
             )
-            await session.commit()
+            await session.flush()
             return result.rowcount > 0
 
     async def clear_tracks(self, playlist_id: int) -> bool:
@@ -128,7 +128,7 @@ class PlaylistOper(OperBase[Playlist]):
             result = await session.execute(
                 delete(PlaylistTrack).where(PlaylistTrack.playlist_id == playlist_id)
             )
-            await session.commit()
+            await session.flush()
             return result.rowcount > 0
 
     async def reorder_tracks(self, playlist_id: int, track_ids: list[int]) -> bool:
@@ -159,5 +159,5 @@ class PlaylistOper(OperBase[Playlist]):
                 if track_id in track_map:
                     track_map[track_id].position = position
 
-            await session.commit()
+            await session.flush()
             return True
@@ -0,0 +1,176 @@
+"""
+搜索操作类
+跨曲目、专辑、艺术家的统一名称搜索
+"""
+
+from typing import Any
+
+from sqlalchemy import func, literal, or_, select, text, union_all
+
+from app.core.log import logger
+from app.db import DatabaseManager
+from app.db.models.album import Album
+from app.db.models.artist import Artist
+from app.db.models.track import Track
+
+# 实体类型 -> (模型, 名称列, 拼音列)
+_ENTITY_COLUMNS = {
+    "track": (Track, Track.title, Track.title_pinyin),
+    "album": (Album, Album.title, Album.title_pinyin),
+    "artist": (Artist, Artist.name, Artist.name_pinyin),
+}
+
+# trigram 分词最短可匹配长度
+_TRIGRAM_MIN_LENGTH = 3
+
+
+class SearchOper:
+    """
+    搜索操作类
+
+    SQLite 使用 FTS5 trigram 索引（search_index），PostgreSQL 使用 pg_trgm 索引，
+    两者都支持名称和拼音的子串匹配
+    """
+
+    ENTITY_TYPES = tuple(_ENTITY_COLUMNS)
+
+    def __init__(self, db_manager: DatabaseManager):
+        """
+        初始化搜索操作类
+
+        Args:
+            db_manager: 数据库管理器
+        """
+        self.db_manager = db_manager
+        self.logger = logger
+
+    async def search(
+        self, keyword: str, types: list[str] | None = None, limit: int = 20
+    ) -> list[dict[str, Any]]:
+        """
+        搜索曲目、专辑、艺术家
+
+        结果按匹配程度排序：完全匹配 > 前缀匹配 > 包含，同级按索引相关度排序
+
+        Args:
+            keyword: 搜索关键词（名称或拼音）
+            types: 实体类型（track/album/artist），默认全部
+            limit: 返回数量
+
+        Returns:
+            结果列表，每项包含 type/id/name/score
+        """
+        keyword = keyword.strip()
+        if not keyword:
+            return []
+        types = [t for t in (types or self.ENTITY_TYPES) if t in _ENTITY_COLUMNS]
+        if not types:
+            return []
+
+        # 多取一些候选，按匹配程度重新排序后再截断
+        candidates = limit * 3
+        async with self.db_manager.get_session() as session:
+            if session.bind.dialect.name == "sqlite":
+                rows = await self._search_fts(session, keyword, types, candidates)
+            else:
+                postgresql = session.bind.dialect.name == "postgresql"
+                rows = await self._search_trigram(session, keyword, types, candidates, postgresql)
+
+        lowered = keyword.lower()
+        ranked = []
+        for entity_type, entity_id, name, pinyin, score in rows:
+            score = float(score or 0)
+            sort_key = (self._match_rank(lowered, name, pinyin), -score, len(name or ""))
+            result = {"type": entity_type, "id": entity_id, "name": name, "score": score}
+            ranked.append((sort_key, result))
+        ranked.sort(key=lambda item: item[0])
+        return [result for _, result in ranked[:limit]]
+
+    async def search_ids(self, keyword: str, entity_type: str, limit: int = 50) -> list[int]:
+        """
+        搜索单一类型实体，返回按相关度排序的 ID
+
+        Args:
+            keyword: 搜索关键词
+            entity_type: 实体类型
+            limit: 返回数量
+
+        Returns:
+            实体 ID 列表
+        """
+        results = await self.search(keyword, types=[entity_type], limit=limit)
+        return [result["id"] for result in results]
+
+    async def _search_fts(self, session, keyword: str, types: list[str], limit: int):
+        """SQLite：查询 FTS5 索引"""
+        type_params = {f"type_{i}": t for i, t in enumerate(types)}
+        type_filter = ", ".join(f":{name}" for name in type_params)
+        words = keyword.split()
+
+        if all(len(word) >= _TRIGRAM_MIN_LENGTH for word in words):
+            # 每个词作为短语匹配，词之间为 AND
+            match = " ".join('"' + word.replace('"', '""') + '"' for word in words)
+            query = text(
+                "SELECT entity_type, entity_id, name, pinyin, -bm25(search_index) "
+                "FROM search_index WHERE search_index MATCH :match "
+                f"AND entity_type IN ({type_filter}) ORDER BY bm25(search_index) LIMIT :limit"
+            )
+            params = {"match": match}
+        else:
+            # 关键词过短无法使用 trigram，回退到 LIKE（只扫描索引表）
+            query = text(
+                "SELECT entity_type, entity_id, name, pinyin, 0 FROM search_index "
+                "WHERE (name LIKE :pattern ESCAPE '\\' OR pinyin LIKE :pattern ESCAPE '\\') "
+                f"AND entity_type IN ({type_filter}) LIMIT :limit"
+            )
+            escaped = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params = {"pattern": f"%{escaped}%"}
+
+        result = await session.execute(query, {**params, **type_params, "limit": limit})
+        return result.all()
+
+    async def _search_trigram(
+        self, session, keyword: str, types: list[str], limit: int, postgresql: bool
+    ):
+        """PostgreSQL（pg_trgm 索引）及其他数据库：按名称和拼音 ILIKE 匹配"""
+        queries = []
+        for entity_type in types:
+            model, name, pinyin = _ENTITY_COLUMNS[entity_type]
+            if postgresql:
+                score = func.greatest(
+                    func.similarity(name, keyword),
+                    func.similarity(func.coalesce(pinyin, ""), keyword),
+                )
+            else:
+                score = literal(0.0)
+            query = select(
+                literal(entity_type).label("entity_type"),
+                model.id.label("entity_id"),
+                name.label("name"),
+                pinyin.label("pinyin"),
+                score.label("score"),
+            ).where(
+                or_(
+                    name.icontains(keyword, autoescape=True),
+                    pinyin.icontains(keyword, autoescape=True),
+                )
+            )
+            if model is Track:
+                query = query.where(Track.missing.is_(False))
+            queries.append(query)
+
+        combined = union_all(*queries).subquery()
+        result = await session.execute(
+            select(combined).order_by(combined.c.score.desc()).limit(limit)
+        )
+        return result.all()
+
+    @staticmethod
+    def _match_rank(keyword: str, name: str | None, pinyin: str | None) -> int:
+        """匹配程度：0 完全匹配，1 前缀匹配，2 包含"""
+        values = [value.lower() for value in (name, *(pinyin or "").split()) if value]
+        if keyword in values:
+            return 0
+        if any(value.startswith(keyword) for value in values):
+            return 1
+        return 2
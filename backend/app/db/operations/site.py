@@ -79,7 +79,7 @@ class SiteOper(OperBase[Site]):
                 return None
 
             site.enabled = not site.enabled
-            await session.commit()
+            await session.flush()
             await session.refresh(site)
             return site
 
@@ -2,15 +2,32 @@
 Track 操作类
 """
 
-from sqlalchemy import and_, or_, select
+from datetime import datetime
+from typing import Any
 
-from app.db import OperBase
+from sqlalchemy import and_, func, insert, select, tuple_, update
+
+from app.core.context import MusicInfo
+from app.core.pinyin import to_pinyin
+from app.db import OperBase, insert_on_conflict
+from app.db.models.album import Album
+from app.db.models.artist import Artist
 from app.db.models.track import Track
+from app.db.operations.search import SearchOper
+
+ArtistKey = tuple[str, str | None]
+
+
+def _artist_key(item: MusicInfo) -> ArtistKey | None:
+    """批量入库时艺术家的键：(名称, MusicBrainz ID)"""
+    return (item.artist, item.musicbrainz_artist_id) if item.artist else None
 
 
 class TrackOper(OperBase[Track]):
     """Track 操作类"""
 
+    pinyin_fields = {"title": "title_pinyin"}
+
     async def get_by_musicbrainz_id(self, musicbrainz_id: str) -> Track | None:
         """
         根据 MusicBrainz ID 获取曲目
@@ -42,7 +59,7 @@ class TrackOper(OperBase[Track]):
         async with self.db_manager.get_session() as session:
             query = (
                 select(Track)
-                .where(Track.album_id == album_id)
+                .where(Track.album_id == album_id, Track.missing.is_(False))
                 .order_by(Track.disc_number.asc(), Track.track_number.asc())
                 .offset(skip)
                 .limit(limit)
@@ -65,7 +82,12 @@ class TrackOper(OperBase[Track]):
             曲目列表
         """
         async with self.db_manager.get_session() as session:
-            query = select(Track).where(Track.artist_id == artist_id).offset(skip).limit(limit)
+            query = (
+                select(Track)
+                .where(Track.artist_id == artist_id, Track.missing.is_(False))
+                .offset(skip)
+                .limit(limit)
+            )
             result = await session.execute(query)
             return result.scalars().all()
 
@@ -73,6 +95,8 @@ class TrackOper(OperBase[Track]):
         """
         搜索曲目（按标题）
 
+        通过搜索索引匹配名称和拼音，按相关度排序
+
         Args:
             keyword: 搜索关键词
             limit: 返回数量
@@ -80,19 +104,14 @@ class TrackOper(OperBase[Track]):
         Returns:
             曲目列表
         """
+        ids = await SearchOper(self.db_manager).search_ids(keyword, "track", limit)
+        if not ids:
+            return []
+
         async with self.db_manager.get_session() as session:
-            query = (
-                select(Track)
-                .where(
-                    or_(
-                        Track.title.ilike(f"%{keyword}%"),
-                        Track.title_pinyin.ilike(f"%{keyword}%"),
-                    )
-                )
-                .limit(limit)
-            )
-            result = await session.execute(query)
-            return result.scalars().all()
+            result = await session.execute(select(Track).where(Track.id.in_(ids)))
+            rows = {row.id: row for row in result.scalars()}
+        return [rows[id] for id in ids if id in rows]
 
     async def get_by_path(self, path: str) -> Track | None:
         """
@@ -124,11 +143,277 @@ class TrackOper(OperBase[Track]):
         """
         async with self.db_manager.get_session() as session:
             query = (
-                select(Track).where(Track.path.like(f"{path_prefix}%")).offset(skip).limit(limit)
+                select(Track)
+                .where(Track.path.like(f"{path_prefix}%"), Track.missing.is_(False))
+                .offset(skip)
+                .limit(limit)
             )
             result = await session.execute(query)
             return result.scalars().all()
 
+    async def get_file_states(self, path_prefix: str) -> dict[str, tuple[int | None, float | None]]:
+        """
+        获取指定目录下曲目的文件状态（用于增量扫描）
+
+        只查询 path/file_size/file_mtime 三列，不加载完整的曲目对象
+
+        Args:
+            path_prefix: 路径前缀
+
+        Returns:
+            路径到 (文件大小, 修改时间) 的映射，不包含已移除的曲目
+        """
+        async with self.db_manager.get_session() as session:
+            result = await session.execute(
+                select(Track.path, Track.file_size, Track.file_mtime).where(
+                    Track.path.startswith(path_prefix, autoescape=True),
+                    Track.missing.is_(False),
+                )
+            )
+            return {path: (file_size, file_mtime) for path, file_size, file_mtime in result}
+
+    async def mark_missing(self, paths: list[str], batch_size: int = 500) -> int:
+        """
+        将文件已不存在的曲目标记为已移除
+
+        Args:
+            paths: 文件路径列表
+            batch_size: 每条 UPDATE 语句包含的路径数
+
+        Returns:
+            标记的曲目数量
+        """
+        count = 0
+        async with self.db_manager.get_session() as session:
+            for i in range(0, len(paths), batch_size):
+                result = await session.execute(
+                    update(Track)
+                    .where(Track.path.in_(paths[i : i + batch_size]))
+                    .values(missing=True)
+                )
+                count += result.rowcount
+        return count
+
+    async def get_library_stats(self, path_prefix: str) -> dict[str, int]:
+        """
+        统计指定目录下的曲目、专辑、艺术家数量和总大小
+
+        Args:
+            path_prefix: 路径前缀
+
+        Returns:
+            统计信息
+        """
+        async with self.db_manager.get_session() as session:
+            result = await session.execute(
+                select(
+                    func.count(Track.id),
+                    func.count(func.distinct(Track.album_id)),
+                    func.count(func.distinct(Track.artist_id)),
+                    func.coalesce(func.sum(Track.file_size), 0),
+                ).where(
+                    Track.path.startswith(path_prefix, autoescape=True),
+                    Track.missing.is_(False),
+                )
+            )
+            track_count, album_count, artist_count, total_size = result.one()
+            return {
+                "track_count": track_count,
+                "album_count": album_count,
+                "artist_count": artist_count,
+                "total_size": total_size,
+            }
+
+    async def bulk_ingest(self, items: list[MusicInfo]) -> list[dict[str, Any]]:
+        """
+        批量入库扫描结果（艺术家、专辑、曲目）
+
+        在一个事务内完成：
+        - 优先按 MusicBrainz ID、其次按名称一次查出已有艺术家，批量插入缺少的
+        - 按 (艺术家, 标题) 一次查出已有专辑，批量插入缺少的
+        - 曲目按路径 INSERT ... ON CONFLICT 写入，已存在时以本次解析结果覆盖
+          （包括重新打标签后的标题、艺术家、专辑等）并清除移除标记
+
+        Args:
+            items: 音乐信息列表，没有路径的条目会被忽略
+
+        Returns:
+            与 items 一一对应的入库结果，包含 artist_id/album_id/track_id
+        """
+        async with self.db_manager.get_session() as session:
+            artist_ids = await self._resolve_artists(session, items)
+            album_ids = await self._resolve_albums(session, items, artist_ids)
+
+            # 同一批中重复的路径以最后一条为准
+            rows = {}
+            for item in items:
+                if not item.path:
+                    continue
+                artist_id = artist_ids.get(_artist_key(item))
+                rows[item.path] = {
+                    "title": item.title or "Unknown",
+                    "title_pinyin": to_pinyin(item.title),
+                    "artist_id": artist_id,
+                    "album_id": album_ids.get((artist_id, item.album)),
+                    "path": item.path,
+                    "file_format": item.file_format,
+                    "file_size": item.file_size,
+                    "file_mtime": item.file_mtime,
+                    "bitrate": item.bitrate,
+                    "sample_rate": item.sample_rate,
+                    "channels": item.channels,
+                    "duration": item.duration,
+                    "track_number": item.track_number,
+                    "disc_number": item.disc_number,
+                    "musicbrainz_id": item.musicbrainz_track_id,
+                    "genres": item.genres,
+                    "tags": item.tags,
+                    "lyrics": item.lyrics,
+                    "missing": False,
+                }
+
+            track_ids = {}
+            if rows:
+                stmt = insert_on_conflict(session.bind.dialect.name, Track)
+                # 所有解析得到的列都以本次扫描为准，播放次数等运行数据不在 rows 中，保持不变
+                updated = next(iter(rows.values())).keys() - {"path"}
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Track.path],
+                    set_={
+                        **{field: stmt.excluded[field] for field in updated},
+                        "updated_at": datetime.utcnow(),
+                    },
+                )
+                result = await session.execute(
+                    stmt.returning(Track.id, Track.path), list(rows.values())
+                )
+                track_ids = {path: id for id, path in result}
+
+        self.logger.debug(f"批量入库曲目: {len(track_ids)} 条")
+
+        results = []
+        for item in items:
+            artist_id = artist_ids.get(_artist_key(item))
+            entry = {
+                "artist_id": artist_id,
+                "album_id": album_ids.get((artist_id, item.album)),
+                "track_id": track_ids.get(item.path),
+            }
+            results.append({key: value for key, value in entry.items() if value is not None})
+        return results
+
+    async def _resolve_artists(self, session, items: list[MusicInfo]) -> dict[ArtistKey, int]:
+        """
+        查出或创建艺术家，返回 (名称, MusicBrainz ID) 到艺术家 ID 的映射
+
+        带 MusicBrainz ID 的条目先按 ID 匹配，未匹配时只与没有 MusicBrainz ID 的同名艺术家合并；
+        不带 ID 的条目按名称匹配
+        """
+        keys = {key for item in items if (key := _artist_key(item))}
+        if not keys:
+            return {}
+
+        by_mbid: dict[str, int] = {}
+        mbids = {mbid for _, mbid in keys if mbid}
+        if mbids:
+            result = await session.execute(
+                select(Artist.musicbrainz_id, func.min(Artist.id))
+                .where(Artist.musicbrainz_id.in_(mbids))
+                .group_by(Artist.musicbrainz_id)
+            )
+            by_mbid = dict(result.all())
+
+        # 名称 -> (任意同名艺术家, 没有 MusicBrainz ID 的同名艺术家)
+        by_name: dict[str, list[int | None]] = {}
+        names = {name for name, mbid in keys if mbid not in by_mbid}
+        if names:
+            result = await session.execute(
+                select(Artist.id, Artist.name, Artist.musicbrainz_id)
+                .where(Artist.name.in_(names))
+                .order_by(Artist.id)
+            )
+            for id, name, mbid in result:
+                found = by_name.setdefault(name, [id, None])
+                if mbid is None and found[1] is None:
+                    found[1] = id
+
+        artist_ids: dict[ArtistKey, int] = {}
+        pending: list[ArtistKey] = []
+        for name, mbid in keys:
+            if mbid in by_mbid:
+                artist_ids[(name, mbid)] = by_mbid[mbid]
+            elif (id := by_name.get(name, [None, None])[1 if mbid else 0]) is not None:
+                artist_ids[(name, mbid)] = id
+            else:
+                pending.append((name, mbid))
+
+        # 同一批中新建的艺术家：带 ID 的按 ID 去重，不带 ID 的按名称去重并优先复用同名新建艺术家
+        new_rows = {}
+        for name, mbid in sorted(pending, key=lambda key: key[1] is None):
+            if mbid is not None:
+                new_rows.setdefault(mbid, (name, mbid))
+            elif not any(row_name == name for row_name, _ in new_rows.values()):
+                new_rows[name] = (name, None)
+        if new_rows:
+            result = await session.execute(
+                insert(Artist).returning(Artist.id, Artist.name, Artist.musicbrainz_id),
+                [
+                    {"name": name, "name_pinyin": to_pinyin(name), "musicbrainz_id": mbid}
+                    for name, mbid in new_rows.values()
+                ],
+            )
+            # 同一 MusicBrainz ID 的不同写法共用一个艺术家；不带 ID 的按名称复用
+            created_by_mbid: dict[str, int] = {}
+            created_by_name: dict[str, int] = {}
+            for id, name, mbid in result:
+                if mbid is not None:
+                    created_by_mbid[mbid] = id
+                created_by_name.setdefault(name, id)
+            for name, mbid in pending:
+                id = created_by_mbid.get(mbid) if mbid else created_by_name.get(name)
+                if id is not None:
+                    artist_ids[(name, mbid)] = id
+            self.logger.info(f"创建艺术家: {len(new_rows)} 个")
+        return artist_ids
+
+    async def _resolve_albums(
+        self, session, items: list[MusicInfo], artist_ids: dict[ArtistKey, int]
+    ) -> dict[tuple[int, str], int]:
+        """按 (艺术家 ID, 标题) 查出或创建专辑，返回键到 ID 的映射"""
+        albums = {}
+        for item in items:
+            artist_id = artist_ids.get(_artist_key(item))
+            if item.album and artist_id is not None:
+                albums.setdefault((artist_id, item.album), item)
+        if not albums:
+            return {}
+
+        result = await session.execute(
+            select(Album.artist_id, Album.title, func.min(Album.id))
+            .where(tuple_(Album.artist_id, Album.title).in_(list(albums)))
+            .group_by(Album.artist_id, Album.title)
+        )
+        album_ids = {(artist_id, title): id for artist_id, title, id in result}
+
+        new_rows = [
+            {
+                "artist_id": artist_id,
+                "title": title,
+                "title_pinyin": to_pinyin(title),
+                "cover_url": item.cover_url,
+                "genres": item.genres,
+            }
+            for (artist_id, title), item in albums.items()
+            if (artist_id, title) not in album_ids
+        ]
+        if new_rows:
+            result = await session.execute(
+                insert(Album).returning(Album.artist_id, Album.title, Album.id), new_rows
+            )
+            album_ids.update({(artist_id, title): id for artist_id, title, id in result})
+            self.logger.info(f"创建专辑: {len(new_rows)} 个")
+        return album_ids
+
     async def get_most_played(self, limit: int = 50) -> list[Track]:
         """
         获取播放次数最多的曲目
@@ -162,7 +447,7 @@ class TrackOper(OperBase[Track]):
         async with self.db_manager.get_session() as session:
             query = (
                 select(Track)
-                .where(Track.last_played.isnot(None))
+                .where(Track.last_played.isnot(None), Track.missing.is_(False))
                 .order_by(Track.last_played.desc())
                 .limit(limit)
             )
@@ -191,7 +476,7 @@ class TrackOper(OperBase[Track]):
                 .where(Track.id == id)
                 .values(play_count=new_count, last_played=Track.updated_at)
             )
-            await session.commit()
+            await session.flush()
             track.play_count = new_count
             return track
 
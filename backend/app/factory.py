@@ -12,13 +12,22 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 
-from app.core.cache import AsyncFileCache
+from app.core.cache import AsyncFileCache, close_default_cache_backend, get_chain_cache
 from app.core.config import settings
-from app.core.event import EventManager
+from app.core.container import close_app_container, get_app_container
+from app.core.download_scheduler import close_download_scheduler, get_download_scheduler
+from app.core.event import event_bus
 from app.core.log import logger
-from app.core.module import ModuleManager
-from app.core.plugin import PluginManager
+from app.core.play_history import close_play_history_recorder, get_play_history_recorder
+from app.core.playback_state import close_playback_state_store
+from app.core.scanner import close_parse_executor
 from app.db import db_manager
+from app.modules.downloader.netease import close_netease_client
+from app.modules.musicbrainz import (
+    close_musicbrainz_cache,
+    close_musicbrainz_client,
+    close_musicbrainz_mirror,
+)
 from app.tasks.download_monitor import DownloadMonitorTask
 
 
@@ -40,13 +49,18 @@ async def lifespan(app: FastAPI):
     db_manager.init_db()
     await db_manager.create_tables()
 
-    # 初始化核心组件
-    app.state.event_manager = EventManager()
-    app.state.module_manager = ModuleManager()
+    # 重放上次未写入数据库的播放记录
+    await get_play_history_recorder().recover()
+
+    # 初始化依赖容器（插件与业务链共用全局事件总线，业务链在所有请求间共享）
+    container = get_app_container()
+    app.state.container = container
+    app.state.event_manager = container.event_manager
+    app.state.module_manager = container.module_manager
     app.state.cache = AsyncFileCache(settings.cache_path, settings.cache_ttl)
 
-    # 初始化插件管理器
-    plugin_manager = PluginManager(app.state.event_manager)
+    # 插件管理器
+    plugin_manager = container.plugin_manager
     app.state.plugin_manager = plugin_manager
 
     # 加载插件（从 app/plugins 目录）
@@ -54,10 +68,14 @@ async def lifespan(app: FastAPI):
     if plugin_dir.exists():
         plugin_manager.load_plugins_from_dir(plugin_dir)
 
+    # 启动下载调度，恢复上次未完成的下载
+    await get_download_scheduler().start()
+
     # 加载模块（从配置）
     # TODO: 从数据库或配置文件加载模块配置
     module_configs = {}
     app.state.module_manager.load_modules(module_configs)
+    container.register_builtin_modules()
 
     # 启动插件
     for plugin in plugin_manager.get_running_plugins():
@@ -68,10 +86,18 @@ async def lifespan(app: FastAPI):
     app.state.scheduler = scheduler
 
     # 启动下载监控任务
-    download_monitor = DownloadMonitorTask(scheduler)
+    download_monitor = DownloadMonitorTask(scheduler, container)
     download_monitor.start(interval=60)  # 每 60 秒检查一次
     app.state.download_monitor = download_monitor
 
+    # 定期清理业务链缓存中的过期条目
+    scheduler.add_job(
+        get_chain_cache().cleanup_expired,
+        "interval",
+        seconds=settings.chain_cache_cleanup_interval,
+        id="chain_cache_cleanup",
+    )
+
     # 启动调度器
     scheduler.start()
 
@@ -90,8 +116,30 @@ async def lifespan(app: FastAPI):
     if hasattr(app.state, "scheduler"):
         app.state.scheduler.shutdown()
 
-    # 停止所有模块
-    app.state.module_manager.stop_all()
+    # 停止下载调度（未完成的下载保留到下次启动）
+    await close_download_scheduler()
+
+    # 停止所有模块并释放业务链
+    close_app_container()
+
+    # 关闭元数据解析进程池
+    close_parse_executor()
+
+    # 处理剩余事件并停止事件总线
+    await event_bus.stop()
+
+    # 写回播放状态和播放记录
+    await close_playback_state_store()
+    await close_play_history_recorder()
+
+    # 关闭共享 HTTP 连接池和 MusicBrainz 客户端
+    await close_netease_client()
+    close_musicbrainz_client()
+
+    # 关闭共享缓存后端
+    await close_default_cache_backend()
+    close_musicbrainz_cache()
+    close_musicbrainz_mirror()
 
     # 关闭数据库连接
     await db_manager.close()
@@ -141,9 +189,11 @@ def create_app() -> FastAPI:
     @app.get("/health")
     async def health_check():
         """健康检查"""
+        metrics = event_bus.metrics()
         return {
             "status": "ok",
             "version": "0.1.0",
+            "events": {"workers": metrics["workers"], "pending": metrics["pending"]},
         }
 
     # 注册路由
@@ -8,6 +8,7 @@ from .base import (
     DownloadSource,
     DownloadStatus,
     DownloadTask,
+    SegmentedDownload,
 )
 from .netease import NeteaseDownloader
 
@@ -17,5 +18,6 @@ __all__ = [
     "DownloadSource",
     "DownloadTask",
     "DownloaderBase",
+    "SegmentedDownload",
     "NeteaseDownloader",
 ]
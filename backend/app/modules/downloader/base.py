@@ -3,10 +3,19 @@
 定义下载器接口
 """
 
+import asyncio
+import json
+import os
 from abc import ABC, abstractmethod
+from collections.abc import Callable
 from enum import StrEnum
+from pathlib import Path
 from typing import Any
 
+import aiofiles
+import httpx
+
+from app.core.log import logger
 from app.core.module import ModuleBase
 
 
@@ -92,8 +101,302 @@ class DownloadTask:
             "total_bytes": self.total_bytes,
             "error_message": self.error_message,
             "file_path": self.file_path,
+            "metadata": self.metadata,
         }
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "DownloadTask":
+        """从字典创建（用于恢复持久化的任务）"""
+        task = cls(
+            task_id=data["task_id"],
+            url=data["url"],
+            source=DownloadSource(data["source"]),
+            quality=DownloadQuality(data.get("quality", DownloadQuality.STANDARD.value)),
+            artist=data.get("artist"),
+            album=data.get("album"),
+            title=data.get("title"),
+            target_path=data.get("target_path"),
+            metadata=data.get("metadata"),
+        )
+        task.status = DownloadStatus(data.get("status", DownloadStatus.PENDING.value))
+        task.progress = data.get("progress", 0.0)
+        task.downloaded_bytes = data.get("downloaded_bytes", 0)
+        task.total_bytes = data.get("total_bytes", 0)
+        task.error_message = data.get("error_message")
+        task.file_path = data.get("file_path")
+        return task
+
+
+class SegmentedDownload:
+    """
+    分段 HTTP 下载引擎
+
+    - 服务器支持 Range 时把文件切成多个区间并行下载，写入预分配的 .part 文件
+    - 文件的打开和写入在线程池中执行，不阻塞事件循环
+    - 各区间的进度保存在 .part.json 清单中，失败后重新下载时从中断处继续
+    - .part 和清单文件按 part_name 命名，同名的不同歌曲同时下载时互不干扰
+    - 完成后校验文件大小，再重命名为目标文件
+    - 服务器不支持 Range 或没有返回文件大小时，退化为单连接完整下载
+    """
+
+    PART_SUFFIX = ".part"
+    MANIFEST_SUFFIX = ".part.json"
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        file_path: str | Path,
+        max_segments: int = 4,
+        min_segment_size: int = 1024 * 1024,
+        chunk_size: int = 64 * 1024,
+        write_size: int = 1024 * 1024,
+        progress_callback: Callable[[int, int], None] | None = None,
+        part_name: str | None = None,
+    ):
+        """
+        初始化分段下载
+
+        Args:
+            client: HTTP 客户端
+            url: 下载地址
+            file_path: 目标文件路径
+            max_segments: 最大并行区间数
+            min_segment_size: 每个区间的最小字节数，文件较小时减少区间数
+            chunk_size: 读取块大小
+            write_size: 缓冲达到该字节数时写入文件
+            progress_callback: 进度回调 (已下载字节数, 总字节数)
+            part_name: .part 和清单文件的名称（不含后缀），默认使用目标文件名
+        """
+        self.client = client
+        self.url = url
+        self.file_path = Path(file_path)
+        part_name = part_name or self.file_path.name
+        self.part_path = self.file_path.with_name(part_name + self.PART_SUFFIX)
+        self.manifest_path = self.file_path.with_name(part_name + self.MANIFEST_SUFFIX)
+        self.max_segments = max(max_segments, 1)
+        self.min_segment_size = min_segment_size
+        self.chunk_size = chunk_size
+        self.write_size = write_size
+        self.progress_callback = progress_callback
+        self.logger = logger
+
+        self.total = 0
+        self.downloaded = 0
+        # 区间列表 [起始字节, 结束字节（含）, 已下载字节数]
+        self.segments: list[list[int]] = []
+        # 各区间并发保存清单时串行写入
+        self._manifest_lock = asyncio.Lock()
+
+    async def run(self) -> int:
+        """
+        执行下载
+
+        Returns:
+            文件字节数
+
+        Raises:
+            httpx.HTTPError: 请求失败（已下载的区间保留，下次继续）
+            OSError: 文件大小校验失败
+        """
+        total, ranged = await self._probe()
+        if not total or not ranged:
+            return await self._download_whole(total)
+
+        self.total = total
+        self.segments = await asyncio.to_thread(self._load_manifest, total) or self._plan(total)
+        self.downloaded = sum(done for _, _, done in self.segments)
+        if self.downloaded:
+            self.logger.info(f"继续下载: {self.file_path.name} ({self.downloaded}/{total} 字节)")
+        await asyncio.to_thread(self._preallocate, total)
+
+        tasks = [asyncio.create_task(self._fetch_segment(segment)) for segment in self.segments]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            await self._save_manifest()
+
+        await asyncio.to_thread(self._finish, total)
+        return total
+
+    async def _probe(self) -> tuple[int | None, bool]:
+        """
+        请求第一个字节，获取文件大小和是否支持 Range
+
+        Returns:
+            (文件大小, 是否支持 Range)
+        """
+        async with self.client.stream("GET", self.url, headers={"Range": "bytes=0-0"}) as response:
+            response.raise_for_status()
+            content_range = response.headers.get("content-range", "")
+            if response.status_code == 206 and "/" in content_range:
+                total = content_range.rsplit("/", 1)[1]
+                if total.isdigit():
+                    return int(total), True
+            length = response.headers.get("content-length")
+            return (int(length) if length and response.status_code == 200 else None), False
+
+    def _plan(self, total: int) -> list[list[int]]:
+        """
+        按文件大小划分区间
+
+        Args:
+            total: 文件字节数
+
+        Returns:
+            区间列表
+        """
+        count = max(1, min(self.max_segments, total // self.min_segment_size))
+        size = -(-total // count)
+        return [[start, min(start + size, total) - 1, 0] for start in range(0, total, size)]
+
+    async def _fetch_segment(self, segment: list[int]):
+        """
+        下载一个区间的剩余部分
+
+        Args:
+            segment: [起始字节, 结束字节, 已下载字节数]
+        """
+        start, end, done = segment
+        if start + done > end:
+            return
+
+        headers = {"Range": f"bytes={start + done}-{end}"}
+        async with self.client.stream("GET", self.url, headers=headers) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise httpx.HTTPError(f"服务器未返回分段内容: HTTP {response.status_code}")
+
+            async with aiofiles.open(self.part_path, "r+b") as f:
+                buffer = bytearray()
+                async for chunk in response.aiter_bytes(self.chunk_size):
+                    buffer += chunk
+                    if len(buffer) >= self.write_size:
+                        await self._write_segment(f, segment, buffer)
+                        buffer.clear()
+                if buffer:
+                    await self._write_segment(f, segment, buffer)
+
+    async def _write_segment(self, f, segment: list[int], data: bytearray):
+        """
+        写入区间数据并更新进度
+
+        Args:
+            f: 异步文件对象（每个区间单独打开）
+            segment: 区间
+            data: 数据
+        """
+        start, end, done = segment
+        # 服务器多返回的数据丢弃
+        data = bytes(data[: end - start + 1 - done])
+        await f.seek(start + done)
+        await f.write(data)
+        segment[2] += len(data)
+        self._advance(len(data))
+        await self._save_manifest()
+
+    async def _download_whole(self, total: int | None) -> int:
+        """
+        单连接完整下载（不支持断点续传）
+
+        Args:
+            total: 文件字节数，未知时为 None
+
+        Returns:
+            文件字节数
+        """
+        self.total = total or 0
+        self.downloaded = 0
+        async with self.client.stream("GET", self.url) as response:
+            response.raise_for_status()
+            async with aiofiles.open(self.part_path, "wb") as f:
+                buffer = bytearray()
+                async for chunk in response.aiter_bytes(self.chunk_size):
+                    buffer += chunk
+                    if len(buffer) >= self.write_size:
+                        await f.write(bytes(buffer))
+                        self._advance(len(buffer))
+                        buffer.clear()
+                if buffer:
+                    await f.write(bytes(buffer))
+                    self._advance(len(buffer))
+
+        await asyncio.to_thread(self._finish, total)
+        return self.downloaded
+
+    def _advance(self, size: int):
+        """累加下载进度并回调"""
+        self.downloaded += size
+        if self.progress_callback:
+            self.progress_callback(self.downloaded, self.total)
+
+    def _preallocate(self, total: int):
+        """创建或调整 .part 文件到目标大小"""
+        mode = "r+b" if self.part_path.exists() else "wb"
+        with open(self.part_path, mode) as f:
+            f.truncate(total)
+
+    def _load_manifest(self, total: int) -> list[list[int]] | None:
+        """
+        读取续传清单，文件大小变化或 .part 文件丢失时作废
+
+        Args:
+            total: 当前文件字节数
+
+        Returns:
+            区间列表，没有可用清单时返回 None
+        """
+        if not self.part_path.exists():
+            return None
+        try:
+            manifest = json.loads(self.manifest_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if manifest.get("total") != total:
+            self.logger.warning(f"文件大小变化，重新下载: {self.file_path.name}")
+            return None
+        return [list(segment) for segment in manifest["segments"]]
+
+    async def _save_manifest(self):
+        """保存续传清单"""
+        if not self.segments:
+            return
+        data = json.dumps({"total": self.total, "segments": self.segments})
+        async with self._manifest_lock:
+            await asyncio.to_thread(self._write_manifest, data)
+
+    def _write_manifest(self, data: str):
+        """写入续传清单（先写临时文件再替换，避免写到一半）"""
+        if not self.part_path.exists():
+            return
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        tmp_path.write_text(data)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _finish(self, total: int | None):
+        """
+        校验文件大小并重命名为目标文件
+
+        Args:
+            total: 期望的文件字节数，未知时只校验下载字节数
+
+        Raises:
+            OSError: 大小不匹配
+        """
+        size = self.part_path.stat().st_size
+        expected = total if total is not None else self.downloaded
+        if size != expected or self.downloaded != expected:
+            raise OSError(
+                f"文件大小校验失败: 期望 {expected} 字节, 实际 {self.downloaded}/{size} 字节"
+            )
+        os.replace(self.part_path, self.file_path)
+        self.manifest_path.unlink(missing_ok=True)
+
 
 class DownloaderBase(ModuleBase, ABC):
     """
@@ -103,6 +406,11 @@ class DownloaderBase(ModuleBase, ABC):
     继承自 ModuleBase 以支持模块管理
     """
 
+    # 分段下载配置，子类可覆盖；为 1 时单连接下载（仍支持断点续传）
+    MAX_SEGMENTS = 1
+    MIN_SEGMENT_SIZE = 1024 * 1024
+    CHUNK_SIZE = 64 * 1024
+
     def __init__(self):
         super().__init__()
         self.module_type = "downloader"
@@ -129,7 +437,7 @@ class DownloaderBase(ModuleBase, ABC):
 
     @abstractmethod
     async def download(
-        self, task: DownloadTask, progress_callback: callable | None = None
+        self, task: DownloadTask, progress_callback: Callable | None = None
     ) -> DownloadTask:
         """
         下载音乐
@@ -157,6 +465,61 @@ class DownloaderBase(ModuleBase, ABC):
         """
         pass
 
+    async def fetch_file(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        file_path: str | Path,
+        task: DownloadTask,
+        progress_callback: Callable | None = None,
+    ) -> int:
+        """
+        使用分段下载引擎下载文件，并更新任务进度
+
+        .part 和清单文件名包含任务 ID，同一目录下同名的不同歌曲不会写入同一个 .part 文件
+
+        Args:
+            client: HTTP 客户端
+            url: 下载地址
+            file_path: 目标文件路径
+            task: 下载任务
+            progress_callback: 进度回调函数，参数为任务
+
+        Returns:
+            文件字节数
+        """
+
+        def on_progress(downloaded: int, total: int):
+            task.downloaded_bytes = downloaded
+            task.total_bytes = total
+            task.progress = (downloaded / total) if total > 0 else 0
+            if progress_callback:
+                progress_callback(task)
+
+        file_path = Path(file_path)
+        download = SegmentedDownload(
+            client,
+            url,
+            file_path,
+            max_segments=self.MAX_SEGMENTS,
+            min_segment_size=self.MIN_SEGMENT_SIZE,
+            chunk_size=self.CHUNK_SIZE,
+            progress_callback=on_progress,
+            part_name=f"{file_path.stem}.{task.task_id}{file_path.suffix}",
+        )
+        size = await download.run()
+        task.total_bytes = size
+        return size
+
+    def prefetch(self, tasks: list[DownloadTask]):
+        """
+        任务即将执行时预取下载所需的信息（如下载 URL），默认不做处理
+
+        Args:
+            tasks: 下载任务列表
+        """
+        pass
+
     @abstractmethod
     async def test(self) -> tuple[bool, str]:
         """
@@ -2,11 +2,18 @@
 网易云音乐下载器
 """
 
+import asyncio
+import importlib.util
+import time
+from collections.abc import Callable, Iterable
 from pathlib import Path
 from typing import Any
 
 import httpx
 
+from app.core.config import settings
+from app.core.log import logger
+
 from .base import (
     DownloaderBase,
     DownloadQuality,
@@ -15,6 +22,288 @@ from .base import (
     DownloadTask,
 )
 
+API_URL = "https://interface.music.163.com"
+
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_netease_client() -> httpx.AsyncClient:
+    """
+    获取共享的网易云音乐 HTTP 客户端
+
+    所有下载器实例共用一个连接池（keep-alive，安装 h2 时使用 HTTP/2），
+    避免每次请求重新建立 TCP/TLS 连接。连接绑定事件循环，循环变化时重新创建
+
+    Returns:
+        HTTP 客户端
+    """
+    global _client, _client_loop
+
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        http2 = settings.netease_http2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("未安装 h2，网易云音乐客户端使用 HTTP/1.1")
+            http2 = False
+
+        _client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.netease_max_connections,
+                max_keepalive_connections=settings.netease_max_keepalive_connections,
+                keepalive_expiry=settings.netease_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                settings.netease_read_timeout, connect=settings.netease_connect_timeout
+            ),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_netease_client():
+    """关闭共享的网易云音乐 HTTP 客户端"""
+    global _client, _client_loop
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _client_loop = None
+
+
+class NeteaseUrlResolver:
+    """
+    网易云音乐下载 URL 批量解析器
+
+    - 短时间窗口内请求的歌曲 ID 按音质分组，合并为一次多 ID 的 player/url 请求
+    - 同一首歌正在解析时复用同一个结果，不重复请求
+    - 解析出的 URL 缓存到过期前（提前 EXPIRY_MARGIN 秒失效）
+    """
+
+    # 接口未返回有效期时使用的默认有效期（秒）
+    DEFAULT_EXPIRY = 1200
+    # 提前失效的时间（秒），避免下载开始时 URL 刚好过期
+    EXPIRY_MARGIN = 60
+
+    def __init__(
+        self,
+        api_url: str = API_URL,
+        batch_size: int | None = None,
+        window: float | None = None,
+        max_entries: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初始化 URL 解析器
+
+        Args:
+            api_url: 接口地址
+            batch_size: 每次请求的最大歌曲数，默认使用配置
+            window: 合并请求的等待窗口（秒），默认使用配置
+            max_entries: 最大缓存条目数
+            clock: 时钟函数（测试用）
+        """
+        self.api_url = api_url
+        self.batch_size = batch_size or settings.netease_url_batch_size
+        self.window = window if window is not None else settings.netease_url_batch_window
+        self.max_entries = max_entries
+        self.clock = clock
+        self.logger = logger
+        self.request_count = 0
+
+        # (br, level, 歌曲 ID) -> (URL, 失效时间)
+        self._cache: dict[tuple[str, str, str], tuple[str, float]] = {}
+        # (br, level, 歌曲 ID) -> 等待中或请求中的结果
+        self._futures: dict[tuple[str, str, str], asyncio.Future] = {}
+        # (br, level) -> 等待合并的歌曲 ID
+        self._pending: dict[tuple[str, str], list[str]] = {}
+        self._timers: dict[tuple[str, str], asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def resolve(self, song_id: str | int, br: str, level: str) -> str:
+        """
+        解析单首歌曲的下载 URL
+
+        Args:
+            song_id: 歌曲 ID
+            br: 码率参数
+            level: 音质等级参数
+
+        Returns:
+            下载 URL，无版权或需要登录时为空字符串
+
+        Raises:
+            Exception: 请求失败
+        """
+        key = (br, level, str(song_id))
+        cached = self._get_cached(key)
+        if cached is not None:
+            return cached
+        # 调用方被取消时不影响同一批次的其他等待者
+        return await asyncio.shield(self._enqueue(key))
+
+    async def resolve_many(
+        self, song_ids: Iterable[str | int], br: str, level: str
+    ) -> dict[str, str]:
+        """
+        解析多首歌曲的下载 URL
+
+        Args:
+            song_ids: 歌曲 ID 列表
+            br: 码率参数
+            level: 音质等级参数
+
+        Returns:
+            歌曲 ID -> 下载 URL（请求失败的歌曲不包含在内）
+        """
+        ids = list(dict.fromkeys(str(song_id) for song_id in song_ids))
+        urls = await asyncio.gather(
+            *(self.resolve(song_id, br, level) for song_id in ids), return_exceptions=True
+        )
+        return {
+            song_id: url for song_id, url in zip(ids, urls, strict=True) if isinstance(url, str)
+        }
+
+    def prefetch(self, song_ids: Iterable[str | int], br: str, level: str):
+        """
+        预取下载 URL（不等待结果），后续 resolve 直接使用缓存或进行中的请求
+
+        Args:
+            song_ids: 歌曲 ID 列表
+            br: 码率参数
+            level: 音质等级参数
+        """
+        for song_id in song_ids:
+            key = (br, level, str(song_id))
+            if self._get_cached(key) is None:
+                self._enqueue(key)
+
+    def invalidate(self, song_id: str | int, br: str, level: str):
+        """
+        删除缓存的下载 URL（如 CDN 拒绝访问），下次解析或预取时重新请求
+
+        Args:
+            song_id: 歌曲 ID
+            br: 码率参数
+            level: 音质等级参数
+        """
+        self._cache.pop((br, level, str(song_id)), None)
+
+    def _get_cached(self, key: tuple[str, str, str]) -> str | None:
+        """获取未失效的缓存 URL"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= self.clock():
+            del self._cache[key]
+            return None
+        return entry[0]
+
+    def _enqueue(self, key: tuple[str, str, str]) -> asyncio.Future:
+        """
+        加入等待合并的批次，达到批次大小时立即请求，否则等待窗口结束
+
+        Args:
+            key: (br, level, 歌曲 ID)
+
+        Returns:
+            解析结果
+        """
+        future = self._futures.get(key)
+        if future is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # 预取的结果可能没有等待者，请求失败时不输出 "exception was never retrieved"
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._futures[key] = future
+
+        group = key[:2]
+        pending = self._pending.setdefault(group, [])
+        pending.append(key[2])
+        if len(pending) >= self.batch_size:
+            self._flush(group)
+        elif group not in self._timers:
+            self._timers[group] = loop.call_later(self.window, self._flush, group)
+        return future
+
+    def _flush(self, group: tuple[str, str]):
+        """发出一个批次的请求"""
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        song_ids = self._pending.pop(group, None)
+        if not song_ids:
+            return
+
+        task = asyncio.create_task(self._fetch(group, song_ids))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, group: tuple[str, str], song_ids: list[str]):
+        """
+        请求一批歌曲的下载 URL 并通知等待者
+
+        Args:
+            group: (br, level)
+            song_ids: 歌曲 ID 列表
+        """
+        br, level = group
+        params = {"ids": f"[{','.join(song_ids)}]", "br": br, "level": level}
+        self.request_count += 1
+
+        try:
+            response = await get_netease_client().get(
+                f"{self.api_url}/api/song/enhance/player/url/v1", params=params
+            )
+            response.raise_for_status()
+            data = response.json()
+            if data.get("code") != 200:
+                raise ValueError(f"获取下载 URL 失败: {data.get('message', '未知错误')}")
+        except Exception as e:
+            self.logger.error(f"批量获取下载 URL 失败 ({len(song_ids)} 首): {e}")
+            for song_id in song_ids:
+                future = self._futures.pop((br, level, song_id), None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+
+        items = {str(item.get("id")): item for item in data.get("data") or []}
+        now = self.clock()
+        for song_id in song_ids:
+            key = (br, level, song_id)
+            item = items.get(song_id, {})
+            url = item.get("url") or ""
+            if url:
+                expiry = item.get("expi") or self.DEFAULT_EXPIRY
+                self._store(key, url, now + expiry - self.EXPIRY_MARGIN)
+            future = self._futures.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(url)
+
+    def _store(self, key: tuple[str, str, str], url: str, expires_at: float):
+        """写入缓存，超过上限时先清理失效条目，再淘汰最早写入的条目"""
+        if len(self._cache) >= self.max_entries:
+            now = self.clock()
+            for stale in [k for k, (_, exp) in self._cache.items() if exp <= now]:
+                del self._cache[stale]
+            while len(self._cache) >= self.max_entries:
+                del self._cache[next(iter(self._cache))]
+        self._cache[key] = (url, expires_at)
+
+
+_url_resolver: NeteaseUrlResolver | None = None
+
+
+def get_netease_url_resolver() -> NeteaseUrlResolver:
+    """获取全局网易云音乐下载 URL 解析器"""
+    global _url_resolver
+    if _url_resolver is None:
+        _url_resolver = NeteaseUrlResolver()
+    return _url_resolver
+
 
 class NeteaseDownloader(DownloaderBase):
     """
@@ -23,6 +312,9 @@ class NeteaseDownloader(DownloaderBase):
     支持搜索、下载、获取实际下载 URL
     """
 
+    # 大文件（无损音质）分 4 段并行下载
+    MAX_SEGMENTS = 4
+
     def __init__(self):
         super().__init__()
         self.source = DownloadSource.NETEASE
@@ -32,9 +324,9 @@ class NeteaseDownloader(DownloaderBase):
             DownloadQuality.STANDARD,
         ]
         self.base_url = "https://music.163.com"
-        self.api_url = "https://interface.music.163.com"
+        self.api_url = API_URL
         self.weapi_url = "https://music.163.com/weapi"
-        self.timeout = 30
+        self.url_resolver = get_netease_url_resolver()
 
     def init_setting(self) -> tuple[str, bool] | None:
         """
@@ -107,51 +399,47 @@ class NeteaseDownloader(DownloaderBase):
         tasks = []
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(search_url, params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                if data.get("code") == 200:
-                    songs = data.get("result", {}).get("songs", [])
-                    for song in songs:
-                        # 获取艺术家名称
-                        artist_name = None
-                        if song.get("artists"):
-                            artist_name = ", ".join(
-                                [artist.get("name", "") for artist in song["artists"]]
-                            )
-
-                        # 获取专辑名称
-                        album_name = (
-                            song.get("album", {}).get("name") if song.get("album") else None
+            client = get_netease_client()
+            response = await client.get(search_url, params=params)
+            response.raise_for_status()
+            data = response.json()
+
+            if data.get("code") == 200:
+                songs = data.get("result", {}).get("songs", [])
+                for song in songs:
+                    # 获取艺术家名称
+                    artist_name = None
+                    if song.get("artists"):
+                        artist_name = ", ".join(
+                            [artist.get("name", "") for artist in song["artists"]]
                         )
 
-                        task = DownloadTask(
-                            task_id=f"netease_{song['id']}",
-                            url=str(song["id"]),
-                            source=self.source,
-                            quality=quality or DownloadQuality.STANDARD,
-                            artist=artist_name,
-                            album=album_name,
-                            title=song.get("name"),
-                            metadata={
-                                "song_id": song["id"],
-                                "artist_ids": [a.get("id") for a in song.get("artists", [])],
-                                "album_id": (
-                                    song.get("album", {}).get("id") if song.get("album") else None
-                                ),
-                                "duration": (
-                                    song.get("duration") / 1000 if song.get("duration") else None
-                                ),
-                                "album_pic": (
-                                    song.get("album", {}).get("picUrl")
-                                    if song.get("album")
-                                    else None
-                                ),
-                            },
-                        )
-                        tasks.append(task)
+                    # 获取专辑名称
+                    album_name = song.get("album", {}).get("name") if song.get("album") else None
+
+                    task = DownloadTask(
+                        task_id=f"netease_{song['id']}",
+                        url=str(song["id"]),
+                        source=self.source,
+                        quality=quality or DownloadQuality.STANDARD,
+                        artist=artist_name,
+                        album=album_name,
+                        title=song.get("name"),
+                        metadata={
+                            "song_id": song["id"],
+                            "artist_ids": [a.get("id") for a in song.get("artists", [])],
+                            "album_id": (
+                                song.get("album", {}).get("id") if song.get("album") else None
+                            ),
+                            "duration": (
+                                song.get("duration") / 1000 if song.get("duration") else None
+                            ),
+                            "album_pic": (
+                                song.get("album", {}).get("picUrl") if song.get("album") else None
+                            ),
+                        },
+                    )
+                    tasks.append(task)
 
         except Exception as e:
             self.logger.error(f"搜索失败: {e}")
@@ -172,37 +460,28 @@ class NeteaseDownloader(DownloaderBase):
         注意: 网易云音乐的获取下载 URL 接口需要特定的加密处理
         这里使用 Web API 的 player url 接口
         """
-        # 使用 Web API 获取下载 URL
-        download_url = f"{self.api_url}/api/song/enhance/player/url/v1"
+        # 多个下载同时解析时合并为一次多 ID 请求
+        return await self.url_resolver.resolve(
+            url, self._map_quality(quality), self._map_level(quality)
+        )
 
-        # 映射质量参数
-        br = self._map_quality(quality)
-        level = self._map_level(quality)
-
-        params = {
-            "ids": f"[{url}]",
-            "br": br,
-            "level": level,
-        }
-
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(download_url, params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                if data.get("code") == 200 and data.get("data"):
-                    return data["data"][0].get("url", "")
-                else:
-                    error_msg = data.get("message", "未知错误")
-                    raise ValueError(f"获取下载 URL 失败: {error_msg}")
+    def prefetch(self, tasks: list[DownloadTask]):
+        """
+        预取下载 URL，即将执行的一批任务合并为批量请求
 
-        except Exception as e:
-            self.logger.error(f"获取下载 URL 失败: {e}")
-            raise
+        Args:
+            tasks: 下载任务列表
+        """
+        by_quality: dict[DownloadQuality, list[str]] = {}
+        for task in tasks:
+            by_quality.setdefault(task.quality, []).append(task.url)
+        for quality, song_ids in by_quality.items():
+            self.url_resolver.prefetch(
+                song_ids, self._map_quality(quality), self._map_level(quality)
+            )
 
     async def download(
-        self, task: DownloadTask, progress_callback: callable | None = None
+        self, task: DownloadTask, progress_callback: Callable | None = None
     ) -> DownloadTask:
         """
         下载音乐
@@ -225,43 +504,32 @@ class NeteaseDownloader(DownloaderBase):
 
             self.logger.info(f"开始下载: {task.title} ({task.quality})")
 
-            # 下载文件
-            async with (
-                httpx.AsyncClient(timeout=self.timeout) as client,
-                client.stream("GET", download_url) as response,
-            ):
-                response.raise_for_status()
-
-                # 获取文件大小
-                total_bytes = int(response.headers.get("content-length", 0))
-                task.total_bytes = total_bytes
-
-                # 确定目标路径
-                if task.target_path:
-                    target_dir = Path(task.target_path)
-                else:
-                    target_dir = Path("/tmp/downloads/netease")
-                target_dir.mkdir(parents=True, exist_ok=True)
-
-                # 确定文件扩展名
-                ext = ".flac" if task.quality == DownloadQuality.LOSSLESS else ".mp3"
-                # 清理文件名
-                safe_title = "".join(
-                    c if c.isalnum() or c in " -_()" else "_" for c in task.title or "unknown"
+            # 确定目标路径
+            if task.target_path:
+                target_dir = Path(task.target_path)
+            else:
+                target_dir = Path("/tmp/downloads/netease")
+            target_dir.mkdir(parents=True, exist_ok=True)
+
+            # 确定文件扩展名
+            ext = ".flac" if task.quality == DownloadQuality.LOSSLESS else ".mp3"
+            # 清理文件名
+            safe_title = "".join(
+                c if c.isalnum() or c in " -_()" else "_" for c in task.title or "unknown"
+            )
+            file_path = target_dir / f"{safe_title}{ext}"
+
+            # 分段并行下载，重试时从上次中断处继续（进度回调由调用方节流）
+            try:
+                await self.fetch_file(
+                    get_netease_client(), download_url, file_path, task, progress_callback
                 )
-                file_path = target_dir / f"{safe_title}{ext}"
-
-                # 下载文件
-                downloaded_bytes = 0
-                with open(file_path, "wb") as f:
-                    async for chunk in response.aiter_bytes(8192):
-                        f.write(chunk)
-                        downloaded_bytes += len(chunk)
-                        task.downloaded_bytes = downloaded_bytes
-                        task.progress = (downloaded_bytes / total_bytes) if total_bytes > 0 else 0
-
-                        if progress_callback:
-                            progress_callback(task)
+            except Exception:
+                # URL 可能已被 CDN 拒绝或提前失效，重试时重新获取
+                self.url_resolver.invalidate(
+                    task.url, self._map_quality(task.quality), self._map_level(task.quality)
+                )
+                raise
 
             # 下载完成
             task.status = DownloadStatus.COMPLETED
@@ -275,6 +543,10 @@ class NeteaseDownloader(DownloaderBase):
             task.error_message = str(e)
             self.logger.error(f"下载失败: {task.title} - {e}")
 
+        # 最终状态总是回调一次
+        if progress_callback:
+            progress_callback(task)
+
         return task
 
     async def get_song_detail(self, song_id: str) -> dict[str, Any] | None:
@@ -291,13 +563,13 @@ class NeteaseDownloader(DownloaderBase):
         params = {"ids": f"[{song_id}]"}
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(detail_url, params=params)
-                response.raise_for_status()
-                data = response.json()
+            client = get_netease_client()
+            response = await client.get(detail_url, params=params)
+            response.raise_for_status()
+            data = response.json()
 
-                if data.get("code") == 200 and data.get("songs"):
-                    return data["songs"][0]
+            if data.get("code") == 200 and data.get("songs"):
+                return data["songs"][0]
         except Exception as e:
             self.logger.error(f"获取歌曲详情失败: {e}")
 
@@ -325,43 +597,39 @@ class NeteaseDownloader(DownloaderBase):
         tasks = []
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(artist_url, params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                if data.get("code") == 200:
-                    songs = data.get("songs", [])
-                    for song in songs:
-                        # 获取艺术家名称
-                        artist_name = (
-                            song.get("ar", [{}])[0].get("name") if song.get("ar") else None
-                        )
-
-                        # 获取专辑名称
-                        album_name = song.get("al", {}).get("name") if song.get("al") else None
-
-                        task = DownloadTask(
-                            task_id=f"netease_{song['id']}",
-                            url=str(song["id"]),
-                            source=self.source,
-                            quality=DownloadQuality.STANDARD,
-                            artist=artist_name,
-                            album=album_name,
-                            title=song.get("name"),
-                            metadata={
-                                "song_id": song["id"],
-                                "artist_ids": [a.get("id") for a in song.get("ar", [])],
-                                "album_id": (
-                                    song.get("al", {}).get("id") if song.get("al") else None
-                                ),
-                                "duration": song.get("dt") / 1000 if song.get("dt") else None,
-                                "album_pic": (
-                                    song.get("al", {}).get("picUrl") if song.get("al") else None
-                                ),
-                            },
-                        )
-                        tasks.append(task)
+            client = get_netease_client()
+            response = await client.get(artist_url, params=params)
+            response.raise_for_status()
+            data = response.json()
+
+            if data.get("code") == 200:
+                songs = data.get("songs", [])
+                for song in songs:
+                    # 获取艺术家名称
+                    artist_name = song.get("ar", [{}])[0].get("name") if song.get("ar") else None
+
+                    # 获取专辑名称
+                    album_name = song.get("al", {}).get("name") if song.get("al") else None
+
+                    task = DownloadTask(
+                        task_id=f"netease_{song['id']}",
+                        url=str(song["id"]),
+                        source=self.source,
+                        quality=DownloadQuality.STANDARD,
+                        artist=artist_name,
+                        album=album_name,
+                        title=song.get("name"),
+                        metadata={
+                            "song_id": song["id"],
+                            "artist_ids": [a.get("id") for a in song.get("ar", [])],
+                            "album_id": (song.get("al", {}).get("id") if song.get("al") else None),
+                            "duration": song.get("dt") / 1000 if song.get("dt") else None,
+                            "album_pic": (
+                                song.get("al", {}).get("picUrl") if song.get("al") else None
+                            ),
+                        },
+                    )
+                    tasks.append(task)
 
         except Exception as e:
             self.logger.error(f"获取艺术家歌曲失败: {e}")
@@ -384,41 +652,41 @@ class NeteaseDownloader(DownloaderBase):
         tasks = []
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(album_url)
-                response.raise_for_status()
-                data = response.json()
-
-                if data.get("code") == 200:
-                    album_data = data.get("album", {})
-                    songs = data.get("songs", [])
-
-                    artist_name = None
-                    if album_data.get("artists"):
-                        artist_name = ", ".join(
-                            [artist.get("name", "") for artist in album_data["artists"]]
-                        )
-
-                    album_name = album_data.get("name")
-
-                    for song in songs:
-                        task = DownloadTask(
-                            task_id=f"netease_{song['id']}",
-                            url=str(song["id"]),
-                            source=self.source,
-                            quality=DownloadQuality.STANDARD,
-                            artist=artist_name,
-                            album=album_name,
-                            title=song.get("name"),
-                            metadata={
-                                "song_id": song["id"],
-                                "artist_ids": [a.get("id") for a in song.get("ar", [])],
-                                "album_id": album_id,
-                                "duration": song.get("dt") / 1000 if song.get("dt") else None,
-                                "album_pic": album_data.get("picUrl"),
-                            },
-                        )
-                        tasks.append(task)
+            client = get_netease_client()
+            response = await client.get(album_url)
+            response.raise_for_status()
+            data = response.json()
+
+            if data.get("code") == 200:
+                album_data = data.get("album", {})
+                songs = data.get("songs", [])
+
+                artist_name = None
+                if album_data.get("artists"):
+                    artist_name = ", ".join(
+                        [artist.get("name", "") for artist in album_data["artists"]]
+                    )
+
+                album_name = album_data.get("name")
+
+                for song in songs:
+                    task = DownloadTask(
+                        task_id=f"netease_{song['id']}",
+                        url=str(song["id"]),
+                        source=self.source,
+                        quality=DownloadQuality.STANDARD,
+                        artist=artist_name,
+                        album=album_name,
+                        title=song.get("name"),
+                        metadata={
+                            "song_id": song["id"],
+                            "artist_ids": [a.get("id") for a in song.get("ar", [])],
+                            "album_id": album_id,
+                            "duration": song.get("dt") / 1000 if song.get("dt") else None,
+                            "album_pic": album_data.get("picUrl"),
+                        },
+                    )
+                    tasks.append(task)
 
         except Exception as e:
             self.logger.error(f"获取专辑歌曲失败: {e}")
@@ -444,58 +712,56 @@ class NeteaseDownloader(DownloaderBase):
         tasks = []
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(playlist_url, params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                if data.get("code") == 200:
-                    playlist_data = data.get("playlist", {})
-                    tracks = playlist_data.get("tracks", [])
-
-                    # 歌单名称
-                    playlist_name = playlist_data.get("name", "")
-                    self.logger.info(f"歌单 '{playlist_name}' 包含 {len(tracks)} 首歌曲")
-
-                    for track in tracks:
-                        # 获取艺术家名称
-                        artist_name = None
-                        if track.get("ar"):
-                            artist_name = ", ".join(
-                                [artist.get("name", "") for artist in track["ar"]]
-                            )
-
-                        # 获取专辑名称
-                        album_name = None
-                        if track.get("al"):
-                            album_name = track["al"].get("name")
-
-                        # 创建下载任务
-                        task = DownloadTask(
-                            task_id=f"netease_{track['id']}",
-                            url=str(track["id"]),
-                            source=self.source,
-                            quality=DownloadQuality.STANDARD,
-                            artist=artist_name,
-                            album=album_name,
-                            title=track.get("name"),
-                            metadata={
-                                "song_id": track["id"],
-                                "artist_ids": [a.get("id") for a in track.get("ar", [])],
-                                "album_id": (
-                                    track.get("al", {}).get("id") if track.get("al") else None
-                                ),
-                                "duration": track.get("dt") / 1000 if track.get("dt") else None,
-                                "album_pic": (
-                                    track.get("al", {}).get("picUrl") if track.get("al") else None
-                                ),
-                                "playlist_id": playlist_id,
-                                "playlist_name": playlist_name,
-                            },
-                        )
-                        tasks.append(task)
+            client = get_netease_client()
+            response = await client.get(playlist_url, params=params)
+            response.raise_for_status()
+            data = response.json()
+
+            if data.get("code") == 200:
+                playlist_data = data.get("playlist", {})
+                tracks = playlist_data.get("tracks", [])
 
-                    self.logger.info(f"歌单抓取完成，获取 {len(tasks)} 首歌曲")
+                # 歌单名称
+                playlist_name = playlist_data.get("name", "")
+                self.logger.info(f"歌单 '{playlist_name}' 包含 {len(tracks)} 首歌曲")
+
+                for track in tracks:
+                    # 获取艺术家名称
+                    artist_name = None
+                    if track.get("ar"):
+                        artist_name = ", ".join([artist.get("name", "") for artist in track["ar"]])
+
+                    # 获取专辑名称
+                    album_name = None
+                    if track.get("al"):
+                        album_name = track["al"].get("name")
+
+                    # 创建下载任务
+                    task = DownloadTask(
+                        task_id=f"netease_{track['id']}",
+                        url=str(track["id"]),
+                        source=self.source,
+                        quality=DownloadQuality.STANDARD,
+                        artist=artist_name,
+                        album=album_name,
+                        title=track.get("name"),
+                        metadata={
+                            "song_id": track["id"],
+                            "artist_ids": [a.get("id") for a in track.get("ar", [])],
+                            "album_id": (
+                                track.get("al", {}).get("id") if track.get("al") else None
+                            ),
+                            "duration": track.get("dt") / 1000 if track.get("dt") else None,
+                            "album_pic": (
+                                track.get("al", {}).get("picUrl") if track.get("al") else None
+                            ),
+                            "playlist_id": playlist_id,
+                            "playlist_name": playlist_name,
+                        },
+                    )
+                    tasks.append(task)
+
+                self.logger.info(f"歌单抓取完成，获取 {len(tasks)} 首歌曲")
 
         except Exception as e:
             self.logger.error(f"抓取歌单失败: {e}")
@@ -527,59 +793,57 @@ class NeteaseDownloader(DownloaderBase):
         tasks = []
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(playlist_url, params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                if data.get("code") == 200:
-                    playlist_data = data.get("playlist", {})
-                    tracks = playlist_data.get("tracks", [])
-
-                    # 榜单名称
-                    chart_name = playlist_data.get("name", "")
-                    self.logger.info(f"榜单 '{chart_name}' 包含 {len(tracks)} 首歌曲")
-
-                    for idx, track in enumerate(tracks, start=1):
-                        # 获取艺术家名称
-                        artist_name = None
-                        if track.get("ar"):
-                            artist_name = ", ".join(
-                                [artist.get("name", "") for artist in track["ar"]]
-                            )
-
-                        # 获取专辑名称
-                        album_name = None
-                        if track.get("al"):
-                            album_name = track["al"].get("name")
-
-                        # 创建下载任务
-                        task = DownloadTask(
-                            task_id=f"netease_{track['id']}",
-                            url=str(track["id"]),
-                            source=self.source,
-                            quality=DownloadQuality.STANDARD,
-                            artist=artist_name,
-                            album=album_name,
-                            title=track.get("name"),
-                            metadata={
-                                "song_id": track["id"],
-                                "artist_ids": [a.get("id") for a in track.get("ar", [])],
-                                "album_id": (
-                                    track.get("al", {}).get("id") if track.get("al") else None
-                                ),
-                                "duration": track.get("dt") / 1000 if track.get("dt") else None,
-                                "album_pic": (
-                                    track.get("al", {}).get("picUrl") if track.get("al") else None
-                                ),
-                                "chart_id": chart_id,
-                                "chart_name": chart_name,
-                                "rank": idx,  # 排名
-                            },
-                        )
-                        tasks.append(task)
+            client = get_netease_client()
+            response = await client.get(playlist_url, params=params)
+            response.raise_for_status()
+            data = response.json()
 
-                    self.logger.info(f"榜单抓取完成，获取 {len(tasks)} 首歌曲")
+            if data.get("code") == 200:
+                playlist_data = data.get("playlist", {})
+                tracks = playlist_data.get("tracks", [])
+
+                # 榜单名称
+                chart_name = playlist_data.get("name", "")
+                self.logger.info(f"榜单 '{chart_name}' 包含 {len(tracks)} 首歌曲")
+
+                for idx, track in enumerate(tracks, start=1):
+                    # 获取艺术家名称
+                    artist_name = None
+                    if track.get("ar"):
+                        artist_name = ", ".join([artist.get("name", "") for artist in track["ar"]])
+
+                    # 获取专辑名称
+                    album_name = None
+                    if track.get("al"):
+                        album_name = track["al"].get("name")
+
+                    # 创建下载任务
+                    task = DownloadTask(
+                        task_id=f"netease_{track['id']}",
+                        url=str(track["id"]),
+                        source=self.source,
+                        quality=DownloadQuality.STANDARD,
+                        artist=artist_name,
+                        album=album_name,
+                        title=track.get("name"),
+                        metadata={
+                            "song_id": track["id"],
+                            "artist_ids": [a.get("id") for a in track.get("ar", [])],
+                            "album_id": (
+                                track.get("al", {}).get("id") if track.get("al") else None
+                            ),
+                            "duration": track.get("dt") / 1000 if track.get("dt") else None,
+                            "album_pic": (
+                                track.get("al", {}).get("picUrl") if track.get("al") else None
+                            ),
+                            "chart_id": chart_id,
+                            "chart_name": chart_name,
+                            "rank": idx,  # 排名
+                        },
+                    )
+                    tasks.append(task)
+
+                self.logger.info(f"榜单抓取完成，获取 {len(tasks)} 首歌曲")
 
         except Exception as e:
             self.logger.error(f"抓取榜单失败: {e}")
@@ -594,16 +858,15 @@ class NeteaseDownloader(DownloaderBase):
             (是否可用, 错误信息)
         """
         try:
-            async with httpx.AsyncClient(timeout=5) as client:
-                response = await client.get(self.base_url)
-                if response.status_code == 200:
-                    # 测试搜索功能
-                    result = await self.search("test", limit=1)
-                    if result:
-                        return True, "连接成功，搜索功能正常"
-                    else:
-                        return False, "搜索功能异常"
+            response = await get_netease_client().get(self.base_url, timeout=5)
+            if response.status_code == 200:
+                # 测试搜索功能
+                result = await self.search("test", limit=1)
+                if result:
+                    return True, "连接成功，搜索功能正常"
                 else:
-                    return False, f"连接失败: HTTP {response.status_code}"
+                    return False, "搜索功能异常"
+            else:
+                return False, f"连接失败: HTTP {response.status_code}"
         except Exception as e:
             return False, f"连接失败: {str(e)}"
@@ -1,24 +1,46 @@
 """
 MusicBrainz 模块
-使用 musicbrainzngs 库集成 MusicBrainz API
+使用 musicbrainzngs 库集成 MusicBrainz API，请求通过异步客户端限速执行
 """
 
-import time
 from typing import Any
 
-from app.modules.module_base import ModuleBase
-from musicbrainzngs import (
-    get_artist_by_id,
-    get_recording_by_id,
-    get_release_cover_url,
-    get_release_group_by_id,
-    search_artists,
-    search_recordings,
-    search_release_groups,
-    set_useragent,
-)
+from musicbrainzngs import ResponseError
 
 from app.core.config import settings
+from app.core.module import ModuleBase
+
+from .cache import (
+    MusicBrainzCache,
+    close_musicbrainz_cache,
+    entity_key,
+    get_musicbrainz_cache,
+    query_key,
+)
+from .client import (
+    MusicBrainzClient,
+    TokenBucket,
+    close_musicbrainz_client,
+    get_musicbrainz_client,
+)
+from .mirror import MusicBrainzMirror, close_musicbrainz_mirror, get_musicbrainz_mirror
+
+__all__ = [
+    "MusicBrainzCache",
+    "MusicBrainzClient",
+    "MusicBrainzMirror",
+    "MusicBrainzModule",
+    "TokenBucket",
+    "close_musicbrainz_cache",
+    "close_musicbrainz_client",
+    "close_musicbrainz_mirror",
+    "get_musicbrainz_cache",
+    "get_musicbrainz_client",
+    "get_musicbrainz_mirror",
+]
+
+# Cover Art Archive 地址
+COVER_ART_URL = "https://coverartarchive.org"
 
 
 class MusicBrainzModule(ModuleBase):
@@ -31,21 +53,85 @@ class MusicBrainzModule(ModuleBase):
 
     def __init__(self):
         super().__init__()
-        # 设置 User-Agent（MusicBrainz 要求）
-        set_useragent(
-            f"{settings.musicbrainz_app_name}/{settings.musicbrainz_app_version}",
-            "https://github.com/hhyo/MusicPilot",
-        )
-        self._last_request_time = 0
-        self._rate_limit = 1.0  # 1 请求/秒
+        # 共享客户端：全局限速（1 请求/秒）并合并相同请求
+        self.client = get_musicbrainz_client()
+        # 持久化缓存：所有请求先查缓存
+        self.cache = get_musicbrainz_cache()
+        # 本地镜像（可选）：优先于缓存和在线 API
+        self.mirror = get_musicbrainz_mirror()
+
+    async def _get_entity(
+        self, entity: str, method: str, mbid: str, includes: list[str]
+    ) -> dict[str, Any] | None:
+        """
+        按 MBID 获取实体，依次查询本地镜像、缓存和在线 API，不存在（404）时写入负缓存
+
+        Args:
+            entity: 实体类型，同时是响应中的字段名
+            method: musicbrainzngs 函数名称
+            mbid: MusicBrainz ID
+            includes: 附加的关联数据
+
+        Returns:
+            实体数据，不存在时返回 None
+        """
+        if self.mirror:
+            value = await self.mirror.async_get(entity, mbid)
+            if value:
+                return value
 
-    def _rate_limit(self):
-        """遵守 API 速率限制"""
-        now = time.time()
-        elapsed = now - self._last_request_time
-        if elapsed < self._rate_limit:
-            time.sleep(self._rate_limit - elapsed)
-        self._last_request_time = time.time()
+        key = entity_key(entity, mbid)
+        hit, value = await self.cache.async_get(key)
+        if hit:
+            return value
+
+        try:
+            result = await self.client.call(method, mbid, includes=includes)
+            value = result.get(entity)
+        except ResponseError as e:
+            if getattr(e.cause, "code", None) != 404:
+                raise
+            value = None
+
+        ttl = settings.musicbrainz_cache_ttl if value else settings.musicbrainz_cache_negative_ttl
+        await self.cache.async_set(key, value, ttl)
+        return value
+
+    async def _search(
+        self, entity: str, method: str, list_key: str, query: str, limit: int
+    ) -> list[dict[str, Any]]:
+        """
+        搜索实体，本地镜像有结果时直接返回，否则按规范化查询缓存在线结果，无结果时使用负缓存时间
+
+        Args:
+            entity: 实体类型
+            method: musicbrainzngs 函数名称
+            list_key: 响应中结果列表的字段名
+            query: 搜索关键词
+            limit: 返回数量
+
+        Returns:
+            搜索结果列表
+        """
+        if self.mirror:
+            results = await self.mirror.async_search(entity, query, limit)
+            if results:
+                return results
+
+        key = query_key(entity, query, limit)
+        hit, value = await self.cache.async_get(key)
+        if hit:
+            return value or []
+
+        result = await self.client.call(method, query, limit=limit)
+        value = result.get(list_key) or None
+        ttl = (
+            settings.musicbrainz_cache_search_ttl
+            if value
+            else settings.musicbrainz_cache_negative_ttl
+        )
+        await self.cache.async_set(key, value, ttl)
+        return value or []
 
     async def search_artist(self, query: str, limit: int = 50) -> list[dict[str, Any]]:
         """
@@ -58,13 +144,12 @@ class MusicBrainzModule(ModuleBase):
         Returns:
             艺术家列表
         """
-        self._rate_limit()
         self.logger.info(f"搜索艺术家: {query}")
 
-        result = search_artists(query, limit=limit)
+        results = await self._search("artist", "search_artists", "artist-list", query, limit)
         artists = []
 
-        for artist in result.get("artist-list", []):
+        for artist in results:
             artists.append(
                 {
                     "id": artist.get("id"),
@@ -89,11 +174,12 @@ class MusicBrainzModule(ModuleBase):
         Returns:
             艺术家详情
         """
-        self._rate_limit()
         self.logger.info(f"获取艺术家详情: {artist_id}")
 
         try:
-            artist = get_artist_by_id(artist_id)
+            artist = await self._get_entity(
+                "artist", "get_artist_by_id", artist_id, ["release-groups"]
+            )
         except Exception as e:
             self.logger.error(f"获取艺术家详情失败: {e}")
             return None
@@ -145,13 +231,14 @@ class MusicBrainzModule(ModuleBase):
         Returns:
             专辑列表
         """
-        self._rate_limit()
         self.logger.info(f"搜索专辑: {query}")
 
-        result = search_release_groups(query, limit=limit)
+        results = await self._search(
+            "release-group", "search_release_groups", "release-group-list", query, limit
+        )
         albums = []
 
-        for rg in result.get("release-group-list", []):
+        for rg in results:
             album = {
                 "id": rg.get("id"),
                 "title": rg.get("title"),
@@ -175,11 +262,15 @@ class MusicBrainzModule(ModuleBase):
         Returns:
             专辑详情
         """
-        self._rate_limit()
         self.logger.info(f"获取专辑详情: {album_id}")
 
         try:
-            rg = get_release_group_by_id(album_id)
+            rg = await self._get_entity(
+                "release-group",
+                "get_release_group_by_id",
+                album_id,
+                ["releases", "artist-credits", "tags"],
+            )
         except Exception as e:
             self.logger.error(f"获取专辑详情失败: {e}")
             return None
@@ -215,13 +306,14 @@ class MusicBrainzModule(ModuleBase):
         Returns:
             曲目列表
         """
-        self._rate_limit()
         self.logger.info(f"搜索曲目: {query}")
 
-        result = search_recordings(query, limit=limit)
+        results = await self._search(
+            "recording", "search_recordings", "recording-list", query, limit
+        )
         tracks = []
 
-        for recording in result.get("recording-list", []):
+        for recording in results:
             track = {
                 "id": recording.get("id"),
                 "title": recording.get("title"),
@@ -242,11 +334,12 @@ class MusicBrainzModule(ModuleBase):
         Returns:
             曲目详情
         """
-        self._rate_limit()
         self.logger.info(f"获取曲目详情: {track_id}")
 
         try:
-            recording = get_recording_by_id(track_id)
+            recording = await self._get_entity(
+                "recording", "get_recording_by_id", track_id, ["artist-credits"]
+            )
         except Exception as e:
             self.logger.error(f"获取曲目详情失败: {e}")
             return None
@@ -277,16 +370,12 @@ class MusicBrainzModule(ModuleBase):
         Returns:
             封面 URL
         """
-        self._rate_limit()
         self.logger.info(f"下载封面: {musicbrainz_id}, 类型: {cover_type}")
 
-        try:
-            cover_url = get_release_cover_url(musicbrainz_id, cover_type)
-            self.logger.info(f"获取封面 URL 成功: {cover_url}")
-            return cover_url
-        except Exception as e:
-            self.logger.error(f"下载封面失败: {e}")
-            return None
+        # 封面地址由 Cover Art Archive 按发行 ID 提供，不需要请求 MusicBrainz
+        cover_url = f"{COVER_ART_URL}/release/{musicbrainz_id}/{cover_type}"
+        self.logger.info(f"获取封面 URL 成功: {cover_url}")
+        return cover_url
 
     def _parse_artist_credit(self, artist_credit: Any) -> dict[str, Any] | None:
         """
@@ -349,7 +438,4 @@ class MusicBrainzModule(ModuleBase):
         if not release_id:
             return None
 
-        try:
-            return self.download_cover(release_id, "front")
-        except Exception:
-            return None
+        return f"{COVER_ART_URL}/release/{release_id}/front"
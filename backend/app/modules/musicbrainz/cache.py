@@ -0,0 +1,307 @@
+"""
+MusicBrainz 响应缓存
+按 MBID 缓存实体、按规范化查询缓存搜索结果，持久化到 SQLite，进程重启后仍然有效
+
+缓存分为两级：
+- 内存层：进程内 LRU（复用 MemoryCache，按字节预算淘汰）
+- 磁盘层：SQLite 表，条目数超过上限时先清理过期条目，再淘汰最久未访问的条目
+
+值为 None 的条目表示“不存在”（负缓存），使用较短的过期时间
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from app.core.cache import MemoryCache
+from app.core.config import settings
+from app.core.log import logger
+
+
+def entity_key(entity: str, mbid: str) -> str:
+    """
+    实体缓存键
+
+    Args:
+        entity: 实体类型（artist / release-group / recording）
+        mbid: MusicBrainz ID
+
+    Returns:
+        缓存键
+    """
+    return f"{entity}:{mbid.strip().lower()}"
+
+
+def normalize_name(text: str) -> str:
+    """
+    规范化名称或查询词：统一 Unicode 形式、大小写和空白
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        规范化后的文本
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def query_key(entity: str, query: str, limit: int) -> str:
+    """
+    搜索缓存键
+
+    Args:
+        entity: 实体类型
+        query: 搜索关键词
+        limit: 返回数量
+
+    Returns:
+        缓存键
+    """
+    return f"search:{entity}:{limit}:{normalize_name(query)}"
+
+
+class MusicBrainzCache:
+    """
+    MusicBrainz 持久化缓存
+
+    get 返回 (是否命中, 值)，用于区分未缓存和负缓存（命中且值为 None）
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_entries: int | None = None,
+        memory_max_bytes: int = 8 * 1024 * 1024,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        初始化缓存
+
+        Args:
+            path: SQLite 文件路径
+            max_entries: 磁盘层最大条目数，默认使用配置
+            memory_max_bytes: 内存层字节预算
+            clock: 时钟函数（测试用）
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries or settings.musicbrainz_cache_max_entries
+        self.clock = clock
+        self.memory = MemoryCache(memory_max_bytes)
+        self.logger = logger
+
+        # 统计计数
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_entries_accessed ON entries (accessed_at)")
+        self._count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """
+        获取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            (是否命中, 值)，负缓存命中时值为 None
+        """
+        payload = self.memory.get(key)
+        if payload is None:
+            payload = self._disk_get(key)
+        if payload is None:
+            self.misses += 1
+            return False, None
+
+        value = json.loads(payload)
+        if value is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return True, value
+
+    def set(self, key: str, value: Any, ttl: int):
+        """
+        设置缓存
+
+        Args:
+            key: 缓存键
+            value: 值（JSON 可序列化），None 表示不存在
+            ttl: 过期时间（秒）
+        """
+        now = self.clock()
+        expires_at = now + ttl
+        payload = json.dumps(value, ensure_ascii=False)
+
+        try:
+            with self._lock:
+                exists = self._db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, payload, expires_at, now),
+                )
+                if not exists:
+                    self._count += 1
+                if self._count > self.max_entries:
+                    self._evict(now)
+        except sqlite3.Error as e:
+            self.logger.error(f"写入 MusicBrainz 缓存失败: {key}, 错误: {e}")
+            return
+
+        self.memory.set(key, payload.encode(), expires_at)
+
+    async def async_get(self, key: str) -> tuple[bool, Any]:
+        """
+        异步获取缓存，内存层未命中时在线程池中查询磁盘
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            (是否命中, 值)
+        """
+        payload = self.memory.get(key)
+        if payload is not None:
+            value = json.loads(payload)
+            if value is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return True, value
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, key)
+
+    async def async_set(self, key: str, value: Any, ttl: int):
+        """
+        异步设置缓存
+
+        Args:
+            key: 缓存键
+            value: 值，None 表示不存在
+            ttl: 过期时间（秒）
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self.set, key, value, ttl)
+
+    def delete(self, key: str):
+        """
+        删除缓存
+
+        Args:
+            key: 缓存键
+        """
+        self.memory.delete(key)
+        with self._lock:
+            if self._db.execute("DELETE FROM entries WHERE key = ?", (key,)).rowcount:
+                self._count -= 1
+
+    def clear(self):
+        """清空缓存"""
+        self.memory.clear()
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._count = 0
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            命中、负缓存命中、未命中、淘汰次数和条目数
+        """
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": self._count,
+            "max_entries": self.max_entries,
+        }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._db.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _disk_get(self, key: str) -> bytes | None:
+        """查询磁盘层，命中时更新访问时间并回填内存层"""
+        now = self.clock()
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row[1] <= now:
+                    self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._count -= 1
+                    return None
+                self._db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            self.logger.error(f"读取 MusicBrainz 缓存失败: {key}, 错误: {e}")
+            return None
+
+        payload = row[0].encode()
+        self.memory.set(key, payload, row[1])
+        return payload
+
+    def _evict(self, now: float):
+        """条目数超过上限时淘汰（调用方需持有锁）"""
+        removed = self._db.execute("DELETE FROM entries WHERE expires_at <= ?", (now,)).rowcount
+        excess = self._count - removed - self.max_entries
+        if excess > 0:
+            keys = [
+                row[0]
+                for row in self._db.execute(
+                    "SELECT key FROM entries ORDER BY accessed_at LIMIT ?", (excess,)
+                )
+            ]
+            self._db.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in keys])
+            for key in keys:
+                self.memory.delete(key)
+            removed += len(keys)
+
+        self._count -= removed
+        self.evictions += removed
+        self.logger.debug(f"MusicBrainz 缓存淘汰 {removed} 个条目")
+
+
+# 全局缓存
+_cache: MusicBrainzCache | None = None
+
+
+def get_musicbrainz_cache() -> MusicBrainzCache:
+    """获取全局 MusicBrainz 缓存（位于缓存目录下的 musicbrainz.db）"""
+    global _cache
+    if _cache is None:
+        _cache = MusicBrainzCache(settings.cache_path / "musicbrainz.db")
+    return _cache
+
+
+def close_musicbrainz_cache():
+    """关闭全局 MusicBrainz 缓存"""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
@@ -0,0 +1,210 @@
+"""
+MusicBrainz 异步客户端
+令牌桶限速、相同请求合并，同步的 musicbrainzngs 调用在专用线程池中执行
+"""
+
+import asyncio
+import functools
+import json
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType
+from typing import Any
+
+import musicbrainzngs
+
+from app.core.config import settings
+from app.core.log import logger
+
+
+class TokenBucket:
+    """
+    异步令牌桶
+
+    每个请求预订一个令牌，令牌不足时在事件循环中等待（不阻塞其他任务）。
+    预订在同步代码中完成，等待者按预订顺序获得令牌
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数，不大于 0 时不限速
+            capacity: 桶容量（允许的突发请求数）
+            clock: 时钟函数（测试用）
+        """
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.clock = clock
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+
+    def reserve(self) -> float:
+        """
+        预订一个令牌
+
+        Returns:
+            获得令牌前需要等待的秒数
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+    async def acquire(self):
+        """获取一个令牌，需要时异步等待"""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class MusicBrainzClient:
+    """
+    MusicBrainz 异步客户端
+
+    - 所有请求共用一个令牌桶，遵守 MusicBrainz 的速率限制
+    - 参数相同的请求正在进行时复用同一个结果，不重复请求
+    - musicbrainzngs 是同步库，请求在专用线程池中执行，不阻塞事件循环
+    """
+
+    def __init__(
+        self,
+        rate: float | None = None,
+        burst: int | None = None,
+        max_workers: int | None = None,
+        api: ModuleType | Any = musicbrainzngs,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初始化客户端
+
+        Args:
+            rate: 每秒请求数，默认使用配置
+            burst: 允许的突发请求数，默认使用配置
+            max_workers: 线程池大小，默认使用配置
+            api: 提供请求函数的对象（测试用）
+            clock: 令牌桶时钟函数（测试用）
+        """
+        self.bucket = TokenBucket(
+            rate if rate is not None else settings.musicbrainz_rate_limit,
+            burst or settings.musicbrainz_burst,
+            clock,
+        )
+        self.api = api
+        self.executor = ThreadPoolExecutor(
+            max_workers or settings.musicbrainz_max_workers,
+            thread_name_prefix="musicbrainz",
+        )
+        self.logger = logger
+        self.request_count = 0
+
+        # 请求键 -> 进行中的请求
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def call(self, method: str, *args, **kwargs) -> Any:
+        """
+        调用 musicbrainzngs 函数
+
+        Args:
+            method: 函数名称，如 search_artists、get_recording_by_id
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            函数返回值
+
+        Raises:
+            musicbrainzngs.WebServiceError: 请求失败
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # 进行中的请求绑定事件循环，循环变化时不能复用
+            self._inflight = {}
+            self._loop = loop
+
+        key = json.dumps([method, args, kwargs], sort_keys=True, default=str)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._request(method, args, kwargs))
+            self._inflight[key] = future
+            future.add_done_callback(functools.partial(self._request_done, key))
+
+        # 一个调用方取消时不影响共用同一请求的其他调用方
+        return await asyncio.shield(future)
+
+    async def _request(self, method: str, args: tuple, kwargs: dict) -> Any:
+        """
+        等待令牌后在线程池中执行请求
+
+        Args:
+            method: 函数名称
+            args: 位置参数
+            kwargs: 关键字参数
+
+        Returns:
+            函数返回值
+        """
+        func = getattr(self.api, method)
+        await self.bucket.acquire()
+        self.request_count += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def _request_done(self, key: str, future: asyncio.Future):
+        """请求结束后移除，并取出异常避免所有调用方都取消时产生未处理异常警告"""
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            future.exception()
+
+    def close(self):
+        """关闭线程池，取消尚未执行的请求"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 全局客户端
+_client: MusicBrainzClient | None = None
+
+
+def get_musicbrainz_client() -> MusicBrainzClient:
+    """
+    获取全局 MusicBrainz 客户端
+
+    首次创建时设置 User-Agent，并关闭 musicbrainzngs 自带的限速
+    （它在请求线程中 sleep，由客户端的令牌桶统一限速）
+
+    Returns:
+        MusicBrainz 客户端
+    """
+    global _client
+    if _client is None:
+        musicbrainzngs.set_useragent(
+            settings.musicbrainz_app_name,
+            settings.musicbrainz_app_version,
+            "https://github.com/hhyo/MusicPilot",
+        )
+        musicbrainzngs.set_rate_limit(False)
+        _client = MusicBrainzClient()
+    return _client
+
+
+def close_musicbrainz_client():
+    """关闭全局 MusicBrainz 客户端"""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
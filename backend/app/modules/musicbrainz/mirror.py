@@ -0,0 +1,431 @@
+"""
+MusicBrainz 本地镜像
+把 MusicBrainz JSON 数据导出（每行一个实体的 JSON Lines）导入本地 SQLite 索引，
+批量刮削时优先从本地查询，查不到再请求在线 API
+
+导入：
+    python -m app.modules.musicbrainz.mirror <索引文件> artist=<文件> release-group=<文件> recording=<文件>
+
+导出文件可以是解压后的 mbdump/<实体> 文件，也可以是 .gz / .bz2 / .xz 压缩文件
+"""
+
+import argparse
+import asyncio
+import bz2
+import gzip
+import json
+import lzma
+import sqlite3
+import threading
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import IO, Any
+
+from app.core.config import settings
+from app.core.log import logger
+
+from .cache import normalize_name
+
+# 实体类型 -> 表名
+TABLES = {
+    "artist": "artists",
+    "release-group": "release_groups",
+    "recording": "recordings",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artists (
+    id TEXT PRIMARY KEY, name TEXT NOT NULL, sort_name TEXT, type TEXT, country TEXT,
+    gender TEXT, disambiguation TEXT, begin TEXT, end TEXT, norm TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_artists_norm ON artists (norm);
+CREATE TABLE IF NOT EXISTS release_groups (
+    id TEXT PRIMARY KEY, title TEXT NOT NULL, primary_type TEXT, first_release_date TEXT,
+    artist_credit TEXT, norm TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_release_groups_norm ON release_groups (norm);
+CREATE TABLE IF NOT EXISTS release_group_artists (
+    artist_id TEXT NOT NULL, release_group_id TEXT NOT NULL,
+    PRIMARY KEY (artist_id, release_group_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS recordings (
+    id TEXT PRIMARY KEY, title TEXT NOT NULL, length INTEGER, artist_credit TEXT,
+    norm TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_recordings_norm ON recordings (norm);
+"""
+
+# 搜索时最多使用的查询词数，超过时只取最后的部分（标题通常在最后）
+MAX_QUERY_TOKENS = 12
+
+
+def open_dump(path: str | Path) -> IO[str]:
+    """
+    按扩展名打开（可能压缩的）导出文件
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        文本文件对象
+    """
+    path = Path(path)
+    openers = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+    opener = openers.get(path.suffix, open)
+    return opener(path, "rt", encoding="utf-8")
+
+
+def compact_credit(credit: list[dict[str, Any]] | None) -> list[dict[str, Any]]:
+    """
+    精简艺术家署名，只保留署名、连接词和艺术家 ID/名称
+
+    Args:
+        credit: 导出数据中的 artist-credit
+
+    Returns:
+        musicbrainzngs 格式的署名列表
+    """
+    return [
+        {
+            "name": item.get("name"),
+            "joinphrase": item.get("joinphrase", ""),
+            "artist": {
+                "id": item.get("artist", {}).get("id"),
+                "name": item.get("artist", {}).get("name"),
+            },
+        }
+        for item in credit or []
+    ]
+
+
+def query_spans(query: str) -> list[str]:
+    """
+    把查询拆成所有连续的词组，用于匹配“艺术家 专辑 标题”形式的组合查询
+
+    Args:
+        query: 查询词
+
+    Returns:
+        规范化后的词组列表（长的在前）
+    """
+    tokens = normalize_name(query).split()[-MAX_QUERY_TOKENS:]
+    spans = {
+        " ".join(tokens[start:end])
+        for start in range(len(tokens))
+        for end in range(start + 1, len(tokens) + 1)
+    }
+    return sorted(spans, key=len, reverse=True)
+
+
+class MusicBrainzMirror:
+    """
+    MusicBrainz 本地镜像索引
+
+    查询结果使用与 musicbrainzngs 相同的字段名，模块解析代码不需要区分来源
+    """
+
+    def __init__(self, path: str | Path):
+        """
+        打开（或创建）镜像索引
+
+        Args:
+            path: SQLite 文件路径
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(SCHEMA)
+
+    # ==================== 导入 ====================
+
+    def import_dump(self, entity: str, path: str | Path, batch_size: int = 5000) -> int:
+        """
+        导入一个实体类型的 JSON Lines 导出文件
+
+        Args:
+            entity: 实体类型（artist / release-group / recording）
+            path: 导出文件路径
+            batch_size: 每次提交的行数
+
+        Returns:
+            导入的实体数
+
+        Raises:
+            ValueError: 实体类型不支持
+        """
+        if entity not in TABLES:
+            raise ValueError(f"不支持的实体类型: {entity}")
+
+        self.logger.info(f"导入 MusicBrainz {entity}: {path}")
+        count = 0
+        with open_dump(path) as dump:
+            for batch in self._batches(dump, batch_size):
+                with self._lock, self._db:
+                    self._insert(entity, batch)
+                count += len(batch)
+                self.logger.debug(f"已导入 {count} 个 {entity}")
+
+        self.logger.info(f"导入 MusicBrainz {entity} 完成: {count} 个")
+        return count
+
+    def _batches(self, lines: Iterable[str], size: int) -> Iterator[list[dict[str, Any]]]:
+        """按批次解析 JSON 行，跳过空行和无法解析的行"""
+        batch: list[dict[str, Any]] = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                batch.append(json.loads(line))
+            except json.JSONDecodeError:
+                self.logger.warning(f"跳过无法解析的行: {line[:80]}")
+                continue
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _insert(self, entity: str, items: list[dict[str, Any]]):
+        """写入一批实体（调用方需持有锁并处于事务中）"""
+        if entity == "artist":
+            self._db.executemany(
+                "INSERT OR REPLACE INTO artists VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        item["id"],
+                        item["name"],
+                        item.get("sort-name"),
+                        item.get("type"),
+                        item.get("country"),
+                        item.get("gender"),
+                        item.get("disambiguation") or None,
+                        (item.get("life-span") or {}).get("begin"),
+                        (item.get("life-span") or {}).get("end"),
+                        normalize_name(item["name"]),
+                    )
+                    for item in items
+                ],
+            )
+        elif entity == "release-group":
+            self._db.executemany(
+                "INSERT OR REPLACE INTO release_groups VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        item["id"],
+                        item["title"],
+                        item.get("primary-type"),
+                        item.get("first-release-date") or None,
+                        json.dumps(compact_credit(item.get("artist-credit")), ensure_ascii=False),
+                        normalize_name(item["title"]),
+                    )
+                    for item in items
+                ],
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO release_group_artists VALUES (?, ?)",
+                [
+                    (credit["artist"]["id"], item["id"])
+                    for item in items
+                    for credit in item.get("artist-credit") or []
+                    if credit.get("artist", {}).get("id")
+                ],
+            )
+        else:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO recordings VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        item["id"],
+                        item["title"],
+                        item.get("length"),
+                        json.dumps(compact_credit(item.get("artist-credit")), ensure_ascii=False),
+                        normalize_name(item["title"]),
+                    )
+                    for item in items
+                ],
+            )
+
+    # ==================== 查询 ====================
+
+    def get(self, entity: str, mbid: str) -> dict[str, Any] | None:
+        """
+        按 MBID 查询实体
+
+        Args:
+            entity: 实体类型
+            mbid: MusicBrainz ID
+
+        Returns:
+            musicbrainzngs 格式的实体，不存在时返回 None
+        """
+        table = TABLES[entity]
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT * FROM {table} WHERE id = ?", (mbid.strip().lower(),)
+            ).fetchone()
+            if row is None:
+                return None
+
+            if entity != "artist":
+                return self._to_entity(entity, row)
+
+            release_groups = self._db.execute(
+                "SELECT rg.* FROM release_group_artists a "
+                "JOIN release_groups rg ON rg.id = a.release_group_id "
+                "WHERE a.artist_id = ? ORDER BY rg.first_release_date LIMIT 100",
+                (row["id"],),
+            ).fetchall()
+
+        artist = self._to_entity(entity, row)
+        artist["release-group-list"] = [
+            self._to_entity("release-group", rg) for rg in release_groups
+        ]
+        return artist
+
+    def search(self, entity: str, query: str, limit: int = 25) -> list[dict[str, Any]]:
+        """
+        按规范化名称搜索
+
+        查询中的任一连续词组与名称完全相同即为候选（可以匹配“艺术家 标题”形式的组合查询）。
+        匹配的词组越长越靠前，署名艺术家也出现在查询中的优先
+
+        Args:
+            entity: 实体类型
+            query: 查询词
+            limit: 返回数量
+
+        Returns:
+            musicbrainzngs 格式的实体列表
+        """
+        spans = query_spans(query)
+        if not spans:
+            return []
+
+        table = TABLES[entity]
+        placeholders = ", ".join("?" * len(spans))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT * FROM {table} WHERE norm IN ({placeholders}) LIMIT ?",
+                (*spans, max(limit * 20, 200)),
+            ).fetchall()
+
+        span_set = set(spans)
+        results = [self._to_entity(entity, row) for row in rows]
+        scores = []
+        for row, result in zip(rows, results, strict=True):
+            credited = any(
+                normalize_name(credit["artist"]["name"] or "") in span_set
+                for credit in result.get("artist-credit", [])
+            )
+            scores.append((credited, len(row["norm"])))
+
+        ranked = sorted(zip(scores, results, strict=True), key=lambda item: item[0], reverse=True)
+        return [result for _, result in ranked[:limit]]
+
+    async def async_get(self, entity: str, mbid: str) -> dict[str, Any] | None:
+        """在线程池中按 MBID 查询实体"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, entity, mbid)
+
+    async def async_search(self, entity: str, query: str, limit: int = 25) -> list[dict[str, Any]]:
+        """在线程池中搜索"""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.search, entity, query, limit
+        )
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        获取各实体类型的条目数
+
+        Returns:
+            实体类型 -> 条目数
+        """
+        with self._lock:
+            return {
+                entity: self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for entity, table in TABLES.items()
+            }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _to_entity(entity: str, row: sqlite3.Row) -> dict[str, Any]:
+        """把数据行转换为 musicbrainzngs 格式"""
+        if entity == "artist":
+            result = {
+                "id": row["id"],
+                "name": row["name"],
+                "sort-name": row["sort_name"],
+                "type": row["type"],
+                "country": row["country"],
+                "gender": row["gender"],
+                "disambiguation": row["disambiguation"],
+                "life-span": {"begin": row["begin"], "end": row["end"]},
+            }
+        elif entity == "release-group":
+            result = {
+                "id": row["id"],
+                "title": row["title"],
+                "type": row["primary_type"],
+                "primary-type": row["primary_type"],
+                "first-release-date": row["first_release_date"],
+                "artist-credit": json.loads(row["artist_credit"] or "[]"),
+            }
+        else:
+            result = {
+                "id": row["id"],
+                "title": row["title"],
+                "length": str(row["length"]) if row["length"] is not None else None,
+                "artist-credit": json.loads(row["artist_credit"] or "[]"),
+            }
+        return {key: value for key, value in result.items() if value is not None}
+
+
+# 全局镜像
+_mirror: MusicBrainzMirror | None = None
+
+
+def get_musicbrainz_mirror() -> MusicBrainzMirror | None:
+    """
+    获取全局 MusicBrainz 本地镜像
+
+    Returns:
+        配置了 musicbrainz_mirror_path 且文件存在时返回镜像，否则返回 None
+    """
+    global _mirror
+    if _mirror is None and settings.musicbrainz_mirror_path:
+        path = Path(settings.musicbrainz_mirror_path)
+        if path.exists():
+            _mirror = MusicBrainzMirror(path)
+            logger.info(f"使用 MusicBrainz 本地镜像: {path}")
+        else:
+            logger.warning(f"MusicBrainz 本地镜像不存在: {path}")
+    return _mirror
+
+
+def close_musicbrainz_mirror():
+    """关闭全局 MusicBrainz 本地镜像"""
+    global _mirror
+    if _mirror is not None:
+        _mirror.close()
+        _mirror = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="导入 MusicBrainz JSON 数据导出到本地镜像")
+    parser.add_argument("index", help="镜像索引文件（SQLite）")
+    parser.add_argument("dumps", nargs="+", metavar="实体=文件", help="如 artist=mbdump/artist")
+    args = parser.parse_args()
+
+    mirror = MusicBrainzMirror(args.index)
+    for spec in args.dumps:
+        entity, _, dump_path = spec.partition("=")
+        mirror.import_dump(entity, dump_path)
+    print(mirror.get_stats())
+    mirror.close()
@@ -71,3 +71,6 @@ class ScanLibraryRequest(BaseModel):
     """扫描音乐库请求模型"""
 
     recursive: bool | None = Field(None, description="是否递归扫描，None 表示使用配置值")
+    incremental: bool = Field(
+        default=True, description="是否增量扫描（只解析新增或大小、修改时间变化的文件）"
+    )
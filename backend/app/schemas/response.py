@@ -25,9 +25,10 @@ class PaginatedResponse(Generic[T], BaseModel):
     message: str = "查询成功"
     data: list[T] = []
     total: int = 0
-    page: int = 1
+    page: int | None = 1  # 页码（仅用于 skip 分页，使用游标时为空）
     page_size: int = 20
     total_pages: int = 0
+    next_cursor: str | None = None  # 下一页游标，没有下一页时为空
 
 
 class ErrorResponse(BaseModel):
@@ -0,0 +1,15 @@
+"""
+Search Schema
+统一搜索相关的数据模型
+"""
+
+from pydantic import BaseModel, Field
+
+
+class SearchResult(BaseModel):
+    """搜索结果"""
+
+    type: str = Field(..., description="实体类型：track, album, artist")
+    id: int
+    name: str
+    score: float = Field(0.0, description="相关度，越大越相关")
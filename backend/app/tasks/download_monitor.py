@@ -6,6 +6,7 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from app.chain.downloader import DownloaderChain
+from app.core.container import Container, get_app_container
 from app.core.log import logger
 from app.db import db_manager
 from app.db.models.download import DownloadHistory
@@ -19,9 +20,16 @@ class DownloadMonitorTask:
     下载进度监控任务
     """
 
-    def __init__(self, scheduler: AsyncIOScheduler):
+    def __init__(self, scheduler: AsyncIOScheduler, container: Container | None = None):
+        """
+        初始化下载监控任务
+
+        Args:
+            scheduler: 定时任务调度器
+            container: 依赖容器，默认使用应用级容器
+        """
         self.scheduler = scheduler
-        self.downloader_chain = DownloaderChain()
+        self.downloader_chain = (container or get_app_container()).get_chain(DownloaderChain)
         self.subscribe_release_oper = SubscribeReleaseOper(SubscribeRelease, db_manager)
         self.download_history_oper = DownloadHistoryOper(DownloadHistory, db_manager)
 
@@ -6,6 +6,7 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from app.chain.subscribe import SubscribeChain
+from app.core.container import Container, get_app_container
 from app.core.log import logger
 
 
@@ -14,9 +15,16 @@ class SubscribeCheckTask:
     订阅检查定时任务
     """
 
-    def __init__(self, scheduler: AsyncIOScheduler):
+    def __init__(self, scheduler: AsyncIOScheduler, container: Container | None = None):
+        """
+        初始化订阅检查任务
+
+        Args:
+            scheduler: 定时任务调度器
+            container: 依赖容器，默认使用应用级容器
+        """
         self.scheduler = scheduler
-        self.subscribe_chain = SubscribeChain()
+        self.subscribe_chain = (container or get_app_container()).get_chain(SubscribeChain)
 
     async def check_subscriptions(self):
         """
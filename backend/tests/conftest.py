@@ -4,10 +4,13 @@
 """
 
 import asyncio
+import fnmatch
+import time
 from typing import AsyncGenerator, Generator
 
 import pytest
 import pytest_asyncio
+from redis.exceptions import WatchError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 # 使用内存数据库进行测试
@@ -47,3 +50,177 @@ async def test_session(test_engine) -> AsyncGenerator[AsyncSession, None]:
     )
     async with async_session_maker() as session:
         yield session
+
+
+class FakeRedis:
+    """
+    进程内 Redis 替身
+    实现测试用到的 redis.asyncio.Redis 命令子集，支持 TTL 过期
+    """
+
+    def __init__(self):
+        self._data: dict[str, bytes] = {}
+        self._expires: dict[str, float] = {}
+        # 每个键的修改次数，用于模拟 WATCH
+        self._revisions: dict[str, int] = {}
+        self.commands: list[str] = []
+
+    def _encode(self, value) -> bytes:
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def _alive(self, key: str) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and time.time() >= expires_at:
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    async def get(self, name: str) -> bytes | None:
+        self.commands.append("GET")
+        return self._data[name] if self._alive(name) else None
+
+    async def set(self, name: str, value, ex: int | None = None, nx: bool = False) -> bool | None:
+        self.commands.append("SET")
+        if nx and self._alive(name):
+            return None
+        self._data[name] = self._encode(value)
+        self._revisions[name] = self._revisions.get(name, 0) + 1
+        self._expires.pop(name, None)
+        if ex:
+            self._expires[name] = time.time() + ex
+        return True
+
+    async def mget(self, keys: list[str]) -> list[bytes | None]:
+        self.commands.append("MGET")
+        return [self._data[key] if self._alive(key) else None for key in keys]
+
+    async def delete(self, *names: str | bytes) -> int:
+        self.commands.append("DEL")
+        count = 0
+        for name in names:
+            name = name.decode() if isinstance(name, bytes) else name
+            if self._alive(name):
+                count += 1
+                self._revisions[name] = self._revisions.get(name, 0) + 1
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        return count
+
+    async def exists(self, *names: str) -> int:
+        self.commands.append("EXISTS")
+        return sum(1 for name in names if self._alive(name))
+
+    async def ttl(self, name: str) -> int:
+        if not self._alive(name):
+            return -2
+        if name not in self._expires:
+            return -1
+        return int(self._expires[name] - time.time())
+
+    async def scan_iter(self, match: str | None = None, count: int | None = None):
+        for key in list(self._data):
+            if self._alive(key) and (match is None or fnmatch.fnmatchcase(key, match)):
+                yield key.encode()
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+    async def aclose(self):
+        pass
+
+
+class FakePipeline:
+    """
+    FakeRedis 的管道，execute 时按顺序执行缓存的命令
+
+    支持 WATCH/MULTI：watch 后命令立即执行，multi 后重新开始缓存，
+    被监视的键在 execute 前被修改时抛出 WatchError
+    """
+
+    def __init__(self, redis: FakeRedis):
+        self._redis = redis
+        self._calls: list[tuple[str, tuple, dict]] = []
+        self._watched: dict[str, int] | None = None
+        self._immediate = False
+
+    def __getattr__(self, name: str):
+        if self._immediate:
+            return getattr(self._redis, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def watch(self, *names: str):
+        self._redis.commands.append("WATCH")
+        self._watched = {name: self._redis._revisions.get(name, 0) for name in names}
+        self._immediate = True
+
+    def multi(self):
+        self._immediate = False
+
+    async def execute(self) -> list:
+        self._redis.commands.append("EXEC")
+        calls, self._calls = self._calls, []
+        watched, self._watched = self._watched, None
+        if watched and any(
+            self._redis._revisions.get(name, 0) != revision for name, revision in watched.items()
+        ):
+            raise WatchError("监视的键已被修改")
+        return [await getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in calls]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._calls = []
+        self._watched = None
+        self._immediate = False
+
+
+class FakeClock:
+    """可手动推进的时钟"""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    """可手动推进的时钟，从 0 开始"""
+    return FakeClock()
+
+
+@pytest.fixture
+def fake_redis() -> FakeRedis:
+    """创建进程内 Redis 替身"""
+    return FakeRedis()
+
+
+@pytest_asyncio.fixture
+async def db_manager(tmp_path):
+    """创建基于临时 SQLite 文件的数据库管理器，包含所有业务表"""
+    import app.db.models  # noqa: F401  注册所有模型
+    from app.db import DatabaseManager
+
+    manager = DatabaseManager(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    manager.init_db()
+    await manager.create_tables()
+    yield manager
+    await manager.close()
+
+
+@pytest.fixture(autouse=True)
+def clear_chain_cache():
+    """业务链缓存是进程内共享的，每个测试结束后清空，避免测试之间互相影响"""
+    yield
+    from app.core.cache import get_chain_cache
+
+    get_chain_cache().clear()
@@ -4,13 +4,22 @@ FileCache 单元测试
 """
 
 import asyncio
+import json
 import tempfile
+import time
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 
-from app.core.cache import AsyncFileCache, FileCache
+from app.core.cache import (
+    AsyncFileCache,
+    ChainCache,
+    FileCache,
+    FileCacheBackend,
+    MemoryCache,
+    RedisCacheBackend,
+)
 
 
 class TestFileCache:
@@ -206,6 +215,107 @@ class TestFileCache:
 
         assert result == data
 
+    # ==================== 两级缓存测试 ====================
+
+    def test_memory_hit_skips_disk(self, cache):
+        """测试内存层命中时不读取磁盘文件"""
+        cache.set("test_key", "value")
+
+        with patch("pathlib.Path.read_bytes", side_effect=AssertionError("不应读取磁盘")):
+            assert cache.get("test_key") == "value"
+
+        assert cache.get_stats()["memory_hits"] == 1
+
+    def test_disk_hit_after_restart(self, cache_dir):
+        """测试新实例从磁盘层读取并回填内存层"""
+        FileCache(cache_dir).set("test_key", {"data": "value"})
+
+        cache = FileCache(cache_dir)
+        assert cache.get("test_key") == {"data": "value"}
+        assert cache.get("test_key") == {"data": "value"}
+
+        stats = cache.get_stats()
+        assert stats["disk_hits"] == 1
+        assert stats["memory_hits"] == 1
+
+    def test_get_returns_copy(self, cache):
+        """测试返回值与缓存内容相互独立"""
+        cache.set("list_key", [1, 2, 3])
+
+        cache.get("list_key").append(4)
+
+        assert cache.get("list_key") == [1, 2, 3]
+
+    def test_memory_budget_eviction(self, cache_dir):
+        """测试超出字节预算时淘汰最久未使用的条目"""
+        cache = FileCache(cache_dir, memory_max_bytes=400)
+        cache.set("key1", "a" * 150)
+        cache.set("key2", "b" * 150)
+        # 访问 key1，使 key2 成为最久未使用
+        cache.get("key1")
+        cache.set("key3", "c" * 150)
+
+        assert cache.get_stats()["evictions"] == 1
+        assert cache.memory.get("key2") is None
+        assert cache.memory.get("key1") is not None
+        # 被淘汰的条目仍可从磁盘层读取
+        assert cache.get("key2") == "b" * 150
+
+    def test_expired_in_index(self, cache):
+        """测试过期时间记录在索引中"""
+        cache.set("test_key", "value", ttl=60)
+        cache.memory.clear()
+
+        with patch("app.core.cache.time.time", return_value=time.time() + 120):
+            assert cache.exists("test_key") is False
+            assert cache.get("test_key") is None
+
+        assert not cache._get_cache_path("test_key").exists()
+
+    def test_get_size_after_delete(self, cache):
+        """测试删除后磁盘大小随之减少"""
+        cache.set("key1", "a" * 100)
+        size = cache.get_size()
+        cache.delete("key1")
+
+        assert size > 0
+        assert cache.get_size() == 0
+
+    def test_miss_counter(self, cache):
+        """测试未命中计数"""
+        cache.get("nonexistent")
+
+        assert cache.get_stats()["misses"] == 1
+
+
+class TestMemoryCache:
+    """MemoryCache 测试类"""
+
+    def test_oversized_entry_not_stored(self):
+        """测试超过预算的单个条目不进入内存层"""
+        memory = MemoryCache(max_bytes=10)
+        memory.set("key", b"x" * 20, None)
+
+        assert memory.get("key") is None
+        assert memory.current_bytes == 0
+
+    def test_overwrite_updates_size(self):
+        """测试覆盖条目时更新字节计数"""
+        memory = MemoryCache(max_bytes=100)
+        memory.set("key", b"x" * 20, None)
+        memory.set("key", b"x" * 30, None)
+
+        assert memory.current_bytes == 30
+        assert len(memory) == 1
+
+    def test_expired_entry(self):
+        """测试过期条目被移除"""
+        memory = MemoryCache(max_bytes=100)
+        memory.set("key", b"x", time.time() - 1)
+
+        assert memory.get("key") is None
+        assert memory.current_bytes == 0
+
 
 class TestAsyncFileCache:
     """AsyncFileCache 测试类"""
@@ -274,3 +384,241 @@ class TestAsyncFileCache:
 
         assert await cache.async_get("keep") == "value"
         assert await cache.async_get("expire") is None
+
+    @pytest.mark.asyncio
+    async def test_async_get_memory_hit(self, cache):
+        """测试异步获取内存层命中时不进入线程池"""
+        await cache.async_set("async_key", "async_value")
+
+        with patch.object(cache, "get", side_effect=AssertionError("不应进入线程池")):
+            assert await cache.async_get("async_key") == "async_value"
+
+    @pytest.mark.asyncio
+    async def test_async_get_many(self, cache):
+        """测试异步批量获取"""
+        await cache.async_set_many({"key1": "value1", "key2": "value2"})
+
+        result = await cache.async_get_many(["key1", "key2", "missing"])
+
+        assert result == {"key1": "value1", "key2": "value2"}
+
+    @pytest.mark.asyncio
+    async def test_custom_backend(self, cache_dir, fake_redis):
+        """测试异步接口通过自定义后端读写"""
+        cache = AsyncFileCache(cache_dir, backend=RedisCacheBackend(fake_redis))
+
+        await cache.async_set("key", "value")
+
+        assert await cache.async_get("key") == "value"
+        assert await cache.async_exists("key") is True
+        # 本地文件缓存不受影响
+        assert cache.get("key") is None
+
+    @pytest.mark.asyncio
+    async def test_set_if_version_across_instances(self, cache_dir):
+        """测试文件后端按版本号写入，绕过其他实例中已过时的内存层"""
+        first = FileCacheBackend(FileCache(cache_dir))
+        second = FileCacheBackend(FileCache(cache_dir))
+
+        assert await first.set_if_version("state", 0, {"queue": [1], "state": {"version": 1}})
+        assert await second.get("state") == {"version": 1}
+        assert await first.set_if_version("state", 1, {"state": {"version": 2}})
+
+        # second 的内存层仍是版本 1
+        assert not await second.set_if_version("state", 1, {"state": {"version": 2}})
+        assert await second.set_if_version("state", 2, {"state": {"version": 3}})
+        assert await second.get("queue") == [1]
+
+
+class TestRedisCacheBackend:
+    """RedisCacheBackend 测试类"""
+
+    @pytest.fixture
+    def backend(self, fake_redis):
+        """创建 RedisCacheBackend 实例"""
+        return RedisCacheBackend(fake_redis, default_ttl=3600)
+
+    @pytest.mark.asyncio
+    async def test_set_and_get(self, backend):
+        """测试设置和获取缓存"""
+        await backend.set("key", {"data": [1, 2, 3]})
+
+        assert await backend.get("key") == {"data": [1, 2, 3]}
+
+    @pytest.mark.asyncio
+    async def test_get_nonexistent(self, backend):
+        """测试获取不存在的缓存"""
+        assert await backend.get("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_server_side_ttl(self, backend, fake_redis):
+        """测试过期时间交给 Redis 处理"""
+        await backend.set("default", "value")
+        await backend.set("custom", "value", ttl=60)
+        await backend.set("forever", "value", ttl=0)
+
+        assert 3590 <= await fake_redis.ttl("musicpilot:cache:default") <= 3600
+        assert 50 <= await fake_redis.ttl("musicpilot:cache:custom") <= 60
+        assert await fake_redis.ttl("musicpilot:cache:forever") == -1
+
+    @pytest.mark.asyncio
+    async def test_json_payload(self, backend, fake_redis):
+        """测试值以 JSON 保存，不可序列化的值不写入"""
+        await backend.set("key", {"name": "周杰伦"})
+        await backend.set("object", object())
+
+        assert json.loads(await fake_redis.get("musicpilot:cache:key")) == {"name": "周杰伦"}
+        assert await fake_redis.get("musicpilot:cache:object") is None
+
+    @pytest.mark.asyncio
+    async def test_expired(self, backend):
+        """测试过期后返回 None"""
+        await backend.set("key", "value", ttl=60)
+
+        with patch("tests.conftest.time.time", return_value=time.time() + 120):
+            assert await backend.get("key") is None
+
+    @pytest.mark.asyncio
+    async def test_set_many_pipelined(self, backend, fake_redis):
+        """测试批量设置使用单次管道提交"""
+        await backend.set_many({f"key{i}": i for i in range(10)}, ttl=60)
+
+        assert fake_redis.commands.count("EXEC") == 1
+        assert await backend.get("key9") == 9
+
+    @pytest.mark.asyncio
+    async def test_get_many_single_round_trip(self, backend, fake_redis):
+        """测试批量获取使用一次 MGET"""
+        await backend.set_many({"key1": "value1", "key2": "value2"})
+        fake_redis.commands.clear()
+
+        result = await backend.get_many(["key1", "key2", "missing"])
+
+        assert result == {"key1": "value1", "key2": "value2"}
+        assert fake_redis.commands == ["MGET"]
+
+    @pytest.mark.asyncio
+    async def test_delete_and_exists(self, backend):
+        """测试删除和存在检查"""
+        await backend.set("key", "value")
+        assert await backend.exists("key") is True
+
+        await backend.delete("key")
+
+        assert await backend.exists("key") is False
+
+    @pytest.mark.asyncio
+    async def test_clear_only_prefixed(self, backend, fake_redis):
+        """测试清空只删除带前缀的键"""
+        await backend.set("key1", "value1")
+        await backend.set("key2", "value2")
+        await fake_redis.set("other:key", "value")
+
+        await backend.clear()
+
+        assert await backend.get("key1") is None
+        assert await backend.get("key2") is None
+        assert await fake_redis.get("other:key") == b"value"
+
+    @pytest.mark.asyncio
+    async def test_set_if_version(self, backend):
+        """测试版本号一致时才写入"""
+        assert await backend.set_if_version("state", 0, {"queue": [1], "state": {"version": 1}})
+        assert not await backend.set_if_version("state", 0, {"state": {"version": 1}})
+        assert await backend.set_if_version("state", 1, {"state": {"version": 2}})
+
+        assert await backend.get("state") == {"version": 2}
+        assert await backend.get("queue") == [1]
+
+    @pytest.mark.asyncio
+    async def test_set_if_version_watch_conflict(self, backend, fake_redis):
+        """测试比较之后、提交之前被其他客户端修改时不写入"""
+        original_get = fake_redis.get
+
+        async def get_then_modify(name):
+            value = await original_get(name)
+            await fake_redis.set(name, b'{"version":5}')
+            return value
+
+        fake_redis.get = get_then_modify
+        assert not await backend.set_if_version("state", 0, {"state": {"version": 1}})
+        fake_redis.get = original_get
+        assert await backend.get("state") == {"version": 5}
+
+    @pytest.mark.asyncio
+    async def test_shared_between_instances(self, fake_redis):
+        """测试多个实例（worker）共享同一份缓存"""
+        worker1 = RedisCacheBackend(fake_redis)
+        worker2 = RedisCacheBackend(fake_redis)
+
+        await worker1.set("key", "value")
+
+        assert await worker2.get("key") == "value"
+
+    @pytest.mark.asyncio
+    async def test_connection_error_is_miss(self, backend, fake_redis):
+        """测试 Redis 不可用时按未命中处理"""
+        with patch.object(fake_redis, "get", side_effect=ConnectionError("down")):
+            assert await backend.get("key") is None
+
+
+class TestChainCache:
+    """ChainCache 测试类"""
+
+    def test_namespaces_are_isolated(self):
+        """测试不同命名空间的键互不影响"""
+        cache = ChainCache(max_entries=10, shards=2, namespace_limits={})
+        cache.set("A", "key", 1)
+        cache.set("B", "key", 2)
+
+        assert cache.get("A", "key") == 1
+        assert cache.get("B", "key") == 2
+        cache.clear("A")
+        assert cache.get("A", "key") is None
+        assert cache.get("B", "key") == 2
+
+    def test_lru_budget_per_namespace(self):
+        """测试每个命名空间按预算淘汰最久未使用的条目，可按命名空间覆盖预算"""
+        cache = ChainCache(max_entries=3, shards=1, namespace_limits={"Big": 100})
+        for i in range(3):
+            cache.set("Small", str(i), i)
+        cache.get("Small", "0")
+        cache.set("Small", "3", 3)
+
+        assert cache.get("Small", "1") is None
+        assert [cache.get("Small", k) for k in ("0", "2", "3")] == [0, 2, 3]
+
+        for i in range(50):
+            cache.set("Big", str(i), i)
+        stats = cache.get_stats()
+        assert stats["Small"]["items"] == 3
+        assert stats["Small"]["evictions"] == 1
+        assert stats["Big"]["items"] == 50
+
+    def test_sharded_budget(self):
+        """测试分片后总条目数不超过预算"""
+        cache = ChainCache(max_entries=64, shards=8, namespace_limits={})
+        for i in range(1000):
+            cache.set("A", f"key{i}", i)
+
+        stats = cache.get_stats()["A"]
+        assert stats["max_items"] == 64
+        assert stats["items"] <= 64
+        assert stats["evictions"] == 1000 - stats["items"]
+
+    def test_ttl_and_cleanup(self, clock):
+        """测试过期条目读取时失效，定时清理移除未再读取的过期条目"""
+        cache = ChainCache(max_entries=10, shards=2, namespace_limits={}, clock=clock)
+        cache.set("A", "short", 1, ttl=10)
+        cache.set("A", "other", 2, ttl=10)
+        cache.set("A", "forever", 3)
+
+        clock.now = 11
+        assert cache.get("A", "short") is None
+        assert cache.cleanup_expired() == 1
+        assert cache.get("A", "forever") == 3
+
+        stats = cache.get_stats()["A"]
+        assert stats["items"] == 1
+        assert stats["expirations"] == 2
+        assert (stats["hits"], stats["misses"]) == (1, 1)
@@ -158,3 +158,136 @@ class TestChainBase:
 
             # put_message 是 send_event 的别名
             mock_event_bus.publish.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_async_cache_uses_backend(self, fake_redis):
+        """测试异步缓存写入共享后端"""
+        from app.core.cache import RedisCacheBackend
+        from app.core.chain import ChainBase
+
+        class TestChain(ChainBase):
+            pass
+
+        backend = RedisCacheBackend(fake_redis)
+        chain1 = TestChain(cache_backend=backend)
+        chain2 = TestChain(cache_backend=backend)
+
+        await chain1.async_set_cache("key", {"data": 1}, ttl=60)
+
+        assert chain1.get_cache("key") == {"data": 1}
+        assert await chain2.async_get_cache("key") == {"data": 1}
+
+        # 未指定过期时间时共享后端使用默认过期时间
+        await chain1.async_set_cache("default", "value")
+        assert 0 < await fake_redis.ttl("musicpilot:cache:TestChain:default") <= backend.default_ttl
+
+    @pytest.mark.asyncio
+    async def test_backend_keys_namespaced(self, fake_redis):
+        """测试共享后端的键按链区分，命中后写入进程内缓存"""
+        from app.core.cache import ChainCache, RedisCacheBackend
+        from app.core.chain import ChainBase
+
+        class FirstChain(ChainBase):
+            pass
+
+        class SecondChain(ChainBase):
+            pass
+
+        backend = RedisCacheBackend(fake_redis)
+        await FirstChain(cache_backend=backend).async_set_cache("key", "first", ttl=60)
+        await SecondChain(cache_backend=backend).async_set_cache_many({"key": "second"}, ttl=60)
+
+        # 另一个进程：进程内缓存为空，从共享后端读取
+        cache = ChainCache(max_entries=10, shards=1, namespace_limits={})
+        first = FirstChain(cache_backend=backend, chain_cache=cache)
+        second = SecondChain(cache_backend=backend, chain_cache=cache)
+        assert await first.async_get_cache("key") == "first"
+        assert await second.async_get_cache_many(["key", "missing"]) == {"key": "second"}
+
+        assert first.get_cache("key") == "first"
+        assert second.get_cache("key") == "second"
+
+    @pytest.mark.asyncio
+    async def test_async_cache_without_backend(self):
+        """测试未配置后端时仅使用进程内缓存"""
+        from app.core.chain import ChainBase
+
+        class TestChain(ChainBase):
+            pass
+
+        chain = TestChain()
+        await chain.async_set_cache("key", "value")
+
+        assert chain.cache_backend is None
+        assert await chain.async_get_cache("key") == "value"
+
+    def test_cache_shared_by_chain_class(self):
+        """测试同一类的链实例共用缓存，不同类的链互不影响"""
+        from app.core.cache import ChainCache
+        from app.core.chain import ChainBase
+
+        class FirstChain(ChainBase):
+            pass
+
+        class SecondChain(ChainBase):
+            pass
+
+        cache = ChainCache(max_entries=10, shards=1, namespace_limits={})
+        FirstChain(chain_cache=cache).set_cache("key", 1)
+
+        assert FirstChain(chain_cache=cache).get_cache("key") == 1
+        assert SecondChain(chain_cache=cache).get_cache("key") is None
+        assert cache.get_stats()["FirstChain"]["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_decorator(self):
+        """测试 cached 按参数生成缓存键，返回 None 时不缓存"""
+        from app.core.chain import ChainBase, cached
+
+        class TestChain(ChainBase):
+            calls = 0
+
+            @cached("lookup:{name}:{limit}", ttl=60)
+            async def lookup(self, name: str, limit: int = 10):
+                self.calls += 1
+                return None if name == "missing" else [name] * limit
+
+        chain = TestChain()
+        assert await chain.lookup("a", limit=2) == ["a", "a"]
+        assert await chain.lookup("a", 2) == ["a", "a"]
+        assert await TestChain().lookup("a", 2) == ["a", "a"]
+        assert chain.calls == 1
+        assert chain.get_cache("lookup:a:2") == ["a", "a"]
+
+        await chain.lookup("a")
+        await chain.lookup("missing")
+        await chain.lookup("missing")
+        assert chain.calls == 4
+
+    def test_cache_stats_endpoint(self):
+        """测试缓存统计端点"""
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        from app.api.endpoints import system
+        from app.core.chain import ChainBase
+
+        class StatsChain(ChainBase):
+            pass
+
+        StatsChain().set_cache("key", 1)
+        StatsChain().get_cache("key")
+        StatsChain().get_cache("other")
+
+        app = FastAPI()
+        app.include_router(system.router, prefix="/system")
+        with (
+            patch("app.api.endpoints.system.get_musicbrainz_cache") as mock_mb_cache,
+            TestClient(app) as client,
+        ):
+            mock_mb_cache.return_value.get_stats.return_value = {"hits": 0}
+            data = client.get("/system/cache/stats").json()["data"]
+
+        assert data["chain"]["StatsChain"]["hits"] == 1
+        assert data["chain"]["StatsChain"]["misses"] == 1
+        assert data["musicbrainz"] == {"hits": 0}
@@ -0,0 +1,121 @@
+"""
+依赖容器单元测试
+测试业务链单例、共享组件注入、内置模块注册和依赖注入
+"""
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_container
+from app.chain.download import DownloadChain, run_download_job
+from app.chain.downloader import DownloaderChain
+from app.chain.metadata import MetadataChain
+from app.chain.musicbrainz import MusicBrainzChain
+from app.chain.subscribe import SubscribeChain
+from app.chain.torrents import TorrentsChain
+from app.core.config import settings
+from app.core.container import Container, close_app_container, get_app_container
+from app.core.download_scheduler import ScheduledJob
+from app.modules.musicbrainz import MusicBrainzClient, close_musicbrainz_cache
+
+
+class FakeApi:
+    """模拟 musicbrainzngs"""
+
+    def search_artists(self, query: str, limit: int = 25):
+        return {"artist-list": [{"id": "a1", "name": query}]}
+
+
+class PlainChain:
+    """不继承 ChainBase 的链"""
+
+
+class TestContainer:
+    """Container 测试类"""
+
+    def test_chain_created_once(self):
+        """测试每种链只创建一次，并注入容器的共享组件"""
+        container = Container()
+        chain = container.get_chain(MetadataChain)
+
+        assert container.get_chain(MetadataChain) is chain
+        assert chain.module_manager is container.module_manager
+        assert chain.plugin_manager is container.plugin_manager
+        assert container.get_chain(MusicBrainzChain).module_manager is container.module_manager
+        assert isinstance(container.get_chain(PlainChain), PlainChain)
+
+    def test_plain_chains_get_shared_components(self, db_manager):
+        """测试不继承 ChainBase 的链按构造参数注入容器的模块管理器和数据库管理器"""
+        container = Container(db_manager=db_manager)
+        torrents = container.get_chain(TorrentsChain)
+        downloader = container.get_chain(DownloaderChain)
+        subscribe = container.get_chain(SubscribeChain)
+
+        for chain in (torrents, downloader, subscribe):
+            assert chain.module_manager is container.module_manager
+            assert chain.db_manager is db_manager
+        assert subscribe.torrents_chain.module_manager is container.module_manager
+        assert subscribe.downloader_chain.module_manager is container.module_manager
+
+    def test_app_container(self):
+        """测试应用级容器在关闭前始终是同一实例"""
+        container = get_app_container()
+        assert get_app_container() is container
+        assert container.get_chain(MetadataChain) is get_app_container().get_chain(MetadataChain)
+
+        close_app_container()
+        assert get_app_container() is not container
+        close_app_container()
+
+    @pytest.mark.asyncio
+    async def test_download_jobs_use_app_chain(self, monkeypatch):
+        """测试下载调度器的任务都由应用级容器中的同一个 DownloadChain 执行"""
+        chains = []
+
+        async def run_job(chain, job):
+            chains.append(chain)
+
+        monkeypatch.setattr(DownloadChain, "run_job", run_job)
+        job = ScheduledJob(1, "netease", 0, {})
+        await run_download_job(job)
+        await run_download_job(job)
+
+        assert chains[0] is chains[1] is get_app_container().get_chain(DownloadChain)
+        close_app_container()
+
+    @pytest.mark.asyncio
+    async def test_builtin_modules(self, tmp_path, monkeypatch):
+        """测试注册内置模块后业务链可以调用 musicbrainz 模块，关闭时停止模块"""
+        monkeypatch.setattr(settings, "cache_dir", str(tmp_path))
+        container = Container()
+        container.register_builtin_modules()
+        container.register_builtin_modules()
+        module = container.module_manager.get_module("musicbrainz")
+        module.client = MusicBrainzClient(rate=0, api=FakeApi())
+
+        artists = await container.get_chain(MusicBrainzChain).search_artist("周杰伦")
+        assert artists[0]["name"] == "周杰伦"
+        assert container.module_manager.get_running_modules() == [module]
+
+        container.close()
+        assert not module.is_enabled()
+        module.client.close()
+        close_musicbrainz_cache()
+
+    def test_dependency(self):
+        """测试端点通过依赖获取应用级容器中的同一实例"""
+        app = FastAPI()
+        app.state.container = Container()
+        chain_ids = []
+
+        @app.get("/chain")
+        async def chain_endpoint(container: Container = Depends(get_container)):
+            chain_ids.append(id(container.get_chain(MetadataChain)))
+            return {}
+
+        with TestClient(app) as client:
+            client.get("/chain")
+            client.get("/chain")
+
+        assert chain_ids[0] == chain_ids[1]
@@ -7,6 +7,7 @@ from contextlib import asynccontextmanager
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+import pytest_asyncio
 
 from app.db import DatabaseManager, OperBase
 from app.db.models.artist import Artist
@@ -66,7 +67,9 @@ class TestOperBase:
         result = await oper.create(name="Test Artist")
 
         mock_session.add.assert_called_once()
-        mock_session.commit.assert_called_once()
+        mock_session.flush.assert_called_once()
+        # 提交由会话的持有者负责
+        mock_session.commit.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_create_with_kwargs(self, oper, mock_db_manager):
@@ -199,7 +202,7 @@ class TestOperBase:
 
         result = await oper.update(1, name="Updated Artist")
 
-        mock_session.commit.assert_called_once()
+        mock_session.commit.assert_not_called()
 
     # ==================== delete 测试 ====================
 
@@ -222,7 +225,7 @@ class TestOperBase:
         result = await oper.delete(1)
 
         mock_session.execute.assert_called_once()
-        mock_session.commit.assert_called_once()
+        mock_session.commit.assert_not_called()
         assert result is True
 
     # ==================== count 测试 ====================
@@ -318,3 +321,476 @@ class TestDatabaseManager:
         manager.init_db()
 
         assert manager.engine is not None
+
+
+class TestTrackFileStates:
+    """TrackOper 文件状态查询测试（SQLite）"""
+
+    @pytest.fixture
+    def track_oper(self, db_manager):
+        """创建 TrackOper 实例"""
+        from app.db.models.track import Track
+        from app.db.operations.track import TrackOper
+
+        return TrackOper(Track, db_manager)
+
+    @pytest.mark.asyncio
+    async def test_get_file_states(self, track_oper):
+        """测试按目录前缀取出文件状态"""
+        await track_oper.create(title="a", path="/music/a.mp3", file_size=10, file_mtime=1.5)
+        await track_oper.create(title="b", path="/music/sub/b.mp3", file_size=20)
+        await track_oper.create(title="c", path="/music2/c.mp3", file_size=30)
+        await track_oper.create(title="d", path="/music/d.mp3", file_size=40, missing=True)
+
+        states = await track_oper.get_file_states("/music/")
+
+        assert states == {"/music/a.mp3": (10, 1.5), "/music/sub/b.mp3": (20, None)}
+
+    @pytest.mark.asyncio
+    async def test_prefix_is_escaped(self, track_oper):
+        """测试路径中的通配符按字面匹配"""
+        await track_oper.create(title="a", path="/mu_ic/a.mp3")
+        await track_oper.create(title="b", path="/music/b.mp3")
+
+        assert list(await track_oper.get_file_states("/mu_ic/")) == ["/mu_ic/a.mp3"]
+
+    @pytest.mark.asyncio
+    async def test_mark_missing(self, track_oper):
+        """测试批量标记已移除"""
+        for i in range(5):
+            await track_oper.create(title=str(i), path=f"/music/{i}.mp3", file_size=1)
+
+        count = await track_oper.mark_missing(
+            ["/music/0.mp3", "/music/1.mp3", "/music/2.mp3"], batch_size=2
+        )
+
+        assert count == 3
+        assert sorted(await track_oper.get_file_states("/music/")) == [
+            "/music/3.mp3",
+            "/music/4.mp3",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_get_library_stats(self, track_oper):
+        """测试聚合统计不包含已移除的曲目"""
+        await track_oper.create(title="a", path="/music/a.mp3", file_size=10)
+        await track_oper.create(title="b", path="/music/b.mp3", file_size=20)
+        await track_oper.create(title="c", path="/music/c.mp3", file_size=40, missing=True)
+
+        stats = await track_oper.get_library_stats("/music/")
+
+        assert stats["track_count"] == 2
+        assert stats["total_size"] == 30
+
+    @pytest.mark.asyncio
+    async def test_lists_exclude_missing(self, track_oper):
+        """测试曲目列表查询不返回已移除的曲目"""
+        await track_oper.create(title="a", path="/music/a.mp3", album_id=1, artist_id=1)
+        await track_oper.create(
+            title="b", path="/music/b.mp3", album_id=1, artist_id=1, missing=True
+        )
+
+        assert [t.title for t in await track_oper.get_by_album_id(1)] == ["a"]
+        assert [t.title for t in await track_oper.get_by_artist_id(1)] == ["a"]
+        assert [t.title for t in await track_oper.get_by_library("/music/")] == ["a"]
+        assert [t.title for t in await track_oper.get_all(missing=False)] == ["a"]
+        assert await track_oper.count(missing=False) == 1
+
+
+class TestTrackBulkIngest:
+    """TrackOper 批量入库测试（SQLite）"""
+
+    @pytest.fixture
+    def track_oper(self, db_manager):
+        """创建 TrackOper 实例"""
+        from app.db.models.track import Track
+        from app.db.operations.track import TrackOper
+
+        return TrackOper(Track, db_manager)
+
+    def _info(self, path: str, **kwargs):
+        from app.core.context import MusicInfo
+
+        return MusicInfo(path=path, title=path.rsplit("/", 1)[-1], file_size=1, **kwargs)
+
+    @pytest.mark.asyncio
+    async def test_creates_shared_artist_and_album(self, track_oper, db_manager):
+        """测试同一批中的曲目共用艺术家和专辑"""
+        from app.db.models.album import Album
+        from app.db.models.artist import Artist
+        from app.db.operations.album import AlbumOper
+        from app.db.operations.artist import ArtistOper
+
+        items = [
+            self._info("/m/1.mp3", artist="A", album="X", musicbrainz_track_id="mb-1"),
+            self._info("/m/2.mp3", artist="A", album="X"),
+            self._info("/m/3.mp3", artist="A", album="Y"),
+            self._info("/m/4.mp3", artist="B"),
+        ]
+
+        results = await track_oper.bulk_ingest(items)
+
+        assert await ArtistOper(Artist, db_manager).count() == 2
+        assert await AlbumOper(Album, db_manager).count() == 2
+        assert await track_oper.count() == 4
+        assert results[0]["artist_id"] == results[1]["artist_id"] == results[2]["artist_id"]
+        assert results[0]["album_id"] == results[1]["album_id"] != results[2]["album_id"]
+        assert "album_id" not in results[3]
+        assert len({r["track_id"] for r in results}) == 4
+
+        track = await track_oper.get_by_id(results[0]["track_id"])
+        assert track.musicbrainz_id == "mb-1"
+        assert track.missing is False
+
+    @pytest.mark.asyncio
+    async def test_reuses_existing_rows(self, track_oper, db_manager):
+        """测试再次入库时复用已有艺术家、专辑和曲目"""
+        from app.db.models.artist import Artist
+        from app.db.operations.artist import ArtistOper
+
+        first = await track_oper.bulk_ingest([self._info("/m/1.mp3", artist="A", album="X")])
+        await track_oper.mark_missing(["/m/1.mp3"])
+
+        second = await track_oper.bulk_ingest(
+            [self._info("/m/1.mp3", artist="A", album="X", file_mtime=2.0)]
+        )
+
+        assert second == first
+        assert await ArtistOper(Artist, db_manager).count() == 1
+        assert await track_oper.get_file_states("/m/") == {"/m/1.mp3": (1, 2.0)}
+
+    @pytest.mark.asyncio
+    async def test_rescan_updates_retagged_file(self, track_oper, db_manager):
+        """测试重新打标签后再次扫描，曲目的标签字段以新结果为准"""
+        from app.db.models.artist import Artist
+        from app.db.operations.artist import ArtistOper
+
+        await track_oper.bulk_ingest(
+            [self._info("/m/1.mp3", artist="A", album="X", track_number=1, tags=["old"])]
+        )
+        track = await track_oper.get_by_path("/m/1.mp3")
+        await track_oper.update(track.id, play_count=5)
+
+        retagged = self._info(
+            "/m/1.mp3", artist="B", album="Y", track_number=7, tags=["new"], genres=["Rock"]
+        )
+        retagged.title = "晴天"
+        [result] = await track_oper.bulk_ingest([retagged])
+
+        track = await track_oper.get_by_path("/m/1.mp3")
+        assert result["track_id"] == track.id
+        assert track.title == "晴天"
+        assert track.title_pinyin
+        assert track.artist_id == result["artist_id"]
+        assert (await ArtistOper(Artist, db_manager).get_by_id(track.artist_id)).name == "B"
+        assert track.album_id == result["album_id"]
+        assert (track.track_number, track.tags, track.genres) == (7, ["new"], ["Rock"])
+        assert track.play_count == 5
+
+    @pytest.mark.asyncio
+    async def test_artist_matched_by_musicbrainz_id(self, track_oper, db_manager):
+        """测试艺术家优先按 MusicBrainz ID 匹配，同名但 ID 不同的艺术家分开保存"""
+        from app.db.models.artist import Artist
+        from app.db.operations.artist import ArtistOper
+
+        artist_oper = ArtistOper(Artist, db_manager)
+        renamed = await artist_oper.create(name="Jay Chou", musicbrainz_id="mb-jay")
+        other = await artist_oper.create(name="Queen", musicbrainz_id="mb-queen")
+        plain = await artist_oper.create(name="Plain")
+
+        results = await track_oper.bulk_ingest(
+            [
+                self._info("/m/1.mp3", artist="周杰伦", musicbrainz_artist_id="mb-jay"),
+                self._info("/m/2.mp3", artist="Queen", musicbrainz_artist_id="mb-queen-rapper"),
+                self._info("/m/3.mp3", artist="Queen"),
+                self._info("/m/4.mp3", artist="Plain", musicbrainz_artist_id="mb-plain"),
+                self._info("/m/5.mp3", artist="New", musicbrainz_artist_id="mb-new"),
+                self._info("/m/6.mp3", artist="New"),
+            ]
+        )
+
+        assert results[0]["artist_id"] == renamed.id
+        assert results[1]["artist_id"] not in (other.id, plain.id)
+        assert results[2]["artist_id"] == other.id
+        assert results[3]["artist_id"] == plain.id
+        assert results[4]["artist_id"] == results[5]["artist_id"]
+        assert await artist_oper.count() == 5
+
+    @pytest.mark.asyncio
+    async def test_same_musicbrainz_id_different_names(self, track_oper, db_manager):
+        """测试同一批中同一 MusicBrainz ID 的不同写法只创建一个艺术家"""
+        from app.db.models.artist import Artist
+        from app.db.operations.artist import ArtistOper
+
+        results = await track_oper.bulk_ingest(
+            [
+                self._info("/m/1.mp3", artist="Beyoncé", musicbrainz_artist_id="mb-beyonce"),
+                self._info("/m/2.mp3", artist="Beyonce", musicbrainz_artist_id="mb-beyonce"),
+            ]
+        )
+
+        assert results[0]["artist_id"] == results[1]["artist_id"]
+        assert await ArtistOper(Artist, db_manager).count() == 1
+        assert await track_oper.count() == 2
+
+    @pytest.mark.asyncio
+    async def test_duplicate_paths_in_batch(self, track_oper):
+        """测试同一批中的重复路径只写入一次"""
+        results = await track_oper.bulk_ingest(
+            [self._info("/m/1.mp3"), self._info("/m/1.mp3"), self._info("")]
+        )
+
+        assert results[0]["track_id"] == results[1]["track_id"]
+        assert results[2] == {}
+        assert await track_oper.count() == 1
+
+    @pytest.mark.asyncio
+    async def test_empty(self, track_oper):
+        """测试空列表"""
+        assert await track_oper.bulk_ingest([]) == []
+
+
+class TestUnitOfWork:
+    """工作单元测试（SQLite）"""
+
+    @pytest.fixture
+    def track_oper(self, db_manager):
+        """创建 TrackOper 实例"""
+        from app.db.models.track import Track
+        from app.db.operations.track import TrackOper
+
+        return TrackOper(Track, db_manager)
+
+    @pytest.fixture
+    def engine_events(self, db_manager):
+        """统计连接签出和提交次数"""
+        from sqlalchemy import event
+
+        counts = {"checkout": 0, "commit": 0}
+        sync_engine = db_manager.engine.sync_engine
+
+        def on_checkout(*args):
+            counts["checkout"] += 1
+
+        def on_commit(*args):
+            counts["commit"] += 1
+
+        event.listen(sync_engine.pool, "checkout", on_checkout)
+        event.listen(sync_engine, "commit", on_commit)
+        yield counts
+        event.remove(sync_engine.pool, "checkout", on_checkout)
+        event.remove(sync_engine, "commit", on_commit)
+
+    @pytest.mark.asyncio
+    async def test_one_connection_one_commit(self, db_manager, track_oper, engine_events):
+        """测试工作单元内的多次调用共用一个连接并只提交一次"""
+        async with db_manager.unit_of_work():
+            track = await track_oper.create(title="a", path="/m/a.mp3")
+            await track_oper.update(track.id, title="b")
+            assert (await track_oper.get_by_id(track.id)).title == "b"
+            assert await track_oper.count() == 1
+
+        assert engine_events == {"checkout": 1, "commit": 1}
+
+    @pytest.mark.asyncio
+    async def test_without_unit_of_work(self, track_oper, engine_events):
+        """测试不在工作单元中时每次调用独立提交"""
+        track = await track_oper.create(title="a", path="/m/a.mp3")
+        updated = await track_oper.update(track.id, title="b")
+
+        assert updated.title == "b"
+        assert engine_events["commit"] == 2
+
+    @pytest.mark.asyncio
+    async def test_rollback_on_error(self, db_manager, track_oper):
+        """测试出现异常时整体回滚"""
+        with pytest.raises(RuntimeError):
+            async with db_manager.unit_of_work():
+                await track_oper.create(title="a", path="/m/a.mp3")
+                raise RuntimeError("boom")
+
+        assert await track_oper.count() == 0
+
+    @pytest.mark.asyncio
+    async def test_nested_reuses_session(self, db_manager):
+        """测试嵌套工作单元复用外层会话"""
+        async with db_manager.unit_of_work() as outer:
+            async with db_manager.unit_of_work() as inner:
+                assert inner is outer
+            async with db_manager.get_session() as session:
+                assert session is outer
+
+    @pytest.mark.asyncio
+    async def test_detach(self, db_manager, track_oper):
+        """测试脱离工作单元后使用独立会话"""
+        async with db_manager.unit_of_work() as outer:
+            with db_manager.detach():
+                async with db_manager.get_session() as session:
+                    assert session is not outer
+                await track_oper.create(title="a", path="/m/a.mp3")
+
+            # 独立会话已提交
+            assert await track_oper.count() == 1
+
+    @pytest.mark.asyncio
+    async def test_get_db_dependency(self, db_manager, track_oper, engine_events, monkeypatch):
+        """测试 get_db 为每个请求绑定一个工作单元"""
+        import httpx
+        from fastapi import Depends, FastAPI
+
+        from app.db import get_db
+
+        monkeypatch.setattr("app.db.db_manager", db_manager)
+        app = FastAPI()
+
+        @app.post("/tracks")
+        async def create_tracks(db=Depends(get_db, scope="function")):
+            for i in range(3):
+                await track_oper.create(title=str(i), path=f"/m/{i}.mp3")
+            return {"count": await track_oper.count()}
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/tracks")
+
+        assert response.json() == {"count": 3}
+        assert engine_events == {"checkout": 1, "commit": 1}
+
+    @pytest.mark.asyncio
+    async def test_get_db_commits_before_response(self, db_manager, track_oper, monkeypatch):
+        """测试响应发送前已提交，提交失败时返回 500"""
+        import httpx
+        from fastapi import Depends, FastAPI
+        from sqlalchemy.ext.asyncio import AsyncSession
+
+        from app.db import get_db
+
+        monkeypatch.setattr("app.db.db_manager", db_manager)
+        app = FastAPI()
+        events = []
+
+        @app.middleware("http")
+        async def record(request, call_next):
+            response = await call_next(request)
+            events.append(("response", await track_oper.count()))
+            return response
+
+        @app.post("/tracks")
+        async def create_track(db=Depends(get_db, scope="function")):
+            await track_oper.create(title="a", path=f"/m/{len(events)}.mp3")
+            return {}
+
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            assert (await client.post("/tracks")).status_code == 200
+            # 中间件拿到响应时数据已提交，其他会话可见
+            assert events == [("response", 1)]
+
+            async def failing_commit(self):
+                raise RuntimeError("提交失败")
+
+            monkeypatch.setattr(AsyncSession, "commit", failing_commit)
+            response = await client.post("/tracks")
+
+        assert response.status_code == 500
+        monkeypatch.undo()
+        assert await track_oper.count() == 1
+
+
+class TestKeysetPagination:
+    """游标分页测试（SQLite）"""
+
+    @pytest_asyncio.fixture
+    async def track_oper(self, db_manager):
+        """创建包含 7 首曲目的 TrackOper 实例"""
+        from app.db.models.track import Track
+        from app.db.operations.track import TrackOper
+
+        oper = TrackOper(Track, db_manager)
+        for i, title in enumerate(["c", "a", "b", "a", "c", "b", "a"]):
+            await oper.create(title=title, path=f"/m/{i}.mp3", disc_number=i % 2)
+        return oper
+
+    async def _collect(self, oper, limit, **kwargs):
+        pages, cursor = [], None
+        while True:
+            items, cursor = await oper.get_page(cursor, limit=limit, **kwargs)
+            pages.append([(t.title, t.id) for t in items])
+            if cursor is None:
+                return pages
+
+    @pytest.mark.asyncio
+    async def test_pages_by_id(self, track_oper):
+        """测试按 ID 翻页不重复不遗漏"""
+        pages = await self._collect(track_oper, limit=3)
+
+        assert [len(page) for page in pages] == [3, 3, 1]
+        assert [id for page in pages for _, id in page] == list(range(1, 8))
+
+    @pytest.mark.asyncio
+    async def test_pages_by_title_with_ties(self, track_oper):
+        """测试排序键有重复值时以 ID 区分"""
+        pages = await self._collect(track_oper, limit=2, order_by="title")
+        rows = [row for page in pages for row in page]
+
+        assert rows == sorted(rows)
+        assert len(rows) == 7
+
+    @pytest.mark.asyncio
+    async def test_descending(self, track_oper):
+        """测试倒序翻页"""
+        pages = await self._collect(track_oper, limit=4, descending=True)
+
+        assert [id for page in pages for _, id in page] == list(range(7, 0, -1))
+
+    @pytest.mark.asyncio
+    async def test_exact_last_page(self, track_oper):
+        """测试最后一页刚好取满时不返回游标"""
+        items, cursor = await track_oper.get_page(limit=7)
+
+        assert len(items) == 7
+        assert cursor is None
+
+    @pytest.mark.asyncio
+    async def test_filters(self, track_oper):
+        """测试游标分页应用过滤条件"""
+        pages = await self._collect(track_oper, limit=2, disc_number=1)
+
+        assert [id for page in pages for _, id in page] == [2, 4, 6]
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor(self, track_oper):
+        """测试无效游标"""
+        with pytest.raises(ValueError):
+            await track_oper.get_page("not-a-cursor")
+
+    @pytest.mark.asyncio
+    async def test_estimate_count_is_cached(self, track_oper, monkeypatch):
+        """测试非 PostgreSQL 数据库的总数按 TTL 缓存"""
+        monkeypatch.setattr("app.db._count_cache", {})
+
+        assert await track_oper.estimate_count() == 7
+        await track_oper.create(title="d", path="/m/8.mp3")
+
+        assert await track_oper.estimate_count() == 7
+        assert await track_oper.count() == 8
+
+
+class TestCursorEncoding:
+    """游标编码测试"""
+
+    def test_round_trip(self):
+        """测试编码后可以还原"""
+        from app.db import decode_cursor, encode_cursor
+
+        cursor = encode_cursor(["周杰伦 - 晴天", 42])
+
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == ["周杰伦 - 晴天", 42]
+
+    def test_wrong_shape(self):
+        """测试格式不符的游标"""
+        from app.db import decode_cursor, encode_cursor
+
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor([1, 2, 3]))
@@ -139,3 +139,45 @@ class TestDownloadChain:
         # _get_downloader 需要访问 module_manager
         # 简化测试，只验证方法存在
         assert hasattr(chain, "_get_downloader")
+
+
+class TestCancelRecoveredDownload:
+    """取消重启后恢复的下载任务"""
+
+    @pytest.mark.asyncio
+    async def test_cancel_recovered_job(self, db_manager):
+        """测试取消恢复的任务时按任务中的历史记录 ID 更新下载历史"""
+        import asyncio
+
+        from app.core.download_scheduler import DownloadScheduler
+        from app.db.models.download import DownloadHistory
+        from app.db.operations.download import DownloadHistoryOper
+
+        chain = DownloadChain(db_manager=db_manager)
+        task = DownloadTask("netease_1", "1", DownloadSource.NETEASE, title="晴天")
+        history = await chain._save_to_history(task, DownloadSource.NETEASE)
+        task.metadata["history_id"] = history.id
+
+        async def runner(job):
+            await asyncio.Event().wait()
+
+        # 上次运行提交的任务，停止后由新的调度器恢复
+        scheduler = DownloadScheduler(runner, db_manager, max_concurrency=1)
+        await scheduler.submit("netease", {"name": "blocker"})
+        await scheduler.submit("netease", {"task": task.to_dict()}, key=task.task_id)
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+
+        recovered = DownloadScheduler(runner, db_manager, max_concurrency=1)
+        await recovered.start()
+        with patch("app.chain.download.get_download_scheduler", return_value=recovered):
+            assert await chain.get_download_status(task.task_id) == {
+                "task_id": task.task_id,
+                "status": "pending",
+            }
+            assert await chain.cancel_download(task.task_id)
+            assert not await chain.cancel_download(task.task_id)
+
+        oper = DownloadHistoryOper(DownloadHistory, db_manager)
+        assert (await oper.get_by_id(history.id)).status == "cancelled"
+        await recovered.stop()
@@ -0,0 +1,314 @@
+"""
+下载调度器单元测试
+测试优先级、并发限制、失败重试、取消和重启恢复
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.download_scheduler import (
+    JOB_FAILED,
+    JOB_RUNNING,
+    DownloadScheduler,
+    JobCancelledError,
+    ScheduledJob,
+)
+from app.db.models.download_job import DownloadJob
+from app.db.operations.download_job import DownloadJobOper
+
+
+class FakeRunner:
+    """记录执行顺序和并发数的假执行函数"""
+
+    def __init__(self, delay: float = 0.01, failures: int = 0):
+        self.delay = delay
+        self.failures = failures
+        self.started: list[str] = []
+        self.running: dict[str, int] = {}
+        self.peak = 0
+        self.peak_by_source: dict[str, int] = {}
+        self.release: asyncio.Event | None = None
+
+    async def __call__(self, job: ScheduledJob):
+        name = job.payload["name"]
+        self.started.append(name)
+        self.running[job.source] = self.running.get(job.source, 0) + 1
+        self.peak = max(self.peak, sum(self.running.values()))
+        self.peak_by_source[job.source] = max(
+            self.peak_by_source.get(job.source, 0), self.running[job.source]
+        )
+        try:
+            if self.release is not None:
+                await self.release.wait()
+            await asyncio.sleep(self.delay)
+            if job.attempts <= self.failures:
+                raise ConnectionError(f"{name} 第 {job.attempts} 次失败")
+            return name
+        finally:
+            self.running[job.source] -= 1
+
+
+def make_scheduler(runner, db_manager, **kwargs) -> DownloadScheduler:
+    """创建测试调度器（退避时间很短）"""
+    kwargs.setdefault("max_concurrency", 4)
+    kwargs.setdefault("source_limits", {})
+    kwargs.setdefault("max_retries", 3)
+    kwargs.setdefault("backoff", 0.01)
+    kwargs.setdefault("backoff_max", 0.05)
+    return DownloadScheduler(runner, db_manager, **kwargs)
+
+
+class TestDownloadScheduler:
+    """DownloadScheduler 测试类"""
+
+    @pytest.mark.asyncio
+    async def test_priority_order(self, db_manager):
+        """测试按优先级执行，同优先级按提交顺序"""
+        runner = FakeRunner()
+        runner.release = asyncio.Event()
+        scheduler = make_scheduler(runner, db_manager, max_concurrency=1)
+
+        blocker = await scheduler.submit("netease", {"name": "blocker"})
+        low = await scheduler.submit("netease", {"name": "low"}, priority=5)
+        first = await scheduler.submit("netease", {"name": "first"}, priority=0)
+        second = await scheduler.submit("netease", {"name": "second"}, priority=0)
+        runner.release.set()
+
+        for job_id in (blocker, low, first, second):
+            await scheduler.wait(job_id)
+        assert runner.started == ["blocker", "first", "second", "low"]
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limits(self, db_manager):
+        """测试全局和来源并发限制"""
+        runner = FakeRunner()
+        runner.release = asyncio.Event()
+        scheduler = make_scheduler(
+            runner, db_manager, max_concurrency=3, source_limits={"netease": 1}
+        )
+
+        job_ids = [await scheduler.submit("netease", {"name": f"n{i}"}) for i in range(4)]
+        job_ids += [await scheduler.submit("qq", {"name": f"q{i}"}) for i in range(6)]
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if scheduler.metrics()["running"] == 3:
+                break
+        assert scheduler.metrics()["running_by_source"] == {"netease": 1, "qq": 2}
+        runner.release.set()
+
+        results = [await scheduler.wait(job_id) for job_id in job_ids]
+        assert len(results) == 10
+        assert runner.peak == 3
+        assert runner.peak_by_source["netease"] == 1
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_retry_does_not_block_others(self, db_manager):
+        """测试失败任务退避等待时不占用并发"""
+        runner = FakeRunner()
+        scheduler = make_scheduler(runner, db_manager, max_concurrency=1, backoff=0.1)
+
+        async def flaky(job: ScheduledJob):
+            if job.payload["name"] == "flaky" and job.attempts == 1:
+                raise ConnectionError("超时")
+            return await runner(job)
+
+        scheduler.runner = flaky
+        flaky_id = await scheduler.submit("netease", {"name": "flaky"})
+        other_id = await scheduler.submit("netease", {"name": "other"}, priority=9)
+
+        assert await scheduler.wait(other_id) == "other"
+        assert scheduler.metrics()["delayed"] == 1
+        assert await scheduler.wait(flaky_id) == "flaky"
+        assert runner.started == ["other", "flaky"]
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_retries_then_fails(self, db_manager):
+        """测试超过最大重试次数后失败并保留失败记录"""
+        runner = FakeRunner(failures=10)
+        scheduler = make_scheduler(runner, db_manager, max_retries=2)
+
+        job_id = await scheduler.submit("netease", {"name": "bad"})
+        with pytest.raises(ConnectionError):
+            await scheduler.wait(job_id)
+        assert runner.started == ["bad"] * 3
+
+        row = await DownloadJobOper(DownloadJob, db_manager).get_by_id(job_id)
+        assert row.status == JOB_FAILED
+        assert row.attempts == 3
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_success_removes_record(self, db_manager):
+        """测试成功后删除任务记录"""
+        runner = FakeRunner(failures=1)
+        scheduler = make_scheduler(runner, db_manager)
+
+        job_id = await scheduler.submit("netease", {"name": "ok"})
+        assert await scheduler.wait(job_id) == "ok"
+        assert await DownloadJobOper(DownloadJob, db_manager).get_by_id(job_id) is None
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_job_ids_not_reused(self, db_manager):
+        """测试完成的任务记录删除后，新任务不会复用其 ID"""
+        scheduler = make_scheduler(FakeRunner(delay=0), db_manager)
+        first = await scheduler.submit("netease", {"name": "first"})
+        assert await scheduler.wait(first) == "first"
+
+        second = await scheduler.submit("netease", {"name": "second"})
+        assert second > first
+        assert await scheduler.wait(second) == "second"
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_cancel(self, db_manager):
+        """测试取消排队中和执行中的任务"""
+        runner = FakeRunner()
+        runner.release = asyncio.Event()
+        scheduler = make_scheduler(runner, db_manager, max_concurrency=1)
+
+        running = await scheduler.submit("netease", {"name": "running"})
+        queued = await scheduler.submit("netease", {"name": "queued"})
+        await asyncio.sleep(0.01)
+
+        assert await scheduler.cancel(queued)
+        assert await scheduler.cancel(running)
+        for job_id in (running, queued):
+            with pytest.raises(JobCancelledError):
+                await scheduler.wait(job_id)
+        assert runner.started == ["running"]
+        assert not await scheduler.cancel(running)
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_recover_after_restart(self, db_manager):
+        """测试停止后未完成的任务在下次启动时恢复"""
+        runner = FakeRunner()
+        runner.release = asyncio.Event()
+        scheduler = make_scheduler(runner, db_manager, max_concurrency=1)
+        await scheduler.submit("netease", {"name": "interrupted"})
+        await scheduler.submit("netease", {"name": "queued"}, priority=1)
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+
+        done = asyncio.Event()
+        restarted = FakeRunner()
+
+        async def runner2(job: ScheduledJob):
+            result = await restarted(job)
+            if len(restarted.started) == 2:
+                done.set()
+            return result
+
+        scheduler = make_scheduler(runner2, db_manager, max_concurrency=1)
+        await scheduler.start()
+        await asyncio.wait_for(done.wait(), 1)
+        assert restarted.started == ["interrupted", "queued"]
+
+        await asyncio.sleep(0.01)
+        assert await DownloadJobOper(DownloadJob, db_manager).get_unfinished() == []
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_claim_only_expired_leases(self, db_manager):
+        """测试只认领租约过期的任务，不执行其他存活进程持有的任务"""
+        oper = DownloadJobOper(DownloadJob, db_manager)
+        now = datetime.utcnow()
+        for name, owner, lease in (
+            ("orphan", "dead", now - timedelta(seconds=1)),
+            ("alive", "alive", now + timedelta(seconds=60)),
+        ):
+            await oper.create(
+                source="netease",
+                priority=0,
+                payload={"name": name},
+                status=JOB_RUNNING,
+                attempts=1,
+                max_retries=3,
+                owner=owner,
+                lease_expires_at=lease,
+            )
+
+        runner = FakeRunner()
+        scheduler = make_scheduler(runner, db_manager)
+        other = make_scheduler(FakeRunner(), db_manager)
+        await asyncio.gather(scheduler.start(), other.start())
+        await asyncio.sleep(0.05)
+
+        assert runner.started + other.runner.started == ["orphan"]
+        [row] = await oper.get_unfinished()
+        assert row.payload == {"name": "alive"} and row.owner == "alive"
+        await scheduler.stop()
+        await other.stop()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_schedulers_do_not_share_jobs(self, db_manager):
+        """测试多个进程同时运行时，续租的任务不会被其他调度器重复执行"""
+        first = FakeRunner()
+        first.release = asyncio.Event()
+        second = FakeRunner()
+        scheduler = make_scheduler(first, db_manager, lease=0.06)
+        other = make_scheduler(second, db_manager, lease=0.06)
+        await other.start()
+
+        job_id = await scheduler.submit("netease", {"name": "song"})
+        await scheduler.start()
+        await asyncio.sleep(0.2)
+        first.release.set()
+
+        assert await scheduler.wait(job_id) == "song"
+        assert second.started == []
+        await scheduler.stop()
+        await other.stop()
+
+    @pytest.mark.asyncio
+    async def test_lost_lease_stops_job(self, db_manager):
+        """测试租约被其他进程接管后停止执行，且不修改记录"""
+        runner = FakeRunner()
+        runner.release = asyncio.Event()
+        scheduler = make_scheduler(runner, db_manager, lease=0.06)
+        oper = DownloadJobOper(DownloadJob, db_manager)
+
+        job_id = await scheduler.submit("netease", {"name": "song"})
+        await asyncio.sleep(0.01)
+        await oper.update(
+            job_id, owner="other", lease_expires_at=datetime.utcnow() + timedelta(seconds=60)
+        )
+
+        with pytest.raises(JobCancelledError):
+            await asyncio.wait_for(scheduler.wait(job_id), 1)
+        row = await oper.get_by_id(job_id)
+        assert row.status == JOB_RUNNING and row.owner == "other"
+        assert scheduler.get_job_id("song") is None
+        await scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_recovered_job_found_by_key(self, db_manager):
+        """测试重启恢复的任务可以按调用方标识查询和取消"""
+        runner = FakeRunner()
+        runner.release = asyncio.Event()
+        scheduler = make_scheduler(runner, db_manager, max_concurrency=1)
+        await scheduler.submit("netease", {"name": "blocker"})
+        job_id = await scheduler.submit("netease", {"name": "queued"}, key="task-1")
+        assert scheduler.get_job_id("task-1") == job_id
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+        assert scheduler.get_job_id("task-1") is None
+
+        restarted = FakeRunner()
+        restarted.release = asyncio.Event()
+        scheduler = make_scheduler(restarted, db_manager, max_concurrency=1)
+        await scheduler.start()
+        assert scheduler.get_job_id("task-1") == job_id
+
+        assert await scheduler.cancel(job_id)
+        assert scheduler.get_job_id("task-1") is None
+        assert (await DownloadJobOper(DownloadJob, db_manager).get_by_id(job_id)).status == (
+            "cancelled"
+        )
+        await scheduler.stop()
@@ -3,11 +3,12 @@ EventManager 单元测试
 测试事件管理器的功能
 """
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from app.core.event import EventManager, EventType, event_bus
+from app.core.event import EventManager, EventPolicy, EventType, OverflowPolicy, event_bus
 
 
 class TestEventType:
@@ -174,3 +175,169 @@ class TestEventManager:
         """测试全局事件管理器实例"""
         assert event_bus is not None
         assert isinstance(event_bus, EventManager)
+
+
+class TestEventBus:
+    """EventManager 异步分发测试类"""
+
+    @pytest.fixture
+    async def bus(self):
+        """创建事件总线，测试结束后停止 worker"""
+        manager = EventManager(workers=2, queue_size=10)
+        yield manager
+        await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_publish_dispatches_to_workers(self, bus):
+        """测试发布的事件由 worker 处理，异步处理器被等待完成"""
+        received = []
+
+        async def handler(data):
+            await asyncio.sleep(0)
+            received.append(data["n"])
+
+        bus.register("test_event", handler)
+        for i in range(5):
+            assert await bus.publish("test_event", {"n": i})
+        await bus.join()
+
+        assert sorted(received) == list(range(5))
+        stats = bus.metrics()["events"]["test_event"]
+        assert stats["published"] == 5
+        assert stats["handled"] == 5
+        assert stats["depth"] == 0
+
+    @pytest.mark.asyncio
+    async def test_send_event_in_loop_is_queued(self, bus):
+        """测试事件循环中 send_event 不会同步调用处理器"""
+        handler = MagicMock()
+        bus.register("test_event", handler)
+
+        bus.send_event("test_event", {"key": "value"})
+        handler.assert_not_called()
+
+        await bus.join()
+        handler.assert_called_once_with({"key": "value"})
+
+    @pytest.mark.asyncio
+    async def test_no_handlers_not_queued(self, bus):
+        """测试没有处理器的事件直接忽略"""
+        assert bus.publish_nowait("nobody", {})
+        assert bus.pending_count == 0
+
+    @pytest.mark.asyncio
+    async def test_handler_failure_is_counted(self, bus):
+        """测试处理器异常被记录且不影响其他处理器"""
+        handler = MagicMock()
+        bus.register("test_event", AsyncMock(side_effect=Exception("boom")))
+        bus.register("test_event", handler)
+
+        await bus.publish("test_event", {})
+        await bus.join()
+
+        handler.assert_called_once()
+        assert bus.metrics()["events"]["test_event"]["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_coalesce(self, bus):
+        """测试合并策略：相同键的未处理事件只保留最新一条"""
+        received = []
+        gate = asyncio.Event()
+
+        async def handler(data):
+            await gate.wait()
+            received.append(data)
+
+        bus.register(EventType.DownloadProgress, handler)
+        for progress in range(100):
+            for task_id in ("a", "b"):
+                bus.publish_nowait(
+                    EventType.DownloadProgress, {"task_id": task_id, "progress": progress}
+                )
+        assert bus.pending_count <= 4
+
+        gate.set()
+        await bus.join()
+        latest = {}
+        for data in received:
+            latest[data["task_id"]] = data["progress"]
+        assert latest == {"a": 99, "b": 99}
+        assert len(received) <= 4
+        assert bus.metrics()["events"][EventType.DownloadProgress]["coalesced"] >= 196
+
+    @pytest.mark.asyncio
+    async def test_drop_newest_when_full(self, bus):
+        """测试队列满时 publish_nowait 丢弃新事件"""
+        gate = asyncio.Event()
+
+        async def handler(data):
+            await gate.wait()
+
+        bus.set_policy("test_event", EventPolicy(maxsize=3))
+        bus.register("test_event", handler)
+        results = [bus.publish_nowait("test_event", {"n": i}) for i in range(20)]
+        await asyncio.sleep(0)
+        results += [bus.publish_nowait("test_event", {"n": i}) for i in range(20)]
+
+        assert results.count(False) > 0
+        assert bus.metrics()["events"]["test_event"]["dropped"] == results.count(False)
+        gate.set()
+        await bus.join()
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest(self, bus):
+        """测试丢弃最早事件的策略"""
+        received = []
+        gate = asyncio.Event()
+
+        async def handler(data):
+            await gate.wait()
+            received.append(data["n"])
+
+        bus.set_policy("test_event", EventPolicy(OverflowPolicy.DROP_OLDEST, maxsize=3))
+        bus.register("test_event", handler)
+        # 先让两个 worker 各取走一个事件并阻塞
+        bus.publish_nowait("test_event", {"n": -2})
+        bus.publish_nowait("test_event", {"n": -1})
+        await asyncio.sleep(0)
+        for i in range(10):
+            assert bus.publish_nowait("test_event", {"n": i})
+
+        gate.set()
+        await bus.join()
+        assert sorted(received) == [-2, -1, 7, 8, 9]
+
+    @pytest.mark.asyncio
+    async def test_publish_blocks_when_full(self, bus):
+        """测试 BLOCK 策略下 publish 等待空位（背压）"""
+        gate = asyncio.Event()
+
+        async def handler(data):
+            await gate.wait()
+
+        bus.set_policy("test_event", EventPolicy(maxsize=1))
+        bus.register("test_event", handler)
+        for i in range(3):
+            await bus.publish("test_event", {"n": i})
+
+        blocked = asyncio.create_task(bus.publish("test_event", {"n": 3}))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        gate.set()
+        assert await asyncio.wait_for(blocked, 1)
+        await bus.join()
+        assert bus.metrics()["events"]["test_event"]["handled"] == 4
+
+    @pytest.mark.asyncio
+    async def test_stop_drains_queue(self):
+        """测试停止时处理完已排队的事件"""
+        bus = EventManager(workers=1)
+        handler = AsyncMock()
+        bus.register("test_event", handler)
+        for i in range(10):
+            bus.publish_nowait("test_event", {"n": i})
+
+        await bus.stop()
+        assert handler.call_count == 10
+        assert bus.metrics()["workers"] == 0
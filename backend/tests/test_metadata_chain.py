@@ -294,53 +294,63 @@ class TestMetadataChain:
                     pytest.skip("ChainBase lacks get_cache method")
                 raise
 
+    @pytest.mark.asyncio
+    async def test_complete_batch(self, chain):
+        """测试批量补全：缓存一次批量读写，失败的文件单独返回异常"""
+        cached = MusicInfo(title="Cached", path="/music/cached.mp3")
+        await chain.async_set_cache_many({"metadata:/music/cached.mp3": {"title": "缓存结果"}})
+        found = MusicInfo(artist="A", title="Found", path="/music/found.mp3")
+        broken = MusicInfo(artist="A", title="Broken", path="/music/broken.mp3")
+
+        async def query(artist, title, album):
+            if title == "Broken":
+                raise ConnectionError("MusicBrainz 不可用")
+            return None
+
+        with (
+            patch.object(chain, "query_musicbrainz", side_effect=query) as mock_query,
+            patch.object(
+                chain, "async_set_cache_many", wraps=chain.async_set_cache_many
+            ) as mock_set_many,
+        ):
+            results = await chain.complete_batch([cached, found, broken])
+
+        assert results[0].title == "缓存结果"
+        assert results[1].title == "Found"
+        assert isinstance(results[2], ConnectionError)
+        assert mock_query.call_count == 2
+        mock_set_many.assert_called_once()
+        assert list(mock_set_many.call_args.args[0]) == ["metadata:/music/found.mp3"]
+
     # ==================== save_to_database 测试 ====================
 
     @pytest.mark.asyncio
     async def test_save_to_database_new_artist(self, chain, sample_music_info):
-        """测试保存新艺术家"""
-        with patch("app.chain.metadata.ArtistOper") as mock_artist_oper_class:
-            with patch("app.chain.metadata.AlbumOper") as mock_album_oper_class:
-                with patch("app.chain.metadata.TrackOper") as mock_track_oper_class:
-                    mock_artist = MagicMock(id=1, name=sample_music_info.artist)
-                    mock_artist_oper = AsyncMock()
-                    mock_artist_oper.get_by_musicbrainz_id = AsyncMock(return_value=None)
-                    mock_artist_oper.create = AsyncMock(return_value=mock_artist)
-                    mock_artist_oper_class.return_value = mock_artist_oper
-
-                    mock_album_oper = AsyncMock()
-                    mock_album_oper.get_by_artist_id = AsyncMock(return_value=[])
-                    mock_album_oper_class.return_value = mock_album_oper
-
-                    mock_track = MagicMock(id=1, title=sample_music_info.title)
-                    mock_track_oper = AsyncMock()
-                    mock_track_oper.get_by_path = AsyncMock(return_value=None)
-                    mock_track_oper.create = AsyncMock(return_value=mock_track)
-                    mock_track_oper_class.return_value = mock_track_oper
-
-                    result = await chain.save_to_database(sample_music_info)
+        """测试保存新艺术家（通过批量入库）"""
+        with patch("app.chain.metadata.TrackOper") as mock_track_oper_class:
+            mock_track_oper = AsyncMock()
+            mock_track_oper.bulk_ingest = AsyncMock(
+                return_value=[{"artist_id": 1, "album_id": 1, "track_id": 1}]
+            )
+            mock_track_oper_class.return_value = mock_track_oper
+
+            result = await chain.save_to_database(sample_music_info)
 
         assert result["artist_id"] == 1
         assert result["track_id"] == 1
+        mock_track_oper.bulk_ingest.assert_awaited_once_with([sample_music_info])
 
     @pytest.mark.asyncio
     async def test_save_to_database_existing_track(self, chain, sample_music_info):
-        """测试保存已存在的曲目"""
-        with patch("app.chain.metadata.ArtistOper") as mock_artist_oper_class:
-            with patch("app.chain.metadata.AlbumOper") as mock_album_oper_class:
-                with patch("app.chain.metadata.TrackOper") as mock_track_oper_class:
-                    mock_track = MagicMock(id=1, title=sample_music_info.title)
-                    mock_track_oper = AsyncMock()
-                    mock_track_oper.get_by_path = AsyncMock(return_value=mock_track)
-                    mock_track_oper_class.return_value = mock_track_oper
-
-                    mock_artist_oper = AsyncMock()
-                    mock_artist_oper_class.return_value = mock_artist_oper
-
-                    mock_album_oper = AsyncMock()
-                    mock_album_oper_class.return_value = mock_album_oper
-
-                    result = await chain.save_to_database(sample_music_info)
+        """测试保存已存在的曲目（批量入库按路径更新，不单独创建）"""
+        with patch("app.chain.metadata.TrackOper") as mock_track_oper_class:
+            mock_track_oper = AsyncMock()
+            mock_track_oper.bulk_ingest = AsyncMock(
+                return_value=[{"artist_id": 2, "album_id": 3, "track_id": 1}]
+            )
+            mock_track_oper_class.return_value = mock_track_oper
+
+            result = await chain.save_to_database(sample_music_info)
 
         assert result["track_id"] == 1
         mock_track_oper.create.assert_not_called()
@@ -0,0 +1,178 @@
+"""
+MusicBrainz 响应缓存单元测试
+测试持久化、负缓存、过期、条目数上限淘汰，以及模块查询前先查缓存
+"""
+
+from urllib.error import HTTPError
+
+import pytest
+from musicbrainzngs import NetworkError, ResponseError
+
+from app.core.config import settings
+from app.modules.musicbrainz import (
+    MusicBrainzCache,
+    MusicBrainzClient,
+    MusicBrainzModule,
+    close_musicbrainz_cache,
+)
+from app.modules.musicbrainz.cache import entity_key, query_key
+
+
+class FakeApi:
+    """模拟 musicbrainzngs，记录请求次数"""
+
+    def __init__(self):
+        self.calls: list[str] = []
+        self.missing: set[str] = set()
+        self.offline = False
+
+    def _check(self, name: str, key: str):
+        self.calls.append(name)
+        if self.offline:
+            raise NetworkError(cause=OSError("网络不可用"))
+        if key in self.missing:
+            raise ResponseError(cause=HTTPError("http://mb", 404, "Not Found", None, None))
+
+    def get_recording_by_id(self, recording_id: str, includes=None):
+        self._check("get_recording_by_id", recording_id)
+        return {"recording": {"id": recording_id, "title": "晴天", "length": "269000"}}
+
+    def search_artists(self, query: str, limit: int = 25):
+        self._check("search_artists", query)
+        if query == "nobody":
+            return {"artist-list": []}
+        return {"artist-list": [{"id": "a1", "name": "周杰伦"}]}
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    """缓存文件路径"""
+    return tmp_path / "musicbrainz.db"
+
+
+@pytest.fixture
+def module(tmp_path, cache_path, monkeypatch):
+    """使用假 API 和临时缓存目录的模块"""
+    monkeypatch.setattr(settings, "cache_dir", str(tmp_path))
+    module = MusicBrainzModule()
+    module.client = MusicBrainzClient(rate=0, api=FakeApi())
+    assert module.cache.path == cache_path
+    yield module
+    module.client.close()
+    close_musicbrainz_cache()
+
+
+class TestMusicBrainzCache:
+    """MusicBrainzCache 测试类"""
+
+    def test_hit_miss_and_negative(self, cache_path):
+        """测试区分未缓存和负缓存"""
+        cache = MusicBrainzCache(cache_path)
+        cache.set("artist:a1", {"id": "a1"}, ttl=60)
+        cache.set("artist:gone", None, ttl=60)
+
+        assert cache.get("artist:a1") == (True, {"id": "a1"})
+        assert cache.get("artist:gone") == (True, None)
+        assert cache.get("artist:unknown") == (False, None)
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["negative_hits"], stats["misses"]) == (1, 1, 1)
+
+    def test_persists_and_expires(self, cache_path, clock):
+        """测试重新打开后仍然有效，过期后失效"""
+        cache = MusicBrainzCache(cache_path, clock=clock)
+        cache.set("artist:a1", {"id": "a1"}, ttl=60)
+        cache.close()
+
+        reopened = MusicBrainzCache(cache_path, clock=clock)
+        assert len(reopened) == 1
+        assert reopened.get("artist:a1") == (True, {"id": "a1"})
+        reopened.close()
+
+        clock.now += 61
+        expired = MusicBrainzCache(cache_path, clock=clock)
+        assert expired.get("artist:a1") == (False, None)
+        assert len(expired) == 0
+
+    def test_evicts_least_recently_used(self, cache_path, clock):
+        """测试超过条目数上限时淘汰最久未访问的条目"""
+        cache = MusicBrainzCache(cache_path, max_entries=3, memory_max_bytes=0, clock=clock)
+        for key in ("a", "b", "c"):
+            clock.now += 1
+            cache.set(key, key, ttl=3600)
+
+        clock.now += 1
+        assert cache.get("a") == (True, "a")
+        clock.now += 1
+        cache.set("d", "d", ttl=3600)
+
+        assert len(cache) == 3
+        assert cache.get("b") == (False, None)
+        assert all(cache.get(key)[0] for key in ("a", "c", "d"))
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_evicts_expired_first(self, cache_path, clock):
+        """测试淘汰时先清理过期条目"""
+        cache = MusicBrainzCache(cache_path, max_entries=2, memory_max_bytes=0, clock=clock)
+        cache.set("old", 1, ttl=3600)
+        cache.set("short", 2, ttl=1)
+        clock.now += 10
+        cache.set("new", 3, ttl=3600)
+
+        assert cache.get("old") == (True, 1)
+        assert cache.get("new") == (True, 3)
+
+    def test_keys(self):
+        """测试缓存键规范化"""
+        assert entity_key("artist", " ABC-123 ") == "artist:abc-123"
+        assert query_key("artist", "  Jay   CHOU ", 10) == query_key("artist", "jay chou", 10)
+        assert query_key("artist", "ＪＡＹ", 10) == query_key("artist", "jay", 10)
+        assert query_key("artist", "jay", 10) != query_key("artist", "jay", 20)
+
+
+class TestMusicBrainzModuleCache:
+    """模块缓存测试类"""
+
+    @pytest.mark.asyncio
+    async def test_entity_cached_across_restart(self, module):
+        """测试实体查询只请求一次，新模块实例（重启后）直接使用缓存"""
+        first = await module.get_track_info("R1")
+        assert first["title"] == "晴天"
+        assert await module.get_track_info("r1") == first
+        assert module.client.api.calls == ["get_recording_by_id"]
+
+        close_musicbrainz_cache()
+        restarted = MusicBrainzModule()
+        restarted.client = MusicBrainzClient(rate=0, api=FakeApi())
+        assert await restarted.get_track_info("r1") == first
+        assert restarted.client.api.calls == []
+        restarted.client.close()
+
+    @pytest.mark.asyncio
+    async def test_not_found_is_cached(self, module):
+        """测试不存在的实体写入负缓存"""
+        module.client.api.missing.add("gone")
+        assert await module.get_track_info("gone") is None
+        assert await module.get_track_info("gone") is None
+        assert module.client.api.calls == ["get_recording_by_id"]
+        assert module.cache.get_stats()["negative_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_network_error_not_cached(self, module):
+        """测试网络错误不写入缓存，恢复后重新请求"""
+        module.client.api.offline = True
+        assert await module.get_track_info("r1") is None
+
+        module.client.api.offline = False
+        assert (await module.get_track_info("r1"))["id"] == "r1"
+        assert len(module.client.api.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_search_cached_by_normalized_query(self, module):
+        """测试搜索按规范化查询缓存，无结果同样缓存"""
+        await module.search_artist("周杰伦", limit=10)
+        artists = await module.search_artist("  周杰伦 ", limit=10)
+        assert artists[0]["name"] == "周杰伦"
+
+        assert await module.search_artist("nobody") == []
+        assert await module.search_artist("Nobody") == []
+        assert module.client.api.calls == ["search_artists", "search_artists"]
@@ -173,3 +173,16 @@ class TestMusicBrainzChain:
             result = await chain.download_cover("album-1", cover_type="back")
 
         mock_run.assert_called_with("musicbrainz", "download_cover", "album-1", "back")
+
+    # ==================== 缓存测试 ====================
+
+    @pytest.mark.asyncio
+    async def test_results_cached_across_instances(self, chain):
+        """测试查询结果缓存在链之间共享，同一查询只调用一次模块"""
+        with patch.object(MusicBrainzChain, "run_module", new_callable=AsyncMock) as mock_run:
+            mock_run.return_value = [{"id": "artist-1"}]
+
+            await chain.search_artist("Cached")
+            await MusicBrainzChain(db_manager=MagicMock()).search_artist("Cached")
+
+        mock_run.assert_called_once_with("musicbrainz", "search_artist", "Cached", 50)
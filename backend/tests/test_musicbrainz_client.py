@@ -0,0 +1,209 @@
+"""
+MusicBrainz 异步客户端单元测试
+测试令牌桶限速、相同请求合并、错误传播，以及查询期间事件循环不被阻塞
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.modules.musicbrainz import (
+    MusicBrainzClient,
+    MusicBrainzModule,
+    TokenBucket,
+    close_musicbrainz_cache,
+)
+
+
+class FakeApi:
+    """模拟同步阻塞的 musicbrainzngs 函数"""
+
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.calls: list[tuple] = []
+        self.threads: set[str] = set()
+        self.fail = False
+
+    def _request(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("MusicBrainz 不可用")
+
+    def get_recording_by_id(self, recording_id: str, includes=None):
+        self._request(recording_id, includes=includes)
+        return {"recording": {"id": recording_id, "title": f"Track {recording_id}"}}
+
+    def search_artists(self, query: str, limit: int = 25):
+        self._request(query, limit=limit)
+        return {"artist-list": [{"id": "a1", "name": query, "type": "Person"}]}
+
+
+async def measure_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """
+    测量事件循环的最大延迟
+
+    Args:
+        stop: 停止测量的事件
+        interval: 采样间隔（秒）
+
+    Returns:
+        最大延迟（秒）
+    """
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - start - interval)
+    return worst
+
+
+class TestTokenBucket:
+    """TokenBucket 测试类"""
+
+    def test_reserve(self, clock):
+        """测试突发容量用完后按速率排队，时间推进后补充令牌"""
+        bucket = TokenBucket(rate=1.0, capacity=2, clock=clock)
+        assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 1.0, 2.0]
+
+        clock.now = 10
+        assert bucket.reserve() == 0.0
+
+    def test_unlimited(self):
+        """测试速率不大于 0 时不限速"""
+        bucket = TokenBucket(rate=0)
+        assert all(bucket.reserve() == 0.0 for _ in range(100))
+
+
+class TestMusicBrainzClient:
+    """MusicBrainzClient 测试类"""
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_does_not_block_loop(self):
+        """测试限速等待和请求执行期间其他任务继续运行"""
+        api = FakeApi(delay=0.05)
+        client = MusicBrainzClient(rate=20, burst=1, max_workers=2, api=api)
+        stop = asyncio.Event()
+        lag = asyncio.create_task(measure_lag(stop))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client.call("get_recording_by_id", str(i)) for i in range(5)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+
+        # 5 个请求，每秒 20 个，至少间隔 4 × 0.05 秒
+        assert elapsed >= 0.19
+        # 同步调用时每次请求阻塞循环 50ms
+        assert await lag < 0.03
+        assert client.request_count == 5
+        assert all(name.startswith("musicbrainz") for name in api.threads)
+        client.close()
+
+    @pytest.mark.asyncio
+    async def test_identical_requests_coalesced(self):
+        """测试进行中的相同请求只执行一次，参数不同时分别请求"""
+        api = FakeApi()
+        client = MusicBrainzClient(rate=0, api=api)
+
+        results = await asyncio.gather(
+            *(client.call("get_recording_by_id", "r1", includes=["artists"]) for _ in range(10)),
+            client.call("get_recording_by_id", "r1"),
+        )
+        assert all(result["recording"]["id"] == "r1" for result in results)
+        assert len(api.calls) == 2
+
+        # 请求完成后不再复用
+        await client.call("get_recording_by_id", "r1")
+        assert len(api.calls) == 3
+        client.close()
+
+    @pytest.mark.asyncio
+    async def test_error_reaches_all_callers(self):
+        """测试请求失败时所有调用方收到异常，之后重新请求"""
+        api = FakeApi()
+        api.fail = True
+        client = MusicBrainzClient(rate=0, api=api)
+
+        results = await asyncio.gather(
+            client.call("search_artists", "周杰伦"),
+            client.call("search_artists", "周杰伦"),
+            return_exceptions=True,
+        )
+        assert all(isinstance(result, ConnectionError) for result in results)
+
+        api.fail = False
+        assert (await client.call("search_artists", "周杰伦"))["artist-list"]
+        assert len(api.calls) == 2
+        client.close()
+
+    @pytest.mark.asyncio
+    async def test_cancel_one_caller(self):
+        """测试一个调用方取消不影响共用请求的其他调用方"""
+        api = FakeApi(delay=0.05)
+        client = MusicBrainzClient(rate=0, api=api)
+
+        first = asyncio.create_task(client.call("get_recording_by_id", "r1"))
+        second = asyncio.create_task(client.call("get_recording_by_id", "r1"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert (await second)["recording"]["id"] == "r1"
+        assert first.cancelled()
+        assert len(api.calls) == 1
+        client.close()
+
+    @pytest.mark.asyncio
+    async def test_module_uses_client(self, tmp_path, monkeypatch):
+        """测试模块通过客户端查询并解析结果"""
+        monkeypatch.setattr(settings, "cache_dir", str(tmp_path))
+        module = MusicBrainzModule()
+        api = FakeApi(delay=0)
+        module.client = MusicBrainzClient(rate=0, api=api)
+
+        artists = await module.search_artist("周杰伦", limit=5)
+        assert artists[0]["name"] == "周杰伦"
+        assert api.calls == [(("周杰伦",), {"limit": 5})]
+        module.client.close()
+        close_musicbrainz_cache()
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(not os.environ.get("MUSICPILOT_BENCHMARK"), reason="性能测试需手动开启")
+    async def test_benchmark(self):
+        """对比 1000 次查询时直接同步调用和异步客户端的事件循环最大延迟"""
+        count = 1000
+        api = FakeApi(delay=0.002)
+
+        # 直接在协程中调用同步函数（原实现）
+        stop = asyncio.Event()
+        lag = asyncio.create_task(measure_lag(stop))
+        await asyncio.sleep(0)
+        for i in range(count):
+            api.get_recording_by_id(str(i))
+            if i % 100 == 0:
+                await asyncio.sleep(0)
+        stop.set()
+        blocking_lag = await lag
+
+        client = MusicBrainzClient(rate=500, burst=10, max_workers=4, api=api)
+        stop = asyncio.Event()
+        lag = asyncio.create_task(measure_lag(stop))
+        start = time.perf_counter()
+        await asyncio.gather(*(client.call("get_recording_by_id", str(i)) for i in range(count)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        client_lag = await lag
+        client.close()
+
+        print(
+            f"\n{count} 次查询: 同步调用最大循环延迟 {blocking_lag * 1000:.1f}ms, "
+            f"异步客户端最大循环延迟 {client_lag * 1000:.1f}ms (耗时 {elapsed:.2f}s)"
+        )
+        # 剩余的延迟主要来自一次创建 1000 个任务
+        assert client_lag < 0.1
+        assert client_lag * 5 < blocking_lag
@@ -0,0 +1,173 @@
+"""
+MusicBrainz 本地镜像单元测试
+使用 tests/fixtures/musicbrainz 下的导出样例测试导入、查询、组合查询搜索和模块回退
+"""
+
+import gzip
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.modules.musicbrainz import (
+    MusicBrainzClient,
+    MusicBrainzMirror,
+    MusicBrainzModule,
+    close_musicbrainz_cache,
+    close_musicbrainz_mirror,
+    get_musicbrainz_mirror,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures" / "musicbrainz"
+
+JAY = "a1b2c3d4-0000-4000-8000-000000000001"
+QUEEN = "a1b2c3d4-0000-4000-8000-000000000002"
+SUNNY_DAY = "c1b2c3d4-0000-4000-8000-000000000001"
+SUNNY_DAY_COVER = "c1b2c3d4-0000-4000-8000-000000000003"
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    """导入样例数据的镜像（recording 使用 gzip 压缩文件）"""
+    recording = tmp_path / "recording.gz"
+    with open(FIXTURES / "recording", "rb") as src, gzip.open(recording, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+
+    mirror = MusicBrainzMirror(tmp_path / "mirror.db")
+    mirror.import_dump("artist", FIXTURES / "artist")
+    mirror.import_dump("release-group", FIXTURES / "release-group", batch_size=2)
+    mirror.import_dump("recording", recording)
+    yield mirror
+    mirror.close()
+
+
+class FakeApi:
+    """模拟在线 API，记录请求"""
+
+    def __init__(self):
+        self.calls: list[str] = []
+
+    def get_recording_by_id(self, recording_id: str, includes=None):
+        self.calls.append(recording_id)
+        return {"recording": {"id": recording_id, "title": "在线结果"}}
+
+    def search_recordings(self, query: str, limit: int = 25):
+        self.calls.append(query)
+        return {"recording-list": [{"id": "online", "title": query}]}
+
+
+class TestMusicBrainzMirror:
+    """MusicBrainzMirror 测试类"""
+
+    def test_import(self, mirror):
+        """测试导入计数，空行和无法解析的行被跳过，重复导入不产生重复条目"""
+        assert mirror.get_stats() == {"artist": 3, "release-group": 3, "recording": 4}
+
+        mirror.import_dump("artist", FIXTURES / "artist")
+        assert mirror.get_stats()["artist"] == 3
+
+    def test_unknown_entity(self, mirror):
+        """测试不支持的实体类型"""
+        with pytest.raises(ValueError):
+            mirror.import_dump("label", FIXTURES / "artist")
+
+    def test_get_artist(self, mirror):
+        """测试按 MBID 查询艺术家，包含按发行日期排序的专辑"""
+        artist = mirror.get("artist", JAY.upper())
+        assert artist["name"] == "周杰伦"
+        assert artist["life-span"] == {"begin": "1979-01-18", "end": None}
+        assert "disambiguation" not in artist
+        assert [rg["title"] for rg in artist["release-group-list"]] == ["叶惠美", "七里香"]
+        assert mirror.get("artist", "missing") is None
+
+    def test_get_recording(self, mirror):
+        """测试曲目字段使用 musicbrainzngs 格式"""
+        recording = mirror.get("recording", SUNNY_DAY)
+        assert recording["length"] == "269000"
+        assert recording["artist-credit"] == [
+            {"name": "周杰伦", "joinphrase": "", "artist": {"id": JAY, "name": "周杰伦"}}
+        ]
+
+    def test_search_by_normalized_name(self, mirror):
+        """测试名称规范化匹配，同名艺术家都返回"""
+        artists = mirror.search("artist", "  QUEEN ")
+        assert sorted(a["disambiguation"] for a in artists) == ["UK rock group", "rapper"]
+        assert mirror.search("artist", "Queen", limit=1)[0]["name"] == "Queen"
+        assert mirror.search("artist", "nobody") == []
+
+    def test_search_combined_query(self, mirror):
+        """测试“艺术家 标题”组合查询，署名艺术家出现在查询中的结果靠前"""
+        results = mirror.search("recording", "周杰伦 叶惠美 晴天")
+        assert [r["id"] for r in results] == [SUNNY_DAY, SUNNY_DAY_COVER]
+
+        results = mirror.search("recording", "Queen Bohemian Rhapsody")
+        assert [r["title"] for r in results] == ["Bohemian Rhapsody"]
+
+    def test_cli(self, tmp_path):
+        """测试命令行导入"""
+        index = tmp_path / "cli.db"
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "app.modules.musicbrainz.mirror",
+                str(index),
+                f"artist={FIXTURES / 'artist'}",
+                f"recording={FIXTURES / 'recording'}",
+            ],
+            check=True,
+            capture_output=True,
+            cwd=Path(__file__).parent.parent,
+        )
+        mirror = MusicBrainzMirror(index)
+        assert mirror.get_stats() == {"artist": 3, "release-group": 0, "recording": 4}
+        mirror.close()
+
+
+class TestMusicBrainzModuleMirror:
+    """模块使用本地镜像测试类"""
+
+    @pytest.fixture
+    def module(self, tmp_path, mirror, monkeypatch):
+        """配置了本地镜像的模块"""
+        monkeypatch.setattr(settings, "cache_dir", str(tmp_path / "cache"))
+        monkeypatch.setattr(settings, "musicbrainz_mirror_path", str(mirror.path))
+        module = MusicBrainzModule()
+        module.client = MusicBrainzClient(rate=0, api=FakeApi())
+        yield module
+        module.client.close()
+        close_musicbrainz_cache()
+        close_musicbrainz_mirror()
+
+    @pytest.mark.asyncio
+    async def test_answers_from_mirror(self, module):
+        """测试本地镜像中存在的数据不请求在线 API"""
+        track = await module.get_track_info(SUNNY_DAY)
+        assert track["title"] == "晴天"
+        assert track["length"] == "269000"
+
+        tracks = await module.search_track("周杰伦 晴天", limit=10)
+        assert tracks[0]["id"] == SUNNY_DAY
+
+        artist = await module.get_artist_info(QUEEN)
+        assert artist["releases"][0]["title"] == "A Night at the Opera"
+        assert module.client.api.calls == []
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_api(self, module):
+        """测试本地镜像没有的数据回退到在线 API"""
+        track = await module.get_track_info("not-in-mirror")
+        assert track["title"] == "在线结果"
+
+        tracks = await module.search_track("unknown song")
+        assert tracks[0]["id"] == "online"
+        assert module.client.api.calls == ["not-in-mirror", "unknown song"]
+
+    def test_missing_index(self, tmp_path, monkeypatch):
+        """测试镜像文件不存在时不使用镜像"""
+        monkeypatch.setattr(settings, "musicbrainz_mirror_path", str(tmp_path / "none.db"))
+        assert get_musicbrainz_mirror() is None
+        assert not (tmp_path / "none.db").exists()
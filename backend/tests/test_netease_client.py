@@ -0,0 +1,316 @@
+"""
+网易云音乐共享 HTTP 客户端单元测试
+使用本地桩服务器测试连接复用、关闭和下载 URL 批量解析，并对比每次新建客户端的延迟
+"""
+
+import asyncio
+import json
+import os
+import time
+from unittest.mock import AsyncMock, patch
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.core.download_scheduler import DownloadScheduler, ScheduledJob
+from app.modules.downloader import DownloadQuality, DownloadSource, DownloadStatus, DownloadTask
+from app.modules.downloader.netease import (
+    NeteaseDownloader,
+    NeteaseUrlResolver,
+    close_netease_client,
+    get_netease_client,
+)
+
+SEARCH_RESULT = {
+    "code": 200,
+    "result": {
+        "songs": [
+            {
+                "id": 186016,
+                "name": "晴天",
+                "artists": [{"id": 6452, "name": "周杰伦"}],
+                "album": {"id": 18905, "name": "叶惠美"},
+                "duration": 269000,
+            }
+        ]
+    },
+}
+
+
+class StubServer:
+    """HTTP/1.1 keep-alive 桩服务器，记录建立的连接数"""
+
+    def __init__(self):
+        self.connections = 0
+        self.requests = 0
+        # 每次 player/url 请求的歌曲 ID
+        self.url_batches: list[list[str]] = []
+        self.fail_urls = False
+        self.server: asyncio.Server | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                self.requests += 1
+                path = head.split(b" ", 2)[1].decode()
+                if path.startswith("/api/song/enhance/player/url"):
+                    data = self.player_url(path)
+                elif path.startswith("/api/search/get/web"):
+                    data = SEARCH_RESULT
+                else:
+                    data = {"code": 200}
+                body = json.dumps(data).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def player_url(self, path: str) -> dict:
+        """模拟 player/url 接口：ID 为 0 的歌曲没有版权"""
+        ids = parse_qs(urlsplit(path).query)["ids"][0].strip("[]").split(",")
+        self.url_batches.append(ids)
+        if self.fail_urls:
+            return {"code": 500, "message": "服务繁忙"}
+        return {
+            "code": 200,
+            "data": [
+                {"id": int(i), "url": f"http://cdn/{i}.mp3" if i != "0" else None, "expi": 1200}
+                for i in ids
+            ],
+        }
+
+
+@pytest_asyncio.fixture
+async def stub_server():
+    """启动本地桩服务器"""
+    server = StubServer()
+    await server.start()
+    yield server
+    await close_netease_client()
+    await server.stop()
+
+
+class TestNeteaseClient:
+    """共享客户端测试类"""
+
+    @pytest.mark.asyncio
+    async def test_client_is_shared(self, stub_server):
+        """测试所有下载器共用同一客户端"""
+        assert get_netease_client() is get_netease_client()
+
+        first = NeteaseDownloader()
+        second = NeteaseDownloader()
+        first.api_url = second.api_url = stub_server.url
+        await first.search("晴天")
+        await second.search("晴天")
+        assert stub_server.requests == 2
+        assert stub_server.connections == 1
+
+    @pytest.mark.asyncio
+    async def test_search_uses_pool(self, stub_server):
+        """测试搜索结果解析和顺序请求复用连接"""
+        downloader = NeteaseDownloader()
+        downloader.api_url = stub_server.url
+
+        for _ in range(5):
+            tasks = await downloader.search("晴天")
+        assert [task.title for task in tasks] == ["晴天"]
+        assert tasks[0].artist == "周杰伦"
+        assert stub_server.connections == 1
+
+    @pytest.mark.asyncio
+    async def test_close_and_recreate(self, stub_server):
+        """测试关闭后重新获取得到新客户端"""
+        client = get_netease_client()
+        await client.get(stub_server.url)
+        await close_netease_client()
+        assert client.is_closed
+
+        new_client = get_netease_client()
+        assert new_client is not client
+        await new_client.get(stub_server.url)
+        assert stub_server.connections == 2
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(not os.environ.get("MUSICPILOT_BENCHMARK"), reason="性能测试需手动开启")
+    async def test_benchmark(self, stub_server):
+        """对比每次新建客户端和共享连接池的单次请求延迟"""
+        count = 200
+
+        start = time.perf_counter()
+        for _ in range(count):
+            async with httpx.AsyncClient(timeout=30) as client:
+                await client.get(stub_server.url)
+        per_call = (time.perf_counter() - start) / count
+
+        client = get_netease_client()
+        await client.get(stub_server.url)
+        start = time.perf_counter()
+        for _ in range(count):
+            await client.get(stub_server.url)
+        pooled = (time.perf_counter() - start) / count
+
+        print(
+            f"\n每次新建客户端: {per_call * 1000:.2f}ms/次, "
+            f"共享连接池: {pooled * 1000:.2f}ms/次 ({per_call / pooled:.1f}x)"
+        )
+        assert pooled < per_call
+
+
+class TestNeteaseUrlResolver:
+    """NeteaseUrlResolver 测试类"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_are_batched(self, stub_server):
+        """测试窗口内的并发解析合并为一次请求，重复 ID 只请求一次"""
+        resolver = NeteaseUrlResolver(stub_server.url, batch_size=100, window=0.01)
+        urls = await asyncio.gather(
+            *(resolver.resolve(song_id, "128000", "standard") for song_id in (1, 2, 3, 2))
+        )
+        assert urls == [f"http://cdn/{song_id}.mp3" for song_id in (1, 2, 3, 2)]
+        assert stub_server.url_batches == [["1", "2", "3"]]
+
+    @pytest.mark.asyncio
+    async def test_large_import_needs_few_requests(self, stub_server):
+        """测试 1000 首歌按批次大小拆分请求"""
+        resolver = NeteaseUrlResolver(stub_server.url, batch_size=100, window=0.01)
+        urls = await resolver.resolve_many(range(1, 1001), "128000", "standard")
+        assert len(urls) == 1000
+        assert resolver.request_count == 10
+        assert all(len(batch) == 100 for batch in stub_server.url_batches)
+
+    @pytest.mark.asyncio
+    async def test_cache_until_expiry(self, stub_server, clock):
+        """测试 URL 缓存到过期前，不同音质分开请求"""
+        resolver = NeteaseUrlResolver(stub_server.url, window=0, clock=clock)
+        await resolver.resolve(7, "128000", "standard")
+        await resolver.resolve(7, "128000", "standard")
+        assert resolver.request_count == 1
+
+        await resolver.resolve(7, "999000", "lossless")
+        assert resolver.request_count == 2
+
+        clock.now = 1200 - NeteaseUrlResolver.EXPIRY_MARGIN
+        await resolver.resolve(7, "128000", "standard")
+        assert resolver.request_count == 3
+
+    @pytest.mark.asyncio
+    async def test_unavailable_and_errors(self, stub_server):
+        """测试无版权返回空字符串，请求失败时所有等待者收到异常且不缓存"""
+        resolver = NeteaseUrlResolver(stub_server.url, window=0.01)
+        assert await resolver.resolve(0, "128000", "standard") == ""
+
+        stub_server.fail_urls = True
+        results = await asyncio.gather(
+            resolver.resolve(1, "128000", "standard"),
+            resolver.resolve(2, "128000", "standard"),
+            return_exceptions=True,
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+
+        stub_server.fail_urls = False
+        assert await resolver.resolve(1, "128000", "standard") == "http://cdn/1.mp3"
+
+    @pytest.mark.asyncio
+    async def test_downloader_prefetch(self, stub_server):
+        """测试下载器预取后 get_url 复用批量请求的结果"""
+        downloader = NeteaseDownloader()
+        downloader.url_resolver = NeteaseUrlResolver(stub_server.url, window=0.01)
+        tasks = [
+            DownloadTask(f"netease_{i}", str(i), DownloadSource.NETEASE, DownloadQuality.STANDARD)
+            for i in range(1, 6)
+        ]
+        downloader.prefetch(tasks)
+
+        urls = [await downloader.get_url(task.url, task.quality) for task in tasks]
+        assert urls == [f"http://cdn/{i}.mp3" for i in range(1, 6)]
+        assert stub_server.url_batches == [["1", "2", "3", "4", "5"]]
+
+    @pytest.mark.asyncio
+    async def test_failed_download_invalidates_url(self, stub_server, tmp_path):
+        """测试下载失败后删除缓存的 URL，重试时重新请求 player/url"""
+        downloader = NeteaseDownloader()
+        downloader.url_resolver = NeteaseUrlResolver(stub_server.url, window=0.01)
+        task = DownloadTask(
+            "netease_1",
+            "1",
+            DownloadSource.NETEASE,
+            DownloadQuality.STANDARD,
+            title="晴天",
+            target_path=str(tmp_path),
+        )
+
+        with patch.object(
+            downloader, "fetch_file", AsyncMock(side_effect=httpx.HTTPError("HTTP 403"))
+        ):
+            assert (await downloader.download(task)).status == DownloadStatus.FAILED
+        assert stub_server.url_batches == [["1"]]
+
+        with patch.object(downloader, "fetch_file", AsyncMock(return_value=1)):
+            assert (await downloader.download(task)).status == DownloadStatus.COMPLETED
+        assert stub_server.url_batches == [["1"], ["1"]]
+
+    @pytest.mark.asyncio
+    async def test_scheduler_prefetch_ahead(self, stub_server, db_manager, clock):
+        """测试队列执行时间超过 URL 有效期时，调度器在执行前分批预取，URL 不会过期"""
+        downloader = NeteaseDownloader()
+        downloader.url_resolver = NeteaseUrlResolver(stub_server.url, window=0.01, clock=clock)
+
+        # 整个歌单提交完成后再开始下载
+        submitted = asyncio.Event()
+
+        async def runner(job: ScheduledJob) -> str:
+            await submitted.wait()
+            task = DownloadTask.from_dict(job.payload["task"])
+            url = await downloader.get_url(task.url, task.quality)
+            # 每首歌下载 50 秒，40 首歌共 2000 秒，超过 URL 有效期
+            clock.now += 50
+            return url
+
+        def prefetch(source: str, jobs: list[ScheduledJob]):
+            downloader.prefetch([DownloadTask.from_dict(job.payload["task"]) for job in jobs])
+
+        scheduler = DownloadScheduler(
+            runner,
+            db_manager,
+            max_concurrency=1,
+            source_limits={},
+            prefetch=prefetch,
+            prefetch_ahead=10,
+        )
+        job_ids = []
+        for i in range(1, 41):
+            task = DownloadTask(
+                f"netease_{i}", str(i), DownloadSource.NETEASE, DownloadQuality.STANDARD
+            )
+            job_ids.append(await scheduler.submit("netease", {"task": task.to_dict()}))
+        submitted.set()
+
+        urls = [await scheduler.wait(job_id) for job_id in job_ids]
+        assert urls == [f"http://cdn/{i}.mp3" for i in range(1, 41)]
+        assert clock.now > NeteaseUrlResolver.DEFAULT_EXPIRY
+        # 每首歌只解析一次（执行时 URL 未过期），且合并为少量批量请求
+        assert sum(len(batch) for batch in stub_server.url_batches) == 40
+        assert len(stub_server.url_batches) <= 10
+        await scheduler.stop()
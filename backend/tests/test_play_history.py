@@ -0,0 +1,256 @@
+"""
+播放记录单元测试
+测试批量写入、播放次数累加、日志恢复和重放去重
+"""
+
+import asyncio
+import fcntl
+import json
+
+import pytest
+import pytest_asyncio
+
+from app.chain.playback import PlaybackChain
+from app.core.cache import FileCache, FileCacheBackend
+from app.core.play_history import PlayHistoryRecorder
+from app.core.playback_state import PlaybackStateStore
+from app.db.models.play_history import PlayHistory
+from app.db.models.track import Track
+from app.db.operations.play_history import PlayHistoryOper
+from app.db.operations.track import TrackOper
+
+
+@pytest_asyncio.fixture
+async def tracks(db_manager):
+    """创建测试曲目"""
+    track_oper = TrackOper(Track, db_manager)
+    first = await track_oper.create(title="晴天", path="/m/1.mp3")
+    second = await track_oper.create(title="Yellow", path="/m/2.mp3")
+    return track_oper, first.id, second.id
+
+
+class TestPlayHistoryOper:
+    """PlayHistoryOper 测试类"""
+
+    @pytest.mark.asyncio
+    async def test_record_batch(self, db_manager, tracks):
+        """测试批量写入并按曲目累加播放次数"""
+        track_oper, first, second = tracks
+        oper = PlayHistoryOper(PlayHistory, db_manager)
+        events = [
+            {"event_id": f"e{i}", "track_id": first, "played_at": f"2026-01-01T00:00:0{i}"}
+            for i in range(3)
+        ]
+        events.append({"event_id": "e9", "track_id": second, "played_at": "2026-01-02T00:00:00"})
+
+        assert await oper.record_batch(events) == 4
+        assert (await track_oper.get_by_id(first)).play_count == 3
+        assert (await track_oper.get_by_id(second)).play_count == 1
+
+        recent = await oper.get_recent()
+        assert [item["track_id"] for item in recent] == [second, first, first, first]
+        assert recent[0]["title"] == "Yellow"
+
+    @pytest.mark.asyncio
+    async def test_duplicate_events_ignored(self, db_manager, tracks):
+        """测试重复事件不会重复计数"""
+        track_oper, first, _ = tracks
+        oper = PlayHistoryOper(PlayHistory, db_manager)
+        event = {"event_id": "dup", "track_id": first, "played_at": "2026-01-01T00:00:00"}
+
+        assert await oper.record_batch([event]) == 1
+        assert await oper.record_batch([event]) == 0
+        assert (await track_oper.get_by_id(first)).play_count == 1
+
+    @pytest.mark.asyncio
+    async def test_deleted_track_skipped(self, db_manager, tracks):
+        """测试已删除曲目的事件不影响整批写入"""
+        _, first, _ = tracks
+        oper = PlayHistoryOper(PlayHistory, db_manager)
+        events = [
+            {"event_id": "a", "track_id": first, "played_at": "2026-01-01T00:00:00"},
+            {"event_id": "b", "track_id": 9999, "played_at": "2026-01-01T00:00:00"},
+        ]
+        assert await oper.record_batch(events) == 1
+
+    @pytest.mark.asyncio
+    async def test_user_filter(self, db_manager, tracks):
+        """测试按用户/设备查询和删除"""
+        _, first, _ = tracks
+        oper = PlayHistoryOper(PlayHistory, db_manager)
+        await oper.record_batch(
+            [
+                {
+                    "event_id": "a",
+                    "track_id": first,
+                    "user_id": "u1",
+                    "device_id": "phone",
+                    "played_at": "2026-01-01T00:00:00",
+                },
+                {
+                    "event_id": "b",
+                    "track_id": first,
+                    "user_id": "u1",
+                    "device_id": "desktop",
+                    "played_at": "2026-01-01T00:00:01",
+                },
+                {"event_id": "c", "track_id": first, "played_at": "2026-01-01T00:00:02"},
+            ]
+        )
+
+        assert len(await oper.get_recent("u1")) == 2
+        assert len(await oper.get_recent("u1", device_id="phone")) == 1
+        assert len(await oper.get_recent()) == 1
+
+        assert await oper.delete_by_user("u1", "phone") == 1
+        assert len(await oper.get_recent("u1")) == 1
+
+
+class TestPlayHistoryRecorder:
+    """PlayHistoryRecorder 测试类"""
+
+    @pytest.mark.asyncio
+    async def test_record_is_buffered(self, tmp_path, db_manager, tracks):
+        """测试记录先进入缓冲，flush 时一次写入"""
+        track_oper, first, _ = tracks
+        recorder = PlayHistoryRecorder(tmp_path, db_manager, flush_interval=60)
+        for _ in range(5):
+            recorder.record(first, "u1")
+
+        assert recorder.buffered_count == 5
+        assert (await track_oper.get_by_id(first)).play_count == 0
+
+        assert await recorder.flush() == 5
+        assert recorder.buffered_count == 0
+        assert (await track_oper.get_by_id(first)).play_count == 5
+        assert list(tmp_path.glob(PlayHistoryRecorder.SEGMENT_GLOB)) == []
+        await recorder.close()
+
+    @pytest.mark.asyncio
+    async def test_batch_size_triggers_flush(self, tmp_path, db_manager, tracks):
+        """测试缓冲达到 batch_size 时立即写入"""
+        track_oper, first, _ = tracks
+        recorder = PlayHistoryRecorder(tmp_path, db_manager, flush_interval=60, batch_size=3)
+        for _ in range(3):
+            recorder.record(first)
+
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if recorder.buffered_count == 0:
+                break
+        assert (await track_oper.get_by_id(first)).play_count == 3
+        await recorder.close()
+
+    @pytest.mark.asyncio
+    async def test_recover_after_crash(self, tmp_path, db_manager, tracks):
+        """测试进程崩溃后从日志恢复"""
+        track_oper, first, second = tracks
+        crashed = PlayHistoryRecorder(tmp_path, db_manager, flush_interval=60)
+        crashed.record(first)
+        crashed.record(second)
+        crashed._task.cancel()
+        crashed._journal.close()
+        # 模拟写到一半的最后一行
+        with open(crashed.journal_path, "ab") as f:
+            f.write(b'{"event_id": "tru')
+
+        recorder = PlayHistoryRecorder(tmp_path, db_manager)
+        assert await recorder.recover() == 2
+        assert (await track_oper.get_by_id(first)).play_count == 1
+        assert (await track_oper.get_by_id(second)).play_count == 1
+        assert list(tmp_path.glob(PlayHistoryRecorder.SEGMENT_GLOB)) == []
+        await recorder.close()
+
+    @pytest.mark.asyncio
+    async def test_replay_is_idempotent(self, tmp_path, db_manager, tracks):
+        """测试写入成功但日志未删除时，重放不会重复计数"""
+        track_oper, first, _ = tracks
+        recorder = PlayHistoryRecorder(tmp_path, db_manager, flush_interval=60)
+        recorder.record(first)
+        await recorder.flush()
+        # 模拟删除日志段之前崩溃：重新写入同一事件的日志
+        event = {"event_id": "x", "track_id": first, "played_at": "2026-01-01T00:00:00"}
+        await PlayHistoryOper(PlayHistory, db_manager).record_batch([event])
+        (tmp_path / "journal.1.seg").write_text(json.dumps(event) + "\n")
+
+        assert await recorder.recover() == 0
+        assert (await track_oper.get_by_id(first)).play_count == 2
+        await recorder.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_retried(self, tmp_path, db_manager, tracks, monkeypatch):
+        """测试写入失败时保留日志段和事件"""
+        track_oper, first, _ = tracks
+        recorder = PlayHistoryRecorder(tmp_path, db_manager, flush_interval=60)
+        recorder.record(first)
+
+        async def fail(self, events):
+            raise ConnectionError("database down")
+
+        with monkeypatch.context() as m:
+            m.setattr(PlayHistoryOper, "record_batch", fail)
+            assert await recorder.flush() == 0
+        assert recorder.buffered_count == 1
+        assert len(list(tmp_path.glob(PlayHistoryRecorder.SEGMENT_GLOB))) == 1
+
+        recorder.record(first)
+        await recorder.close()
+        assert (await track_oper.get_by_id(first)).play_count == 2
+        assert list(tmp_path.glob(PlayHistoryRecorder.SEGMENT_GLOB)) == []
+
+    @pytest.mark.asyncio
+    async def test_journals_are_per_process(self, tmp_path, db_manager, tracks):
+        """测试只接管已退出进程的日志，仍在运行的进程的日志和日志段保持不动"""
+        track_oper, first, second = tracks
+        dead = {"event_id": "dead", "track_id": first, "played_at": "2026-01-01T00:00:00"}
+        (tmp_path / "journal.100001.log").write_text(json.dumps(dead) + "\n")
+        (tmp_path / "journal.100001.1-0.seg").write_text(json.dumps({**dead, "event_id": "d2"}))
+
+        # 模拟另一个仍在运行的 worker：持有日志锁
+        live = {"event_id": "live", "track_id": second, "played_at": "2026-01-01T00:00:00"}
+        live_journal = open(tmp_path / "journal.100002.log", "ab")  # noqa: SIM115
+        fcntl.flock(live_journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        live_journal.write(json.dumps(live).encode() + b"\n")
+        live_journal.flush()
+        live_segment = tmp_path / "journal.100002.1-0.seg"
+        live_segment.write_text(json.dumps({**live, "event_id": "l2"}))
+
+        recorder = PlayHistoryRecorder(tmp_path, db_manager)
+        assert await recorder.recover() == 2
+        assert (await track_oper.get_by_id(first)).play_count == 2
+        assert (await track_oper.get_by_id(second)).play_count == 0
+        assert (tmp_path / "journal.100002.log").read_text().strip() == json.dumps(live)
+        assert live_segment.exists()
+        assert not (tmp_path / "journal.100001.log").exists()
+        await recorder.close()
+        live_journal.close()
+
+
+class TestPlaybackHistory:
+    """PlaybackChain 播放历史测试类"""
+
+    @pytest.mark.asyncio
+    async def test_history_includes_buffered_without_flush(self, tmp_path, db_manager, tracks):
+        """测试读取历史时合并缓冲中的记录，不触发数据库写入"""
+        track_oper, first, second = tracks
+        recorder = PlayHistoryRecorder(tmp_path, db_manager, flush_interval=60)
+        cache = FileCache(tmp_path / "state", memory_max_bytes=0)
+        chain = PlaybackChain(
+            db_manager=db_manager,
+            state_store=PlaybackStateStore(FileCacheBackend(cache)),
+            history_recorder=recorder,
+        )
+        recorder.record(first, "u1")
+        await recorder.flush()
+        recorder.record(second, "u1")
+        recorder.record(first, "u2")
+
+        history = await chain.get_history("u1")
+        assert [item["track_id"] for item in history] == [second, first]
+        assert history[0]["title"] == "Yellow"
+        assert recorder.buffered_count == 2
+        assert (await track_oper.get_by_id(second)).play_count == 0
+
+        assert len(await chain.get_history("u1", limit=1)) == 1
+        await recorder.close()
+        cache.close()
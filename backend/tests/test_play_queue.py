@@ -0,0 +1,178 @@
+"""
+播放队列单元测试
+测试顺序/随机播放导航、播放模式、窗口读取和序列化
+"""
+
+import os
+import time
+
+import pytest
+
+from app.core.play_queue import PlayQueue
+
+
+def play_all(queue: PlayQueue, repeat_mode: str = "off", limit: int = 1000) -> list[int]:
+    """从当前位置一直自动播放下一首，返回播放过的曲目"""
+    played = []
+    while (track_id := queue.next(repeat_mode, manual=False)) is not None:
+        played.append(track_id)
+        if len(played) >= limit:
+            break
+    return played
+
+
+class TestPlayQueue:
+    """PlayQueue 顺序播放测试类"""
+
+    def test_empty(self):
+        """测试空队列"""
+        queue = PlayQueue()
+        assert queue.current is None
+        assert queue.current_index == -1
+        assert queue.next() is None
+        assert queue.previous() is None
+        assert queue.window() == []
+
+    def test_next_and_previous(self):
+        """测试顺序播放上一首/下一首"""
+        queue = PlayQueue([10, 20, 30])
+        assert queue.next() == 10
+        assert queue.next() == 20
+        assert queue.previous() == 10
+        assert queue.previous() is None
+        assert queue.current == 10
+
+    def test_repeat_off_stops_at_end(self):
+        """测试不循环时播放到末尾停止"""
+        queue = PlayQueue([1, 2, 3])
+        assert play_all(queue) == [1, 2, 3]
+        assert queue.current == 3
+
+    def test_repeat_all_wraps(self):
+        """测试列表循环时首尾相接"""
+        queue = PlayQueue([1, 2, 3])
+        assert play_all(queue, "all", limit=7) == [1, 2, 3, 1, 2, 3, 1]
+        assert queue.previous("all") == 3
+
+    def test_repeat_one(self):
+        """测试单曲循环：自动播放重复当前曲目，手动切歌按列表循环"""
+        queue = PlayQueue([1, 2, 3], position=2)
+        assert play_all(queue, "one", limit=3) == [3, 3, 3]
+        assert queue.next("one") == 1
+        assert queue.previous("one") == 3
+
+    def test_jump(self):
+        """测试按队列索引跳转"""
+        queue = PlayQueue([1, 2, 3, 4])
+        assert queue.jump(2) == 3
+        assert queue.next() == 4
+        with pytest.raises(IndexError):
+            queue.jump(4)
+
+    def test_window(self):
+        """测试窗口读取只返回一段"""
+        queue = PlayQueue(range(100))
+        assert queue.window(10, 5) == [10, 11, 12, 13, 14]
+        assert queue.window(98, 5) == [98, 99]
+        assert queue.window(200, 5) == []
+
+    def test_extend_and_clear(self):
+        """测试追加和清空"""
+        queue = PlayQueue([1, 2], position=1)
+        queue.extend([3, 4])
+        assert queue.next() == 3
+        queue.clear()
+        assert len(queue) == 0
+        assert queue.current is None
+
+
+class TestPlayQueueShuffle:
+    """PlayQueue 随机播放测试类"""
+
+    def test_visits_every_track_once(self):
+        """测试随机播放每首曲目恰好播放一次"""
+        queue = PlayQueue(range(100), seed=1)
+        played = play_all(queue)
+        assert sorted(played) == list(range(100))
+        assert played != list(range(100))
+
+    def test_seed_is_stable(self):
+        """测试相同种子得到相同顺序"""
+        first = PlayQueue(range(50), seed=42).window(0, 50)
+        assert PlayQueue(range(50), seed=42).window(0, 50) == first
+        assert PlayQueue(range(50), seed=43).window(0, 50) != first
+
+    def test_previous_goes_back(self):
+        """测试随机播放时上一首回到实际播放过的曲目"""
+        queue = PlayQueue(range(20), seed=3)
+        played = [queue.next() for _ in range(5)]
+        assert [queue.previous() for _ in range(4)] == played[-2::-1]
+
+    def test_shuffle_keeps_current_first(self):
+        """测试开启随机播放时当前曲目保持不变"""
+        queue = PlayQueue(range(20), position=7)
+        queue.shuffle(seed=5)
+        assert queue.current == 7
+        assert queue.position == 0
+        assert sorted(queue.window(0, 20)) == list(range(20))
+
+    def test_unshuffle_restores_order(self):
+        """测试关闭随机播放后回到原顺序中当前曲目的位置"""
+        queue = PlayQueue(range(20))
+        queue.shuffle(seed=9)
+        current = queue.next()
+        current = queue.next()
+        queue.unshuffle()
+        assert queue.current == current
+        assert queue.position == current
+        assert queue.next("all") == (current + 1) % 20
+
+    def test_jump_when_shuffled(self):
+        """测试随机播放时按队列索引跳转后继续按排列播放"""
+        queue = PlayQueue([100 + i for i in range(10)], seed=4)
+        assert queue.jump(6) == 106
+        assert queue.current_index == 6
+        assert queue.track_at(queue.position) == 106
+
+    def test_extend_when_shuffled(self):
+        """测试随机播放时追加的曲目排在已有排列之后"""
+        queue = PlayQueue(range(10), seed=8)
+        before = queue.window(0, 10)
+        queue.extend(range(10, 20))
+        assert queue.window(0, 10) == before
+        assert sorted(queue.window(10, 10)) == list(range(10, 20))
+
+    def test_repeat_all_keeps_order(self):
+        """测试随机播放列表循环时每轮顺序相同"""
+        queue = PlayQueue(range(5), seed=6)
+        played = play_all(queue, "all", limit=10)
+        assert played[:5] == played[5:]
+
+    def test_repeat_one_when_shuffled(self):
+        """测试随机播放下的单曲循环"""
+        queue = PlayQueue(range(5), seed=6)
+        first = queue.next()
+        assert play_all(queue, "one", limit=3) == [first] * 3
+
+    def test_round_trip(self):
+        """测试字典序列化往返"""
+        queue = PlayQueue(range(10), seed=11)
+        queue.next()
+        queue.extend([42])
+        restored = PlayQueue.from_dict(queue.to_dict())
+        assert restored == queue
+        assert restored.window(0, 11) == queue.window(0, 11)
+
+    @pytest.mark.skipif(not os.environ.get("MUSICPILOT_BENCHMARK"), reason="性能测试需手动开启")
+    def test_large_queue(self):
+        """测试 5 万首曲目的队列导航耗时"""
+        queue = PlayQueue(range(50_000))
+        queue.shuffle(seed=1)
+
+        start = time.perf_counter()
+        for _ in range(10_000):
+            queue.next("all")
+            queue.window(queue.position, 20)
+        elapsed = time.perf_counter() - start
+        print(f"\n10000 次 next + window: {elapsed * 1000:.1f}ms")
+        assert elapsed < 1
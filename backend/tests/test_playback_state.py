@@ -0,0 +1,269 @@
+"""
+播放状态存储单元测试
+测试热副本、并发修改、批量写回、写回冲突合并和跨实例共享
+"""
+
+import asyncio
+from typing import Any
+
+import pytest
+
+from app.core.cache import CacheBackend, FileCache, FileCacheBackend, RedisCacheBackend
+from app.core.context import PlaybackSession
+from app.core.play_queue import PlayQueue
+from app.core.playback_state import PlaybackState, PlaybackStateStore
+
+
+class RecordingBackend(CacheBackend):
+    """记录写入次数的内存后端"""
+
+    def __init__(self):
+        self.data: dict[str, Any] = {}
+        self.set_many_calls: list[dict[str, Any]] = []
+        self.fail = False
+
+    async def get(self, key: str) -> Any | None:
+        return self.data.get(key)
+
+    async def set(self, key: str, value: Any, ttl: int | None = None):
+        self.data[key] = value
+
+    async def delete(self, key: str):
+        self.data.pop(key, None)
+
+    async def exists(self, key: str) -> bool:
+        return key in self.data
+
+    async def clear(self):
+        self.data.clear()
+
+    async def set_many(self, items: dict[str, Any], ttl: int | None = None):
+        if self.fail:
+            raise ConnectionError("backend down")
+        self.set_many_calls.append(items)
+        self.data.update(items)
+
+
+@pytest.fixture
+def backend():
+    """内存后端"""
+    return RecordingBackend()
+
+
+class TestPlaybackState:
+    """PlaybackState 测试类"""
+
+    def test_round_trip(self):
+        """测试字典序列化往返"""
+        state = PlaybackState(
+            user_id="u1",
+            device_id="phone",
+            session=PlaybackSession(session_id="s1", track_id=3, title="晴天"),
+            queue=PlayQueue([1, 2, 3], position=2, seed=7),
+            version=5,
+        )
+        assert PlaybackState.from_dict(state.to_dict()) == state
+
+    def test_legacy_queue_format(self):
+        """测试兼容旧的列表格式队列"""
+        state = PlaybackState.from_dict({"queue": [4, 5, 6], "current_index": 1})
+        assert state.queue.tracks.tolist() == [4, 5, 6]
+        assert state.queue.current == 5
+
+
+class TestPlaybackStateStore:
+    """PlaybackStateStore 测试类"""
+
+    @pytest.mark.asyncio
+    async def test_default_state(self, backend):
+        """测试不存在时返回空状态"""
+        store = PlaybackStateStore(backend)
+        state = await store.get("u1", "phone")
+        assert state.user_id == "u1"
+        assert len(state.queue) == 0
+        assert state.session is None
+
+    @pytest.mark.asyncio
+    async def test_keys_are_isolated(self, backend):
+        """测试不同用户/设备的状态相互独立"""
+        store = PlaybackStateStore(backend)
+        async with store.edit("u1", "phone") as state:
+            state.queue.extend([1, 2])
+        async with store.edit("u1", "desktop") as state:
+            state.queue.extend([3])
+
+        assert (await store.get("u1", "phone")).queue.window(0, 10) == [1, 2]
+        assert (await store.get("u1", "desktop")).queue.window(0, 10) == [3]
+        assert len((await store.get("u2", "phone")).queue) == 0
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_edits(self, backend):
+        """测试并发修改同一状态不丢失更新"""
+        store = PlaybackStateStore(backend)
+
+        async def enqueue(track_id: int):
+            async with store.edit("u1") as state:
+                queue = state.queue.tracks.tolist()
+                await asyncio.sleep(0)
+                state.queue.replace(queue + [track_id])
+
+        await asyncio.gather(*(enqueue(i) for i in range(50)))
+        await store.close()
+        state = await store.get("u1")
+        assert sorted(state.queue.tracks) == list(range(50))
+        # 50 次修改合并为一次写回
+        assert state.version == 1
+
+    @pytest.mark.asyncio
+    async def test_writes_are_batched(self, backend):
+        """测试写回间隔内的多次修改合并为一次写入，队列和状态头分开保存"""
+        store = PlaybackStateStore(backend, flush_interval=0.05)
+        for i in range(10):
+            async with store.edit("u1") as state:
+                state.queue.extend([i])
+        async with store.edit("u2") as state:
+            state.queue.extend([99])
+        assert backend.set_many_calls == []
+
+        await asyncio.sleep(0.1)
+        assert len(backend.set_many_calls) == 2
+        assert backend.data[store.QUEUE_PREFIX + "u1:default"]["tracks"] == list(range(10))
+        assert backend.data[store.QUEUE_PREFIX + "u2:default"]["tracks"] == [99]
+        header = backend.data[store.KEY_PREFIX + "u1:default"]
+        assert header["version"] == header["queue_version"] == 1
+        assert "tracks" not in header
+
+    @pytest.mark.asyncio
+    async def test_progress_does_not_rewrite_queue(self, backend):
+        """测试只修改会话时不重写队列内容"""
+        store = PlaybackStateStore(backend, flush_interval=10)
+        async with store.edit("u1") as state:
+            state.queue.replace(range(1000), position=0)
+            state.session = PlaybackSession(session_id="s1", track_id=0)
+        await store.flush()
+
+        async with store.edit("u1") as state:
+            state.session.position = 42.0
+        await store.flush()
+
+        assert list(backend.set_many_calls[-1]) == [store.KEY_PREFIX + "u1:default"]
+        header = backend.data[store.KEY_PREFIX + "u1:default"]
+        assert header["session"]["position"] == 42.0
+        assert header["version"] == 2
+        assert header["queue_version"] == 1
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_unchanged_edit_is_not_written(self, backend):
+        """测试没有实际修改（包括块内异常）时不标记为脏"""
+        store = PlaybackStateStore(backend, flush_interval=10)
+        async with store.edit("u1") as state:
+            if state.session:
+                state.session.is_playing = False
+        with pytest.raises(ValueError):
+            async with store.edit("u1"):
+                raise ValueError("曲目不存在")
+
+        await store.close()
+        assert backend.set_many_calls == []
+        assert (await store.get("u1")).version == 0
+
+    @pytest.mark.asyncio
+    async def test_edit_during_flush_is_flushed(self, backend):
+        """测试写回期间的修改会在下一轮写回"""
+        store = PlaybackStateStore(backend, flush_interval=0.02)
+        async with store.edit("u1") as state:
+            state.queue.extend([1])
+        await asyncio.sleep(0.03)
+        async with store.edit("u1") as state:
+            state.queue.extend([2])
+        await asyncio.sleep(0.05)
+        assert backend.data[store.QUEUE_PREFIX + "u1:default"]["tracks"] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_retried(self, backend):
+        """测试写回失败时保留脏状态"""
+        store = PlaybackStateStore(backend, flush_interval=10)
+        async with store.edit("u1") as state:
+            state.queue.extend([1])
+
+        backend.fail = True
+        await store.flush()
+        assert backend.data == {}
+
+        backend.fail = False
+        await store.close()
+        assert backend.data[store.QUEUE_PREFIX + "u1:default"]["tracks"] == [1]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_workers_are_merged(self, fake_redis):
+        """测试两个 worker 同时修改同一状态时按版本号写回，双方的修改都保留"""
+        worker_a = PlaybackStateStore(RedisCacheBackend(client=fake_redis), flush_interval=10)
+        worker_b = PlaybackStateStore(RedisCacheBackend(client=fake_redis), flush_interval=10)
+        async with worker_a.edit("u1") as state:
+            state.session = PlaybackSession(session_id="s1", track_id=1)
+            state.queue.replace([1, 2, 3], position=0)
+        await worker_a.flush()
+        await worker_b.get("u1")
+
+        # 两个 worker 基于同一版本修改不同字段
+        async with worker_a.edit("u1") as state:
+            state.session.volume = 0.5
+        async with worker_b.edit("u1") as state:
+            state.session.position = 30.0
+            state.queue.extend([4])
+        await worker_b.flush()
+        await worker_a.flush()
+
+        reader = PlaybackStateStore(RedisCacheBackend(client=fake_redis))
+        state = await reader.get("u1")
+        assert state.version == 3
+        assert state.session.volume == 0.5
+        assert state.session.position == 30.0
+        assert state.queue.window(0, 10) == [1, 2, 3, 4]
+        assert "WATCH" in fake_redis.commands
+
+    @pytest.mark.asyncio
+    async def test_shared_across_workers(self, tmp_path):
+        """测试通过共享存储在多个实例（worker）之间同步"""
+        cache = FileCache(tmp_path, memory_max_bytes=0)
+        worker_a = PlaybackStateStore(FileCacheBackend(cache), refresh_interval=0)
+        worker_b = PlaybackStateStore(FileCacheBackend(cache), refresh_interval=0)
+
+        async with worker_a.edit("u1", "phone") as state:
+            state.session = PlaybackSession(session_id="s1", track_id=7)
+            state.queue.replace([7, 8], position=0)
+        await worker_a.close()
+
+        state = await worker_b.get("u1", "phone")
+        assert state.session.track_id == 7
+        assert state.queue.window(0, 10) == [7, 8]
+
+        async with worker_b.edit("u1", "phone") as state:
+            state.queue.next()
+        await worker_b.close()
+
+        assert (await worker_a.get("u1", "phone")).queue.current == 8
+        cache.close()
+
+    @pytest.mark.asyncio
+    async def test_hot_copy_is_not_reloaded(self, backend):
+        """测试刷新间隔内读取直接使用热副本"""
+        store = PlaybackStateStore(backend, refresh_interval=60)
+        first = await store.get("u1")
+        backend.data[store.KEY_PREFIX + "u1:default"] = PlaybackState(version=1).to_header()
+        assert await store.get("u1") is first
+
+    @pytest.mark.asyncio
+    async def test_idle_states_are_evicted(self, backend):
+        """测试闲置的热副本和锁被淘汰，淘汰后从共享存储重新加载"""
+        store = PlaybackStateStore(backend, flush_interval=10, idle_timeout=0)
+        async with store.edit("u1") as state:
+            state.queue.extend([1])
+        await store.flush()
+
+        await store.get("u2")
+        assert "u1:default" not in store._states
+        assert "u1:default" not in store._locks
+        assert (await store.get("u1")).queue.window(0, 10) == [1]
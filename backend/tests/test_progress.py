@@ -0,0 +1,155 @@
+"""
+进度上报单元测试
+测试按任务节流、最终更新、回调包装和下载器进度轮询
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.chain.downloader import DownloaderChain
+from app.core.event import EventType
+from app.core.progress import ProgressReporter
+from app.modules.downloader_module import DownloadProgress
+
+
+@pytest.fixture
+def bus():
+    """记录发布事件的事件总线替身"""
+    return MagicMock()
+
+
+class TestProgressReporter:
+    """ProgressReporter 测试类"""
+
+    def test_rate_limited_per_task(self, bus, clock):
+        """测试每个任务按频率节流，不同任务互不影响"""
+        reporter = ProgressReporter(rate=4, bus=bus, clock=clock)
+
+        assert reporter.update("a", {"n": 1})
+        assert not reporter.update("a", {"n": 2})
+        assert reporter.update("b", {"n": 1})
+
+        clock.now = 0.2
+        assert not reporter.update("a", {"n": 3})
+        clock.now = 0.25
+        assert reporter.update("a", {"n": 4})
+        assert bus.publish_nowait.call_count == 3
+        bus.publish_nowait.assert_called_with(EventType.DownloadProgress, {"n": 4})
+
+    def test_final_always_reported(self, bus, clock):
+        """测试最终更新不受节流限制"""
+        reporter = ProgressReporter(rate=4, bus=bus, clock=clock)
+        reporter.update("a", {"progress": 99})
+
+        assert reporter.update("a", {"progress": 100}, final=True)
+        assert reporter._next_report == {}
+
+    def test_final_reported_once(self, bus, clock):
+        """测试轮询已完成的任务只上报一次最终更新，任务重新开始或清理后恢复"""
+        reporter = ProgressReporter(rate=4, bus=bus, clock=clock)
+
+        assert reporter.update("a", {"progress": 100}, final=True)
+        for i in range(10):
+            clock.now = i
+            assert not reporter.update("a", {"progress": 100}, final=True)
+
+        assert reporter.update("a", {"progress": 50})
+        assert reporter.update("a", {"progress": 100}, final=True)
+
+        reporter.discard("a")
+        assert reporter.update("a", {"progress": 100}, final=True)
+        assert bus.publish_nowait.call_count == 4
+
+    def test_lazy_data(self, bus, clock):
+        """测试被节流的更新不会构建事件数据"""
+        reporter = ProgressReporter(rate=4, bus=bus, clock=clock)
+        build = MagicMock(return_value={})
+
+        for _ in range(100):
+            reporter.update("a", build)
+        assert build.call_count == 1
+
+    def test_throttle_callback(self, bus, clock):
+        """测试包装下载器回调：每块数据的回调被合并，最终状态总是送达"""
+        reporter = ProgressReporter(rate=4, bus=bus, clock=clock)
+        callback = MagicMock()
+        report = reporter.throttle(
+            callback, "a", lambda chunk: {"chunk": chunk}, lambda chunk: chunk == "done"
+        )
+
+        # 模拟 1 秒内 1 万个数据块
+        for i in range(10_000):
+            clock.now = i / 10_000
+            report(i)
+        report("done")
+
+        assert callback.call_count == 5
+        callback.assert_called_with("done")
+        bus.publish_nowait.assert_called_with(EventType.DownloadProgress, {"chunk": "done"})
+
+    def test_callback_error_is_logged(self, bus, clock):
+        """测试原回调异常不会中断下载"""
+        reporter = ProgressReporter(rate=4, bus=bus, clock=clock)
+        report = reporter.throttle(
+            MagicMock(side_effect=Exception("boom")), "a", lambda v: {}, lambda v: False
+        )
+        report(1)
+        bus.publish_nowait.assert_called_once()
+
+
+class FakeDownloader:
+    """模拟下载器模块，按顺序返回进度"""
+
+    downloader_type = "qbittorrent"
+
+    def __init__(self, results: list):
+        self.results = results
+
+    async def get_task_progress(self, task_id: str) -> DownloadProgress | None:
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class TestDownloaderProgress:
+    """DownloaderChain 进度轮询测试类"""
+
+    @pytest.fixture
+    def reporter(self, bus, clock, monkeypatch):
+        """替换全局进度上报器"""
+        reporter = ProgressReporter(rate=4, bus=bus, clock=clock)
+        monkeypatch.setattr("app.chain.downloader.get_progress_reporter", lambda: reporter)
+        return reporter
+
+    def _chain(self, results: list) -> DownloaderChain:
+        chain = DownloaderChain()
+        chain.module_manager.get_running_modules_by_type = lambda _: [FakeDownloader(results)]
+        return chain
+
+    @pytest.mark.asyncio
+    async def test_completed_task_reported_once(self, reporter, bus, clock):
+        """测试持续轮询已完成的种子不会重复发送进度事件"""
+        done = DownloadProgress("t1", 100, 10, 10, 0)
+        chain = self._chain([done] * 5)
+
+        for i in range(5):
+            clock.now = i
+            assert await chain.get_progress("t1") is done
+        assert bus.publish_nowait.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_errored_or_removed_task_is_discarded(self, reporter, clock):
+        """测试出错或已删除的任务清理节流状态"""
+        running = DownloadProgress("t1", 50, 5, 10, 1)
+        chain = self._chain([running, ConnectionError("downloader down"), running, None])
+
+        await chain.get_progress("t1")
+        with pytest.raises(ConnectionError):
+            await chain.get_progress("t1")
+        assert reporter._next_report == {}
+
+        await chain.get_progress("t1")
+        assert await chain.get_progress("t1") is None
+        assert reporter._next_report == {}
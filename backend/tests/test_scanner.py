@@ -0,0 +1,350 @@
+"""
+LibraryScanner 单元测试
+测试目录遍历和扫描流水线
+"""
+
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core.context import MusicInfo
+from app.core.scanner import (
+    LibraryScanner,
+    close_parse_executor,
+    get_parse_executor,
+    is_covered,
+    is_file_changed,
+    iter_music_files,
+    parse_files,
+)
+
+
+@pytest.fixture
+def music_dir():
+    """创建包含音乐文件的临时目录"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        (root / "Artist" / "Album").mkdir(parents=True)
+        (root / "a.mp3").write_bytes(b"")
+        (root / "b.FLAC").write_bytes(b"")
+        (root / "cover.jpg").write_bytes(b"")
+        (root / "Artist" / "Album" / "01 - Song.flac").write_bytes(b"")
+        (root / "Artist" / "Album" / "02 - Song.m4a").write_bytes(b"")
+        yield root
+
+
+class TestIterMusicFiles:
+    """iter_music_files 测试类"""
+
+    def test_recursive(self, music_dir):
+        """测试递归遍历"""
+        files = sorted(Path(p).name for p in iter_music_files(music_dir))
+
+        assert files == ["01 - Song.flac", "02 - Song.m4a", "a.mp3", "b.FLAC"]
+
+    def test_non_recursive(self, music_dir):
+        """测试只遍历当前目录"""
+        files = sorted(Path(p).name for p in iter_music_files(music_dir, recursive=False))
+
+        assert files == ["a.mp3", "b.FLAC"]
+
+    def test_missing_directory(self, music_dir):
+        """测试目录不存在时不报错"""
+        assert list(iter_music_files(music_dir / "missing")) == []
+
+    def test_is_lazy(self, music_dir):
+        """测试按需产出路径"""
+        files = iter_music_files(music_dir)
+
+        assert next(files).endswith((".mp3", ".flac", ".FLAC", ".m4a"))
+
+
+class TestIsFileChanged:
+    """is_file_changed 测试类"""
+
+    def test_new_file(self):
+        """测试新文件"""
+        assert is_file_changed(None, 100, 1.0) is True
+
+    def test_unchanged(self):
+        """测试大小和修改时间都未变"""
+        assert is_file_changed((100, 1700000000.1234), 100, 1700000000.1234) is False
+
+    def test_size_changed(self):
+        """测试大小变化"""
+        assert is_file_changed((100, 1.0), 200, 1.0) is True
+
+    def test_mtime_changed(self):
+        """测试修改时间变化"""
+        assert is_file_changed((100, 1.0), 100, 2.0) is True
+
+    def test_mtime_unknown(self):
+        """测试旧记录没有修改时间"""
+        assert is_file_changed((100, None), 100, 1.0) is True
+
+
+class TestParseFiles:
+    """parse_files 测试类"""
+
+    def test_invalid_audio(self, music_dir):
+        """测试无法解析的文件只返回文件名元数据"""
+        path = str(music_dir / "Artist" / "Album" / "01 - Song.flac")
+
+        [(file_path, local, filename)] = parse_files([path])
+
+        assert file_path == path
+        assert local is None
+        assert filename.title == "Song"
+
+
+class TestLibraryScanner:
+    """LibraryScanner 测试类"""
+
+    @pytest.fixture
+    def executor(self):
+        """使用线程池代替进程池"""
+        with ThreadPoolExecutor(2) as executor:
+            yield executor
+
+    @pytest.mark.asyncio
+    async def test_scan_batches(self, music_dir, executor):
+        """测试按批调用处理回调并汇总进度"""
+        batches = []
+
+        async def handle_batch(batch):
+            batches.append([path for path, _, _ in batch])
+            return [{"success": not path.endswith(".m4a")} for path, _, _ in batch]
+
+        scanner = LibraryScanner(parse_workers=2, batch_size=3, chunk_size=1, executor=executor)
+        progress = await scanner.scan(music_dir, handle_batch)
+
+        assert sorted(len(batch) for batch in batches) == [1, 3]
+        assert progress["status"] == "completed"
+        assert progress["total"] == 4
+        assert progress["processed"] == 4
+        assert progress["success"] == 3
+        assert progress["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_progress_updated_in_place(self, music_dir, executor):
+        """测试进度写入传入的字典"""
+        task = {"library_id": 1}
+
+        async def handle_batch(batch):
+            return [{"success": True} for _ in batch]
+
+        scanner = LibraryScanner(executor=executor)
+        await scanner.scan(music_dir, handle_batch, recursive=False, progress=task)
+
+        assert task["library_id"] == 1
+        assert task["processed"] == 2
+
+    @pytest.mark.asyncio
+    async def test_handler_error_counts_failed(self, music_dir, executor):
+        """测试处理回调异常时整批计为失败"""
+
+        async def handle_batch(batch):
+            raise RuntimeError("db down")
+
+        scanner = LibraryScanner(executor=executor)
+        progress = await scanner.scan(music_dir, handle_batch)
+
+        assert progress["status"] == "completed"
+        assert progress["failed"] == 4
+
+    @pytest.mark.asyncio
+    async def test_backpressure(self, executor):
+        """测试入库阻塞时遍历不会无限超前"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for i in range(50):
+                (Path(tmpdir) / f"{i:02d}.mp3").write_bytes(b"")
+
+            release = asyncio.Event()
+
+            async def handle_batch(batch):
+                await release.wait()
+                return [{"success": True} for _ in batch]
+
+            scanner = LibraryScanner(
+                parse_workers=1, batch_size=1, chunk_size=1, queue_size=1, executor=executor
+            )
+            progress = {}
+            task = asyncio.create_task(scanner.scan(tmpdir, handle_batch, progress=progress))
+            await asyncio.sleep(0.2)
+
+            # 各阶段最多各持有少量块
+            assert progress["total"] < 10
+
+            release.set()
+            await task
+            assert progress["processed"] == 50
+
+    @pytest.mark.asyncio
+    async def test_process_pool(self, music_dir):
+        """测试默认使用进程池解析"""
+        parsed = []
+
+        async def handle_batch(batch):
+            parsed.extend(batch)
+            return [{"success": local is not None} for _, local, _ in batch]
+
+        scanner = LibraryScanner(parse_workers=2)
+        progress = await scanner.scan(music_dir, handle_batch)
+
+        assert len(parsed) == 4
+        # 空文件无法解析音频元数据
+        assert progress["failed"] == 4
+
+        # 多次扫描共用同一个非 fork 方式启动的进程池
+        executor = get_parse_executor()
+        assert executor._mp_context.get_start_method() in ("forkserver", "spawn")
+        await LibraryScanner(parse_workers=2).scan(music_dir, handle_batch)
+        assert get_parse_executor() is executor
+        close_parse_executor()
+
+    @pytest.mark.asyncio
+    async def test_missing_directory(self, music_dir):
+        """测试目录不存在"""
+
+        async def handle_batch(batch):
+            raise AssertionError("不应调用")
+
+        progress = await LibraryScanner().scan(music_dir / "missing", handle_batch)
+
+        assert progress["status"] == "completed"
+        assert progress["total"] == 0
+
+
+class TestIncrementalScan:
+    """增量扫描测试类"""
+
+    @pytest.fixture
+    def executor(self):
+        """使用线程池代替进程池"""
+        with ThreadPoolExecutor(2) as executor:
+            yield executor
+
+    def _known(self, *paths: Path) -> dict:
+        return {str(p): (p.stat().st_size, p.stat().st_mtime) for p in paths}
+
+    @pytest.mark.asyncio
+    async def test_skips_unchanged(self, music_dir, executor):
+        """测试跳过未变化的文件，只处理新增和变化的文件"""
+        a = music_dir / "a.mp3"
+        b = music_dir / "b.FLAC"
+        known = self._known(a, b)
+        known[str(b)] = (999, known[str(b)][1])
+        handled = []
+
+        async def handle_batch(batch):
+            handled.extend(path for path, _, _ in batch)
+            return [{"success": True} for _ in batch]
+
+        scanner = LibraryScanner(executor=executor)
+        progress = await scanner.scan(music_dir, handle_batch, known_files=known)
+
+        assert str(a) not in handled
+        assert str(b) in handled
+        assert len(handled) == 3
+        assert progress["skipped"] == 1
+        assert progress["total"] == 3
+
+    @pytest.mark.asyncio
+    async def test_marks_missing(self, music_dir, executor):
+        """测试数据库中有记录但磁盘上已不存在的文件"""
+        known = self._known(music_dir / "a.mp3")
+        known[str(music_dir / "gone.mp3")] = (1, 1.0)
+        missing = []
+
+        async def handle_batch(batch):
+            return [{"success": True} for _ in batch]
+
+        async def handle_missing(paths):
+            missing.extend(paths)
+
+        scanner = LibraryScanner(executor=executor)
+        progress = await scanner.scan(
+            music_dir, handle_batch, known_files=known, handle_missing=handle_missing
+        )
+
+        assert missing == [str(music_dir / "gone.mp3")]
+        assert progress["missing"] == 1
+
+    @pytest.mark.asyncio
+    async def test_non_recursive_keeps_subdirectories(self, music_dir, executor):
+        """测试非递归扫描不把子目录中的文件标记为已移除"""
+        known = self._known(*(Path(p) for p in iter_music_files(music_dir)))
+        known[str(music_dir / "gone.mp3")] = (1, 1.0)
+        missing = []
+
+        async def handle_missing(paths):
+            missing.extend(paths)
+
+        scanner = LibraryScanner(executor=executor)
+        await scanner.scan(
+            music_dir,
+            AsyncMock(return_value=[]),
+            recursive=False,
+            known_files=known,
+            handle_missing=handle_missing,
+        )
+
+        assert missing == [str(music_dir / "gone.mp3")]
+
+    @pytest.mark.asyncio
+    async def test_failed_directory_not_missing(self, music_dir, executor):
+        """测试读取失败的目录下的文件不标记为已移除"""
+        known = self._known(*(Path(p) for p in iter_music_files(music_dir)))
+        scandir = os.scandir
+        album = str(music_dir / "Artist" / "Album")
+
+        def failing_scandir(path):
+            if str(path) == album:
+                raise PermissionError("无权限")
+            return scandir(path)
+
+        handle_missing = AsyncMock()
+        scanner = LibraryScanner(executor=executor)
+        with patch("app.core.scanner.os.scandir", side_effect=failing_scandir):
+            progress = await scanner.scan(
+                music_dir, AsyncMock(), known_files=known, handle_missing=handle_missing
+            )
+
+        assert progress["missing"] == 0
+        handle_missing.assert_not_called()
+
+    def test_is_covered(self):
+        """测试遍历覆盖范围判断"""
+        assert is_covered("/m/a.mp3", "/m", recursive=False)
+        assert not is_covered("/m/sub/a.mp3", "/m/", recursive=False)
+        assert is_covered("/m/sub/a.mp3", "/m", recursive=True)
+        assert not is_covered("/m/sub/a.mp3", "/m", recursive=True, failed=["/m/sub"])
+        assert is_covered("/m/sub2/a.mp3", "/m", recursive=True, failed=["/m/sub"])
+
+    @pytest.mark.asyncio
+    async def test_nothing_changed(self, music_dir, executor):
+        """测试没有变化时不调用处理回调"""
+        known = self._known(*(Path(p) for p in iter_music_files(music_dir)))
+
+        async def handle_batch(batch):
+            raise AssertionError("不应调用")
+
+        scanner = LibraryScanner(executor=executor)
+        progress = await scanner.scan(music_dir, handle_batch, known_files=known)
+
+        assert progress["skipped"] == 4
+        assert progress["total"] == 0
+        assert progress["missing"] == 0
+
+    @pytest.mark.asyncio
+    async def test_parse_files_records_mtime(self, music_dir):
+        """测试解析结果携带修改时间"""
+        with patch("app.core.scanner.metadata_parser.parse_file", return_value=MusicInfo()):
+            [(path, local, _)] = parse_files([str(music_dir / "a.mp3")])
+
+        assert local.file_mtime == (music_dir / "a.mp3").stat().st_mtime
@@ -0,0 +1,194 @@
+"""
+搜索单元测试
+测试拼音生成、搜索索引同步和统一搜索
+"""
+
+import os
+import time
+
+import pytest
+import pytest_asyncio
+
+from app.core.pinyin import to_pinyin
+from app.db.models.album import Album
+from app.db.models.artist import Artist
+from app.db.models.track import Track
+from app.db.operations.album import AlbumOper
+from app.db.operations.artist import ArtistOper
+from app.db.operations.search import SearchOper
+from app.db.operations.track import TrackOper
+
+
+class TestToPinyin:
+    """to_pinyin 测试类"""
+
+    def test_chinese(self):
+        """测试中文生成全拼和首字母"""
+        assert to_pinyin("周杰伦") == "zhoujielun zjl"
+
+    def test_mixed(self):
+        """测试中英文混合"""
+        assert to_pinyin("Jay 周杰伦").startswith("jayzhoujielun")
+
+    def test_no_chinese(self):
+        """测试不含中文时不生成"""
+        assert to_pinyin("Coldplay") is None
+        assert to_pinyin(None) is None
+
+
+@pytest_asyncio.fixture
+async def library(db_manager):
+    """创建测试曲库"""
+    artist_oper = ArtistOper(Artist, db_manager)
+    album_oper = AlbumOper(Album, db_manager)
+    track_oper = TrackOper(Track, db_manager)
+
+    jay = await artist_oper.create(name="周杰伦")
+    coldplay = await artist_oper.create(name="Coldplay")
+    album = await album_oper.create(title="叶惠美", artist_id=jay.id)
+    await track_oper.create(title="晴天", artist_id=jay.id, album_id=album.id, path="/m/1.mp3")
+    await track_oper.create(title="Yellow", artist_id=coldplay.id, path="/m/2.mp3")
+    await track_oper.create(title="Yellow Submarine", path="/m/3.mp3")
+    await track_oper.create(title="Hello Yellow", path="/m/4.mp3")
+    return {"artist": artist_oper, "album": album_oper, "track": track_oper}
+
+
+class TestSearchOper:
+    """SearchOper 测试类（SQLite FTS5）"""
+
+    @pytest.fixture
+    def search_oper(self, db_manager):
+        """创建 SearchOper 实例"""
+        return SearchOper(db_manager)
+
+    @pytest.mark.asyncio
+    async def test_pinyin_populated(self, library):
+        """测试写入时自动生成拼音字段"""
+        [artist] = await library["artist"].get_all(name="周杰伦")
+
+        assert artist.name_pinyin == "zhoujielun zjl"
+
+    @pytest.mark.asyncio
+    async def test_mixed_results(self, search_oper, library):
+        """测试跨实体搜索"""
+        results = await search_oper.search("yellow")
+
+        assert {r["type"] for r in results} == {"track"}
+        # 完全匹配 > 前缀匹配 > 包含
+        assert [r["name"] for r in results] == ["Yellow", "Yellow Submarine", "Hello Yellow"]
+
+    @pytest.mark.asyncio
+    async def test_chinese_and_pinyin(self, search_oper, library):
+        """测试中文名称、全拼和首字母搜索"""
+        assert [r["type"] for r in await search_oper.search("周杰伦")] == ["artist"]
+        assert [r["name"] for r in await search_oper.search("zjl")] == ["周杰伦"]
+        assert [r["name"] for r in await search_oper.search("zhoujie")] == ["周杰伦"]
+
+    @pytest.mark.asyncio
+    async def test_short_keyword(self, search_oper, library):
+        """测试少于三个字符的关键词"""
+        results = await search_oper.search("晴天")
+
+        assert [(r["type"], r["name"]) for r in results] == [("track", "晴天")]
+
+    @pytest.mark.asyncio
+    async def test_types_filter(self, search_oper, library):
+        """测试按类型过滤"""
+        assert await search_oper.search("yellow", types=["album", "artist"]) == []
+        assert [r["name"] for r in await search_oper.search("叶惠", types=["album"])] == ["叶惠美"]
+
+    @pytest.mark.asyncio
+    async def test_special_characters(self, search_oper, library):
+        """测试关键词中的引号和通配符不会破坏查询"""
+        assert await search_oper.search('"yel') == []
+        assert await search_oper.search("%_") == []
+        assert await search_oper.search("   ") == []
+
+    @pytest.mark.asyncio
+    async def test_index_follows_updates(self, search_oper, library):
+        """测试更新、删除和标记移除后索引同步"""
+        track_oper = library["track"]
+        [track] = await track_oper.search_by_title("晴天")
+
+        await track_oper.update(track.id, title="七里香")
+        assert await search_oper.search("晴天") == []
+        assert [r["name"] for r in await search_oper.search("qlx")] == ["七里香"]
+
+        await track_oper.mark_missing(["/m/2.mp3"])
+        assert [r["name"] for r in await search_oper.search("yellow", types=["track"])] == [
+            "Yellow Submarine",
+            "Hello Yellow",
+        ]
+
+        await track_oper.delete(track.id)
+        assert await search_oper.search("七里香") == []
+
+    @pytest.mark.asyncio
+    async def test_bulk_ingest_indexed(self, search_oper, db_manager):
+        """测试批量入库的记录也进入索引"""
+        from app.core.context import MusicInfo
+
+        await TrackOper(Track, db_manager).bulk_ingest(
+            [MusicInfo(path="/m/x.mp3", title="稻香", artist="周杰伦", album="魔杰座")]
+        )
+
+        results = await search_oper.search("mjz")
+        assert [(r["type"], r["name"]) for r in results] == [("album", "魔杰座")]
+        assert [r["name"] for r in await search_oper.search("dx", types=["track"])] == ["稻香"]
+
+    @pytest.mark.asyncio
+    async def test_oper_search_methods(self, library):
+        """测试各 Oper 的搜索方法使用索引并按相关度排序"""
+        tracks = await library["track"].search_by_title("yellow", limit=2)
+
+        assert [t.title for t in tracks] == ["Yellow", "Yellow Submarine"]
+        assert [a.name for a in await library["artist"].search_by_name("cold")] == ["Coldplay"]
+        assert [a.title for a in await library["album"].search_by_title("yhm")] == ["叶惠美"]
+
+
+@pytest.mark.skipif(
+    not os.environ.get("MUSICPILOT_BENCHMARK"), reason="设置 MUSICPILOT_BENCHMARK=1 运行性能测试"
+)
+class TestSearchBenchmark:
+    """搜索延迟基准测试"""
+
+    @pytest.mark.asyncio
+    async def test_latency(self, db_manager):
+        """对比索引搜索与 LIKE 全表扫描的延迟"""
+        from sqlalchemy import insert, or_, select
+
+        rows = [
+            {"title": f"Song {i} 歌曲{i}", "title_pinyin": f"gequ{i} gq{i}", "path": f"/m/{i}"}
+            for i in range(200_000)
+        ]
+        async with db_manager.get_session() as session:
+            await session.execute(insert(Track), rows)
+
+        search_oper = SearchOper(db_manager)
+        keywords = ["Song 12345", "gequ9999", "歌曲777", "gq5"]
+
+        async def measure(func) -> float:
+            start = time.perf_counter()
+            for _ in range(5):
+                for keyword in keywords:
+                    await func(keyword)
+            return (time.perf_counter() - start) / (5 * len(keywords)) * 1000
+
+        async def like_scan(keyword):
+            async with db_manager.get_session() as session:
+                await session.execute(
+                    select(Track.id)
+                    .where(
+                        or_(
+                            Track.title.ilike(f"%{keyword}%"),
+                            Track.title_pinyin.ilike(f"%{keyword}%"),
+                        )
+                    )
+                    .limit(60)
+                )
+
+        indexed = await measure(lambda keyword: search_oper.search(keyword, types=["track"]))
+        scanned = await measure(like_scan)
+        print(f"\n索引搜索: {indexed:.2f} ms/次, LIKE 扫描: {scanned:.2f} ms/次")
+
+        assert indexed < scanned
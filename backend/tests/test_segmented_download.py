@@ -0,0 +1,223 @@
+"""
+分段下载引擎单元测试
+使用支持 Range 的本地桩服务器测试并行分段、断点续传、退化为完整下载和大小校验
+"""
+
+import asyncio
+import json
+import random
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.modules.downloader import DownloadQuality, DownloadSource, DownloadTask
+from app.modules.downloader.base import SegmentedDownload
+from app.modules.downloader.netease import NeteaseDownloader
+
+CONTENT = random.Random(1).randbytes(1024 * 1024 + 123)
+
+
+class RangeServer:
+    """支持 Range 的桩服务器，可以在发送部分内容后断开连接"""
+
+    def __init__(self, content: bytes = CONTENT):
+        self.content = content
+        self.ranges = True
+        # 下一个下载请求（不含探测请求）只发送这么多字节后断开
+        self.fail_after: int | None = None
+        self.requested: list[str | None] = []
+        self.sent = 0
+        self.server: asyncio.Server | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/song.flac"
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = (await reader.readuntil(b"\r\n\r\n")).decode()
+                headers = dict(
+                    line.split(": ", 1) for line in head.split("\r\n")[1:] if ": " in line
+                )
+                range_header = {k.lower(): v for k, v in headers.items()}.get("range")
+                self.requested.append(range_header)
+
+                total = len(self.content)
+                if range_header and self.ranges:
+                    start, end = range_header.removeprefix("bytes=").split("-")
+                    start, end = int(start), min(int(end), total - 1)
+                    body = self.content[start : end + 1]
+                    status = b"206 Partial Content"
+                    extra = f"Content-Range: bytes {start}-{end}/{total}\r\n".encode()
+                else:
+                    body, status, extra = self.content, b"200 OK", b""
+
+                writer.write(
+                    b"HTTP/1.1 "
+                    + status
+                    + b"\r\n"
+                    + extra
+                    + b"Content-Length: "
+                    + str(len(body)).encode()
+                    + b"\r\n\r\n"
+                )
+                if self.fail_after is not None and range_header != "bytes=0-0":
+                    body, self.fail_after = body[: self.fail_after], None
+                    writer.write(body)
+                    self.sent += len(body)
+                    await writer.drain()
+                    break
+                writer.write(body)
+                self.sent += len(body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+@pytest_asyncio.fixture
+async def range_server():
+    """启动 Range 桩服务器"""
+    server = RangeServer()
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest_asyncio.fixture
+async def client():
+    """HTTP 客户端"""
+    async with httpx.AsyncClient(timeout=10) as client:
+        yield client
+
+
+def make_download(client, range_server, tmp_path, **kwargs) -> SegmentedDownload:
+    """创建测试用分段下载（小块写入，便于测试续传）"""
+    kwargs.setdefault("max_segments", 4)
+    kwargs.setdefault("min_segment_size", 64 * 1024)
+    kwargs.setdefault("chunk_size", 8 * 1024)
+    kwargs.setdefault("write_size", 16 * 1024)
+    return SegmentedDownload(client, range_server.url, tmp_path / "song.flac", **kwargs)
+
+
+class TestSegmentedDownload:
+    """SegmentedDownload 测试类"""
+
+    @pytest.mark.asyncio
+    async def test_parallel_segments(self, client, range_server, tmp_path):
+        """测试分段并行下载并合并为完整文件"""
+        progress = []
+        download = make_download(
+            client, range_server, tmp_path, progress_callback=lambda d, t: progress.append(d)
+        )
+        assert await download.run() == len(CONTENT)
+
+        assert (tmp_path / "song.flac").read_bytes() == CONTENT
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["song.flac"]
+        # 第一个请求探测大小，之后 4 个区间
+        assert range_server.requested[0] == "bytes=0-0"
+        assert len(range_server.requested) == 5
+        assert progress[-1] == len(CONTENT)
+
+    @pytest.mark.asyncio
+    async def test_small_file_uses_fewer_segments(self, client, range_server, tmp_path):
+        """测试小文件按最小区间大小减少分段数"""
+        download = make_download(client, range_server, tmp_path, min_segment_size=512 * 1024)
+        await download.run()
+        assert len(download.segments) == 2
+
+    @pytest.mark.asyncio
+    async def test_resume_after_failure(self, client, range_server, tmp_path):
+        """测试连接中断后保留进度，重新下载时只请求剩余部分"""
+        range_server.fail_after = 100 * 1024
+        with pytest.raises(httpx.HTTPError):
+            await make_download(client, range_server, tmp_path).run()
+
+        manifest = json.loads((tmp_path / "song.flac.part.json").read_text())
+        saved = sum(done for _, _, done in manifest["segments"])
+        assert 0 < saved < len(CONTENT)
+        assert not (tmp_path / "song.flac").exists()
+
+        range_server.sent = 0
+        download = make_download(client, range_server, tmp_path)
+        assert await download.run() == len(CONTENT)
+        assert (tmp_path / "song.flac").read_bytes() == CONTENT
+        assert range_server.sent == len(CONTENT) - saved + 1
+        assert not (tmp_path / "song.flac.part.json").exists()
+
+    @pytest.mark.asyncio
+    async def test_size_change_restarts(self, client, range_server, tmp_path):
+        """测试文件大小变化时作废续传清单"""
+        range_server.fail_after = 100 * 1024
+        with pytest.raises(httpx.HTTPError):
+            await make_download(client, range_server, tmp_path).run()
+
+        range_server.content = CONTENT[:-1000]
+        await make_download(client, range_server, tmp_path).run()
+        assert (tmp_path / "song.flac").read_bytes() == CONTENT[:-1000]
+
+    @pytest.mark.asyncio
+    async def test_without_range_support(self, client, range_server, tmp_path):
+        """测试服务器不支持 Range 时单连接完整下载"""
+        range_server.ranges = False
+        download = make_download(client, range_server, tmp_path)
+        assert await download.run() == len(CONTENT)
+        assert (tmp_path / "song.flac").read_bytes() == CONTENT
+        assert download.segments == []
+
+    @pytest.mark.asyncio
+    async def test_truncated_whole_download_fails(self, client, range_server, tmp_path):
+        """测试完整下载中断时不生成目标文件"""
+        range_server.ranges = False
+        range_server.fail_after = 1000
+        with pytest.raises(httpx.HTTPError):
+            await make_download(client, range_server, tmp_path).run()
+        assert not (tmp_path / "song.flac").exists()
+
+    @pytest.mark.asyncio
+    async def test_downloader_fetch_file(self, client, range_server, tmp_path):
+        """测试下载器通过 fetch_file 使用分段下载并更新任务进度"""
+        downloader = NeteaseDownloader()
+        task = DownloadTask("netease_1", "1", DownloadSource.NETEASE, DownloadQuality.LOSSLESS)
+        updates = []
+
+        size = await downloader.fetch_file(
+            client,
+            range_server.url,
+            tmp_path / "song.flac",
+            task,
+            lambda t: updates.append(t.progress),
+        )
+        assert size == task.total_bytes == len(CONTENT)
+        assert task.downloaded_bytes == len(CONTENT)
+        assert updates[-1] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_same_title_uses_separate_parts(self, client, range_server, tmp_path):
+        """测试同一目录下同名的不同歌曲使用各自的 .part 和清单文件"""
+        downloader = NeteaseDownloader()
+        first = DownloadTask("netease_1", "1", DownloadSource.NETEASE, DownloadQuality.LOSSLESS)
+        second = DownloadTask("netease_2", "2", DownloadSource.NETEASE, DownloadQuality.LOSSLESS)
+
+        range_server.fail_after = 100 * 1024
+        with pytest.raises(httpx.HTTPError):
+            await downloader.fetch_file(client, range_server.url, tmp_path / "song.flac", first)
+        manifest = (tmp_path / "song.netease_1.flac.part.json").read_text()
+
+        await downloader.fetch_file(client, range_server.url, tmp_path / "song.flac", second)
+        assert (tmp_path / "song.flac").read_bytes() == CONTENT
+        assert not (tmp_path / "song.netease_2.flac.part").exists()
+        # 第一首歌的续传进度没有被覆盖
+        assert (tmp_path / "song.netease_1.flac.part.json").read_text() == manifest
+        assert (tmp_path / "song.netease_1.flac.part").exists()
@@ -0,0 +1,301 @@
+"""
+文件流式传输单元测试
+测试 Range 解析、协商缓存和文件区间响应
+"""
+
+import asyncio
+import os
+import tracemalloc
+from email.utils import formatdate
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+
+from app.core.streaming import (
+    FileRangeResponse,
+    RangeNotSatisfiableError,
+    content_disposition,
+    file_response,
+    parse_range_header,
+)
+
+CONTENT = bytes(range(256)) * 40  # 10240 字节
+
+
+@pytest.fixture
+def audio_file(tmp_path):
+    """测试音频文件"""
+    path = tmp_path / "song.mp3"
+    path.write_bytes(CONTENT)
+    return path
+
+
+@pytest.fixture
+def client(audio_file):
+    """挂载 file_response 的测试客户端"""
+
+    async def endpoint(request):
+        return file_response(
+            request,
+            audio_file,
+            "audio/mpeg",
+            headers={"content-disposition": content_disposition("inline", "晴天.mp3")},
+        )
+
+    app = Starlette(routes=[Route("/stream", endpoint, methods=["GET", "HEAD"])])
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+class TestParseRangeHeader:
+    """parse_range_header 测试类"""
+
+    def test_no_header(self):
+        """测试无 Range 头返回完整文件"""
+        assert parse_range_header(None, 100) is None
+
+    def test_single_and_open_ended(self):
+        """测试普通区间和开放区间"""
+        assert parse_range_header("bytes=0-9", 100) == [(0, 9)]
+        assert parse_range_header("bytes=90-", 100) == [(90, 99)]
+        assert parse_range_header("bytes=90-500", 100) == [(90, 99)]
+
+    def test_suffix(self):
+        """测试后缀区间"""
+        assert parse_range_header("bytes=-10", 100) == [(90, 99)]
+        assert parse_range_header("bytes=-500", 100) == [(0, 99)]
+
+    def test_multiple_ranges_are_merged(self):
+        """测试多区间排序并合并重叠/相邻区间"""
+        assert parse_range_header("bytes=50-59, 0-9, 5-19, 20-29", 100) == [(0, 29), (50, 59)]
+
+    def test_invalid_is_ignored(self):
+        """测试格式无效时忽略 Range"""
+        assert parse_range_header("items=0-9", 100) is None
+        assert parse_range_header("bytes=abc", 100) is None
+        assert parse_range_header("bytes=9-0", 100) is None
+
+    def test_too_many_ranges_is_ignored(self):
+        """测试区间过多时忽略 Range"""
+        header = "bytes=" + ",".join(f"{i * 2}-{i * 2}" for i in range(40))
+        assert parse_range_header(header, 100) is None
+
+    def test_unsatisfiable(self):
+        """测试区间超出文件范围"""
+        with pytest.raises(RangeNotSatisfiableError):
+            parse_range_header("bytes=100-200", 100)
+        with pytest.raises(RangeNotSatisfiableError):
+            parse_range_header("bytes=0-1", 0)
+
+
+class TestFileResponse:
+    """file_response 测试类"""
+
+    @pytest.mark.asyncio
+    async def test_full_file(self, client):
+        """测试完整文件"""
+        async with client:
+            response = await client.get("/stream")
+        assert response.status_code == 200
+        assert response.content == CONTENT
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["content-length"] == str(len(CONTENT))
+        assert "filename*=UTF-8''%E6%99%B4%E5%A4%A9.mp3" in response.headers["content-disposition"]
+
+    @pytest.mark.asyncio
+    async def test_single_range(self, client):
+        """测试单区间返回 206"""
+        async with client:
+            response = await client.get("/stream", headers={"Range": "bytes=100-199"})
+        assert response.status_code == 206
+        assert response.content == CONTENT[100:200]
+        assert response.headers["content-range"] == f"bytes 100-199/{len(CONTENT)}"
+        assert response.headers["content-length"] == "100"
+
+    @pytest.mark.asyncio
+    async def test_multipart_ranges(self, client):
+        """测试多区间返回 multipart/byteranges"""
+        async with client:
+            response = await client.get("/stream", headers={"Range": "bytes=0-9,-10"})
+        assert response.status_code == 206
+        content_type = response.headers["content-type"]
+        assert content_type.startswith("multipart/byteranges; boundary=")
+        boundary = content_type.split("boundary=")[1].encode()
+        assert int(response.headers["content-length"]) == len(response.content)
+
+        parts = response.content.split(b"--" + boundary)
+        assert parts[-1] == b"--\r\n"
+        first = parts[1].split(b"\r\n\r\n", 1)
+        assert f"Content-Range: bytes 0-9/{len(CONTENT)}".encode() in first[0]
+        assert first[1] == CONTENT[:10] + b"\r\n"
+        last = parts[2].split(b"\r\n\r\n", 1)
+        assert last[1] == CONTENT[-10:] + b"\r\n"
+
+    @pytest.mark.asyncio
+    async def test_unsatisfiable_range(self, client):
+        """测试超出范围返回 416"""
+        async with client:
+            response = await client.get("/stream", headers={"Range": "bytes=99999-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+    @pytest.mark.asyncio
+    async def test_etag_revalidation(self, client):
+        """测试 If-None-Match 返回 304"""
+        async with client:
+            etag = (await client.get("/stream")).headers["etag"]
+            response = await client.get("/stream", headers={"If-None-Match": f"W/{etag}"})
+            changed = await client.get("/stream", headers={"If-None-Match": '"other"'})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert changed.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_last_modified_revalidation(self, client, audio_file):
+        """测试 If-Modified-Since 返回 304"""
+        mtime = audio_file.stat().st_mtime
+        async with client:
+            response = await client.get(
+                "/stream", headers={"If-Modified-Since": formatdate(mtime, usegmt=True)}
+            )
+            stale = await client.get(
+                "/stream", headers={"If-Modified-Since": formatdate(mtime - 3600, usegmt=True)}
+            )
+        assert response.status_code == 304
+        assert stale.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_if_range(self, client, audio_file):
+        """测试 If-Range 匹配时返回区间，不匹配时返回完整文件"""
+        async with client:
+            etag = (await client.get("/stream")).headers["etag"]
+            matched = await client.get("/stream", headers={"Range": "bytes=0-9", "If-Range": etag})
+            # 文件被修改后旧 ETag 失效
+            os.utime(audio_file, (0, 0))
+            changed = await client.get("/stream", headers={"Range": "bytes=0-9", "If-Range": etag})
+        assert matched.status_code == 206
+        assert matched.content == CONTENT[:10]
+        assert changed.status_code == 200
+        assert changed.content == CONTENT
+
+    @pytest.mark.asyncio
+    async def test_head(self, client):
+        """测试 HEAD 请求只返回响应头"""
+        async with client:
+            response = await client.head("/stream", headers={"Range": "bytes=0-9"})
+        assert response.status_code == 206
+        assert response.headers["content-length"] == "10"
+        assert response.content == b""
+
+
+async def _drive(response: FileRangeResponse, extensions: dict | None = None) -> list[dict]:
+    """直接驱动 ASGI 响应，返回发送的消息"""
+    messages = []
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "extensions": extensions or {}}
+    await response(scope, receive, send)
+    return messages
+
+
+class TestFileRangeResponse:
+    """FileRangeResponse 测试类"""
+
+    @pytest.mark.asyncio
+    async def test_zerocopysend(self, audio_file):
+        """测试服务器支持 zerocopysend 时使用 sendfile"""
+        response = FileRangeResponse(
+            audio_file, audio_file.stat(), "audio/mpeg", ranges=[(100, 199)]
+        )
+        messages = await _drive(response, {"http.response.zerocopysend": {}})
+        assert messages[1]["type"] == "http.response.zerocopysend"
+        assert messages[1]["offset"] == 100
+        assert messages[1]["count"] == 100
+
+    @pytest.mark.asyncio
+    async def test_pathsend(self, audio_file):
+        """测试完整文件交给服务器发送"""
+        response = FileRangeResponse(audio_file, audio_file.stat(), "audio/mpeg")
+        messages = await _drive(response, {"http.response.pathsend": {}})
+        assert messages[1] == {"type": "http.response.pathsend", "path": str(audio_file)}
+
+    @pytest.mark.asyncio
+    async def test_chunked(self, audio_file):
+        """测试按块发送"""
+        response = FileRangeResponse(audio_file, audio_file.stat(), "audio/mpeg")
+        response.chunk_size = 4096
+        messages = await _drive(response)
+        chunks = [m["body"] for m in messages[1:]]
+        assert max(len(chunk) for chunk in chunks) == 4096
+        assert b"".join(chunks) == CONTENT
+
+    @pytest.mark.asyncio
+    async def test_stops_on_disconnect(self, audio_file):
+        """测试客户端断开后停止读取"""
+        response = FileRangeResponse(audio_file, audio_file.stat(), "audio/mpeg")
+        response.chunk_size = 16
+        sent = []
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            await asyncio.sleep(0)
+
+        await response({"type": "http", "method": "GET"}, receive, send)
+        assert sum(len(m.get("body", b"")) for m in sent) < len(CONTENT)
+
+
+@pytest.mark.skipif(
+    not os.environ.get("MUSICPILOT_BENCHMARK"), reason="设置 MUSICPILOT_BENCHMARK=1 运行性能测试"
+)
+class TestStreamingBenchmark:
+    """并发流式传输内存基准测试"""
+
+    @pytest.mark.asyncio
+    async def test_memory_is_flat(self, tmp_path):
+        """200 个并发听众读取 20MB 文件，内存峰值只与块大小相关"""
+        listeners = 200
+        file_size = 20 * 1024 * 1024
+        path = tmp_path / "big.flac"
+        with open(path, "wb") as f:
+            f.truncate(file_size)
+        stat_result = path.stat()
+
+        async def listen(i: int) -> int:
+            received = 0
+
+            async def receive():
+                await asyncio.Event().wait()
+
+            async def send(message):
+                nonlocal received
+                received += len(message.get("body", b""))
+
+            start = i * 4096
+            response = FileRangeResponse(
+                path, stat_result, "audio/flac", ranges=[(start, file_size - 1)]
+            )
+            await response({"type": "http", "method": "GET"}, receive, send)
+            return received
+
+        tracemalloc.start()
+        received = await asyncio.gather(*(listen(i) for i in range(listeners)))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        total = sum(received)
+        print(
+            f"\n{listeners} 个并发听众, 共发送 {total / 1024 / 1024:.0f}MB, "
+            f"内存峰值 {peak / 1024 / 1024:.1f}MB"
+        )
+        assert total == sum(file_size - i * 4096 for i in range(listeners))
+        # 每个连接最多持有几个块，远小于整文件读入内存（200 × 20MB）
+        assert peak < listeners * FileRangeResponse.chunk_size * 4
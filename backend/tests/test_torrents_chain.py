@@ -0,0 +1,226 @@
+"""
+资源搜索链单元测试
+测试流式合并、站点超时、前 K 个结果和部分结果缓存
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.endpoints import torrents as torrents_endpoint
+from app.chain.torrents import (
+    SITE_ERROR,
+    SITE_OK,
+    SITE_TIMEOUT,
+    TopKResults,
+    TorrentInfo,
+    TorrentsChain,
+)
+from app.core.container import Container
+from app.core.context import MusicInfo
+
+
+def make_result(torrent_id: str, seeders: int = 0, format: str = "FLAC", size: int = 100):
+    """创建站点模块返回的种子结果"""
+    return SimpleNamespace(
+        torrent_id=torrent_id,
+        title=f"Album {torrent_id}",
+        size=size,
+        download_url=f"http://site/{torrent_id}",
+        upload_time=None,
+        seeders=seeders,
+        leechers=0,
+        is_free=False,
+        format=format,
+        bitrate="",
+    )
+
+
+class FakeSiteModule:
+    """按设定延迟返回结果的站点模块"""
+
+    def __init__(self, name: str, results: list, delay: float = 0.0, error: bool = False):
+        self.site_info = SimpleNamespace(name=name)
+        self.results = results
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def search_album(self, artist: str, album: str, format: str):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise ConnectionError("站点不可用")
+        return self.results
+
+
+def make_chain(tmp_path, modules: list[FakeSiteModule]) -> TorrentsChain:
+    """创建使用假站点的搜索链"""
+    chain = TorrentsChain(cache_dir=str(tmp_path))
+
+    async def get_enabled():
+        return [SimpleNamespace(name=module.site_info.name) for module in modules]
+
+    chain.site_oper = SimpleNamespace(get_enabled=get_enabled)
+    chain.module_manager = SimpleNamespace(get_running_modules_by_type=lambda _: modules)
+    return chain
+
+
+MUSIC = MusicInfo(artist="周杰伦", album="叶惠美")
+
+
+async def collect(stream) -> list[dict]:
+    """收集流式搜索的所有事件"""
+    return [event async for event in stream]
+
+
+class TestTopKResults:
+    """TopKResults 测试类"""
+
+    def test_keeps_best(self):
+        """测试只保留排序最靠前的 K 个，结果与整体排序一致"""
+        torrents = [
+            TorrentInfo(str(i), "s", "t", 100, "u", seeders=(i * 7) % 10) for i in range(10)
+        ]
+        top = TopKResults(3, TorrentsChain._sort_key)
+        for torrent in torrents:
+            top.add(torrent)
+        expected = TorrentsChain()._sort_results(torrents)[:3]
+        assert [t.torrent_id for t in top.results()] == [t.torrent_id for t in expected]
+
+    def test_unlimited(self):
+        """测试不限制数量时保留全部，同分保持加入顺序"""
+        top = TopKResults(None, TorrentsChain._sort_key)
+        for i in range(5):
+            top.add(TorrentInfo(str(i), "s", "t", 100, "u"))
+        assert [t.torrent_id for t in top.results()] == ["0", "1", "2", "3", "4"]
+
+
+class TestTorrentsChainStream:
+    """TorrentsChain 流式搜索测试类"""
+
+    @pytest.mark.asyncio
+    async def test_results_arrive_per_site(self, tmp_path):
+        """测试每个站点返回后立即产出合并结果，快的站点先产出"""
+        fast = FakeSiteModule("fast", [make_result("f1", seeders=1)])
+        slow = FakeSiteModule("slow", [make_result("s1", seeders=9)], delay=0.05)
+        chain = make_chain(tmp_path, [slow, fast])
+
+        events = await collect(chain.search_stream(MUSIC, use_cache=False))
+        assert [e["type"] for e in events] == ["site", "site", "done"]
+        assert events[0]["site"] == "fast"
+        assert [t.torrent_id for t in events[0]["results"]] == ["f1"]
+        assert [t.torrent_id for t in events[1]["results"]] == ["s1", "f1"]
+        assert events[-1]["complete"] is True
+
+    @pytest.mark.asyncio
+    async def test_site_timeout_and_error(self, tmp_path):
+        """测试单站点超时和失败不影响其他站点"""
+        chain = make_chain(
+            tmp_path,
+            [
+                FakeSiteModule("ok", [make_result("a")]),
+                FakeSiteModule("hang", [make_result("b")], delay=10),
+                FakeSiteModule("broken", [], error=True),
+            ],
+        )
+
+        events = await collect(chain.search_stream(MUSIC, site_timeout=0.05, use_cache=False))
+        done = events[-1]
+        assert done["complete"] is False
+        assert done["sites"] == {"ok": SITE_OK, "hang": SITE_TIMEOUT, "broken": SITE_ERROR}
+        assert [t.torrent_id for t in done["results"]] == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_deadline_returns_partial(self, tmp_path):
+        """测试整体截止时间到达时返回已有结果"""
+        chain = make_chain(
+            tmp_path,
+            [
+                FakeSiteModule("ok", [make_result("a")]),
+                FakeSiteModule("slow", [make_result("b")], delay=10),
+            ],
+        )
+
+        start = asyncio.get_running_loop().time()
+        events = await collect(chain.search_stream(MUSIC, deadline=0.05, use_cache=False))
+        assert asyncio.get_running_loop().time() - start < 1
+        assert events[-1]["sites"]["slow"] == SITE_TIMEOUT
+        assert [t.torrent_id for t in events[-1]["results"]] == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_limit_and_filter(self, tmp_path):
+        """测试结果按格式过滤并只保留前 K 个"""
+        results = [make_result(str(i), seeders=i) for i in range(20)]
+        results.append(make_result("mp3", seeders=100, format="MP3"))
+        chain = make_chain(tmp_path, [FakeSiteModule("s", results)])
+
+        events = await collect(chain.search_stream(MUSIC, limit=5, use_cache=False))
+        assert [t.torrent_id for t in events[-1]["results"]] == ["19", "18", "17", "16", "15"]
+
+    @pytest.mark.asyncio
+    async def test_partial_cache_requeries_failed_sites(self, tmp_path):
+        """测试部分结果缓存后，再次搜索只查询上次未成功的站点"""
+        ok = FakeSiteModule("ok", [make_result("a")])
+        broken = FakeSiteModule("broken", [make_result("b", seeders=5)], error=True)
+        chain = make_chain(tmp_path, [ok, broken])
+
+        first = await collect(chain.search_stream(MUSIC))
+        assert first[-1]["complete"] is False
+
+        broken.error = False
+        second = await collect(chain.search_stream(MUSIC))
+        assert [e["type"] for e in second] == ["cached", "site", "done"]
+        assert second[-1]["complete"] is True
+        assert [t.torrent_id for t in second[-1]["results"]] == ["b", "a"]
+        assert (ok.calls, broken.calls) == (1, 2)
+
+        # 完整结果直接从缓存返回
+        third = await collect(chain.search_stream(MUSIC))
+        assert [e["type"] for e in third] == ["done"]
+        assert (ok.calls, broken.calls) == (1, 2)
+
+    @pytest.mark.asyncio
+    async def test_search_returns_all(self, tmp_path):
+        """测试 search 等待所有站点并返回全部结果"""
+        chain = make_chain(
+            tmp_path,
+            [
+                FakeSiteModule("a", [make_result(str(i)) for i in range(60)]),
+                FakeSiteModule("b", [make_result("x", seeders=1)], delay=0.01),
+            ],
+        )
+        results = await chain.search(MUSIC, use_cache=False)
+        assert len(results) == 61
+        assert results[0].torrent_id == "x"
+
+
+class TestTorrentsEndpoint:
+    """流式搜索端点测试类"""
+
+    def test_sse_stream(self, tmp_path):
+        """测试 SSE 按事件推送结果"""
+        chain = make_chain(tmp_path, [FakeSiteModule("s", [make_result("a")])])
+        app = FastAPI()
+        app.dependency_overrides[torrents_endpoint.get_torrents_chain] = lambda: chain
+        app.include_router(torrents_endpoint.router, prefix="/torrents")
+
+        with TestClient(app) as client:
+            response = client.get(
+                "/torrents/search/stream", params={"artist": "周杰伦", "album": "叶惠美"}
+            )
+        assert response.headers["content-type"].startswith("text/event-stream")
+        messages = [m for m in response.text.split("\n\n") if m]
+        assert [m.split("\n")[0] for m in messages] == ["event: site", "event: done"]
+        assert '"torrent_id": "a"' in messages[-1]
+
+    def test_requires_query(self):
+        """测试缺少搜索条件时返回 400"""
+        app = FastAPI()
+        app.state.container = Container()
+        app.include_router(torrents_endpoint.router, prefix="/torrents")
+        with TestClient(app) as client:
+            assert client.get("/torrents/search/stream").status_code == 400
@@ -0,0 +1,168 @@
+"""
+转码器单元测试
+使用模拟 ffmpeg 脚本测试转码流、并发限制和 LRU 磁盘缓存
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+from starlette.requests import ClientDisconnect
+
+from app.core.transcoder import TranscodeError, Transcoder, TranscodeResponse
+
+# 模拟 ffmpeg：按参数输出可预测的数据，源文件内容为 broken 时异常退出
+FAKE_FFMPEG = """
+import sys, time
+args = sys.argv[1:]
+source = args[args.index("-i") + 1]
+if open(source, "rb").read() == b"broken":
+    sys.stdout.buffer.write(b"partial")
+    sys.exit(1)
+start = args[args.index("-ss") + 1] if "-ss" in args else "0"
+header = f"{args[args.index('-c:a') + 1]}|{args[args.index('-b:a') + 1]}|{start}|".encode()
+sys.stdout.buffer.write(header)
+for _ in range(4):
+    sys.stdout.buffer.write(b"x" * 1000)
+    sys.stdout.buffer.flush()
+    time.sleep(0.01)
+"""
+
+
+@pytest.fixture
+def ffmpeg(tmp_path):
+    """模拟 ffmpeg 可执行文件"""
+    path = tmp_path / "ffmpeg"
+    path.write_text(f"#!{sys.executable}\n{FAKE_FFMPEG}")
+    path.chmod(0o755)
+    return str(path)
+
+
+@pytest.fixture
+def source(tmp_path):
+    """源音频文件"""
+    path = tmp_path / "song.flac"
+    path.write_bytes(b"flac")
+    return path
+
+
+@pytest.fixture
+def transcoder(tmp_path, ffmpeg):
+    """转码器"""
+    return Transcoder(tmp_path / "transcode", 1024 * 1024, workers=1, ffmpeg_path=ffmpeg)
+
+
+async def _read(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+class TestTranscoder:
+    """Transcoder 测试类"""
+
+    @pytest.mark.asyncio
+    async def test_transcode_and_cache(self, transcoder, source):
+        """测试转码输出并写入缓存"""
+        assert transcoder.get_cached(1, source, "opus", 128) is None
+
+        data = await _read(await transcoder.transcode(1, source, "opus", 128))
+        assert data.startswith(b"libopus|128k|0|")
+        assert len(data) == len(b"libopus|128k|0|") + 4000
+
+        cached = transcoder.get_cached(1, source, "opus", 128)
+        assert cached is not None
+        assert cached.read_bytes() == data
+        # 不同码率是不同的缓存键
+        assert transcoder.get_cached(1, source, "opus", 192) is None
+        assert not list(transcoder.cache_dir.glob("*.part"))
+
+    @pytest.mark.asyncio
+    async def test_seek_is_not_cached(self, transcoder, source):
+        """测试从中间开始的转码不写入缓存"""
+        data = await _read(await transcoder.transcode(1, source, "mp3", 192, start_time=30))
+        assert data.startswith(b"libmp3lame|192k|30.000|")
+        assert transcoder.get_cached(1, source, "mp3", 192) is None
+
+    @pytest.mark.asyncio
+    async def test_source_change_invalidates_cache(self, transcoder, source):
+        """测试源文件修改后缓存失效"""
+        await _read(await transcoder.transcode(1, source, "mp3", 128))
+        assert transcoder.get_cached(1, source, "mp3", 128) is not None
+
+        os.utime(source, (0, 0))
+        assert transcoder.get_cached(1, source, "mp3", 128) is None
+
+    @pytest.mark.asyncio
+    async def test_failed_transcode_is_not_cached(self, transcoder, source):
+        """测试转码失败时不写入缓存"""
+        source.write_bytes(b"broken")
+        await _read(await transcoder.transcode(1, source, "mp3", 128))
+        assert transcoder.get_cached(1, source, "mp3", 128) is None
+        assert not list(transcoder.cache_dir.iterdir())
+
+    @pytest.mark.asyncio
+    async def test_unsupported_format(self, transcoder, source):
+        """测试不支持的格式"""
+        with pytest.raises(TranscodeError):
+            await transcoder.transcode(1, source, "wma", 128)
+
+    @pytest.mark.asyncio
+    async def test_missing_ffmpeg(self, tmp_path, source):
+        """测试 ffmpeg 不存在时报错并释放名额"""
+        transcoder = Transcoder(
+            tmp_path / "transcode", 1024, workers=1, ffmpeg_path=str(tmp_path / "missing")
+        )
+        for _ in range(2):
+            with pytest.raises(TranscodeError):
+                await transcoder.transcode(1, source, "mp3", 128)
+
+    @pytest.mark.asyncio
+    async def test_worker_limit(self, transcoder, source):
+        """测试并发转码数受限，关闭流后释放名额"""
+        first = await transcoder.transcode(1, source, "mp3", 128)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(transcoder.transcode(2, source, "mp3", 128), 0.2)
+
+        # 中途关闭：终止进程，不写入缓存
+        await first.aclose()
+        second = await asyncio.wait_for(transcoder.transcode(2, source, "mp3", 128), 1)
+        await _read(second)
+        assert transcoder.get_cached(1, source, "mp3", 128) is None
+        assert transcoder.get_cached(2, source, "mp3", 128) is not None
+
+    @pytest.mark.asyncio
+    async def test_response_releases_when_not_started(self, transcoder, source):
+        """测试响应头发送前客户端断开时也会释放名额并终止 ffmpeg"""
+        stream = await transcoder.transcode(1, source, "mp3", 128)
+        response = TranscodeResponse(stream, media_type="audio/mpeg")
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            raise OSError("连接已断开")
+
+        with pytest.raises(ClientDisconnect):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+
+        second = await asyncio.wait_for(transcoder.transcode(2, source, "mp3", 128), 1)
+        await _read(second)
+        assert stream._process.returncode is not None
+        assert not list(transcoder.cache_dir.glob("*.part"))
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self, tmp_path, ffmpeg, source):
+        """测试缓存超过上限时淘汰最久未使用的结果"""
+        # 每个结果约 4KB，上限只能放下两个
+        transcoder = Transcoder(tmp_path / "transcode", 9000, workers=2, ffmpeg_path=ffmpeg)
+        await _read(await transcoder.transcode(1, source, "mp3", 128))
+        await _read(await transcoder.transcode(2, source, "mp3", 128))
+
+        # 访问 1 使其成为最近使用
+        first = transcoder.get_cached(1, source, "mp3", 128)
+        os.utime(first, (first.stat().st_atime, first.stat().st_mtime + 10))
+
+        await _read(await transcoder.transcode(3, source, "mp3", 128))
+        assert transcoder.get_cached(1, source, "mp3", 128) is not None
+        assert transcoder.get_cached(2, source, "mp3", 128) is None
+        assert transcoder.get_cached(3, source, "mp3", 128) is not None